@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Benchmark loading of graph files.
+
+Compares DependencyGraph.from_file() for JSON and binary graph files with
+a loader that adds every edge with add_dependency() and parses all
+requirements and versions up front. Without a graph file, a synthetic
+graph is generated.
+
+    hatch run e2e:run python e2e/benchmark_graph_load.py [--packages N] [GRAPH]
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import tempfile
+import time
+import tracemalloc
+import typing
+
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from fromager.dependency_graph import ROOT, DependencyGraph
+from fromager.requirements_file import RequirementType
+
+
+def generate_graph(packages: int, seed: int = 0) -> dict[str, typing.Any]:
+    """Create a graph dict with about 6 edges per package"""
+    rng = random.Random(seed)
+    names = [f"package-{i}" for i in range(packages)]
+    req_types = ["install"] * 3 + ["build-system", "build-backend", "build-sdist"]
+
+    def node_dict(name: str) -> dict[str, typing.Any]:
+        return {
+            "download_url": f"https://pypi.example/{name}-1.0.tar.gz",
+            "pre_built": False,
+            "version": "1.0",
+            "canonicalized_name": name,
+            "constraint": None,
+            "edges": [],
+        }
+
+    graph: dict[str, typing.Any] = {ROOT: node_dict(ROOT)}
+    graph[ROOT]["version"] = "0"
+    for name in names:
+        graph[f"{name}==1.0"] = node_dict(name)
+    for name in names[: max(1, packages // 20)]:
+        graph[ROOT]["edges"].append(
+            {"key": f"{name}==1.0", "req_type": "toplevel", "req": name}
+        )
+    for i, name in enumerate(names):
+        children = names[i + 1 :]
+        for child in rng.sample(children, min(6, len(children))):
+            graph[f"{name}==1.0"]["edges"].append(
+                {
+                    "key": f"{child}==1.0",
+                    "req_type": rng.choice(req_types),
+                    "req": f"{child}>=1.0; python_version >= '3.9'",
+                }
+            )
+    return graph
+
+
+def eager_load(graph_file: pathlib.Path) -> DependencyGraph:
+    """Load a graph with add_dependency(), parsing everything up front"""
+    with graph_file.open() as f:
+        graph_dict = json.load(f)
+    graph = DependencyGraph()
+    stack = [ROOT]
+    visited = set()
+    while stack:
+        curr_key = stack.pop()
+        if curr_key in visited:
+            continue
+        node_dict = graph_dict[curr_key]
+        parent_name = parent_version = None
+        if curr_key != ROOT:
+            parent_name = canonicalize_name(node_dict["canonicalized_name"])
+            parent_version = Version(node_dict["version"])
+        for edge_dict in node_dict["edges"]:
+            destination = graph_dict[edge_dict["key"]]
+            constraint = destination.get("constraint")
+            graph.add_dependency(
+                parent_name=parent_name,
+                parent_version=parent_version,
+                req_type=RequirementType(edge_dict["req_type"]),
+                req=Requirement(edge_dict["req"]),
+                req_version=Version(destination["version"]),
+                download_url=destination["download_url"],
+                pre_built=destination["pre_built"],
+                constraint=Requirement(constraint) if constraint else None,
+                build_fingerprint=destination.get("build_fingerprint"),
+            )
+            stack.append(edge_dict["key"])
+        visited.add(curr_key)
+    return graph
+
+
+def measure(
+    loader: typing.Callable[[pathlib.Path], DependencyGraph],
+    graph_file: pathlib.Path,
+    repeat: int,
+) -> tuple[float, int]:
+    """Return the best load time and the peak memory of one load"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(graph_file)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    graph = loader(graph_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del graph
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("graph", nargs="?", type=pathlib.Path)
+    parser.add_argument("--packages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        graph_file: pathlib.Path = args.graph
+        if graph_file is None:
+            graph_file = pathlib.Path(tmpdir) / "graph.json"
+            graph_file.write_text(json.dumps(generate_graph(args.packages)))
+        graph = DependencyGraph.from_file(graph_file)
+        edges = sum(len(node.children) for node in graph.get_all_nodes())
+        print(f"{graph_file}: {len(graph)} packages, {edges} edges")
+        binary_file = pathlib.Path(tmpdir) / "graph.bin"
+        with binary_file.open("wb") as f:
+            graph.serialize_binary(f)
+        print(
+            f"JSON {graph_file.stat().st_size / 2**20:.1f} MiB, "
+            f"binary {binary_file.stat().st_size / 2**20:.1f} MiB"
+        )
+        runs = [
+            ("from_file", DependencyGraph.from_file, graph_file),
+            ("from_file (binary)", DependencyGraph.from_file, binary_file),
+            ("add_dependency", eager_load, graph_file),
+        ]
+        for name, loader, path in runs:
+            best, peak = measure(loader, path, args.repeat)
+            print(f"{name:>18}: {best:.3f}s, peak memory {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
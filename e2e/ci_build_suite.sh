@@ -18,5 +18,6 @@ run_test "build_steps"
 
 test_section "advanced build tests"
 run_test "build_parallel"
+run_test "build_parallel_coordinator"
 
 finish_suite
@@ -0,0 +1,77 @@
+#!/bin/bash
+# -*- indent-tabs-mode: nil; tab-width: 2; sh-indentation: 2; -*-
+
+set -e
+set -u
+set o pipefail
+
+# Test build-parallel --coordinator with two build-worker processes
+
+SCRIPTDIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+source "$SCRIPTDIR/common.sh"
+
+DIST="imapautofiler"
+PORT=8765
+URL="http://127.0.0.1:${PORT}/"
+
+cp "$SCRIPTDIR/build-parallel/graph.json" "$OUTDIR/graph.json"
+
+pass=true
+
+log="$OUTDIR/build-logs/coordinator.log"
+fromager \
+    --log-file "$log" \
+    --work-dir "$OUTDIR/work-dir" \
+    --sdists-repo "$OUTDIR/sdists-repo" \
+    --wheels-repo "$OUTDIR/wheels-repo" \
+    --settings-dir="$SCRIPTDIR/build-parallel" \
+    build-parallel --coordinator --coordinator-port "$PORT" "$OUTDIR/graph.json" &
+coordinator_pid=$!
+
+# every worker has its own work directory, like on separate hosts
+worker_pids=""
+for worker in 1 2; do
+  fromager \
+      --log-file "$OUTDIR/build-logs/worker-$worker.log" \
+      --work-dir "$OUTDIR/worker-$worker/work-dir" \
+      --sdists-repo "$OUTDIR/worker-$worker/sdists-repo" \
+      --wheels-repo "$OUTDIR/worker-$worker/wheels-repo" \
+      --settings-dir="$SCRIPTDIR/build-parallel" \
+      build-worker --coordinator "$URL" --worker-id "worker-$worker" &
+  worker_pids="$worker_pids $!"
+done
+
+for pid in $worker_pids; do
+  if ! wait "$pid"; then
+    echo "Build worker $pid failed" 1>&2
+    pass=false
+  fi
+done
+if ! wait "$coordinator_pid"; then
+  echo "Coordinator failed" 1>&2
+  pass=false
+fi
+
+$pass
+
+find "$OUTDIR/wheels-repo/"
+
+if ! grep -q "built by worker worker-" "$log"; then
+  echo "Did not find message indicating a worker built a package" 1>&2
+  pass=false
+fi
+
+EXPECTED_FILES="
+$OUTDIR/wheels-repo/downloads/setuptools-*.whl
+$OUTDIR/wheels-repo/downloads/$DIST-*.whl
+$OUTDIR/work-dir/build-sequence-summary.json
+"
+
+for pattern in $EXPECTED_FILES; do
+  if [ ! -f "${pattern}" ]; then
+    echo "Did not find $pattern" 1>&2
+    pass=false
+  fi
+done
+
+$pass
@@ -94,6 +94,16 @@ else:
     "--build-wheel-server-url",
     help="An optional URL for external web server for building wheels, to replace the built-in server. Must be configured to serve the path specified for --wheels-repo.",
 )
+@click.option(
+    "--build-cache-url",
+    default="",
+    help="URL of a content-addressed build cache to fetch wheels from, see 'fromager build-cache-server'",
+)
+@click.option(
+    "--build-cache-upload/--no-build-cache-upload",
+    default=True,
+    help="upload newly built wheels to the build cache",
+)
 @click.option(
     "-t",
     "--work-dir",
@@ -160,6 +170,15 @@ else:
     help="Build sdist and when with network isolation (unshare -cn)",
     show_default=True,
 )
+@click.option(
+    "--network-isolation-sandbox/--no-network-isolation-sandbox",
+    default=False,
+    help=(
+        "run network isolated commands in one persistent namespace per "
+        "worker thread instead of a new namespace per command"
+    ),
+    show_default=True,
+)
 @click.option(
     "--min-release-age",
     type=click.IntRange(min=0),
@@ -178,6 +197,8 @@ def main(
     sdists_repo: pathlib.Path | None,
     wheels_repo: pathlib.Path | None,
     build_wheel_server_url: str,
+    build_cache_url: str,
+    build_cache_upload: bool,
     work_dir: pathlib.Path | None,
     patches_dir: pathlib.Path,
     settings_file: pathlib.Path,
@@ -187,6 +208,7 @@ def main(
     variant: str,
     jobs: int | None,
     network_isolation: bool,
+    network_isolation_sandbox: bool,
     min_release_age: int,
 ) -> None:
     # Save the debug flag so invoke_main() can use it.
@@ -254,10 +276,17 @@ def main(
             logger.info(f"maximum concurrent jobs: {jobs}")
             logger.info(f"constraints files: {', '.join(constraints_files)}")
             logger.info(f"network isolation: {network_isolation}")
+            if network_isolation and network_isolation_sandbox:
+                logger.info("network isolation sandbox: one per worker thread")
             if build_wheel_server_url:
                 logger.info(f"external build wheel server: {build_wheel_server_url}")
             else:
                 logger.info("using internal build wheel server")
+            if build_cache_url:
+                logger.info(
+                    f"build cache: {build_cache_url} "
+                    f"(upload {'enabled' if build_cache_upload else 'disabled'})"
+                )
             overrides.log_overrides()
             hooks.log_hooks()
 
@@ -277,10 +306,13 @@ def main(
         sdists_repo=sdists_repo,
         wheels_repo=wheels_repo,
         wheel_server_url=build_wheel_server_url,
+        build_cache_url=build_cache_url,
+        build_cache_upload=build_cache_upload,
         work_dir=work_dir,
         cleanup=cleanup,
         variant=variant,
         network_isolation=network_isolation,
+        network_isolation_sandbox=network_isolation_sandbox,
         max_jobs=jobs,
         settings_dir=settings_dir,
         cooldown=(
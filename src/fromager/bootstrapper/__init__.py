@@ -1,3 +1,4 @@
 from ._bootstrapper import Bootstrapper
+from ._types import BootstrapListener, FailureRecord, FailureType
 
-__all__ = ["Bootstrapper"]
+__all__ = ["BootstrapListener", "Bootstrapper", "FailureRecord", "FailureType"]
@@ -33,6 +33,7 @@ from ._prepare_source import PrepareSource
 from ._process_install_deps import ProcessInstallDeps
 from ._resolve import Resolve
 from ._types import (
+    BootstrapListener,
     FailureRecord,
     FailureType,
     SeenKey,
@@ -65,6 +66,7 @@ class Bootstrapper:
         test_mode: bool = False,
         multiple_versions: bool = False,
         num_bg_threads: int = DEFAULT_BG_THREADS,
+        listener: BootstrapListener | None = None,
     ) -> None:
         if test_mode and sdist_only:
             raise ValueError(
@@ -78,6 +80,7 @@ class Bootstrapper:
         self.sdist_only = sdist_only
         self.test_mode = test_mode
         self.multiple_versions = multiple_versions
+        self.listener = listener
         self.why: list[tuple[RequirementType, Requirement, Version]] = []
         self._num_bg_threads = max(1, num_bg_threads)
         self._bg_pool: concurrent.futures.ThreadPoolExecutor | None = (
@@ -317,7 +320,8 @@ class Bootstrapper:
                     )
                     self._drain_background_pool()
                 try:
-                    new_items = item.run(self)
+                    with self.ctx.resource_pool.hold(item.resource_classes):
+                        new_items = item.run(self)
                 except Exception as err:
                     new_items = self._handle_phase_error(item, err)
 
@@ -4,7 +4,9 @@ import logging
 import pathlib
 import typing
 
-from .. import finders, server, sources, wheels
+from packaging.utils import canonicalize_name
+
+from .. import finders, fingerprint, server, sources, wheels
 from ._phase import Phase
 from ._process_install_deps import ProcessInstallDeps
 from ._types import BootstrapPhase, SourceBuildResult
@@ -30,7 +32,8 @@ class Build(Phase):
 
     When ``pbi.exclusive_build`` is set the bootstrap loop drains the
     background thread pool before calling ``run()`` so the build has exclusive
-    access to the environment.
+    access to the environment. The build holds a slot of each of the
+    package's resource classes.
 
     Next phase: ``ProcessInstallDeps``.
     """
@@ -42,6 +45,10 @@ class Build(Phase):
     def requires_exclusive_run(self) -> bool:
         return self.work_item.exclusive_build
 
+    @property
+    def resource_classes(self) -> frozenset[str]:
+        return self.work_item.resource_classes
+
     def run(self, bt: Bootstrapper) -> list[Phase]:
         """BUILD phase: install remaining deps, build wheel/sdist.
 
@@ -60,6 +67,15 @@ class Build(Phase):
 
         wheel_filename, sdist_filename = self.do_build(bt.ctx, bt.explain)
 
+        if wheel_filename is not None:
+            build_fingerprint = fingerprint.read_wheel_fingerprint(wheel_filename)
+            if build_fingerprint is not None:
+                bt.ctx.dependency_graph.set_build_fingerprint(
+                    canonicalize_name(wi.req.name),
+                    wi.resolved_version,
+                    build_fingerprint.digest,
+                )
+
         source_type = sources.get_source_type(bt.ctx, wi.req)
 
         wi.build_result = SourceBuildResult(
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import pathlib
@@ -12,7 +13,17 @@ from packaging.requirements import Requirement
 from packaging.version import Version
 from resolvelib.resolvers import ResolverException
 
-from .. import dependencies, finders, resolver, server, wheels
+from .. import (
+    build_cache,
+    cache_index,
+    dependencies,
+    finders,
+    fingerprint,
+    resolver,
+    server,
+    sources,
+    wheels,
+)
 from ..requirements_file import RequirementType
 from ._types import PreparedSourceData
 
@@ -104,6 +115,10 @@ def _look_for_existing_wheel(
             f"found wheel for {resolved_version} in {wheel_filename} but build tag does not match. Got {build_tag} but expected {expected_build_tag}"
         )
         return None, None
+    if not fingerprint.verify_wheel_fingerprint(
+        ctx=ctx, req=req, version=resolved_version, wheel_filename=wheel_filename
+    ):
+        return None, None
     logger.info(f"found existing wheel {wheel_filename}")
     build_reqs_dir = _extract_build_reqs_from_wheel(
         ctx.work_dir, req, resolved_version, wheel_filename
@@ -126,7 +141,11 @@ def _download_wheel_from_cache(
             cache_server_url=cache_wheel_server_url,
             constraints=ctx.constraints,
         )
-        results = resolver.find_all_matching_from_provider(provider, pinned_req)
+        results = cache_index.lookup_for_provider(
+            provider, cache_wheel_server_url, pinned_req
+        )
+        if results is None:
+            results = resolver.find_all_matching_from_provider(provider, pinned_req)
         wheel_url, _ = results[0]
         wheelfile_name = pathlib.Path(urlparse(wheel_url).path)
         pbi = ctx.package_build_info(req)
@@ -145,6 +164,12 @@ def _download_wheel_from_cache(
         cached_wheel = wheels.download_wheel(
             req=req, wheel_url=wheel_url, output_directory=ctx.wheels_downloads
         )
+        if not fingerprint.verify_wheel_fingerprint(
+            ctx=ctx, req=req, version=resolved_version, wheel_filename=cached_wheel
+        ):
+            # remove the outdated wheel, so it is not picked up again
+            cached_wheel.unlink()
+            return None, None
         if cache_wheel_server_url != ctx.wheel_server_url:
             server.update_wheel_mirror(ctx)
         logger.info("found built wheel on cache server")
@@ -171,18 +196,58 @@ def _download_wheel_from_cache(
         return None, None
 
 
+def _download_wheel_from_build_cache(
+    ctx: context.WorkContext,
+    req: Requirement,
+    resolved_version: Version,
+    source_url: str | None = None,
+) -> tuple[pathlib.Path | None, pathlib.Path | None]:
+    get_source_filename = (
+        functools.partial(
+            sources.download_source,
+            ctx=ctx,
+            req=req,
+            version=resolved_version,
+            download_url=source_url,
+        )
+        if source_url
+        else None
+    )
+    # the build environment is not known yet, it is not compared
+    cached_wheel = build_cache.fetch_wheel(
+        ctx,
+        req,
+        resolved_version,
+        ctx.wheels_downloads,
+        get_source_filename=get_source_filename,
+    )
+    if not cached_wheel:
+        return None, None
+    server.update_wheel_mirror(ctx)
+    unpack_dir = _extract_build_reqs_from_wheel(
+        ctx.work_dir, req, resolved_version, cached_wheel
+    )
+    return cached_wheel, unpack_dir
+
+
 def find_cached_wheel(
     ctx: context.WorkContext,
     cache_wheel_server_url: str | None,
     req: Requirement,
     resolved_version: Version,
+    source_url: str | None = None,
 ) -> tuple[pathlib.Path | None, pathlib.Path | None]:
-    """Look for cached wheel in 3 locations (thread-safe, no Bootstrapper state).
+    """Look for cached wheel in 4 locations (thread-safe, no Bootstrapper state).
 
     Checks for cached wheels in order:
     1. wheels_build directory (previously built)
     2. wheels_downloads directory (previously downloaded)
-    3. Cache server (remote cache)
+    3. Build cache (content-addressed remote cache, if configured)
+    4. Cache server (remote cache)
+
+    Wheels whose build fingerprint does not match the current patches,
+    settings, and environment are ignored. Wheels from the build cache
+    are also checked against the source at *source_url*, if given.
 
     Returns:
         Tuple of (cached_wheel_filename, unpacked_cached_wheel).
@@ -200,6 +265,12 @@ def find_cached_wheel(
     if cached_wheel:
         return cached_wheel, unpacked
 
+    cached_wheel, unpacked = _download_wheel_from_build_cache(
+        ctx, req, resolved_version, source_url
+    )
+    if cached_wheel:
+        return cached_wheel, unpacked
+
     cached_wheel, unpacked = _download_wheel_from_cache(
         ctx, cache_wheel_server_url, req, resolved_version
     )
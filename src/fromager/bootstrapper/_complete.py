@@ -34,4 +34,7 @@ class Complete(Phase):
                 wi.build_result.sdist_root_dir,
                 wi.build_result.build_env,
             )
+        if bt.listener is not None:
+            assert wi.resolved_version is not None
+            bt.listener.package_completed(wi.req, wi.resolved_version)
         return []
@@ -58,6 +58,15 @@ class Phase(abc.ABC):
         """
         return False
 
+    @property
+    def resource_classes(self) -> frozenset[str]:
+        """Resource classes that this item holds while ``run()`` is active.
+
+        The bootstrap loop waits for a free slot of every class, e.g. while
+        a streaming build of the same class is running.
+        """
+        return frozenset()
+
     def background_work(
         self, bt: Bootstrapper
     ) -> typing.Callable[[], typing.Any] | None:
@@ -36,7 +36,7 @@ def _bg_prepare_source(
     # making them unique across concurrent threads processing different packages.
     logger.info("preparing source")
     cached_wheel, unpacked = _cache.find_cached_wheel(
-        ctx, cache_wheel_server_url, req, resolved_version
+        ctx, cache_wheel_server_url, req, resolved_version, source_url=source_url
     )
     if unpacked is not None:
         return PreparedSourceData(
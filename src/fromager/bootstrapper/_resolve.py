@@ -113,7 +113,11 @@ class Resolve(Phase):
             filtered: list[tuple[str, Version]] = []
             for source_url, version in resolved_versions:
                 cached_wheel, _ = _cache.find_cached_wheel(
-                    bt.ctx, bt.cache_wheel_server_url, self.work_item.req, version
+                    bt.ctx,
+                    bt.cache_wheel_server_url,
+                    self.work_item.req,
+                    version,
+                    source_url=source_url,
                 )
                 if cached_wheel:
                     logger.info(
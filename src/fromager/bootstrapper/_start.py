@@ -64,6 +64,8 @@ class Start(Phase):
             )
             return []
         bt.mark_as_seen(wi.req, wi.resolved_version, wi.build_sdist_only)
+        if bt.listener is not None:
+            bt.listener.package_started(wi.req, wi.resolved_version)
 
         logger.info(
             f"new {wi.req_type} dependency {wi.req} resolves to {wi.resolved_version}"
@@ -74,4 +76,5 @@ class Start(Phase):
         pbi = bt.ctx.package_build_info(wi.req)
         wi.pbi_pre_built = pbi.pre_built
         wi.exclusive_build = pbi.exclusive_build
+        wi.resource_classes = pbi.resource_classes
         return [PrepareSource(wi)]
@@ -5,7 +5,9 @@ import pathlib
 import typing
 from enum import StrEnum
 
+from packaging.requirements import Requirement
 from packaging.utils import NormalizedName
+from packaging.version import Version
 
 from .. import build_environment
 from ..requirements_file import SourceType
@@ -51,13 +53,39 @@ class PreparedSourceData:
     unpack_dir: pathlib.Path | None = None
 
 
-# Valid failure types for test mode error recording
-FailureType = typing.Literal["resolution", "bootstrap", "hook", "dependency_extraction"]
+class BootstrapListener(typing.Protocol):
+    """Receives notifications about packages processed by the bootstrapper.
+
+    Methods are called from the bootstrap thread.
+    """
+
+    def package_started(self, req: Requirement, version: Version) -> None:
+        """Processing of a new package version starts."""
+
+    def package_completed(self, req: Requirement, version: Version) -> None:
+        """A package version and all of its dependencies are processed."""
+
+
+# Valid failure types for test mode and keep-going error recording
+FailureType = typing.Literal[
+    "resolution",
+    "bootstrap",
+    "hook",
+    "dependency_extraction",
+    "build",
+    "timeout",
+    "blocked",
+]
 
 
 class FailureRecord(typing.TypedDict):
     """Record of a package that failed during bootstrap in test mode.
 
+    ``build-parallel --keep-going`` writes the same records with the failure
+    types ``build`` for failed builds, ``timeout`` for builds that were
+    killed by the hung-build watchdog, and ``blocked`` for packages that were
+    not built, because a build requirement failed.
+
     Attributes:
         package: The package name that failed.
         version: The resolved version (None if resolution failed).
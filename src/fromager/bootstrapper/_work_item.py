@@ -47,6 +47,7 @@ class WorkItem:
     build_result: SourceBuildResult | None = None
     pbi_pre_built: bool = False
     exclusive_build: bool = False
+    resource_classes: frozenset[str] = frozenset()
     build_system_deps: set[Requirement] = dataclasses.field(default_factory=set)
     build_backend_deps: set[Requirement] = dataclasses.field(default_factory=set)
     build_sdist_deps: set[Requirement] = dataclasses.field(default_factory=set)
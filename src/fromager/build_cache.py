@@ -0,0 +1,506 @@
+"""Content-addressed build cache
+
+The build cache stores wheels by a cache key that is derived from the
+build fingerprint (see :mod:`fromager.fingerprint`) instead of name and
+version. Build hosts with the same settings, patches, variant, and
+platform share the same keys. The source and the build environment are
+not known when bootstrap looks up a wheel, so a key has one entry per
+full build fingerprint. A wheel built on one host is reused on another
+host only if its fingerprint matches the inputs of that host.
+
+The protocol is plain HTTP::
+
+    GET {url}/v1/{key[:2]}/{key}/index.json
+    GET {url}/v1/{key[:2]}/{key}/{digest}/{wheel filename}
+    PUT {url}/v1/{key[:2]}/{key}/{wheel filename}
+
+The index lists the JSON metadata of all entries of a key. Clients only
+upload the wheel. The server reads the fingerprint from the wheel and
+publishes wheel and metadata in one step under the digest of the
+fingerprint. Entries are immutable, servers reject uploads of an
+existing entry with ``409 Conflict``.
+
+.. versionadded:: 0.93.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import re
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import typing
+import zipfile
+from urllib.parse import quote
+
+import requests
+import uvicorn
+from packaging.requirements import Requirement
+from packaging.utils import (
+    InvalidWheelFilename,
+    canonicalize_name,
+    parse_wheel_filename,
+)
+from packaging.version import Version
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from . import downloads, fingerprint, server
+from .request_session import session
+
+if typing.TYPE_CHECKING:
+    from . import context
+
+logger = logging.getLogger(__name__)
+
+BUILD_CACHE_API: typing.Final = "v1"
+INDEX_FILENAME: typing.Final = "index.json"
+METADATA_FILENAME: typing.Final = "metadata.json"
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BuildCacheError(Exception):
+    """Build cache entry is invalid or could not be transferred"""
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheEntry:
+    """Metadata of a build cache entry"""
+
+    key: str
+    digest: str
+    """Digest of the build fingerprint, the hash of wheels without one"""
+    name: str
+    version: str
+    filename: str
+    sha256: str
+    size: int
+    fingerprint: dict[str, typing.Any] | None = None
+    created: str = ""
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, typing.Any]) -> CacheEntry:
+        fields = {field.name for field in dataclasses.fields(cls)}
+        try:
+            return cls(**{k: v for k, v in data.items() if k in fields})
+        except TypeError as err:
+            raise BuildCacheError(f"invalid cache metadata: {err}") from err
+
+
+def compute_cache_key(
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+) -> str:
+    """Compute the build cache key of a package version
+
+    The key covers the name, version, and build tag of the package, and
+    the fingerprint components that are known before the source is
+    downloaded and the build environment is created: patches, settings,
+    and the build host environment. Source and build environment are
+    unknown when bootstrap looks for cached wheels. A key has an entry per
+    full fingerprint, :func:`fetch_wheel` picks the entry that matches.
+    """
+    pbi = ctx.package_build_info(req)
+    fp = fingerprint.compute_build_fingerprint(ctx=ctx, req=req, version=version)
+    data = {
+        "api": BUILD_CACHE_API,
+        "name": canonicalize_name(req.name),
+        "version": str(version),
+        "build_tag": list(pbi.build_tag(version)),
+        "patches": fp.patches,
+        "settings": fp.settings,
+        "environment": fp.environment,
+    }
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _sha256_file(filename: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with filename.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _validate_key(key: str) -> None:
+    if not _KEY_RE.match(key):
+        raise BuildCacheError(f"invalid cache key {key!r}")
+
+
+def _validate_entry(entry: CacheEntry, req: Requirement, version: Version) -> None:
+    name = canonicalize_name(req.name)
+    if "/" in entry.filename or "\\" in entry.filename:
+        raise BuildCacheError(f"invalid wheel file name {entry.filename!r}")
+    try:
+        wheel_name, wheel_version, _, _ = parse_wheel_filename(entry.filename)
+    except InvalidWheelFilename as err:
+        raise BuildCacheError(str(err)) from err
+    if (wheel_name, wheel_version) != (name, version) or (
+        canonicalize_name(entry.name),
+        Version(entry.version),
+    ) != (name, version):
+        raise BuildCacheError(
+            f"cache entry {entry.digest} has {entry.filename} "
+            f"({entry.name} {entry.version}), expected {name} {version}"
+        )
+
+
+def _select_entry(
+    entries: list[CacheEntry], expected: fingerprint.BuildFingerprint
+) -> CacheEntry | None:
+    """Pick the newest entry whose fingerprint matches *expected*
+
+    Entries without fingerprint are accepted like wheels without
+    fingerprint, but entries with a matching fingerprint win.
+    """
+    matching: list[CacheEntry] = []
+    for entry in entries:
+        if entry.fingerprint is not None:
+            try:
+                fp = fingerprint.BuildFingerprint.from_dict(entry.fingerprint)
+            except (ValueError, KeyError, TypeError) as err:
+                logger.debug("ignoring entry %s: %s", entry.digest, err)
+                continue
+            differences = expected.differences(fp)
+            if differences:
+                logger.debug(
+                    "entry %s was built from different inputs: %s changed",
+                    entry.digest,
+                    ", ".join(differences),
+                )
+                continue
+        matching.append(entry)
+    if not matching:
+        return None
+    return max(matching, key=lambda e: (e.fingerprint is not None, e.created))
+
+
+class BuildCacheClient:
+    """HTTP client for a content-addressed build cache"""
+
+    def __init__(
+        self,
+        url: str,
+        http_session: requests.Session | None = None,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.session = http_session if http_session is not None else session
+
+    def entry_url(self, key: str, *parts: str) -> str:
+        _validate_key(key)
+        path = "/".join(quote(part) for part in parts)
+        return f"{self.url}/{BUILD_CACHE_API}/{key[:2]}/{key}/{path}"
+
+    def get_entries(self, key: str) -> list[CacheEntry]:
+        """Get metadata of all entries of a cache key"""
+        url = self.entry_url(key, INDEX_FILENAME)
+        resp = self.session.get(url)
+        if resp.status_code == 404:
+            return []
+        resp.raise_for_status()
+        data = resp.json()
+        if not isinstance(data, dict) or not isinstance(data.get("entries"), list):
+            raise BuildCacheError(f"{url} is not a valid index")
+        entries = [CacheEntry.from_dict(item) for item in data["entries"]]
+        for entry in entries:
+            if entry.key != key or not _KEY_RE.match(entry.digest):
+                raise BuildCacheError(
+                    f"{url} has an entry {entry.digest!r} for key {entry.key}"
+                )
+        return entries
+
+    def download(
+        self,
+        entry: CacheEntry,
+        req: Requirement,
+        version: Version,
+        destination_dir: pathlib.Path,
+    ) -> pathlib.Path:
+        """Download and verify the wheel of a cache entry
+
+        The metadata comes from the server, so the wheel file name must be
+        a plain wheel file name of *req* and *version*. The wheel is first
+        downloaded into a temporary directory next to *destination_dir*
+        and only moved into *destination_dir* when its hash matches the
+        metadata. An existing file is replaced.
+        """
+        _validate_entry(entry, req, version)
+        destination_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=destination_dir.parent) as tmpdir:
+            tmp_wheel = downloads.download_wheel(
+                destination_dir=pathlib.Path(tmpdir),
+                url=self.entry_url(entry.key, entry.digest, entry.filename),
+                destination_filename=entry.filename,
+            )
+            sha256 = _sha256_file(tmp_wheel)
+            if sha256 != entry.sha256:
+                raise BuildCacheError(
+                    f"{entry.filename} from cache entry {entry.key} has "
+                    f"sha256 {sha256}, expected {entry.sha256}"
+                )
+            wheel_filename = destination_dir / entry.filename
+            os.replace(tmp_wheel, wheel_filename)
+        return wheel_filename
+
+    def upload(self, key: str, wheel_filename: pathlib.Path) -> bool:
+        """Upload a wheel, the server creates the metadata
+
+        Returns ``False`` if the cache already has an entry for *key* with
+        the build fingerprint of the wheel.
+        """
+        with wheel_filename.open("rb") as f:
+            resp = self.session.put(
+                self.entry_url(key, wheel_filename.name),
+                data=f,
+                headers={"Content-Type": "application/zip"},
+            )
+        if resp.status_code == 409:
+            return False
+        resp.raise_for_status()
+        return True
+
+
+def fetch_wheel(
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+    destination_dir: pathlib.Path,
+    *,
+    get_source_filename: typing.Callable[[], pathlib.Path | None] | None = None,
+    build_distributions: typing.Mapping[str, Version] | None = None,
+) -> pathlib.Path | None:
+    """Fetch a wheel from the build cache of the work context
+
+    Returns ``None`` when no build cache is configured, the cache has no
+    entry with a build fingerprint that matches the current inputs, or
+    the entry cannot be downloaded. The source and the build environment
+    are only compared when *get_source_filename* and *build_distributions*
+    are given. *get_source_filename* is only called when the key has
+    entries. Errors are logged and not raised, the caller builds the
+    wheel instead.
+    """
+    if not ctx.build_cache_url:
+        return None
+    client = BuildCacheClient(ctx.build_cache_url)
+    key = compute_cache_key(ctx, req, version)
+    logger.info("checking build cache %s for key %s", client.url, key)
+    try:
+        entries = client.get_entries(key)
+    except (requests.exceptions.RequestException, BuildCacheError, ValueError) as err:
+        logger.warning("failed to fetch %s from build cache: %s", key, err)
+        return None
+    if not entries:
+        logger.info("no entry for key %s in build cache", key)
+        return None
+    try:
+        expected = fingerprint.compute_build_fingerprint(
+            ctx=ctx,
+            req=req,
+            version=version,
+            source_filename=get_source_filename() if get_source_filename else None,
+            build_distributions=build_distributions,
+        )
+    except (OSError, requests.exceptions.RequestException) as err:
+        logger.warning("failed to compute build fingerprint of %s: %s", req, err)
+        return None
+    entry = _select_entry(entries, expected)
+    if entry is None:
+        logger.info(
+            "none of the %i entries for key %s matches the build fingerprint",
+            len(entries),
+            key,
+        )
+        return None
+    try:
+        wheel_filename = client.download(entry, req, version, destination_dir)
+    except (requests.exceptions.RequestException, BuildCacheError, ValueError) as err:
+        logger.warning("failed to fetch %s from build cache: %s", key, err)
+        return None
+    logger.info("found %s in build cache", wheel_filename.name)
+    return wheel_filename
+
+
+def upload_wheel(
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+    wheel_filename: pathlib.Path,
+) -> None:
+    """Upload a newly built wheel to the build cache of the work context
+
+    Does nothing when no build cache is configured or uploads are
+    disabled. Errors are logged and not raised.
+    """
+    if not ctx.build_cache_url or not ctx.build_cache_upload:
+        return
+    client = BuildCacheClient(ctx.build_cache_url)
+    key = compute_cache_key(ctx, req, version)
+    try:
+        if client.upload(key, wheel_filename):
+            logger.info("uploaded %s to build cache as %s", wheel_filename.name, key)
+        else:
+            logger.info("build cache already has an entry like %s", wheel_filename.name)
+    except (OSError, requests.exceptions.RequestException) as err:
+        logger.warning(
+            "failed to upload %s to build cache: %s", wheel_filename.name, err
+        )
+
+
+class BuildCacheStore:
+    """File system storage for the bundled build cache server
+
+    Uploads are written to a private directory of the upload and renamed
+    to the entry directory when they are complete, so concurrent uploads
+    never mix their files and readers never see partial entries.
+    """
+
+    def __init__(self, basedir: pathlib.Path) -> None:
+        self.basedir = basedir.resolve()
+        self._lock = threading.Lock()
+
+    def _key_dir(self, prefix: str, key: str) -> pathlib.Path:
+        if not _KEY_RE.match(key) or prefix != key[:2]:
+            raise HTTPException(status_code=404, detail="Invalid cache key")
+        return self.basedir / prefix / key
+
+    def _wheel_filename(self, filename: str) -> str:
+        try:
+            parse_wheel_filename(filename)
+        except InvalidWheelFilename:
+            raise HTTPException(status_code=404, detail="Not found") from None
+        return filename
+
+    async def get_index(self, request: Request) -> Response:
+        key_dir = self._key_dir(
+            request.path_params["prefix"], request.path_params["key"]
+        )
+        if request.path_params["filename"] != INDEX_FILENAME:
+            raise HTTPException(status_code=404, detail="Not found")
+        entries = []
+        if key_dir.is_dir():
+            for entry_dir in sorted(key_dir.iterdir()):
+                metadata = entry_dir / METADATA_FILENAME
+                if _KEY_RE.match(entry_dir.name) and metadata.is_file():
+                    entries.append(json.loads(metadata.read_text()))
+        if not entries:
+            raise HTTPException(status_code=404, detail="Not found")
+        return JSONResponse({"entries": entries})
+
+    async def get_file(self, request: Request) -> Response:
+        key_dir = self._key_dir(
+            request.path_params["prefix"], request.path_params["key"]
+        )
+        digest = request.path_params["digest"]
+        if not _KEY_RE.match(digest):
+            raise HTTPException(status_code=404, detail="Not found")
+        path = key_dir / digest / self._wheel_filename(request.path_params["filename"])
+        if not path.is_file():
+            raise HTTPException(status_code=404, detail="Not found")
+        return FileResponse(path, media_type="application/zip")
+
+    async def put_file(self, request: Request) -> Response:
+        key = request.path_params["key"]
+        key_dir = self._key_dir(request.path_params["prefix"], key)
+        filename = self._wheel_filename(request.path_params["filename"])
+        name, version, _, _ = parse_wheel_filename(filename)
+        key_dir.mkdir(parents=True, exist_ok=True)
+        upload_dir = pathlib.Path(tempfile.mkdtemp(dir=key_dir, prefix=".upload-"))
+        try:
+            wheel = upload_dir / filename
+            with wheel.open("wb") as f:
+                async for chunk in request.stream():
+                    f.write(chunk)
+            if not zipfile.is_zipfile(wheel):
+                raise HTTPException(status_code=400, detail="Not a wheel")
+            sha256 = _sha256_file(wheel)
+            fp = fingerprint.read_wheel_fingerprint(wheel)
+            entry = CacheEntry(
+                key=key,
+                digest=fp.digest if fp is not None else sha256,
+                name=name,
+                version=str(version),
+                filename=filename,
+                sha256=sha256,
+                size=wheel.stat().st_size,
+                fingerprint=fp.to_dict() if fp is not None else None,
+                created=datetime.datetime.now(datetime.UTC).isoformat(),
+            )
+            upload_dir.joinpath(METADATA_FILENAME).write_text(
+                json.dumps(entry.to_dict(), indent=2, sort_keys=True) + "\n"
+            )
+            entry_dir = key_dir / entry.digest
+            with self._lock:
+                if entry_dir.exists():
+                    raise HTTPException(status_code=409, detail="Entry exists")
+                upload_dir.rename(entry_dir)
+        finally:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+        logger.info("stored %s", entry_dir.relative_to(self.basedir))
+        return Response(status_code=201)
+
+
+def make_app(basedir: pathlib.Path) -> Starlette:
+    """Create a Starlette app for the build cache server"""
+    store = BuildCacheStore(basedir)
+    key_path = f"/{BUILD_CACHE_API}/{{prefix:str}}/{{key:str}}"
+    routes: list[Route] = [
+        Route(
+            f"{key_path}/{{filename:str}}",
+            endpoint=store.get_index,
+            methods=["GET", "HEAD"],
+        ),
+        Route(f"{key_path}/{{filename:str}}", endpoint=store.put_file, methods=["PUT"]),
+        Route(
+            f"{key_path}/{{digest:str}}/{{filename:str}}",
+            endpoint=store.get_file,
+            methods=["GET", "HEAD"],
+        ),
+    ]
+    return Starlette(routes=routes)
+
+
+def run_build_cache_server(
+    basedir: pathlib.Path,
+    address: str = "127.0.0.1",
+    port: int = 0,
+) -> tuple[uvicorn.Server, socket.socket, threading.Thread, str]:
+    """Run the bundled build cache server in a background thread
+
+    Returns the server objects and the URL of the server.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+
+    basedir.mkdir(parents=True, exist_ok=True)
+    app = make_app(basedir)
+    cache_server, sock, thread = server._run_background_thread(
+        loop=loop, app=app, host=address, port=port
+    )
+    # the socket is bound, but it only accepts connections after startup
+    while not cache_server.started and thread.is_alive():
+        time.sleep(0.01)
+    realport = sock.getsockname()[1]
+    url = f"http://{address}:{realport}/"
+    logger.info("started build cache server at %s serving %s", url, basedir)
+    return cache_server, sock, thread, url
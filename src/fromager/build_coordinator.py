@@ -0,0 +1,569 @@
+"""Distributed builds with a coordinator and build workers
+
+``build-parallel --coordinator`` does not build anything itself. It serves
+the build topology of a graph over HTTP next to its wheel server. Build
+workers (``fromager build-worker --coordinator URL``) on the same or other
+machines lease packages that are ready to build, build them in their own
+work directory against the wheel server of the coordinator, and upload the
+wheels. The coordinator applies the scheduling rules of ``build-parallel``:
+build order, exclusive builds, and resource classes.
+
+A worker renews its lease while it builds. When a worker dies, its lease
+expires and the package is handed to the next worker, at most
+:data:`MAX_ATTEMPTS` times.
+
+The protocol is JSON over HTTP::
+
+    POST {url}/coordinator/v1/lease     200 task, 204 nothing ready, 410 finished
+    POST {url}/coordinator/v1/renew     200, 409 the lease is lost
+    PUT  {url}/coordinator/v1/wheels/{filename}
+    POST {url}/coordinator/v1/complete  200, 409 the result is ignored
+
+Workers upload the wheel before they complete the package.
+
+.. versionadded:: 0.93.0
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import dataclasses
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import typing
+from urllib.parse import quote
+
+import requests
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+from packaging.version import Version
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from . import server
+from .dependency_graph import DependencyNode, TrackingTopologicalSorter
+
+if typing.TYPE_CHECKING:
+    from . import context
+    from .bootstrapper import FailureRecord
+
+logger = logging.getLogger(__name__)
+
+COORDINATOR_API: typing.Final = "coordinator/v1"
+#: seconds until the lease of a worker expires without renewal
+DEFAULT_LEASE_TIMEOUT: typing.Final = 300.0
+#: number of leases of a package before it fails as lost
+MAX_ATTEMPTS: typing.Final = 3
+#: seconds between lease requests of idle workers
+POLL_INTERVAL: typing.Final = 5.0
+#: seconds that a worker keeps trying to reach the coordinator
+CONNECT_TIMEOUT: typing.Final = 60.0
+
+
+class CoordinatorError(Exception):
+    """Coordinator cannot be reached or rejected a request"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Task:
+    """A package that a worker builds"""
+
+    key: str
+    name: str
+    version: str
+    download_url: str
+    build_requirements: dict[str, str] = dataclasses.field(default_factory=dict)
+    force: bool = False
+    cache_wheel_server_url: str | None = None
+    lease_timeout: float = DEFAULT_LEASE_TIMEOUT
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, typing.Any]) -> Task:
+        fields = {field.name for field in dataclasses.fields(cls)}
+        try:
+            return cls(**{k: v for k, v in data.items() if k in fields})
+        except TypeError as err:
+            raise CoordinatorError(f"invalid task: {err}") from err
+
+
+@dataclasses.dataclass(frozen=True)
+class TaskResult:
+    """Outcome of a task, either a wheel or an error"""
+
+    key: str
+    wheel_filename: str | None = None
+    """File name of the uploaded wheel"""
+    prebuilt: bool = False
+    skipped: bool = False
+    error: dict[str, str] | None = None
+    """``exception_type``, ``exception_message``, and ``failure_type``"""
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, typing.Any]) -> TaskResult:
+        fields = {field.name for field in dataclasses.fields(cls)}
+        try:
+            return cls(**{k: v for k, v in data.items() if k in fields})
+        except TypeError as err:
+            raise CoordinatorError(f"invalid task result: {err}") from err
+
+
+@dataclasses.dataclass
+class _Lease:
+    worker: str
+    deadline: float
+    classes: frozenset[str]
+
+
+class BuildCoordinator:
+    """Hand out the nodes of a prepared build topology to workers
+
+    Thread-safe, the HTTP endpoints call the methods from the event loop
+    of the wheel server. With a *failures* list, failed builds are
+    recorded and nodes that need a failed node are recorded with
+    *record_blocked* instead of being built. Without, the first failure
+    finishes the coordinator with :attr:`error`.
+    """
+
+    def __init__(
+        self,
+        wkctx: context.WorkContext,
+        topo: TrackingTopologicalSorter,
+        *,
+        get_build_requirements: typing.Callable[
+            [DependencyNode], typing.Mapping[str, Version]
+        ],
+        force: bool = False,
+        cache_wheel_server_url: str | None = None,
+        failures: list[FailureRecord] | None = None,
+        record_blocked: typing.Callable[[DependencyNode, FailureRecord], FailureRecord]
+        | None = None,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        on_done: typing.Callable[[], typing.Any] | None = None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.wkctx = wkctx
+        self.topo = topo
+        self.get_build_requirements = get_build_requirements
+        self.force = force
+        self.cache_wheel_server_url = cache_wheel_server_url
+        self.failures = failures
+        self.record_blocked = record_blocked
+        self.lease_timeout = lease_timeout
+        self.on_done = on_done
+        self.clock = clock
+        self.completed: list[tuple[DependencyNode, TaskResult]] = []
+        self.error: str | None = None
+        self._nodes: dict[str, DependencyNode] = {}
+        self._leases: dict[DependencyNode, _Lease] = {}
+        self._attempts: collections.Counter[DependencyNode] = collections.Counter()
+        self._failed: dict[DependencyNode, FailureRecord] = {}
+        # workers that asked for work and workers that were told to stop
+        self._workers: set[str] = set()
+        self._dismissed: set[str] = set()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    @property
+    def finished(self) -> bool:
+        return self.error is not None or not self.topo.is_active()
+
+    def lease(self, worker: str) -> Task | None:
+        """Lease a ready node to *worker*, ``None`` when no node is ready"""
+        with self._lock:
+            self._workers.add(worker)
+            self._expire()
+            task = self._lease(worker) if not self.finished else None
+            if task is None and self.finished:
+                self._dismissed.add(worker)
+                self._cond.notify_all()
+            return task
+
+    def _lease(self, worker: str) -> Task | None:
+        leased = set(self._leases)
+        if not leased.isdisjoint(self.topo.exclusive_nodes):
+            # an exclusive build is running
+            return None
+        pool = self.wkctx.resource_pool
+        for node in sorted(self.topo.get_available().difference(leased)):
+            blocked_by = sorted(self.topo.predecessors(node) & self._failed.keys())
+            if blocked_by:
+                assert self.failures is not None and self.record_blocked
+                record = self.record_blocked(node, self._failed[blocked_by[0]])
+                self._failed[node] = record
+                self.failures.append(record)
+                self.topo.done(node)
+                if self.on_done is not None:
+                    self.on_done()
+                continue
+            classes = self.wkctx.package_build_info(
+                node.canonicalized_name
+            ).resource_classes
+            if not pool.try_acquire(classes):
+                continue
+            self._nodes[node.key] = node
+            self._leases[node] = _Lease(
+                worker=worker,
+                deadline=self.clock() + self.lease_timeout,
+                classes=classes,
+            )
+            self._attempts[node] += 1
+            logger.info(
+                "%s: leased to worker %s (attempt %i)",
+                node.key,
+                worker,
+                self._attempts[node],
+            )
+            return Task(
+                key=node.key,
+                name=node.canonicalized_name,
+                version=str(node.version),
+                download_url=node.download_url,
+                build_requirements={
+                    name: str(version)
+                    for name, version in self.get_build_requirements(node).items()
+                },
+                force=self.force,
+                cache_wheel_server_url=self.cache_wheel_server_url,
+                lease_timeout=self.lease_timeout,
+            )
+        return None
+
+    def renew(self, worker: str, key: str) -> bool:
+        """Extend the lease of *worker*, ``False`` when it is lost"""
+        with self._lock:
+            node = self._nodes.get(key)
+            lease = self._leases.get(node) if node is not None else None
+            if lease is None or lease.worker != worker:
+                return False
+            lease.deadline = self.clock() + self.lease_timeout
+            return True
+
+    def complete(self, worker: str, result: TaskResult) -> bool:
+        """Record the result of a task
+
+        The result of a worker whose lease expired is accepted, as long as
+        no other worker completed the node. Returns ``False`` when the
+        result is ignored.
+        """
+        with self._lock:
+            node = self._nodes.get(result.key)
+            if node is None or self.topo.is_done(node) or self.error is not None:
+                return False
+            lease = self._leases.pop(node, None)
+            if lease is not None:
+                self.wkctx.resource_pool.release(lease.classes)
+            error = result.error
+            if error is None and (
+                not result.wheel_filename
+                or not self.wkctx.wheels_downloads.joinpath(
+                    result.wheel_filename
+                ).is_file()
+            ):
+                error = {
+                    "exception_type": "CoordinatorError",
+                    "exception_message": "the wheel was not uploaded",
+                    "failure_type": "build",
+                }
+            if error is not None:
+                logger.error(
+                    "%s: failed on worker %s: %s",
+                    node.key,
+                    worker,
+                    error.get("exception_message"),
+                )
+                self._fail(node, error)
+            else:
+                logger.info("%s: built by worker %s", node.key, worker)
+                self.completed.append((node, result))
+            self.topo.done(node)
+            if self.on_done is not None:
+                self.on_done()
+            return True
+
+    def expire(self) -> None:
+        """Re-queue the nodes of workers that did not renew their lease"""
+        with self._lock:
+            self._expire()
+
+    def _expire(self) -> None:
+        now = self.clock()
+        for node, lease in list(self._leases.items()):
+            if lease.deadline > now:
+                continue
+            del self._leases[node]
+            self.wkctx.resource_pool.release(lease.classes)
+            # do not wait for a dead worker at the end of the build
+            self._workers.discard(lease.worker)
+            if self._attempts[node] < MAX_ATTEMPTS:
+                logger.warning(
+                    "%s: lease of worker %s expired, re-queuing", node.key, lease.worker
+                )
+                continue
+            message = (
+                f"{node.key} was leased {self._attempts[node]} times, the last "
+                f"worker {lease.worker} did not finish"
+            )
+            logger.error(message)
+            self._fail(
+                node,
+                {
+                    "exception_type": "WorkerLost",
+                    "exception_message": message,
+                    "failure_type": "build",
+                },
+            )
+            self.topo.done(node)
+            if self.on_done is not None:
+                self.on_done()
+
+    def _fail(self, node: DependencyNode, error: dict[str, str]) -> None:
+        if self.failures is None:
+            self.error = f"Failed to build {node.key}: {error.get('exception_message')}"
+            return
+        record: FailureRecord = {
+            "package": node.canonicalized_name,
+            "version": str(node.version),
+            "exception_type": error.get("exception_type", "Exception"),
+            "exception_message": error.get("exception_message", ""),
+            "failure_type": "timeout"
+            if error.get("failure_type") == "timeout"
+            else "build",
+        }
+        self._failed[node] = record
+        self.failures.append(record)
+
+    def wait(self, poll_interval: float = 1.0) -> None:
+        """Wait until all nodes are done or the first failure"""
+        while not self.finished:
+            generation = self.topo.generation
+            self.expire()
+            self.topo.wait(generation, timeout=poll_interval)
+
+    def dismiss_workers(self, timeout: float) -> bool:
+        """Wait until all known workers were told that the build is finished
+
+        Idle workers poll for work, the coordinator has to serve them until
+        they learn about the end of the build. Returns ``False`` after
+        *timeout* seconds.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._workers <= self._dismissed, timeout=timeout
+            )
+
+    # HTTP endpoints
+
+    async def _json(self, request: Request) -> dict[str, typing.Any]:
+        try:
+            data = json.loads(await request.body())
+        except ValueError as err:
+            raise HTTPException(status_code=400, detail=str(err)) from None
+        if not isinstance(data, dict) or not isinstance(data.get("worker"), str):
+            raise HTTPException(status_code=400, detail="worker is missing")
+        return data
+
+    async def _lease_endpoint(self, request: Request) -> Response:
+        data = await self._json(request)
+        task = self.lease(data["worker"])
+        if task is not None:
+            return JSONResponse(task.to_dict())
+        return Response(status_code=410 if self.finished else 204)
+
+    async def _renew_endpoint(self, request: Request) -> Response:
+        data = await self._json(request)
+        if self.renew(data["worker"], str(data.get("key"))):
+            return Response(status_code=200)
+        return Response(status_code=409)
+
+    async def _complete_endpoint(self, request: Request) -> Response:
+        data = await self._json(request)
+        try:
+            result = TaskResult.from_dict(data.get("result") or {})
+            accepted = self.complete(data["worker"], result)
+        except CoordinatorError as err:
+            raise HTTPException(status_code=400, detail=str(err)) from None
+        return Response(status_code=200 if accepted else 409)
+
+    async def _upload_endpoint(self, request: Request) -> Response:
+        filename = request.path_params["filename"]
+        try:
+            parse_wheel_filename(filename)
+        except InvalidWheelFilename:
+            raise HTTPException(status_code=400, detail="Invalid wheel") from None
+        body = await request.body()
+        destination = self.wkctx.wheels_downloads
+        destination.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=destination, prefix=f".tmp.{filename}.", delete=False
+        ) as tmp:
+            tmp.write(body)
+        os.replace(tmp.name, destination / filename)
+        server.update_wheel_mirror(self.wkctx)
+        logger.info("received %s", filename)
+        return Response(status_code=201)
+
+    def routes(self) -> list[Route]:
+        """Routes of the coordinator API for the wheel server"""
+        prefix = f"/{COORDINATOR_API}"
+        return [
+            Route(f"{prefix}/lease", self._lease_endpoint, methods=["POST"]),
+            Route(f"{prefix}/renew", self._renew_endpoint, methods=["POST"]),
+            Route(f"{prefix}/complete", self._complete_endpoint, methods=["POST"]),
+            Route(
+                f"{prefix}/wheels/{{filename:str}}",
+                self._upload_endpoint,
+                methods=["PUT"],
+            ),
+        ]
+
+
+class CoordinatorClient:
+    """HTTP client of a build worker"""
+
+    def __init__(
+        self,
+        url: str,
+        worker: str,
+        http_session: requests.Session | None = None,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.worker = worker
+        self.session = http_session if http_session is not None else requests.Session()
+        self.finished = False
+
+    @property
+    def wheel_server_url(self) -> str:
+        return f"{self.url}/simple/"
+
+    def _post(self, endpoint: str, **data: typing.Any) -> requests.Response:
+        return self.session.post(
+            f"{self.url}/{COORDINATOR_API}/{endpoint}",
+            json={"worker": self.worker, **data},
+        )
+
+    def lease(self) -> Task | None:
+        """Lease a task, ``None`` when no task is ready
+
+        Sets :attr:`finished` when the coordinator is finished. Retries connection errors for :data:`CONNECT_TIMEOUT` seconds.
+        """
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                resp = self._post("lease")
+                break
+            except requests.exceptions.ConnectionError as err:
+                if time.monotonic() >= deadline:
+                    raise CoordinatorError(
+                        f"cannot reach coordinator {self.url}: {err}"
+                    ) from err
+                time.sleep(1.0)
+        if resp.status_code == 410:
+            self.finished = True
+            return None
+        if resp.status_code == 204:
+            return None
+        resp.raise_for_status()
+        return Task.from_dict(resp.json())
+
+    def renew(self, task: Task) -> bool:
+        resp = self._post("renew", key=task.key)
+        if resp.status_code == 409:
+            return False
+        resp.raise_for_status()
+        return True
+
+    def upload(self, wheel_filename: pathlib.Path) -> None:
+        with wheel_filename.open("rb") as f:
+            resp = self.session.put(
+                f"{self.url}/{COORDINATOR_API}/wheels/{quote(wheel_filename.name)}",
+                data=f,
+                headers={"Content-Type": "application/zip"},
+            )
+        resp.raise_for_status()
+
+    def complete(self, result: TaskResult) -> bool:
+        resp = self._post("complete", result=result.to_dict())
+        if resp.status_code == 409:
+            return False
+        resp.raise_for_status()
+        return True
+
+
+@contextlib.contextmanager
+def _keep_lease(
+    client: CoordinatorClient, task: Task
+) -> typing.Generator[None, None, None]:
+    """Renew the lease of *task* in a background thread"""
+    stop = threading.Event()
+
+    def renew() -> None:
+        while not stop.wait(task.lease_timeout / 3):
+            try:
+                if not client.renew(task):
+                    logger.warning("%s: lease was lost", task.key)
+                    return
+            except requests.exceptions.RequestException as err:
+                logger.warning("%s: failed to renew lease: %s", task.key, err)
+
+    thread = threading.Thread(target=renew, name="renew-lease", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_worker(
+    client: CoordinatorClient,
+    build: typing.Callable[[Task], tuple[TaskResult, pathlib.Path | None]],
+    poll_interval: float = POLL_INTERVAL,
+) -> int:
+    """Build tasks of a coordinator until it is finished
+
+    *build* returns the result of a task and the wheel to upload.
+    Returns the number of completed tasks.
+    """
+    count = 0
+    while True:
+        task = client.lease()
+        if task is None:
+            if client.finished:
+                break
+            time.sleep(poll_interval)
+            continue
+        logger.info("%s: building for coordinator %s", task.key, client.url)
+        with _keep_lease(client, task):
+            try:
+                result, wheel_filename = build(task)
+            except Exception as err:
+                logger.exception("%s: build failed", task.key)
+                result = TaskResult(
+                    key=task.key,
+                    error={
+                        "exception_type": err.__class__.__name__,
+                        "exception_message": str(err),
+                        "failure_type": "build",
+                    },
+                )
+                wheel_filename = None
+            if wheel_filename is not None:
+                client.upload(wheel_filename)
+        if not client.complete(result):
+            logger.info("%s: coordinator ignored the result", task.key)
+        count += 1
+    logger.info("coordinator %s is finished, completed %i tasks", client.url, count)
+    return count
@@ -0,0 +1,114 @@
+"""Automatic retries of transient wheel build failures
+
+Builds fail for reasons that have nothing to do with the package, e.g. the
+out-of-memory killer terminates a compiler or a download inside the build
+hits a network error. The failure classes in the ``build_retries`` section
+of ``settings.yaml`` classify a failed build command by exit code and
+output. Builds of a known failure class are retried according to the
+class's policy, all other failures are raised immediately. Builds that were
+killed by the hung-build watchdog of :func:`fromager.external_commands.run`
+are classified separately by failure classes with ``timeout``.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import time
+import typing
+
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from . import external_commands
+
+if typing.TYPE_CHECKING:
+    from . import context
+
+logger = logging.getLogger(__name__)
+
+
+def _get_output(err: subprocess.CalledProcessError) -> str:
+    output = err.output
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output or ""
+
+
+def call_with_retries[T](
+    *,
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+    func: typing.Callable[[], T],
+) -> T:
+    """Call *func* and retry it when it fails with a transient failure
+
+    *func* runs the build command. Retries are recorded in
+    ``ctx.retry_store``.
+    """
+    build_retries = ctx.settings.build_retries
+    retries: dict[str, int] = {}
+    while True:
+        try:
+            return func()
+        except external_commands.NetworkIsolationError:
+            # the build needs network access, a retry does not help
+            raise
+        except subprocess.CalledProcessError as err:
+            policy = build_retries.classify(
+                err.returncode,
+                _get_output(err),
+                timed_out=isinstance(err, external_commands.CommandTimeoutError),
+            )
+            if policy is None:
+                raise
+            count = retries.get(policy.name, 0)
+            if count >= policy.retries:
+                logger.error(
+                    "build failed with %s failure, giving up after %d retries",
+                    policy.name,
+                    count,
+                )
+                raise
+            retries[policy.name] = count + 1
+            ctx.retry_store[f"{req.name}=={version}"].append(policy.name)
+
+            if policy.reduce_parallel_jobs is not None:
+                pbi = ctx.package_build_info(req)
+                jobs = pbi.parallel_jobs()
+                pbi.limit_parallel_jobs(int(jobs * policy.reduce_parallel_jobs))
+                logger.info(
+                    "reducing parallel jobs from %i to %i",
+                    jobs,
+                    pbi.parallel_jobs(),
+                )
+
+            wait = policy.backoff * 2**count
+            logger.warning(
+                "build failed with %s failure (exit code %d), retry %d of %d in %.0fs",
+                policy.name,
+                err.returncode,
+                count + 1,
+                policy.retries,
+                wait,
+            )
+            if wait:
+                time.sleep(wait)
+
+
+def count_retries(ctx: context.WorkContext) -> dict[str, int]:
+    """Count retries by failure class"""
+    counts: dict[str, int] = {}
+    for names in ctx.retry_store.values():
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def format_retries(ctx: context.WorkContext) -> str:
+    """Format retry statistics for a summary, empty string without retries"""
+    if not ctx.retry_store:
+        return ""
+    counts = ", ".join(f"{count} {name}" for name, count in count_retries(ctx).items())
+    return f"retried {len(ctx.retry_store)} build(s): {counts}"
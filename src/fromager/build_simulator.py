@@ -0,0 +1,399 @@
+"""Simulate parallel builds of a dependency graph
+
+The simulator replays the scheduling rules of ``build-parallel`` on a
+virtual clock: a package starts when its build dependencies are built, a
+worker is free, and all of its resource classes have a free slot. An
+exclusive build starts when nothing else is ready or running and runs
+alone. Build durations are predictions, e.g. from the ``build-timings.json``
+file of an earlier build, so the simulation runs in milliseconds and
+nothing is built.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import heapq
+import html
+import json
+import pathlib
+import typing
+from datetime import timedelta
+
+from packaging.utils import canonicalize_name
+
+from . import resources
+from .dependency_graph import ROOT, DependencyGraph, DependencyNode
+
+if typing.TYPE_CHECKING:
+    from . import context
+
+#: predicted duration of packages without a known duration, in seconds
+DEFAULT_DURATION: typing.Final = 60.0
+
+#: order in which ready packages are started
+POLICIES: typing.Final = ("name", "critical-path")
+
+
+def _normalize_key(key: str) -> str:
+    name, sep, version = key.partition("==")
+    return f"{canonicalize_name(name)}{sep}{version}"
+
+
+class Durations:
+    """Predicted build durations of packages in seconds
+
+    Durations are looked up by ``name==version`` first, then by name, so a
+    table of an earlier build also covers new versions of a package.
+    """
+
+    def __init__(
+        self,
+        durations: typing.Mapping[str, float] | None = None,
+        default: float = DEFAULT_DURATION,
+    ) -> None:
+        self.default = default
+        self._by_key: dict[str, float] = {}
+        self._by_name: dict[str, float] = {}
+        for key, seconds in (durations or {}).items():
+            key = _normalize_key(key)
+            self._by_key[key] = seconds
+            name, sep, _ = key.partition("==")
+            if sep:
+                # the longest known version predicts other versions
+                self._by_name[name] = max(seconds, self._by_name.get(name, 0.0))
+        # durations without version take precedence over other versions
+        self._by_name.update((k, v) for k, v in self._by_key.items() if "==" not in k)
+
+    @classmethod
+    def from_file(
+        cls, filename: pathlib.Path, default: float = DEFAULT_DURATION
+    ) -> Durations:
+        """Load durations from a JSON file
+
+        The file maps ``name==version`` or package names to seconds, or to
+        objects that map build steps to seconds like ``build-timings.json``.
+        """
+        with filename.open(encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{filename}: expected a JSON object")
+        durations: dict[str, float] = {}
+        for key, value in data.items():
+            if isinstance(value, dict):
+                value = sum(value.values())
+            if not isinstance(value, int | float) or value < 0:
+                raise ValueError(f"{filename}: invalid duration for {key}: {value!r}")
+            durations[key] = float(value)
+        return cls(durations, default=default)
+
+    def lookup(self, node: DependencyNode) -> float | None:
+        """Duration of a node, None when it is not known"""
+        duration = self._by_key.get(node.key)
+        if duration is None:
+            duration = self._by_name.get(node.canonicalized_name)
+        return duration
+
+
+@dataclasses.dataclass(frozen=True)
+class BuildTask:
+    """A package build with its constraints"""
+
+    node: DependencyNode
+    duration: float
+    predecessors: frozenset[DependencyNode] = frozenset()
+    exclusive: bool = False
+    resource_classes: frozenset[str] = frozenset()
+    estimated: bool = False
+    """The duration is the default duration"""
+
+
+def get_build_tasks(
+    graph: DependencyGraph,
+    wkctx: context.WorkContext,
+    durations: Durations,
+) -> list[BuildTask]:
+    """Create build tasks like ``get_build_topology()`` does"""
+    closures = graph.closures()
+    tasks: list[BuildTask] = []
+    for node in graph.get_all_nodes():
+        if node.key == ROOT:
+            continue
+        pbi = wkctx.package_build_info(node.canonicalized_name)
+        duration = durations.lookup(node)
+        tasks.append(
+            BuildTask(
+                node=node,
+                duration=durations.default if duration is None else duration,
+                predecessors=frozenset(closures.build_requirements(node)),
+                exclusive=pbi.exclusive_build,
+                resource_classes=pbi.resource_classes,
+                estimated=duration is None,
+            )
+        )
+    return tasks
+
+
+@dataclasses.dataclass(frozen=True)
+class TimelineEntry:
+    node: DependencyNode
+    worker: int
+    start: float
+    end: float
+    estimated: bool = False
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "key": self.node.key,
+            "name": str(self.node.canonicalized_name),
+            "version": str(self.node.version),
+            "worker": self.worker,
+            "start": self.start,
+            "end": self.end,
+            "estimated": self.estimated,
+        }
+
+
+@dataclasses.dataclass(frozen=True)
+class Simulation:
+    """Result of a simulated parallel build"""
+
+    workers: int
+    policy: str
+    timeline: list[TimelineEntry]
+    """Builds in order of their start time"""
+    critical_path: list[DependencyNode]
+    """Longest chain of build dependencies, the lower bound of the makespan"""
+
+    @property
+    def makespan(self) -> float:
+        return max((entry.end for entry in self.timeline), default=0.0)
+
+    @property
+    def critical_path_duration(self) -> float:
+        entries = {entry.node: entry for entry in self.timeline}
+        return sum(
+            entries[node].end - entries[node].start for node in self.critical_path
+        )
+
+    def utilization(self) -> list[float]:
+        """Fraction of the makespan that each worker is busy"""
+        busy = [0.0] * self.workers
+        for entry in self.timeline:
+            busy[entry.worker] += entry.end - entry.start
+        makespan = self.makespan
+        return [b / makespan if makespan else 0.0 for b in busy]
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "workers": self.workers,
+            "policy": self.policy,
+            "makespan": self.makespan,
+            "critical_path": [node.key for node in self.critical_path],
+            "critical_path_duration": self.critical_path_duration,
+            "utilization": self.utilization(),
+            "timeline": [entry.to_dict() for entry in self.timeline],
+        }
+
+    def summary(self) -> str:
+        def fmt(seconds: float) -> str:
+            return str(timedelta(seconds=round(seconds)))
+
+        lines = [
+            f"Simulated build of {len(self.timeline)} packages with "
+            f"{self.workers} workers ({self.policy} policy): {fmt(self.makespan)}",
+            f"Critical path ({fmt(self.critical_path_duration)}): "
+            + " -> ".join(node.key for node in self.critical_path),
+            "Worker utilization:",
+        ]
+        for worker, used in enumerate(self.utilization()):
+            lines.append(f"  {worker}: {used:.0%}")
+        estimated = sum(entry.estimated for entry in self.timeline)
+        if estimated:
+            lines.append(f"{estimated} packages use the default duration")
+        return "\n".join(lines)
+
+    def to_html(self) -> str:
+        """Render the timeline as a self-contained Gantt chart"""
+        makespan = self.makespan or 1.0
+        critical = set(self.critical_path)
+        rows: list[str] = []
+        for worker in range(self.workers):
+            bars = []
+            for entry in self.timeline:
+                if entry.worker != worker:
+                    continue
+                left = 100 * entry.start / makespan
+                width = 100 * (entry.end - entry.start) / makespan
+                classes = "bar critical" if entry.node in critical else "bar"
+                title = f"{entry.node.key}: {entry.start:.0f}s - {entry.end:.0f}s" + (
+                    " (estimated)" if entry.estimated else ""
+                )
+                bars.append(
+                    f'<div class="{classes}" style="left:{left:.3f}%;'
+                    f'width:{width:.3f}%" title="{html.escape(title)}">'
+                    f"{html.escape(entry.node.key)}</div>"
+                )
+            rows.append(
+                f'<div class="row"><span class="worker">{worker}</span>'
+                f'<div class="lane">{"".join(bars)}</div></div>'
+            )
+        summary = html.escape(self.summary())
+        return _HTML_TEMPLATE.format(summary=summary, rows="\n".join(rows))
+
+
+_HTML_TEMPLATE = """\
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Simulated build timeline</title>
+<style>
+body {{ font-family: sans-serif; font-size: 12px; }}
+.row {{ display: flex; align-items: center; margin: 2px 0; }}
+.worker {{ width: 3em; text-align: right; padding-right: 0.5em; }}
+.lane {{ position: relative; flex: 1; height: 20px; background: #f4f4f4; }}
+.bar {{ position: absolute; top: 0; height: 100%; overflow: hidden;
+  white-space: nowrap; box-sizing: border-box; border: 1px solid #fff;
+  background: #6a9fd4; color: #fff; }}
+.critical {{ background: #d46a6a; }}
+</style>
+</head>
+<body>
+<pre>{summary}</pre>
+{rows}
+</body>
+</html>
+"""
+
+
+def _topological_order(
+    tasks: typing.Mapping[DependencyNode, BuildTask],
+    successors: typing.Mapping[DependencyNode, list[DependencyNode]],
+) -> list[DependencyNode]:
+    pending = {node: len(task.predecessors) for node, task in tasks.items()}
+    order = [node for node, count in pending.items() if not count]
+    for node in order:
+        for successor in successors[node]:
+            pending[successor] -= 1
+            if not pending[successor]:
+                order.append(successor)
+    if len(order) != len(tasks):
+        cycle = sorted(node.key for node, count in pending.items() if count)
+        raise ValueError(f"build dependencies have a cycle: {', '.join(cycle)}")
+    return order
+
+
+def simulate(
+    tasks: typing.Iterable[BuildTask],
+    workers: int,
+    *,
+    policy: str = "name",
+    resource_classes: typing.Mapping[str, int] | None = None,
+) -> Simulation:
+    """Simulate a parallel build of *tasks* with *workers* workers
+
+    The ``name`` policy starts ready packages in the order of their names,
+    like ``build-parallel``. The ``critical-path`` policy starts packages
+    with the longest chain of dependent builds first. *resource_classes*
+    are the capacities of resource classes.
+    """
+    if workers < 1:
+        raise ValueError("at least one worker is required")
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy {policy!r}, expected one of {POLICIES}")
+    by_node = {task.node: task for task in tasks}
+    successors: dict[DependencyNode, list[DependencyNode]] = {
+        node: [] for node in by_node
+    }
+    for task in by_node.values():
+        for predecessor in task.predecessors:
+            successors[predecessor].append(task.node)
+    order = _topological_order(by_node, successors)
+
+    # longest chain of builds that ends with / starts with a node
+    finish: dict[DependencyNode, float] = {}
+    via: dict[DependencyNode, DependencyNode | None] = {}
+    for node in order:
+        task = by_node[node]
+        before = max(task.predecessors, key=lambda p: (finish[p], p), default=None)
+        via[node] = before
+        finish[node] = task.duration + (finish[before] if before else 0.0)
+    remaining: dict[DependencyNode, float] = {}
+    for node in reversed(order):
+        remaining[node] = by_node[node].duration + max(
+            (remaining[s] for s in successors[node]), default=0.0
+        )
+    critical_path: list[DependencyNode] = []
+    last = max(finish, key=lambda n: (finish[n], n), default=None)
+    while last is not None:
+        critical_path.append(last)
+        last = via[last]
+    critical_path.reverse()
+
+    def priority(node: DependencyNode) -> typing.Any:
+        if policy == "critical-path":
+            return (-remaining[node], node)
+        return node
+
+    # exclusive builds that others depend on go first, see TrackingTopologicalSorter
+    def exclusive_priority(node: DependencyNode) -> typing.Any:
+        return (0 if successors[node] else 1, priority(node))
+
+    pool = resources.ResourcePool(resource_classes)
+    pending = {node: len(task.predecessors) for node, task in by_node.items()}
+    ready = {node for node, count in pending.items() if not count}
+    free_workers = list(range(workers))
+    # end time, start order, node, worker
+    running: list[tuple[float, int, DependencyNode, int]] = []
+    timeline: list[TimelineEntry] = []
+    now = 0.0
+
+    def start(node: DependencyNode) -> None:
+        task = by_node[node]
+        worker = heapq.heappop(free_workers)
+        ready.discard(node)
+        end = now + task.duration
+        heapq.heappush(running, (end, len(timeline), node, worker))
+        timeline.append(
+            TimelineEntry(
+                node=node,
+                worker=worker,
+                start=now,
+                end=end,
+                estimated=task.estimated,
+            )
+        )
+
+    while ready or running:
+        if not any(by_node[entry[2]].exclusive for entry in running):
+            light = [node for node in ready if not by_node[node].exclusive]
+            if light:
+                for node in sorted(light, key=priority):
+                    if not free_workers:
+                        break
+                    if pool.try_acquire(by_node[node].resource_classes):
+                        start(node)
+            elif ready and not running:
+                node = min(ready, key=exclusive_priority)
+                if not pool.try_acquire(by_node[node].resource_classes):
+                    raise ValueError(f"{node.key}: resource class without capacity")
+                start(node)
+        if not running:
+            stuck = ", ".join(sorted(node.key for node in ready))
+            raise ValueError(f"resource classes without capacity block {stuck}")
+        now = running[0][0]
+        while running and running[0][0] == now:
+            _, _, node, worker = heapq.heappop(running)
+            heapq.heappush(free_workers, worker)
+            pool.release(by_node[node].resource_classes)
+            for successor in successors[node]:
+                pending[successor] -= 1
+                if not pending[successor]:
+                    ready.add(successor)
+
+    return Simulation(
+        workers=workers,
+        policy=policy,
+        timeline=timeline,
+        critical_path=critical_path,
+    )
@@ -0,0 +1,212 @@
+"""In-memory index of the wheels on a cache server
+
+Looking up a wheel on a cache server with a resolver provider fetches the
+project page of the package, one package at a time. Build commands know the
+names of all packages up front. :func:`prefetch` lists the projects on the
+cache server once, fetches the pages of the known projects concurrently,
+and keeps the wheels in memory. Lookups for indexed packages are answered
+without another request for the rest of the run.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import threading
+import typing
+
+import pypi_simple
+import resolvelib
+from packaging.requirements import Requirement
+from packaging.utils import NormalizedName, canonicalize_name
+from packaging.version import Version
+
+from . import finders, resolver
+from .candidate import Candidate
+from .request_session import session
+
+if typing.TYPE_CHECKING:
+    from .constraints import Constraints
+
+logger = logging.getLogger(__name__)
+
+#: default number of concurrent project page requests
+DEFAULT_MAX_WORKERS: typing.Final = 16
+
+
+class WheelCacheIndex:
+    """Wheels of a cache server, indexed by package name
+
+    Packages that have not been prefetched are unknown to the index and
+    callers have to query the server.
+    """
+
+    def __init__(self, server_url: str) -> None:
+        self.server_url = server_url
+        self._projects: dict[NormalizedName, list[Candidate]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return canonicalize_name(name) in self._projects
+
+    def __len__(self) -> int:
+        return len(self._projects)
+
+    def prefetch(
+        self,
+        names: typing.Iterable[str],
+        max_workers: int | None = DEFAULT_MAX_WORKERS,
+    ) -> None:
+        """Fetch the wheels of all *names* that are not indexed, yet"""
+        with self._lock:
+            missing = {canonicalize_name(name) for name in names}.difference(
+                self._projects
+            )
+        if not missing:
+            return
+
+        listed = self._list_projects()
+        if listed is not None:
+            absent = missing.difference(listed)
+            logger.debug(
+                "%i of %i packages are not on %s",
+                len(absent),
+                len(missing),
+                self.server_url,
+            )
+            with self._lock:
+                for name in absent:
+                    self._projects[name] = []
+            missing.difference_update(absent)
+
+        to_fetch = sorted(missing)
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cache-index"
+        ) as executor:
+            results = executor.map(self._fetch_project, to_fetch)
+            for name, candidates in zip(to_fetch, results, strict=True):
+                if candidates is None:
+                    # keep unknown, callers fall back to querying the server
+                    continue
+                with self._lock:
+                    self._projects[name] = candidates
+
+        logger.info(
+            "indexed %i packages with %i wheels on %s",
+            len(self._projects),
+            sum(len(c) for c in self._projects.values()),
+            self.server_url,
+        )
+
+    def _list_projects(self) -> set[NormalizedName] | None:
+        """Get names of all projects on the server, ``None`` on error"""
+        client = pypi_simple.PyPISimple(
+            endpoint=self.server_url,
+            session=session,
+            accept=pypi_simple.ACCEPT_JSON_PREFERRED,
+        )
+        try:
+            page = client.get_index_page()
+        except Exception as err:
+            logger.debug("could not list projects on %s: %s", self.server_url, err)
+            return None
+        return {canonicalize_name(name) for name in page.projects}
+
+    def _fetch_project(self, name: NormalizedName) -> list[Candidate] | None:
+        """Get wheels of a project, ``None`` on error"""
+        try:
+            candidates = list(
+                resolver.get_project_from_pypi(
+                    name, extras=(), sdist_server_url=self.server_url
+                )
+            )
+        except resolvelib.resolvers.ResolverException:
+            return []
+        except Exception as err:
+            logger.debug("could not index %s on %s: %s", name, self.server_url, err)
+            return None
+        return [c for c in candidates if not c.is_sdist]
+
+    def lookup(
+        self,
+        req: Requirement,
+        constraints: Constraints | None = None,
+    ) -> list[tuple[str, Version]] | None:
+        """Find wheels matching *req*
+
+        Returns a list of (url, version) tuples, sorted by version and build
+        tag (highest first), like
+        :func:`~fromager.resolver.find_all_matching_from_provider`. Returns
+        ``None`` when the package is not indexed. Raises
+        :exc:`~resolvelib.resolvers.ResolverException` when the package is
+        indexed, but no wheel matches.
+        """
+        name = canonicalize_name(req.name)
+        with self._lock:
+            candidates = self._projects.get(name)
+        if candidates is None:
+            return None
+        matching = [
+            c
+            for c in candidates
+            if req.specifier.contains(c.version, prereleases=True)
+            and (constraints is None or constraints.is_satisfied_by(name, c.version))
+        ]
+        if not matching:
+            raise resolvelib.resolvers.ResolverException(
+                f"found no wheel for {req} in cache index of {self.server_url}"
+            )
+        matching.sort(key=lambda c: (c.version, c.build_tag), reverse=True)
+        return [(c.url, c.version) for c in matching]
+
+
+_indexes: dict[str, WheelCacheIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(server_url: str) -> WheelCacheIndex | None:
+    """Get the index of a cache server, ``None`` if it was never prefetched"""
+    with _indexes_lock:
+        return _indexes.get(server_url)
+
+
+def lookup_for_provider(
+    provider: resolver.BaseProvider,
+    server_url: str,
+    req: Requirement,
+) -> list[tuple[str, Version]] | None:
+    """Answer a lookup of *provider* from the index of *server_url*
+
+    Only the default providers for wheel servers are answered from the
+    index. A plugin can return its own provider with ``get_resolver_provider``
+    and the index does not know upload times for cooldowns, those lookups
+    return ``None`` and the caller has to ask the provider.
+    """
+    if type(provider) not in (resolver.PyPIProvider, finders.PyPICacheProvider):
+        return None
+    if provider.cooldown is not None:
+        return None
+    index = get_index(server_url)
+    if index is None:
+        return None
+    return index.lookup(req, provider.constraints)
+
+
+def prefetch(
+    server_url: str,
+    names: typing.Iterable[str],
+    max_workers: int | None = DEFAULT_MAX_WORKERS,
+) -> WheelCacheIndex:
+    """Index the wheels of *names* on a cache server"""
+    with _indexes_lock:
+        index = _indexes.get(server_url)
+        if index is None:
+            index = _indexes[server_url] = WheelCacheIndex(server_url)
+    index.prefetch(names, max_workers=max_workers)
+    return index
+
+
+def clear() -> None:
+    """Forget all cache server indexes"""
+    with _indexes_lock:
+        _indexes.clear()
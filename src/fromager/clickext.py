@@ -84,3 +84,30 @@ class RequirementType(click.ParamType):
                 param,
                 ctx,
             )
+
+
+class ShardIndex(click.ParamType):
+    """Shard of a partitioned build in the form ``I/N``, returns (I, N)"""
+
+    name = "shard"
+
+    def convert(
+        self,
+        value: str | tuple[int, int],
+        param: click.core.Parameter | None,
+        ctx: click.core.Context | None,
+    ) -> tuple[int, int]:
+        if isinstance(value, tuple):
+            return value
+        index, sep, count = value.partition("/")
+        try:
+            shard = (int(index), int(count))
+        except ValueError:
+            shard = (0, 0)
+        if not sep or not 1 <= shard[0] <= shard[1]:
+            self.fail(
+                f"Invalid shard '{value}', expected I/N with 1 <= I <= N",
+                param,
+                ctx,
+            )
+        return shard
@@ -12,6 +12,7 @@ from fromager.dependency_graph import DependencyNode
 
 from .. import (
     bootstrapper,
+    cache_index,
     context,
     dependency_graph,
     metrics,
@@ -21,7 +22,7 @@ from .. import (
     server,
 )
 from ..bootstrapper import Bootstrapper
-from .build import build_parallel
+from .build import StreamingBuild, build_parallel
 from .graph import find_why, show_explain_duplicates
 
 # Map child_name==child_version to list of (parent_name==parent_version, Requirement)
@@ -148,6 +149,36 @@ def bootstrap(
     .. versionadded:: 0.89.0
        ``--bg-threads`` option for parallel I/O pre-fetching.
     """
+    _run_bootstrap(
+        wkctx,
+        requirements_files=requirements_files,
+        previous_bootstrap_file=previous_bootstrap_file,
+        cache_wheel_server_url=cache_wheel_server_url,
+        sdist_only=sdist_only,
+        skip_constraints=skip_constraints,
+        test_mode=test_mode,
+        multiple_versions=multiple_versions,
+        max_release_age=max_release_age,
+        num_bg_threads=num_bg_threads,
+        toplevel=toplevel,
+    )
+
+
+def _run_bootstrap(
+    wkctx: context.WorkContext,
+    *,
+    requirements_files: list[str],
+    previous_bootstrap_file: str | None,
+    cache_wheel_server_url: str | None,
+    sdist_only: bool,
+    skip_constraints: bool,
+    test_mode: bool,
+    multiple_versions: bool,
+    max_release_age: int | None,
+    num_bg_threads: int,
+    toplevel: list[str],
+    listener: bootstrapper.BootstrapListener | None = None,
+) -> None:
     logger.info(f"cache wheel server url: {cache_wheel_server_url}")
 
     to_build = _get_requirements_from_args(toplevel, requirements_files)
@@ -200,6 +231,17 @@ def bootstrap(
 
     server.start_wheel_server(wkctx)
 
+    if cache_wheel_server_url and prev_graph is not None:
+        # the previous graph is the best guess for the packages to look up
+        cache_index.prefetch(
+            cache_wheel_server_url,
+            [
+                node.canonicalized_name
+                for node in prev_graph.get_all_nodes()
+                if node.key != dependency_graph.ROOT
+            ],
+        )
+
     with progress.progress_context(total=len(to_build * 2)) as progressbar:
         with bootstrapper.Bootstrapper(
             wkctx,
@@ -210,6 +252,7 @@ def bootstrap(
             test_mode=test_mode,
             multiple_versions=multiple_versions,
             num_bg_threads=num_bg_threads,
+            listener=listener,
         ) as bt:
             # Resolve and bootstrap all top-level dependencies and their transitive
             # dependencies. Context management and error handling are handled internally
@@ -494,6 +537,31 @@ bootstrap._fromager_show_build_settings = True  # type: ignore
     default=None,
     help="maximum number of parallel workers to run (default: unlimited)",
 )
+@click.option(
+    "--prepare-workers",
+    type=click.IntRange(min=0),
+    default=2,
+    show_default=True,
+    help="number of threads that download and prepare sources ahead of the builds, 0 to prepare sources in the build workers",
+)
+@click.option(
+    "--prepare-ahead",
+    type=click.IntRange(min=1),
+    default=None,
+    help="maximum number of prepared sources waiting for a build worker (default: 4 per prepare worker)",
+)
+@click.option(
+    "--keep-going/--fail-fast",
+    "keep_going",
+    default=False,
+    help="keep building packages that do not depend on a failed build and write a failure report",
+)
+@click.option(
+    "--streaming/--no-streaming",
+    "streaming",
+    default=False,
+    help="start building wheels while the bootstrap is still running",
+)
 @click.option(
     "--multiple-versions",
     "multiple_versions",
@@ -529,6 +597,10 @@ def bootstrap_parallel(
     skip_constraints: bool,
     force: bool,
     max_workers: int | None,
+    prepare_workers: int,
+    prepare_ahead: int | None,
+    keep_going: bool = False,
+    streaming: bool = False,
     multiple_versions: bool,
     max_release_age: int | None,
     num_bg_threads: int,
@@ -541,6 +613,10 @@ def bootstrap_parallel(
     and builds build-time dependency in serial. The build-parallel step
     builds the remaining wheels in parallel.
 
+    With --streaming, the build-parallel step starts while the bootstrap
+    is still running. A package is built as soon as the bootstrap has
+    processed it and all packages of its build environment.
+
     Note: --test-mode is not supported in parallel builds. Use the serial
     bootstrap command for test mode.
     """
@@ -550,6 +626,45 @@ def bootstrap_parallel(
     wkctx.cleanup_buildenv = False
 
     start = time.perf_counter()
+    if streaming:
+        logger.info(
+            "*** starting bootstrap in sdist-only mode with streaming build ***"
+        )
+        with StreamingBuild(
+            wkctx,
+            force=force,
+            cache_wheel_server_url=cache_wheel_server_url,
+            max_workers=max_workers,
+            prepare_workers=prepare_workers,
+            prepare_ahead=prepare_ahead,
+            keep_going=keep_going,
+        ) as stream:
+            _run_bootstrap(
+                wkctx,
+                requirements_files=requirements_files,
+                previous_bootstrap_file=previous_bootstrap_file,
+                cache_wheel_server_url=cache_wheel_server_url,
+                sdist_only=True,
+                skip_constraints=skip_constraints,
+                test_mode=False,
+                multiple_versions=multiple_versions,
+                max_release_age=max_release_age,
+                num_bg_threads=num_bg_threads,
+                toplevel=toplevel,
+                listener=stream,
+            )
+            logger.info(
+                "*** finished bootstrap in %s, waiting for builds ***\n",
+                timedelta(seconds=round(time.perf_counter() - start, 0)),
+            )
+            wkctx.cleanup_buildenv = wkctx.cleanup
+            stream.finish()
+        logger.info(
+            "*** finished bootstrap and build-parallel in %s ***\n",
+            timedelta(seconds=round(time.perf_counter() - start, 0)),
+        )
+        return
+
     logger.info("*** starting bootstrap in sdist-only mode ***")
     ctx.invoke(
         bootstrap,
@@ -587,6 +702,9 @@ def bootstrap_parallel(
         build_parallel,
         cache_wheel_server_url=cache_wheel_server_url,
         max_workers=max_workers,
+        prepare_workers=prepare_workers,
+        prepare_ahead=prepare_ahead,
+        keep_going=keep_going,
         force=force,
         graph_file=wkctx.graph_file,
     )
@@ -1,11 +1,17 @@
+import collections
 import concurrent.futures
+import contextlib
 import dataclasses
 import datetime
+import functools
 import json
 import logging
+import os
 import pathlib
+import socket
 import sys
 import threading
+import time
 import typing
 from urllib.parse import urlparse
 
@@ -19,22 +25,34 @@ from rich.table import Table
 from rich.text import Text
 
 from fromager import (
+    build_cache,
+    build_coordinator,
     build_environment,
+    build_retry,
+    build_simulator,
+    cache_index,
     clickext,
     context,
     dependency_graph,
     downloads,
+    external_commands,
+    fingerprint,
+    graph_shard,
     hooks,
     metrics,
     overrides,
     progress,
     read,
+    resolver,
+    resource_usage,
+    resources,
     server,
     sources,
     wheels,
 )
 
-from ..log import VERBOSE_LOG_FMT, ThreadLogFilter, req_ctxvar_context
+from ..bootstrapper import FailureRecord, FailureType
+from ..log import log_to_file, req_ctxvar_context
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +78,15 @@ class BuildSequenceEntry:
 
 type BuildSequenceEntryFuture = concurrent.futures.Future[BuildSequenceEntry]
 type DependencyNodeSet = set[dependency_graph.DependencyNode]
+type BuildRequirementsGetter = typing.Callable[
+    [dependency_graph.DependencyNode], typing.Mapping[str, Version]
+]
+type ExternalWheelGetter = typing.Callable[
+    [dependency_graph.DependencyNode, threading.Event], BuildSequenceEntry
+]
+
+# seconds between polls of the wheel server for wheels of other shards
+SHARD_POLL_INTERVAL: float = 30.0
 
 
 @click.command()
@@ -177,36 +204,41 @@ def build_sequence(
 
     logger.info("reading build order from %s", build_order_file)
     with read.open_file_or_url(build_order_file) as f:
-        for entry in progress.progress(json.load(f)):
-            dist_name = entry["dist"]
-            resolved_version = Version(entry["version"])
-            source_download_url = entry["source_url"]
+        build_order = json.load(f)
 
-            req = Requirement(f"{dist_name}=={resolved_version}")
+    if cache_wheel_server_url and not force:
+        cache_index.prefetch(
+            cache_wheel_server_url, [entry["dist"] for entry in build_order]
+        )
 
-            with req_ctxvar_context(req, resolved_version):
-                logger.info("building %s", resolved_version)
-                entry = _build(
-                    wkctx=wkctx,
-                    resolved_version=resolved_version,
-                    req=req,
-                    source_download_url=source_download_url,
-                    force=force,
-                    cache_wheel_server_url=cache_wheel_server_url,
+    for entry in progress.progress(build_order):
+        dist_name = entry["dist"]
+        resolved_version = Version(entry["version"])
+        source_download_url = entry["source_url"]
+
+        req = Requirement(f"{dist_name}=={resolved_version}")
+
+        with req_ctxvar_context(req, resolved_version):
+            logger.info("building %s", resolved_version)
+            entry = _build(
+                wkctx=wkctx,
+                resolved_version=resolved_version,
+                req=req,
+                source_download_url=source_download_url,
+                force=force,
+                cache_wheel_server_url=cache_wheel_server_url,
+            )
+            if entry.prebuilt:
+                logger.info("downloaded prebuilt wheel %s", entry.wheel_filename.name)
+            elif entry.skipped:
+                logger.info(
+                    "skipping building wheel since %s already exists",
+                    entry.wheel_filename.name,
                 )
-                if entry.prebuilt:
-                    logger.info(
-                        "downloaded prebuilt wheel %s", entry.wheel_filename.name
-                    )
-                elif entry.skipped:
-                    logger.info(
-                        "skipping building wheel since %s already exists",
-                        entry.wheel_filename.name,
-                    )
-                else:
-                    logger.info("built %s", entry.wheel_filename.name)
-
-                entries.append(entry)
+            else:
+                logger.info("built %s", entry.wheel_filename.name)
+
+            entries.append(entry)
 
     metrics.summarize(wkctx, "Building")
 
@@ -226,6 +258,7 @@ def _summary(ctx: context.WorkContext, entries: list[BuildSequenceEntry]) -> Non
         output.append(
             _create_table(
                 built_entries,
+                ctx,
                 title="New builds",
                 box=rich.box.MARKDOWN,
                 title_justify="left",
@@ -260,6 +293,18 @@ def _summary(ctx: context.WorkContext, entries: list[BuildSequenceEntry]) -> Non
     else:
         output.append(Text("No skipped builds\n"))
 
+    if ctx.retry_store:
+        output.append(
+            Text(
+                f"Retried builds ({build_retry.format_retries(ctx)}):\n"
+                + "\n".join(
+                    f"- {key}: {', '.join(names)}"
+                    for key, names in sorted(ctx.retry_store.items())
+                )
+                + "\n"
+            )
+        )
+
     console = rich.get_console()
     console.print(*output, sep="\n\n")
 
@@ -276,27 +321,50 @@ def _summary(ctx: context.WorkContext, entries: list[BuildSequenceEntry]) -> Non
             f,
         )
 
+    # build durations for "fromager graph build-graph --simulate"
+    with open(ctx.work_dir / "build-timings.json", "w", encoding="utf-8") as f:
+        json.dump(ctx.time_store, f, indent=2, sort_keys=True)
+
 
 def _create_table(
-    entries: list[BuildSequenceEntry], **table_kwargs: typing.Any
+    entries: list[BuildSequenceEntry],
+    ctx: context.WorkContext | None = None,
+    **table_kwargs: typing.Any,
 ) -> Table:
+    """Create a summary table, with resource usage of the builds when *ctx* is given"""
     table = Table(**table_kwargs)
     table.add_column("Name", justify="right", no_wrap=True)
     table.add_column("Version", no_wrap=True)
     table.add_column("Wheel", no_wrap=True)
+    if ctx is not None:
+        table.add_column("CPU time", justify="right", no_wrap=True)
+        table.add_column("Max RSS", justify="right", no_wrap=True)
     table.add_column("Source URL")
 
     platlib_count = 0
+    total_usage = resource_usage.ResourceUsage()
 
     for info in sorted(entries):
         tags = parse_wheel_filename(info.wheel_filename.name)[3]
         if any(t.platform != "any" or t.abi != "none" for t in tags):
             platlib_count += 1
         source_filename = urlparse(info.download_url).path.rsplit("/", 1)[-1]
+        usage_columns: list[str | None] = []
+        if ctx is not None:
+            usage = metrics.get_resource_usage(ctx, f"{info.name}=={info.version}")
+            if usage is None:
+                usage_columns = [None, None]
+            else:
+                total_usage += usage
+                usage_columns = [
+                    str(datetime.timedelta(seconds=round(usage.cpu_time))),
+                    resource_usage.format_bytes(usage.max_rss),
+                ]
         table.add_row(
             info.name,
             str(info.version),
             info.wheel_filename.name,
+            *usage_columns,
             # escape Rich markup
             rf"\[{source_filename}]({info.download_url})",
         )
@@ -307,11 +375,48 @@ def _create_table(
         f"total: {len(entries)}",
         None,
         f"platlib: {platlib_count}",
+        *(
+            [
+                str(datetime.timedelta(seconds=round(total_usage.cpu_time))),
+                resource_usage.format_bytes(total_usage.max_rss),
+            ]
+            if ctx is not None
+            else []
+        ),
         None,
     )
     return table
 
 
+@dataclasses.dataclass(frozen=True)
+class PreparedBuild:
+    """Result of the I/O-bound first half of a build
+
+    Either *wheel_filename* points to an existing or pre-built wheel, or
+    *source_root_dir* is the prepared source tree to build.
+    """
+
+    prebuilt: bool
+    wheel_filename: pathlib.Path | None = None
+    use_existing_wheel: bool = False
+    source_root_dir: pathlib.Path | None = None
+
+
+@contextlib.contextmanager
+def _build_log(
+    wkctx: context.WorkContext, req: Requirement, resolved_version: Version
+) -> typing.Generator[None, None, None]:
+    """Log all details of the build of one wheel to a log file
+
+    A single handler on the root logger routes the messages of the current
+    context to the file, so parallel builds each get their own log.
+    """
+    module_name = overrides.pkgname_to_override_module(req.name)
+    wheel_log = wkctx.logs_dir / f"{module_name}-{resolved_version}.log"
+    with log_to_file(wheel_log):
+        yield
+
+
 def _build(
     wkctx: context.WorkContext,
     resolved_version: Version,
@@ -319,6 +424,8 @@ def _build(
     source_download_url: str,
     force: bool,
     cache_wheel_server_url: str | None,
+    build_requirements: typing.Mapping[str, Version] | None = None,
+    prepared: PreparedBuild | None = None,
 ) -> BuildSequenceEntry:
     """Handle one version of one wheel.
 
@@ -326,22 +433,101 @@ def _build(
     1. Reuse an existing wheel we have locally.
     2. Download a pre-built wheel.
     3. Build the wheel from source.
+
+    Existing wheels are only reused when their build fingerprint matches
+    the current inputs. *build_requirements* are the expected
+    distributions of the build environment, if known. *prepared* is the
+    result of :func:`_prepare_build`, if it already ran in another thread.
+    """
+    with _build_log(wkctx, req, resolved_version):
+        if prepared is None:
+            prepared = _prepare_build(
+                wkctx=wkctx,
+                resolved_version=resolved_version,
+                req=req,
+                source_download_url=source_download_url,
+                force=force,
+                cache_wheel_server_url=cache_wheel_server_url,
+                build_requirements=build_requirements,
+            )
+        wheel_filename = prepared.wheel_filename
+
+        # If we get here and still don't have a wheel filename, then we need to
+        # build the wheel.
+        if not wheel_filename:
+            source_root_dir = prepared.source_root_dir
+            assert source_root_dir is not None
+
+            # Build environment
+            build_env = build_environment.prepare_build_environment(
+                ctx=wkctx,
+                req=req,
+                version=resolved_version,
+                sdist_root_dir=source_root_dir,
+            )
+
+            # Make a new source distribution, in case we patched the code.
+            sdist_filename = sources.build_sdist(
+                ctx=wkctx,
+                req=req,
+                version=resolved_version,
+                sdist_root_dir=source_root_dir,
+                build_env=build_env,
+            )
+
+            # Build
+            wheel_filename = wheels.build_wheel(
+                ctx=wkctx,
+                req=req,
+                sdist_root_dir=source_root_dir,
+                version=resolved_version,
+                build_env=build_env,
+            )
+
+            hooks.run_post_build_hooks(
+                ctx=wkctx,
+                req=req,
+                dist_name=canonicalize_name(req.name),
+                dist_version=str(resolved_version),
+                sdist_filename=sdist_filename,
+                wheel_filename=wheel_filename,
+            )
+
+            wkctx.clean_build_dirs(source_root_dir, build_env)
+
+    server.update_wheel_mirror(wkctx)
+
+    # After we update the wheel mirror, the built file has
+    # moved to a new directory.
+    wheel_filename = wkctx.wheels_downloads / wheel_filename.name
+
+    return BuildSequenceEntry(
+        name=canonicalize_name(req.name),
+        version=resolved_version,
+        prebuilt=prepared.prebuilt,
+        download_url=source_download_url,
+        wheel_filename=wheel_filename,
+        skipped=prepared.use_existing_wheel,
+    )
+
+
+def _prepare_build(
+    wkctx: context.WorkContext,
+    resolved_version: Version,
+    req: Requirement,
+    source_download_url: str,
+    force: bool,
+    cache_wheel_server_url: str | None,
+    build_requirements: typing.Mapping[str, Version] | None = None,
+) -> PreparedBuild:
+    """Find an existing wheel or download and prepare the source.
+
+    These steps are mostly I/O-bound and do not depend on other wheels of
+    the build, so parallel builds can run them ahead of time.
     """
     wheel_filename: pathlib.Path | None = None
     use_exiting_wheel: bool = False
 
-    # Set up a log file for all of the details of the build for this one wheel.
-    # We attach a handler to the root logger so that all messages are logged to
-    # the file, and we add a filter to the handler so that only messages from
-    # the current thread are logged for when we build in parallel.
-    root_logger = logging.getLogger(None)
-    module_name = overrides.pkgname_to_override_module(req.name)
-    wheel_log = wkctx.logs_dir / f"{module_name}-{resolved_version}.log"
-    file_handler = logging.FileHandler(filename=str(wheel_log))
-    file_handler.setFormatter(logging.Formatter(VERBOSE_LOG_FMT))
-    file_handler.addFilter(ThreadLogFilter(threading.current_thread().name))
-    root_logger.addHandler(file_handler)
-
     logger.info("starting processing")
     pbi = wkctx.package_build_info(req)
     prebuilt = pbi.pre_built
@@ -350,13 +536,22 @@ def _build(
         wkctx, req, cache_wheel_server_url=cache_wheel_server_url
     )
 
-    # See if we can reuse an existing wheel.
+    # See if we can reuse an existing wheel. Only a source of an earlier
+    # run is compared with the fingerprint, it is not downloaded just to
+    # check existing wheels.
     if not force:
         wheel_filename = _is_wheel_built(
             wkctx,
             req.name,
             resolved_version,
             wheel_server_urls,
+            get_source_filename=functools.partial(
+                fingerprint.find_local_source,
+                ctx=wkctx,
+                req=req,
+                version=resolved_version,
+            ),
+            build_distributions=build_requirements,
         )
         if wheel_filename:
             logger.info("using existing wheel from %s", wheel_filename)
@@ -385,94 +580,91 @@ def _build(
             wheel_filename=wheel_filename,
         )
 
-    # If we get here and still don't have a wheel filename, then we need to
-    # build the wheel.
-    if not wheel_filename:
-        source_filename = sources.download_source(
-            ctx=wkctx,
-            req=req,
-            version=resolved_version,
-            download_url=source_download_url,
-        )
-        logger.debug(
-            "saved sdist of version %s from %s to %s",
-            resolved_version,
-            source_download_url,
-            source_filename,
+    if wheel_filename:
+        return PreparedBuild(
+            prebuilt=prebuilt,
+            wheel_filename=wheel_filename,
+            use_existing_wheel=use_exiting_wheel,
         )
 
-        # Prepare source
-        source_root_dir = sources.prepare_source(
-            ctx=wkctx,
-            req=req,
-            source_filename=source_filename,
-            version=resolved_version,
-        )
+    source_filename = sources.download_source(
+        ctx=wkctx,
+        req=req,
+        version=resolved_version,
+        download_url=source_download_url,
+    )
+    logger.debug(
+        "saved sdist of version %s from %s to %s",
+        resolved_version,
+        source_download_url,
+        source_filename,
+    )
 
-        # Build environment
-        build_env = build_environment.prepare_build_environment(
-            ctx=wkctx,
-            req=req,
-            version=resolved_version,
-            sdist_root_dir=source_root_dir,
-        )
+    # Prepare source
+    source_root_dir = sources.prepare_source(
+        ctx=wkctx,
+        req=req,
+        source_filename=source_filename,
+        version=resolved_version,
+    )
+    return PreparedBuild(prebuilt=prebuilt, source_root_dir=source_root_dir)
 
-        # Make a new source distribution, in case we patched the code.
-        sdist_filename = sources.build_sdist(
-            ctx=wkctx,
-            req=req,
-            version=resolved_version,
-            sdist_root_dir=source_root_dir,
-            build_env=build_env,
-        )
 
-        # Build
-        wheel_filename = wheels.build_wheel(
+def _is_wheel_built(
+    wkctx: context.WorkContext,
+    dist_name: str,
+    resolved_version: Version,
+    wheel_server_urls: list[str],
+    *,
+    get_source_filename: typing.Callable[[], pathlib.Path | None] | None = None,
+    build_distributions: typing.Mapping[str, Version] | None = None,
+) -> pathlib.Path | None:
+    """Find a built wheel on the wheel servers or in the build cache
+
+    The build cache is consulted when the wheel servers have no wheel of
+    the version with the expected build tag, e.g. after a changelog entry
+    bumped the build tag, or when the build fingerprint of their wheel
+    does not match. Pre-built wheels have no fingerprint to compare.
+    Wheels from the build cache are picked by their fingerprint, see
+    :func:`~fromager.build_cache.fetch_wheel`.
+    """
+    req = Requirement(f"{dist_name}=={resolved_version}")
+    wheel_filename = _find_wheel_on_servers(
+        wkctx, req, resolved_version, wheel_server_urls
+    )
+    if (
+        wheel_filename is not None
+        and not wkctx.package_build_info(req).pre_built
+        and not fingerprint.verify_wheel_fingerprint(
             ctx=wkctx,
             req=req,
-            sdist_root_dir=source_root_dir,
             version=resolved_version,
-            build_env=build_env,
-        )
-
-        hooks.run_post_build_hooks(
-            ctx=wkctx,
-            req=req,
-            dist_name=canonicalize_name(req.name),
-            dist_version=str(resolved_version),
-            sdist_filename=sdist_filename,
             wheel_filename=wheel_filename,
+            get_source_filename=get_source_filename,
+            build_distributions=build_distributions,
         )
-
-        wkctx.clean_build_dirs(source_root_dir, build_env)
-
-    root_logger.removeHandler(file_handler)
-    file_handler.close()
-
-    server.update_wheel_mirror(wkctx)
-
-    # After we update the wheel mirror, the built file has
-    # moved to a new directory.
-    wheel_filename = wkctx.wheels_downloads / wheel_filename.name
-
-    return BuildSequenceEntry(
-        name=canonicalize_name(req.name),
-        version=resolved_version,
-        prebuilt=prebuilt,
-        download_url=source_download_url,
-        wheel_filename=wheel_filename,
-        skipped=use_exiting_wheel,
+    ):
+        logger.info("not using %s, build fingerprint changed", wheel_filename.name)
+        wheel_filename = None
+    if wheel_filename is not None:
+        return wheel_filename
+    return build_cache.fetch_wheel(
+        wkctx,
+        req,
+        resolved_version,
+        wkctx.wheels_downloads,
+        get_source_filename=get_source_filename,
+        build_distributions=build_distributions,
     )
 
 
-def _is_wheel_built(
+def _find_wheel_on_servers(
     wkctx: context.WorkContext,
-    dist_name: str,
+    req: Requirement,
     resolved_version: Version,
     wheel_server_urls: list[str],
 ) -> pathlib.Path | None:
-    req = Requirement(f"{dist_name}=={resolved_version}")
-
+    dist_name = req.name
     try:
         logger.info(
             "checking if a suitable wheel for %s was already built on %s",
@@ -527,7 +719,127 @@ def _is_wheel_built(
             exc_info=True,
         )
         logger.info("could not locate prebuilt wheel")
-        return None
+    return None
+
+
+class _SourcePreparer:
+    """Prepare sources on I/O threads ahead of the build slots
+
+    Runs :func:`_prepare_build` for the nodes of the build order, so build
+    workers receive prepared source trees. At most *prepare_ahead* prepared
+    nodes wait for a build slot, which limits the disk space for unpacked
+    sources.
+    """
+
+    def __init__(
+        self,
+        *,
+        wkctx: context.WorkContext,
+        build_order: list[dependency_graph.DependencyNode],
+        force: bool,
+        cache_wheel_server_url: str | None,
+        prepare_workers: int,
+        prepare_ahead: int,
+        get_build_requirements: BuildRequirementsGetter | None = None,
+    ) -> None:
+        self.wkctx = wkctx
+        self.force = force
+        self.cache_wheel_server_url = cache_wheel_server_url
+        self.prepare_ahead = prepare_ahead
+        self.get_build_requirements = get_build_requirements or _get_build_requirements
+        self._queue = collections.deque(build_order)
+        self._futures: dict[
+            dependency_graph.DependencyNode, concurrent.futures.Future[PreparedBuild]
+        ] = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=prepare_workers, thread_name_prefix="prepare"
+        )
+
+    def __enter__(self) -> typing.Self:
+        self._fill()
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def extend(self, nodes: typing.Iterable[dependency_graph.DependencyNode]) -> None:
+        """Append nodes to the build order"""
+        with self._lock:
+            self._queue.extend(nodes)
+        self._fill()
+
+    def _fill(self) -> None:
+        with self._lock:
+            while self._queue and len(self._futures) < self.prepare_ahead:
+                node = self._queue.popleft()
+                if node not in self._futures:
+                    self._futures[node] = self._executor.submit(self._prepare, node)
+
+    def _prepare(self, node: dependency_graph.DependencyNode) -> PreparedBuild:
+        req = Requirement(f"{node.canonicalized_name}=={node.version}")
+        with (
+            req_ctxvar_context(req, node.version),
+            _build_log(self.wkctx, req, node.version),
+        ):
+            logger.info("preparing source ahead of build")
+            return _prepare_build(
+                wkctx=self.wkctx,
+                resolved_version=node.version,
+                req=req,
+                source_download_url=node.download_url,
+                force=self.force,
+                cache_wheel_server_url=self.cache_wheel_server_url,
+                build_requirements=self.get_build_requirements(node),
+            )
+
+    def take(self, node: dependency_graph.DependencyNode) -> PreparedBuild | None:
+        """Get the prepared build of a node
+
+        Waits for a running preparation. Returns ``None`` when the
+        preparation of the node has not started, yet. The caller prepares
+        the node itself.
+        """
+        with self._lock:
+            try:
+                self._queue.remove(node)
+            except ValueError:
+                pass
+            future = self._futures.pop(node, None)
+        try:
+            if future is None or future.cancel():
+                return None
+            return future.result()
+        finally:
+            self._fill()
+
+    def discard(self, node: dependency_graph.DependencyNode) -> None:
+        """Drop a node that is not built, e.g. because it is blocked
+
+        A pending preparation is cancelled. A running preparation finishes
+        in the background, but no longer takes a slot of the window.
+        """
+        with self._lock:
+            try:
+                self._queue.remove(node)
+            except ValueError:
+                pass
+            future = self._futures.pop(node, None)
+        if future is not None:
+            future.cancel()
+        self._fill()
+
+
+def _get_build_requirements(
+    node: dependency_graph.DependencyNode,
+    closures: dependency_graph.GraphClosures | None = None,
+) -> dict[str, Version]:
+    deps = (
+        node.iter_build_requirements()
+        if closures is None
+        else closures.build_requirements(node)
+    )
+    return {dep.canonicalized_name: dep.version for dep in deps}
 
 
 def _build_parallel(
@@ -537,11 +849,17 @@ def _build_parallel(
     source_download_url: str,
     force: bool,
     cache_wheel_server_url: str | None,
+    build_requirements: typing.Mapping[str, Version] | None = None,
+    preparer: _SourcePreparer | None = None,
+    node: dependency_graph.DependencyNode | None = None,
 ) -> BuildSequenceEntry:
     """
     This function runs in a thread to manage the build of a single package.
     """
     with req_ctxvar_context(req, resolved_version):
+        prepared: PreparedBuild | None = None
+        if preparer is not None and node is not None:
+            prepared = preparer.take(node)
         return _build(
             wkctx=wkctx,
             resolved_version=resolved_version,
@@ -549,6 +867,8 @@ def _build_parallel(
             source_download_url=source_download_url,
             force=force,
             cache_wheel_server_url=cache_wheel_server_url,
+            build_requirements=build_requirements,
+            prepared=prepared,
         )
 
 
@@ -577,6 +897,78 @@ def _nodes_to_string(nodes: typing.Iterable[dependency_graph.DependencyNode]) ->
     default=None,
     help="maximum number of parallel workers to run (default: unlimited)",
 )
+@click.option(
+    "--prepare-workers",
+    type=click.IntRange(min=0),
+    default=2,
+    show_default=True,
+    help="number of threads that download and prepare sources ahead of the builds, 0 to prepare sources in the build workers",
+)
+@click.option(
+    "--prepare-ahead",
+    type=click.IntRange(min=1),
+    default=None,
+    help="maximum number of prepared sources waiting for a build worker (default: 4 per prepare worker)",
+)
+@click.option(
+    "--keep-going/--fail-fast",
+    "keep_going",
+    default=False,
+    help="keep building packages that do not depend on a failed build and write a failure report",
+)
+@click.option(
+    "--shard",
+    "shard_index",
+    type=clickext.ShardIndex(),
+    default=None,
+    help="build shard I of N shards of the graph, needs a shared --cache-wheel-server-url",
+)
+@click.option(
+    "--durations",
+    "durations_file",
+    type=clickext.ClickPath(),
+    default=None,
+    help="JSON file with build durations to balance the shards, e.g. build-timings.json",
+)
+@click.option(
+    "--duplicate-below",
+    type=click.FloatRange(min=0),
+    default=graph_shard.DEFAULT_DUPLICATE_BELOW,
+    show_default=True,
+    help="build shared build dependencies with a shorter build time in seconds in every shard",
+)
+@click.option(
+    "--shard-wait-timeout",
+    type=click.FloatRange(min=0),
+    default=360,
+    show_default=True,
+    help="minutes to wait for a wheel of another shard",
+)
+@click.option(
+    "--coordinator",
+    is_flag=True,
+    default=False,
+    help="do not build, serve the builds to build-worker processes",
+)
+@click.option(
+    "--coordinator-host",
+    default="127.0.0.1",
+    show_default=True,
+    help="address of the coordinator, use 0.0.0.0 for workers on other hosts",
+)
+@click.option(
+    "--coordinator-port",
+    type=click.IntRange(min=0, max=65535),
+    default=0,
+    help="port of the coordinator (default: random free port)",
+)
+@click.option(
+    "--lease-timeout",
+    type=click.FloatRange(min=1),
+    default=build_coordinator.DEFAULT_LEASE_TIMEOUT,
+    show_default=True,
+    help="seconds until the build of a worker that stopped responding is given to another worker",
+)
 @click.argument("graph_file")
 @click.pass_obj
 def build_parallel(
@@ -585,6 +977,17 @@ def build_parallel(
     force: bool,
     cache_wheel_server_url: str | None,
     max_workers: int | None,
+    prepare_workers: int = 2,
+    prepare_ahead: int | None = None,
+    keep_going: bool = False,
+    shard_index: tuple[int, int] | None = None,
+    durations_file: pathlib.Path | None = None,
+    duplicate_below: float = graph_shard.DEFAULT_DUPLICATE_BELOW,
+    shard_wait_timeout: float = 360,
+    coordinator: bool = False,
+    coordinator_host: str = "127.0.0.1",
+    coordinator_port: int = 0,
+    lease_timeout: float = build_coordinator.DEFAULT_LEASE_TIMEOUT,
 ) -> None:
     """Build wheels in parallel based on a dependency graph
 
@@ -595,11 +998,37 @@ def build_parallel(
     can be built concurrently. By default, all possible packages are built in
     parallel. Use --max-workers to limit the number of concurrent builds.
 
+    Sources are downloaded and prepared by separate I/O threads, ahead of
+    the builds, in build order. Use --prepare-workers and --prepare-ahead
+    to tune the pipeline.
+
+    By default, the first failed build stops the command. With --keep-going,
+    packages that need a failed package to build are skipped, all other
+    packages are built, and the failures are written to a JSON report.
+
+    With --shard I/N, the graph is partitioned into N shards for N build
+    hosts and the command builds shard I. All hosts must use the same
+    graph, settings, and --durations file. Wheels that other shards build
+    are downloaded from the --cache-wheel-server-url server, so every host
+    has to publish its wheels there.
+
+    With --coordinator, the command does not build anything. It serves the
+    builds to 'fromager build-worker' processes on this or other hosts,
+    which upload the wheels to the wheel server of the coordinator.
+
     """
+    if shard_index is not None and not cache_wheel_server_url:
+        raise click.UsageError("--shard requires a shared --cache-wheel-server-url")
+    if shard_index is not None and coordinator:
+        raise click.UsageError("--shard cannot be combined with --coordinator")
     wkctx.enable_parallel_builds()
 
-    server.start_wheel_server(wkctx)
-    wheel_server_urls: list[str] = [wkctx.wheel_server_url]
+    if not coordinator:
+        # the coordinator serves the wheels next to its API
+        server.start_wheel_server(wkctx)
+    wheel_server_urls: list[str] = (
+        [wkctx.wheel_server_url] if wkctx.wheel_server_url else []
+    )
     if cache_wheel_server_url:
         # put after local server so we always check local server first
         wheel_server_urls.append(cache_wheel_server_url)
@@ -616,8 +1045,39 @@ def build_parallel(
     graph = dependency_graph.DependencyGraph.from_file(graph_file)
     logger.info("found %i packages to build", len(graph))
 
-    topo = graph.get_build_topology(context=wkctx)
+    shard: graph_shard.Shard | None = None
+    external: frozenset[dependency_graph.DependencyNode] = frozenset()
+    get_external_wheel: ExternalWheelGetter | None = None
+    if shard_index is not None:
+        assert cache_wheel_server_url is not None
+        shard = _get_shard(wkctx, graph, shard_index, durations_file, duplicate_below)
+        external = shard.external
+        get_external_wheel = functools.partial(
+            _wait_for_wheel,
+            wkctx=wkctx,
+            cache_wheel_server_url=cache_wheel_server_url,
+            timeout=shard_wait_timeout * 60,
+        )
+
+    if cache_wheel_server_url and not force and not coordinator:
+        # wheels of other shards are published while the build runs
+        waiting = {node.canonicalized_name for node in external}
+        cache_index.prefetch(
+            cache_wheel_server_url,
+            [
+                node.canonicalized_name
+                for node in graph.get_all_nodes()
+                if node.key != dependency_graph.ROOT
+                and node.canonicalized_name not in waiting
+            ],
+        )
+
+    topo = _get_build_topology(wkctx, graph, shard)
     topo.prepare()
+    # the graph does not change, share its closures
+    get_build_requirements = functools.partial(
+        _get_build_requirements, closures=graph.closures()
+    )
     logger.info(
         "build topology has %i exclusive nodes: %s",
         len(topo.exclusive_nodes),
@@ -629,32 +1089,336 @@ def build_parallel(
         _nodes_to_string(topo.dependency_nodes),
     )
 
-    future2node: dict[BuildSequenceEntryFuture, dependency_graph.DependencyNode] = {}
-    built_entries: list[BuildSequenceEntry] = []
-    rounds: int = 0
+    failures: list[FailureRecord] | None = [] if keep_going else None
+    if coordinator:
+        with progress.progress_context(total=len(graph)) as progressbar:
+            built_entries = _run_coordinator(
+                wkctx=wkctx,
+                topo=topo,
+                force=force,
+                cache_wheel_server_url=cache_wheel_server_url,
+                get_build_requirements=get_build_requirements,
+                failures=failures,
+                host=coordinator_host,
+                port=coordinator_port,
+                lease_timeout=lease_timeout,
+                progressbar=progressbar,
+            )
+        metrics.summarize(wkctx, "Building with workers")
+        _summary(wkctx, built_entries)
+        if failures is not None:
+            _write_failure_report(wkctx, failures)
+            if failures:
+                raise SystemExit(1)
+        return
+
+    preparer: _SourcePreparer | None = None
+    if prepare_workers:
+        build_order = [
+            node
+            for batch in _get_build_topology(wkctx, graph, shard).static_batches()
+            for node in sorted(batch, key=lambda n: n.key)
+            if node not in external
+        ]
+        preparer = _SourcePreparer(
+            wkctx=wkctx,
+            build_order=build_order,
+            force=force,
+            cache_wheel_server_url=cache_wheel_server_url,
+            prepare_workers=prepare_workers,
+            prepare_ahead=prepare_ahead or 4 * prepare_workers,
+            get_build_requirements=get_build_requirements,
+        )
+        logger.info(
+            "preparing sources with %i workers, up to %i ahead of the builds",
+            prepare_workers,
+            preparer.prepare_ahead,
+        )
 
+    total = len(graph) if shard is None else len(shard.build) + len(external)
     with (
-        progress.progress_context(total=len(graph)) as progressbar,
-        concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor,
+        progress.progress_context(total=total) as progressbar,
+        preparer or contextlib.nullcontext(),
     ):
+        built_entries = _run_parallel_builds(
+            wkctx=wkctx,
+            topo=topo,
+            force=force,
+            cache_wheel_server_url=cache_wheel_server_url,
+            max_workers=max_workers,
+            progressbar=progressbar,
+            preparer=preparer,
+            get_build_requirements=get_build_requirements,
+            failures=failures,
+            external=external,
+            get_external_wheel=get_external_wheel,
+        )
 
-        def update_progressbar_cb(future: concurrent.futures.Future) -> None:
-            """Immediately update the progress and mark node as done"""
-            progressbar.update()
+    metrics.summarize(wkctx, "Building in parallel")
+    _summary(wkctx, built_entries)
+    if failures is not None:
+        _write_failure_report(wkctx, failures)
+        if failures:
+            raise SystemExit(1)
 
-        while topo.is_active():
-            rounds += 1
-            nodes_to_build = topo.get_available()
-            logger.info(
-                "round %i: starting to build %i node(s): %s",
-                rounds,
-                len(nodes_to_build),
-                _nodes_to_string(nodes_to_build),
+
+def _run_coordinator(
+    *,
+    wkctx: context.WorkContext,
+    topo: dependency_graph.TrackingTopologicalSorter,
+    force: bool,
+    cache_wheel_server_url: str | None,
+    get_build_requirements: BuildRequirementsGetter,
+    failures: list[FailureRecord] | None,
+    host: str,
+    port: int,
+    lease_timeout: float,
+    progressbar: progress.Progressbar,
+) -> list[BuildSequenceEntry]:
+    """Serve the builds of a prepared topology to build workers
+
+    Runs the wheel server with the coordinator API and waits until the
+    workers built all nodes, or until the first failure without a
+    *failures* list.
+    """
+    coordinator = build_coordinator.BuildCoordinator(
+        wkctx,
+        topo,
+        get_build_requirements=get_build_requirements,
+        force=force,
+        cache_wheel_server_url=cache_wheel_server_url,
+        failures=failures,
+        record_blocked=_record_blocked,
+        lease_timeout=lease_timeout,
+        on_done=progressbar.update,
+    )
+    server.update_wheel_mirror(wkctx)
+    _, sock, _ = server.run_wheel_server(
+        wkctx, address=host, port=port, routes=coordinator.routes()
+    )
+    url = f"http://{host}:{sock.getsockname()[1]}/"
+    logger.info(
+        "waiting for build workers, run: fromager build-worker --coordinator %s", url
+    )
+    coordinator.wait()
+    # idle workers learn about the end of the build when they poll
+    coordinator.dismiss_workers(timeout=2 * build_coordinator.POLL_INTERVAL)
+    if coordinator.error is not None:
+        raise RuntimeError(coordinator.error)
+    return [
+        BuildSequenceEntry(
+            name=node.canonicalized_name,
+            version=node.version,
+            prebuilt=result.prebuilt,
+            download_url=node.download_url,
+            wheel_filename=wkctx.wheels_downloads / str(result.wheel_filename),
+            skipped=result.skipped,
+        )
+        for node, result in coordinator.completed
+    ]
+
+
+def _get_shard(
+    wkctx: context.WorkContext,
+    graph: dependency_graph.DependencyGraph,
+    shard_index: tuple[int, int],
+    durations_file: pathlib.Path | None,
+    duplicate_below: float,
+) -> graph_shard.Shard:
+    """Plan the shards of the graph and return shard I of N"""
+    index, count = shard_index
+    if durations_file is not None:
+        durations = build_simulator.Durations.from_file(durations_file)
+    else:
+        durations = build_simulator.Durations()
+    plan = graph_shard.plan_shards(
+        build_simulator.get_build_tasks(graph, wkctx, durations),
+        count,
+        duplicate_below=duplicate_below,
+    )
+    for line in plan.summary().splitlines():
+        logger.info(line)
+    shard = plan.shards[index - 1]
+    logger.info(
+        "building shard %i/%i: %i packages, waiting for %i packages of other shards",
+        index,
+        count,
+        len(shard.build),
+        len(shard.external),
+    )
+    return shard
+
+
+def _get_build_topology(
+    wkctx: context.WorkContext,
+    graph: dependency_graph.DependencyGraph,
+    shard: graph_shard.Shard | None = None,
+) -> dependency_graph.TrackingTopologicalSorter:
+    """Build topology of the graph or of one shard
+
+    Packages of other shards have no predecessors in the topology of a
+    shard, their wheels are downloaded when they are published.
+    """
+    if shard is None:
+        return graph.get_build_topology(context=wkctx)
+    topo = dependency_graph.TrackingTopologicalSorter()
+    closures = graph.closures()
+    for node in shard.build:
+        pbi = wkctx.package_build_info(node.canonicalized_name)
+        topo.add(
+            node, *closures.build_requirements(node), exclusive=pbi.exclusive_build
+        )
+    for node in shard.external:
+        topo.add(node)
+    return topo
+
+
+def _wait_for_wheel(
+    node: dependency_graph.DependencyNode,
+    stop: threading.Event,
+    *,
+    wkctx: context.WorkContext,
+    cache_wheel_server_url: str,
+    timeout: float,
+) -> BuildSequenceEntry:
+    """Wait until another shard publishes the wheel of *node*
+
+    Polls the wheel server every :data:`SHARD_POLL_INTERVAL` seconds until
+    the wheel appears, *timeout* seconds pass, or *stop* is set.
+    """
+    req = Requirement(f"{node.canonicalized_name}=={node.version}")
+    deadline = time.monotonic() + timeout
+    with req_ctxvar_context(req, node.version):
+        logger.info("waiting for another shard to publish the wheel")
+        while True:
+            # do not answer from candidates of an earlier poll
+            with contextlib.suppress(KeyError):
+                resolver.BaseProvider.clear_cache(node.canonicalized_name)
+            wheel_filename = _is_wheel_built(
+                wkctx, req.name, node.version, [cache_wheel_server_url]
             )
-            for node in nodes_to_build:
+            if wheel_filename is not None:
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"{node.key} was not published on {cache_wheel_server_url} "
+                    f"within {timeout / 60:.0f} minutes"
+                )
+            if stop.wait(SHARD_POLL_INTERVAL):
+                raise RuntimeError(f"stopped waiting for {node.key}")
+        server.update_wheel_mirror(wkctx)
+    return BuildSequenceEntry(
+        name=node.canonicalized_name,
+        version=node.version,
+        prebuilt=node.pre_built,
+        download_url=node.download_url,
+        wheel_filename=wkctx.wheels_downloads / wheel_filename.name,
+        skipped=True,
+    )
+
+
+def _run_parallel_builds(
+    *,
+    wkctx: context.WorkContext,
+    topo: dependency_graph.TrackingTopologicalSorter,
+    force: bool,
+    cache_wheel_server_url: str | None,
+    max_workers: int | None,
+    progressbar: progress.Progressbar,
+    preparer: _SourcePreparer | None = None,
+    get_build_requirements: BuildRequirementsGetter | None = None,
+    cancel: threading.Event | None = None,
+    failures: list[FailureRecord] | None = None,
+    external: typing.AbstractSet[dependency_graph.DependencyNode] = frozenset(),
+    get_external_wheel: ExternalWheelGetter | None = None,
+) -> list[BuildSequenceEntry]:
+    """Build all nodes of a prepared topology with a pool of workers
+
+    Nodes are submitted as soon as their build requirements are done and
+    a slot of each of their resource classes is free. Exclusive nodes are
+    built alone. Works with streaming topologies, which
+    receive new nodes while the builds are running. Setting *cancel* stops
+    submitting new builds.
+
+    The first failed build raises an error. With a *failures* list, failed
+    builds are recorded instead and the nodes that depend on a failed node
+    are recorded as blocked without building them. Independent nodes are
+    still built.
+
+    *external* nodes are built elsewhere. ``get_external_wheel`` waits for
+    their wheels on separate threads, so waiting does not take a worker.
+    """
+    get_build_requirements = get_build_requirements or _get_build_requirements
+    future2node: dict[BuildSequenceEntryFuture, dependency_graph.DependencyNode] = {}
+    built_entries: list[BuildSequenceEntry] = []
+    # failed and blocked nodes -> failure record of the failed node
+    failed: dict[dependency_graph.DependencyNode, FailureRecord] = {}
+    # resource classes held by running nodes
+    resource_pool = wkctx.resource_pool
+    held: dict[dependency_graph.DependencyNode, frozenset[str]] = {}
+
+    def update_progressbar_cb(future: concurrent.futures.Future) -> None:
+        """Immediately update the progress and wake up the scheduler"""
+        progressbar.update()
+        topo.notify()
+
+    # stops waiting for external wheels when the builds end
+    stop_waiting = threading.Event()
+
+    with (
+        _release_resources(resource_pool, held),
+        concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor,
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, len(external)), thread_name_prefix="shard-wait"
+        ) as waiter,
+        _set_on_exit(stop_waiting),
+    ):
+        while topo.is_active() and not (cancel is not None and cancel.is_set()):
+            generation = topo.generation
+            exclusive_nodes = topo.exclusive_nodes
+            running = set(future2node.values())
+            if running.isdisjoint(exclusive_nodes):
+                nodes_to_build = topo.get_available().difference(running)
+            else:
+                # an exclusive build is running
+                nodes_to_build = set()
+            started: list[dependency_graph.DependencyNode] = []
+            # nodes wait for resource classes, which can be held by others
+            waiting_for_resources = False
+            for node in sorted(nodes_to_build):
+                blocked_by = sorted(topo.predecessors(node).intersection(failed))
+                if blocked_by:
+                    failed[node] = _record_blocked(node, failed[blocked_by[0]])
+                    assert failures is not None
+                    failures.append(failed[node])
+                    if preparer is not None:
+                        preparer.discard(node)
+                    progressbar.update()
+                    topo.done(node)
+                    continue
+                if node in external:
+                    assert get_external_wheel is not None
+                    held[node] = frozenset()
+                    started.append(node)
+                    future = waiter.submit(get_external_wheel, node, stop_waiting)
+                    future.add_done_callback(update_progressbar_cb)
+                    future2node[future] = node
+                    continue
+                classes = wkctx.package_build_info(
+                    node.canonicalized_name
+                ).resource_classes
+                if not resource_pool.try_acquire(classes):
+                    waiting_for_resources = True
+                    continue
+                held[node] = classes
+                started.append(node)
                 with req_ctxvar_context(node.requirement, node.version):
-                    if node in topo.exclusive_nodes:
+                    if node in exclusive_nodes:
                         logger.info("requires exclusive build")
+                    if classes:
+                        logger.info(
+                            "holds resource classes %s", ", ".join(sorted(classes))
+                        )
                     logger.info("ready to build")
 
                 req = Requirement(f"{node.canonicalized_name}=={node.version}")
@@ -667,29 +1431,410 @@ def build_parallel(
                     source_download_url=node.download_url,
                     force=force,
                     cache_wheel_server_url=cache_wheel_server_url,
+                    build_requirements=get_build_requirements(node),
+                    preparer=preparer,
+                    node=node,
                 )
                 future.add_done_callback(update_progressbar_cb)
                 future2node[future] = node
 
-            # Wait for all builds to complete
-            for future in concurrent.futures.as_completed(future2node):
+            if started:
+                logger.info(
+                    "starting to build %i node(s): %s",
+                    len(started),
+                    _nodes_to_string(started),
+                )
+
+            finished = [future for future in future2node if future.done()]
+            if not finished:
+                # wait for a build to finish or for new nodes. Resource
+                # classes can also be released by a concurrent bootstrap.
+                topo.wait(generation, timeout=1.0 if waiting_for_resources else None)
+                continue
+
+            for future in finished:
                 node = future2node.pop(future)
                 with req_ctxvar_context(node.requirement, node.version):
                     try:
                         entry = future.result()
                     except Exception as e:
                         logger.error(f"Failed to build {node.key}: {e}")
-                        raise RuntimeError(f"Failed to build {node.key}") from e
+                        if failures is None:
+                            raise RuntimeError(f"Failed to build {node.key}") from e
+                        failed[node] = {
+                            "package": node.canonicalized_name,
+                            "version": str(node.version),
+                            "exception_type": e.__class__.__name__,
+                            "exception_message": str(e),
+                            "failure_type": _build_failure_type(e),
+                        }
+                        failures.append(failed[node])
                     else:
                         # success
                         built_entries.append(entry)
                     finally:
+                        resource_pool.release(held.pop(node))
                         # mark node as done, progress bar is updated in callback.
                         topo.done(node)
-                        # Re-raise with package context since context var is lost across threads
 
-    metrics.summarize(wkctx, "Building in parallel")
-    _summary(wkctx, built_entries)
+    return built_entries
+
+
+@contextlib.contextmanager
+def _release_resources(
+    resource_pool: resources.ResourcePool,
+    held: dict[dependency_graph.DependencyNode, frozenset[str]],
+) -> typing.Generator[None, None, None]:
+    """Release resource classes of builds that are left after an error"""
+    try:
+        yield
+    finally:
+        for classes in held.values():
+            resource_pool.release(classes)
+        held.clear()
+
+
+@contextlib.contextmanager
+def _set_on_exit(event: threading.Event) -> typing.Generator[None, None, None]:
+    try:
+        yield
+    finally:
+        event.set()
+
+
+def _build_failure_type(err: BaseException) -> FailureType:
+    """Tell hung builds that were killed apart from other build failures"""
+    cause: BaseException | None = err
+    while cause is not None:
+        if isinstance(cause, external_commands.CommandTimeoutError):
+            return "timeout"
+        cause = cause.__cause__ or cause.__context__
+    return "build"
+
+
+def _record_blocked(
+    node: dependency_graph.DependencyNode, cause: FailureRecord
+) -> FailureRecord:
+    """Record a node that is not built, because a build requirement failed"""
+    with req_ctxvar_context(node.requirement, node.version):
+        logger.warning(
+            "not building, build requirement %s==%s failed",
+            cause["package"],
+            cause["version"],
+        )
+    return {
+        "package": node.canonicalized_name,
+        "version": str(node.version),
+        "exception_type": cause["exception_type"],
+        "exception_message": (
+            f"blocked by failed build of {cause['package']}=={cause['version']}: "
+            f"{cause['exception_message']}"
+        ),
+        "failure_type": "blocked",
+    }
+
+
+def _write_failure_report(
+    wkctx: context.WorkContext, failures: list[FailureRecord]
+) -> None:
+    """Write keep-going failures in the format of the test mode report"""
+    if not failures:
+        logger.info("keep going: all packages built successfully")
+        return
+    timestamp = datetime.datetime.now(tz=datetime.UTC).strftime("%Y%m%d-%H%M%S-%f")
+    failures_file = wkctx.work_dir / f"build-parallel-failures-{timestamp}.json"
+    with open(failures_file, "w") as f:
+        json.dump({"failures": failures}, f, indent=2)
+    logger.info("keep going: wrote failure report to %s", failures_file)
+    labels: dict[FailureType, str] = {
+        "build": "failed",
+        "timeout": "timed out",
+        "blocked": "blocked",
+    }
+    for failure_type, label in labels.items():
+        names = [
+            f"{f['package']}=={f['version']}"
+            for f in failures
+            if f["failure_type"] == failure_type
+        ]
+        if names:
+            logger.error(
+                "keep going: %d package(s) %s: %s",
+                len(names),
+                label,
+                ", ".join(names),
+            )
+
+
+class StreamingBuild:
+    """Build wheels while the bootstrapper discovers the dependency graph
+
+    Implements :class:`~fromager.bootstrapper.BootstrapListener`. The
+    edges of a package in the dependency graph are final when the
+    bootstrapper has completed the package. A package is added to a live
+    build topology as soon as the package and all packages of its build
+    closure are complete. A background thread builds the nodes of the
+    topology like ``build-parallel``.
+
+    Use as a context manager around the bootstrap, then call
+    :meth:`finish` to add the remaining nodes and wait for the builds.
+    """
+
+    def __init__(
+        self,
+        wkctx: context.WorkContext,
+        *,
+        force: bool,
+        cache_wheel_server_url: str | None,
+        max_workers: int | None,
+        prepare_workers: int = 2,
+        prepare_ahead: int | None = None,
+        keep_going: bool = False,
+    ) -> None:
+        self.wkctx = wkctx
+        self.force = force
+        self.cache_wheel_server_url = cache_wheel_server_url
+        self.max_workers = max_workers
+        self.topo = dependency_graph.TrackingTopologicalSorter(streaming=True)
+        self.topo.prepare()
+        self.built_entries: list[BuildSequenceEntry] = []
+        self.failures: list[FailureRecord] | None = [] if keep_going else None
+        # complete packages that are not in the topology, yet
+        self._pending: dict[str, dependency_graph.DependencyNode] = {}
+        self._complete: set[str] = set()
+        self._added: dict[str, dependency_graph.DependencyNode] = {}
+        self._build_requirements: dict[
+            dependency_graph.DependencyNode, dict[str, Version]
+        ] = {}
+        self._preparer: _SourcePreparer | None = None
+        if prepare_workers:
+            self._preparer = _SourcePreparer(
+                wkctx=wkctx,
+                build_order=[],
+                force=force,
+                cache_wheel_server_url=cache_wheel_server_url,
+                prepare_workers=prepare_workers,
+                prepare_ahead=prepare_ahead or 4 * prepare_workers,
+                get_build_requirements=self._get_build_requirements,
+            )
+        self._cancel = threading.Event()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._run, name="streaming-build", daemon=True
+        )
+
+    def __enter__(self) -> typing.Self:
+        self.wkctx.enable_parallel_builds()
+        self._thread.start()
+        return self
+
+    def __exit__(self, typ: type[BaseException] | None, *args: typing.Any) -> None:
+        if typ is not None:
+            # bootstrap failed, stop submitting new builds
+            self._cancel.set()
+            self.topo.close()
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            with self._preparer or contextlib.nullcontext():
+                self.built_entries = _run_parallel_builds(
+                    wkctx=self.wkctx,
+                    topo=self.topo,
+                    force=self.force,
+                    cache_wheel_server_url=self.cache_wheel_server_url,
+                    max_workers=self.max_workers,
+                    progressbar=progress.Progressbar(None),
+                    preparer=self._preparer,
+                    get_build_requirements=self._get_build_requirements,
+                    cancel=self._cancel,
+                    failures=self.failures,
+                )
+        except BaseException as err:
+            self._error = err
+            self.topo.notify()
+
+    def _check_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("streaming build failed") from self._error
+
+    def _get_build_requirements(
+        self, node: dependency_graph.DependencyNode
+    ) -> dict[str, Version]:
+        return self._build_requirements[node]
+
+    def package_started(self, req: Requirement, version: Version) -> None:
+        self._check_error()
+        key = f"{canonicalize_name(req.name)}=={version}"
+        node = self._added.get(key)
+        if node is None:
+            # processed again, e.g. as build requirement after sdist-only
+            self._complete.discard(key)
+            self._pending.pop(key, None)
+            return
+        # The package is built already or is being built. Wait for the
+        # wheel, so the bootstrapper finds it instead of building it again.
+        logger.info("waiting for streaming build of %s", key)
+        while True:
+            generation = self.topo.generation
+            if self.topo.is_done(node):
+                break
+            self._check_error()
+            self.topo.wait(generation)
+        self._check_error()
+
+    def package_completed(self, req: Requirement, version: Version) -> None:
+        self._check_error()
+        key = f"{canonicalize_name(req.name)}=={version}"
+        node = self.wkctx.dependency_graph.nodes.get(key)
+        if node is None or key in self._added:
+            return
+        self._complete.add(key)
+        self._pending[key] = node
+        self._add_nodes()
+
+    def _add_nodes(self, final: bool = False) -> None:
+        """Add complete nodes with complete build closures to the topology
+
+        With *final*, add all remaining nodes of the graph.
+        """
+        if final:
+            for node in self.wkctx.dependency_graph.get_all_nodes():
+                if node.key != dependency_graph.ROOT and node.key not in self._added:
+                    self._pending[node.key] = node
+
+        added: list[dependency_graph.DependencyNode] = []
+        closures = {
+            key: list(node.iter_build_requirements())
+            for key, node in self._pending.items()
+        }
+        progressed = True
+        while progressed:
+            progressed = False
+            for key, closure in list(closures.items()):
+                # all dependencies must be in the topology or added in the
+                # same round, so their build closures are final, too.
+                if not final and not all(dep.key in self._added for dep in closure):
+                    continue
+                node = self._pending.pop(key)
+                del closures[key]
+                self._added[key] = node
+                self._build_requirements[node] = {
+                    dep.canonicalized_name: dep.version for dep in closure
+                }
+                added.append(node)
+                progressed = True
+
+        for node in added:
+            pbi = self.wkctx.package_build_info(node.canonicalized_name)
+            self.topo.add(
+                node,
+                *(self._added[dep.key] for dep in node.iter_build_requirements()),
+                exclusive=pbi.exclusive_build,
+            )
+        if added:
+            logger.info(
+                "adding %i node(s) to streaming build: %s",
+                len(added),
+                _nodes_to_string(added),
+            )
+            if self._preparer is not None:
+                self._preparer.extend(added)
+
+    def finish(self) -> list[BuildSequenceEntry]:
+        """Add all remaining nodes, wait for the builds, and print a summary
+
+        Raises :exc:`SystemExit` in keep-going mode when a build failed.
+        """
+        self._check_error()
+        self._add_nodes(final=True)
+        self.topo.close()
+        self._thread.join()
+        self._check_error()
+        metrics.summarize(self.wkctx, "Building in parallel")
+        _summary(self.wkctx, self.built_entries)
+        if self.failures is not None:
+            _write_failure_report(self.wkctx, self.failures)
+            if self.failures:
+                raise SystemExit(1)
+        return self.built_entries
 
 
 build_parallel._fromager_show_build_settings = True  # type: ignore
+
+
+@click.command()
+@click.option(
+    "--coordinator",
+    "coordinator_url",
+    required=True,
+    help="URL of a 'build-parallel --coordinator' process",
+)
+@click.option(
+    "--worker-id",
+    default=None,
+    help="name of the worker in the logs of the coordinator (default: host name and process id)",
+)
+@click.pass_obj
+def build_worker(
+    wkctx: context.WorkContext,
+    coordinator_url: str,
+    worker_id: str | None,
+) -> None:
+    """Build wheels for a build-parallel coordinator
+
+    Leases packages that are ready to build from the coordinator, builds
+    them one at a time, and uploads the wheels to the wheel server of the
+    coordinator. Build dependencies are installed from the same wheel
+    server. Run one worker per build slot, on as many hosts as needed.
+    All workers must use the same settings as the coordinator.
+
+    The command exits when the coordinator is finished.
+
+    """
+    worker = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    client = build_coordinator.CoordinatorClient(coordinator_url, worker)
+    wkctx.wheel_server_url = client.wheel_server_url
+    server.update_wheel_mirror(wkctx)
+    logger.info("worker %s builds for coordinator %s", worker, client.url)
+    count = build_coordinator.run_worker(client, functools.partial(_build_task, wkctx))
+    print(f"built {count} packages for {client.url}")
+
+
+build_worker._fromager_show_build_settings = True  # type: ignore
+
+
+def _build_task(
+    wkctx: context.WorkContext, task: build_coordinator.Task
+) -> tuple[build_coordinator.TaskResult, pathlib.Path | None]:
+    """Build the package of a coordinator task"""
+    version = Version(task.version)
+    req = Requirement(f"{task.name}=={version}")
+    with req_ctxvar_context(req, version):
+        try:
+            entry = _build(
+                wkctx=wkctx,
+                resolved_version=version,
+                req=req,
+                source_download_url=task.download_url,
+                force=task.force,
+                cache_wheel_server_url=task.cache_wheel_server_url,
+                build_requirements={
+                    name: Version(v) for name, v in task.build_requirements.items()
+                },
+            )
+        except Exception as err:
+            logger.exception("build failed")
+            error = {
+                "exception_type": err.__class__.__name__,
+                "exception_message": str(err),
+                "failure_type": _build_failure_type(err),
+            }
+            return build_coordinator.TaskResult(key=task.key, error=error), None
+    result = build_coordinator.TaskResult(
+        key=task.key,
+        wheel_filename=entry.wheel_filename.name,
+        prebuilt=entry.prebuilt,
+        skipped=entry.skipped,
+    )
+    return result, entry.wheel_filename
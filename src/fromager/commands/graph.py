@@ -1,7 +1,10 @@
+import dataclasses
+import graphlib
 import io
 import itertools
 import json
 import logging
+import os
 import pathlib
 import sys
 import typing
@@ -14,12 +17,22 @@ from packaging.utils import NormalizedName, canonicalize_name
 from packaging.version import Version
 from rich.table import Table
 
-from fromager import clickext, context
+from fromager import (
+    build_simulator,
+    clickext,
+    context,
+    finders,
+    fingerprint,
+    graph_binary,
+    graph_diff,
+    graph_shard,
+)
 from fromager.commands import bootstrap
 from fromager.dependency_graph import (
     ROOT,
     DependencyGraph,
     DependencyNode,
+    GraphClosures,
 )
 from fromager.packagesettings import PatchMap
 from fromager.requirements_file import RequirementType
@@ -562,24 +575,17 @@ def extract_package_subset(
         version_msg = f" version {version}" if version else ""
         raise ValueError(f"Package {package_name}{version_msg} not found in graph")
 
-    # Collect all related nodes
-    related_nodes: set[str] = set()
-
-    # Add target nodes
-    for node in target_nodes:
-        related_nodes.add(node.key)
-
-    # Traverse up to find dependents (what depends on our package)
-    if not dependencies_only:
-        visited_up: set[str] = set()
-        for target_node in target_nodes:
-            _collect_dependents(target_node, related_nodes, visited_up)
-
-    # Traverse down to find dependencies (what our package depends on)
-    if not dependents_only:
-        visited_down: set[str] = set()
-        for target_node in target_nodes:
-            _collect_dependencies(target_node, related_nodes, visited_down)
+    # Collect all related nodes, starting with the target nodes
+    closures = graph.closures()
+    related_bits = closures.bits(target_nodes)
+    for target_node in target_nodes:
+        # dependents (what depends on our package)
+        if not dependencies_only:
+            related_bits |= closures.dependents_bits(target_node)
+        # dependencies (what our package depends on)
+        if not dependents_only:
+            related_bits |= closures.all_bits(target_node)
+    related_nodes = closures.to_keys(related_bits)
 
     # Always include ROOT so the graph is rooted
     related_nodes.add(ROOT)
@@ -612,38 +618,6 @@ def extract_package_subset(
     return subset_graph
 
 
-def _collect_dependents(
-    node: DependencyNode,
-    related_nodes: set[str],
-    visited: set[str],
-) -> None:
-    """Recursively collect all nodes that depend on the given node."""
-    if node.key in visited:
-        return
-    visited.add(node.key)
-
-    for parent_edge in node.parents:
-        parent_node = parent_edge.destination_node
-        related_nodes.add(parent_node.key)
-        _collect_dependents(parent_node, related_nodes, visited)
-
-
-def _collect_dependencies(
-    node: DependencyNode,
-    related_nodes: set[str],
-    visited: set[str],
-) -> None:
-    """Recursively collect all dependencies of the given node."""
-    if node.key in visited:
-        return
-    visited.add(node.key)
-
-    for child_edge in node.children:
-        child_node = child_edge.destination_node
-        related_nodes.add(child_node.key)
-        _collect_dependencies(child_node, related_nodes, visited)
-
-
 def _build_subset_graph(
     source_graph: DependencyGraph,
     target_graph: DependencyGraph,
@@ -773,44 +747,122 @@ def find_why(
     "--output",
     type=clickext.ClickPath(),
 )
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["json", "binary"], case_sensitive=False),
+    default="json",
+    show_default=True,
+    help="Format of the output graph",
+)
 @click.argument(
     "graph-file",
     type=clickext.ClickPath(),
 )
 @click.pass_obj
 def migrate_graph(
-    wkctx: context.WorkContext, graph_file: pathlib.Path, output: pathlib.Path
+    wkctx: context.WorkContext,
+    graph_file: pathlib.Path,
+    output: pathlib.Path,
+    output_format: str,
 ) -> None:
-    "Convert a old graph file into the the new format"
-    graph = DependencyGraph()
-    with open(graph_file, "r") as f:
-        old_graph = json.load(f)
-        stack = [ROOT]
-        visited = set()
-        while stack:
-            curr_key = stack.pop()
-            if curr_key in visited:
-                continue
-            for req_type, req_name, req_version, req in old_graph.get(curr_key, []):
-                parent_name, _, parent_version = curr_key.partition("==")
-                graph.add_dependency(
-                    parent_name=canonicalize_name(parent_name) if parent_name else None,
-                    parent_version=Version(parent_version) if parent_version else None,
-                    req_type=RequirementType(req_type),
-                    req_version=Version(req_version),
-                    req=Requirement(req),
-                )
-                stack.append(f"{req_name}=={req_version}")
-            visited.add(curr_key)
+    """Convert a graph file into the new format
 
-    if output:
+    Reads old graph files, current JSON graph files, and binary graph
+    files. Writes JSON or the compact binary format, which is for fast
+    handoff between machines. Commands that read graph files detect the
+    binary format.
+    """
+    with open(graph_file, "rb") as f:
+        is_binary = graph_binary.is_binary_graph(f.read(len(graph_binary.MAGIC)))
+        f.seek(0)
+        if is_binary:
+            graph = DependencyGraph.from_binary(f)
+        else:
+            raw_graph = json.load(f)
+            if isinstance(raw_graph.get(ROOT), dict):
+                graph = DependencyGraph.from_dict(raw_graph)
+            else:
+                graph = _migrate_old_graph(raw_graph)
+
+    if output_format == "binary":
+        if output:
+            with open(output, "wb") as bf:
+                graph.serialize_binary(bf)
+        else:
+            graph.serialize_binary(sys.stdout.buffer)
+    elif output:
         with open(output, "w") as f:
             graph.serialize(f)
     else:
         graph.serialize(sys.stdout)
 
 
+def _migrate_old_graph(old_graph: dict[str, list[list[str]]]) -> DependencyGraph:
+    """Convert a graph in the old list based format"""
+    graph = DependencyGraph()
+    stack = [ROOT]
+    visited = set()
+    while stack:
+        curr_key = stack.pop()
+        if curr_key in visited:
+            continue
+        for req_type, req_name, req_version, req in old_graph.get(curr_key, []):
+            parent_name, _, parent_version = curr_key.partition("==")
+            graph.add_dependency(
+                parent_name=canonicalize_name(parent_name) if parent_name else None,
+                parent_version=Version(parent_version) if parent_version else None,
+                req_type=RequirementType(req_type),
+                req_version=Version(req_version),
+                req=Requirement(req),
+            )
+            stack.append(f"{req_name}=={req_version}")
+        visited.add(curr_key)
+    return graph
+
+
 @graph.command()
+@click.option(
+    "--simulate",
+    is_flag=True,
+    default=False,
+    help="Simulate the parallel build with predicted build durations",
+)
+@click.option(
+    "--durations",
+    "durations_file",
+    type=clickext.ClickPath(),
+    help="JSON file with build durations, e.g. build-timings.json of a build",
+)
+@click.option(
+    "--default-duration",
+    type=click.FloatRange(min=0),
+    default=build_simulator.DEFAULT_DURATION,
+    show_default=True,
+    help="Build duration in seconds of packages without a known duration",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Number of simulated build workers [default: CPU count + 4, at most 32]",
+)
+@click.option(
+    "--policy",
+    type=click.Choice(build_simulator.POLICIES),
+    default="name",
+    show_default=True,
+    help="Order in which ready packages are started",
+)
+@click.option(
+    "--timeline-json",
+    type=clickext.ClickPath(),
+    help="Write the simulated timeline as JSON, implies --simulate",
+)
+@click.option(
+    "--timeline-html",
+    type=clickext.ClickPath(),
+    help="Write the simulated timeline as HTML Gantt chart, implies --simulate",
+)
 @click.argument(
     "graph-file",
     type=clickext.ClickPath(),
@@ -819,12 +871,25 @@ def migrate_graph(
 def build_graph(
     wkctx: context.WorkContext,
     graph_file: pathlib.Path,
+    simulate: bool,
+    durations_file: pathlib.Path | None,
+    default_duration: float,
+    workers: int | None,
+    policy: str,
+    timeline_json: pathlib.Path | None,
+    timeline_html: pathlib.Path | None,
 ) -> None:
     """Print build graph steps for parallel-build
 
     The build-graph command takes a graph.json file and analyzes in which
     order parallel build is going to build the wheels. It also shows which
     wheels are recognized as build dependencies or exclusive builds.
+
+    With --simulate, the command also projects the wall-clock time of a
+    parallel build with a number of workers, the critical path, and the
+    utilization of the workers. Build durations come from a --durations
+    file, e.g. the build-timings.json file in the work directory of an
+    earlier build.
     """
     graph = DependencyGraph.from_file(graph_file)
     topo = graph.get_build_topology(context=wkctx)
@@ -849,8 +914,421 @@ def build_graph(
 
     print(f"\nBuilding {len(graph)} packages in {rounds} rounds.")
 
+    if not (simulate or timeline_json or timeline_html):
+        return
+    if durations_file is not None:
+        durations = build_simulator.Durations.from_file(
+            durations_file, default=default_duration
+        )
+    else:
+        durations = build_simulator.Durations(default=default_duration)
+    if workers is None:
+        # default of ThreadPoolExecutor, which runs the builds
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    result = build_simulator.simulate(
+        build_simulator.get_build_tasks(graph, wkctx, durations),
+        workers,
+        policy=policy,
+        resource_classes=wkctx.settings.resource_classes,
+    )
+    print()
+    print(result.summary())
+    if timeline_json:
+        with open(timeline_json, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f, indent=2)
+    if timeline_html:
+        with open(timeline_html, "w", encoding="utf-8") as f:
+            f.write(result.to_html())
+
+
+@graph.command()
+@click.option(
+    "-n",
+    "--shards",
+    type=click.IntRange(min=1),
+    required=True,
+    help="Number of shards",
+)
+@click.option(
+    "--durations",
+    "durations_file",
+    type=clickext.ClickPath(),
+    help="JSON file with build durations, e.g. build-timings.json of a build",
+)
+@click.option(
+    "--duplicate-below",
+    type=click.FloatRange(min=0),
+    default=graph_shard.DEFAULT_DUPLICATE_BELOW,
+    show_default=True,
+    help="Build shared build dependencies with a shorter build time in seconds in every shard",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=clickext.ClickPath(),
+    help="Write the shard plan as JSON",
+)
+@click.argument(
+    "graph-file",
+    type=clickext.ClickPath(),
+)
+@click.pass_obj
+def shard(
+    wkctx: context.WorkContext,
+    graph_file: pathlib.Path,
+    shards: int,
+    durations_file: pathlib.Path | None,
+    duplicate_below: float,
+    output: pathlib.Path | None,
+) -> None:
+    """Partition the builds of a graph into shards for several hosts
+
+    Shows the shards that "build-parallel --shard I/N" builds with the same
+    graph, settings, and --durations file. Shared build dependencies are
+    either built by every shard that needs them or built once and
+    published on the shared wheel server.
+    """
+    if durations_file is not None:
+        durations = build_simulator.Durations.from_file(durations_file)
+    else:
+        durations = build_simulator.Durations()
+    graph = DependencyGraph.from_file(graph_file)
+    plan = graph_shard.plan_shards(
+        build_simulator.get_build_tasks(graph, wkctx, durations),
+        shards,
+        duplicate_below=duplicate_below,
+    )
+    print(plan.summary())
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(plan.to_dict(), f, indent=2)
+
 
-def get_dependency_closure(node: DependencyNode) -> set[NormalizedName]:
+@graph.command()
+@click.option(
+    "-o",
+    "--output",
+    type=clickext.ClickPath(),
+    help="Write the JSON diff to a file instead of stdout",
+)
+@click.argument(
+    "old-graph",
+    type=clickext.ClickPath(),
+)
+@click.argument(
+    "new-graph",
+    type=clickext.ClickPath(),
+)
+@click.pass_obj
+def diff(
+    wkctx: context.WorkContext,
+    old_graph: pathlib.Path,
+    new_graph: pathlib.Path,
+    output: pathlib.Path | None,
+) -> None:
+    """Compare two graph files
+
+    Reports added, removed, and changed packages with the top-level
+    requirements that pull them in, and changed edges. The diff is written
+    as JSON, a summary is printed to stderr.
+    """
+    result = graph_diff.diff_graphs(
+        DependencyGraph.from_file(old_graph),
+        DependencyGraph.from_file(new_graph),
+    )
+    if output:
+        with open(output, "w") as f:
+            json.dump(result.to_dict(), f, indent=2)
+    else:
+        click.echo(json.dumps(result.to_dict(), indent=2))
+    click.echo(result.summary(), err=True)
+
+
+@graph.command()
+@click.option(
+    "-o",
+    "--output",
+    type=clickext.ClickPath(),
+    help="Output file path for the pruned graph",
+)
+@click.option(
+    "--new-graph",
+    type=clickext.ClickPath(exists=True),
+    help="graph.json of the new configuration, defaults to GRAPH_FILE",
+)
+@click.option(
+    "--check-wheels/--no-check-wheels",
+    default=True,
+    help="Compare fingerprints of existing wheels with the current settings and patches",
+)
+@click.argument(
+    "graph-file",
+    type=clickext.ClickPath(exists=True),
+)
+@click.pass_obj
+def rebuild_plan(
+    wkctx: context.WorkContext,
+    graph_file: pathlib.Path,
+    output: pathlib.Path | None,
+    new_graph: pathlib.Path | None,
+    check_wheels: bool,
+) -> None:
+    """Compute the minimal set of wheels to rebuild after a change
+
+    GRAPH_FILE is the graph.json of the previous run. The command finds
+    nodes that changed since that run and all nodes whose build
+    environment contains a changed or rebuilt node. A node has changed
+    when it is new, its build requirements or build fingerprint differ
+    from the previous run, or its wheel in the local wheels repository
+    was built with different settings or patches.
+
+    The output is a pruned graph that contains only the nodes to rebuild.
+    Pass it to ``build-parallel --force`` to rebuild them in the correct
+    order.
+    """
+    old = DependencyGraph.from_file(graph_file)
+    new = DependencyGraph.from_file(new_graph) if new_graph else old
+    wheel_dirs: list[pathlib.Path] | None = None
+    if check_wheels:
+        wheel_dirs = [wkctx.wheels_downloads, wkctx.wheels_prebuilt]
+    try:
+        plan = plan_rebuild(wkctx, old, new, wheel_dirs=wheel_dirs)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+
+    for key, reason in sorted(plan.changed.items()):
+        logger.info("%s: %s", key, reason)
+    logger.info(
+        "rebuilding %i of %i packages, %i changed",
+        len(plan.invalidated),
+        len(new),
+        len(plan.changed),
+    )
+    if output:
+        with open(output, "w") as f:
+            plan.graph.serialize(f)
+    else:
+        plan.graph.serialize(sys.stdout)
+
+
+@dataclasses.dataclass
+class RebuildPlan:
+    """Result of :func:`plan_rebuild`"""
+
+    #: keys of changed nodes and the reason for the change
+    changed: dict[str, str]
+    #: keys of all nodes that have to be rebuilt
+    invalidated: set[str]
+    #: graph with invalidated nodes
+    graph: DependencyGraph
+
+
+def plan_rebuild(
+    wkctx: context.WorkContext,
+    old_graph: DependencyGraph,
+    new_graph: DependencyGraph,
+    wheel_dirs: typing.Sequence[pathlib.Path] | None = None,
+) -> RebuildPlan:
+    """Plan an incremental rebuild of *new_graph*
+
+    Args:
+        wkctx: Work context with the new settings and patches
+        old_graph: Graph of the previous run
+        new_graph: Graph of the new run, can be *old_graph*
+        wheel_dirs: Directories with wheels of the previous run. Wheels
+            are not checked when ``None``.
+
+    Returns:
+        The changed nodes, the invalidated nodes, and a pruned graph
+
+    Raises:
+        ValueError: If a node no longer satisfies the constraints
+    """
+    changed = find_changed_nodes(wkctx, old_graph, new_graph, wheel_dirs)
+    invalidated = get_invalidated_nodes(new_graph, changed)
+    return RebuildPlan(
+        changed=changed,
+        invalidated=invalidated,
+        graph=_build_pruned_graph(new_graph, invalidated),
+    )
+
+
+def find_changed_nodes(
+    wkctx: context.WorkContext,
+    old_graph: DependencyGraph,
+    new_graph: DependencyGraph,
+    wheel_dirs: typing.Sequence[pathlib.Path] | None = None,
+) -> dict[str, str]:
+    """Find nodes of *new_graph* whose inputs changed since *old_graph*
+
+    Returns a mapping of node keys to the reason of the change. Pre-built
+    wheels are only reported when they are new.
+    """
+    unsatisfied = sorted(
+        node.key
+        for node in new_graph.get_all_nodes()
+        if node.key != ROOT
+        and not wkctx.constraints.is_satisfied_by(node.canonicalized_name, node.version)
+    )
+    if unsatisfied:
+        raise ValueError(
+            f"{', '.join(unsatisfied)} do not satisfy the current constraints, "
+            "bootstrap a new graph and pass it with --new-graph"
+        )
+
+    old_closures = old_graph.closures()
+    new_closures = new_graph.closures()
+    changed: dict[str, str] = {}
+    for node in new_graph.get_all_nodes():
+        if node.key == ROOT:
+            continue
+        old_node = old_graph.nodes.get(node.key)
+        if old_node is None:
+            changed[node.key] = "new in graph"
+            continue
+        if node.pre_built:
+            continue
+        if (
+            old_node.build_fingerprint
+            and node.build_fingerprint
+            and old_node.build_fingerprint != node.build_fingerprint
+        ):
+            changed[node.key] = "build fingerprint changed"
+            continue
+        old_build_reqs = old_closures.to_keys(old_closures.build_bits(old_node))
+        new_build_reqs = new_closures.to_keys(new_closures.build_bits(node))
+        if old_build_reqs != new_build_reqs:
+            changed[node.key] = "build requirements changed"
+            continue
+        if wheel_dirs is not None:
+            reason = _check_existing_wheel(wkctx, node, wheel_dirs)
+            if reason:
+                changed[node.key] = reason
+    return changed
+
+
+def _check_existing_wheel(
+    wkctx: context.WorkContext,
+    node: DependencyNode,
+    wheel_dirs: typing.Sequence[pathlib.Path],
+) -> str | None:
+    """Compare the fingerprint of a node's wheel with the current inputs"""
+    req = node.requirement
+    pbi = wkctx.package_build_info(req)
+    build_tag = pbi.build_tag(node.version)
+    for wheel_dir in wheel_dirs:
+        if not wheel_dir.is_dir():
+            continue
+        wheel_filename = finders.find_wheel(
+            wheel_dir, req, str(node.version), build_tag
+        )
+        if wheel_filename is not None:
+            break
+    else:
+        return "no existing wheel"
+
+    existing = fingerprint.read_wheel_fingerprint(wheel_filename)
+    if existing is None:
+        # wheels without fingerprint are accepted, see build command
+        return None
+    expected = fingerprint.compute_build_fingerprint(
+        ctx=wkctx, req=req, version=node.version
+    )
+    differences = expected.differences(existing)
+    if differences:
+        return f"{', '.join(differences)} changed"
+    return None
+
+
+def get_invalidated_nodes(
+    graph: DependencyGraph,
+    changed: typing.Iterable[str],
+) -> set[str]:
+    """Get keys of changed nodes and nodes that have to be rebuilt with them
+
+    A node has to be rebuilt when its build environment
+    (:meth:`DependencyNode.iter_build_requirements`) contains a changed
+    node or another node that has to be rebuilt.
+    """
+    invalidated = set(changed)
+    closures = graph.closures()
+    build_reqs: dict[str, set[str]] = {}
+    for node in graph.get_all_nodes():
+        if node.key != ROOT:
+            build_reqs[node.key] = closures.to_keys(closures.build_bits(node))
+    # build requirements are visited before the nodes that need them
+    for key in graphlib.TopologicalSorter(build_reqs).static_order():
+        if key not in invalidated and not build_reqs.get(key, set()).isdisjoint(
+            invalidated
+        ):
+            invalidated.add(key)
+    return invalidated
+
+
+def _build_pruned_graph(
+    graph: DependencyGraph,
+    invalidated: set[str],
+) -> DependencyGraph:
+    """Create a graph with invalidated nodes that keeps their build order
+
+    Edges between invalidated nodes are kept. Invalidated nodes that are
+    build requirements of another invalidated node only through nodes that
+    are not in the pruned graph get a direct build-system edge. Nodes that
+    are not reachable from ROOT become top-level requirements.
+    """
+    pruned = DependencyGraph()
+    _build_subset_graph(graph, pruned, invalidated | {ROOT})
+
+    closures = graph.closures()
+    # The new build-system edges do not change install requirements, so the
+    # build requirements of the other nodes stay valid while edges are added.
+    pruned_closures = pruned.closures()
+    for key in sorted(invalidated):
+        node = graph.nodes[key]
+        pruned_node = pruned.nodes[key]
+        expected = closures.to_keys(closures.build_bits(node)) & invalidated
+        missing = expected - pruned_closures.to_keys(
+            pruned_closures.build_bits(pruned_node)
+        )
+        for dep_key in sorted(missing):
+            dep = graph.nodes[dep_key]
+            pruned.add_dependency(
+                parent_name=node.canonicalized_name,
+                parent_version=node.version,
+                req_type=RequirementType.BUILD_SYSTEM,
+                req=Requirement(f"{dep.canonicalized_name}=={dep.version}"),
+                req_version=dep.version,
+                download_url=dep.download_url,
+                pre_built=dep.pre_built,
+                constraint=dep.constraint,
+            )
+
+    root = pruned.get_root_node()
+    reachable = {dep.key for dep in root.iter_all_dependencies()}
+    for key in sorted(invalidated - reachable):
+        if key in reachable:
+            continue
+        node = graph.nodes[key]
+        pruned.add_dependency(
+            parent_name=None,
+            parent_version=None,
+            req_type=RequirementType.TOP_LEVEL,
+            req=Requirement(f"{node.canonicalized_name}=={node.version}"),
+            req_version=node.version,
+            download_url=node.download_url,
+            pre_built=node.pre_built,
+            constraint=node.constraint,
+        )
+        pruned_node = pruned.nodes[key]
+        reachable.add(key)
+        reachable.update(dep.key for dep in pruned_node.iter_all_dependencies())
+    return pruned
+
+
+def get_dependency_closure(
+    node: DependencyNode,
+    closures: GraphClosures | None = None,
+) -> set[NormalizedName]:
     """Compute the full dependency closure for a node.
 
     Traverses all edge types and returns the set of canonical package names reachable from node,
@@ -858,10 +1336,13 @@ def get_dependency_closure(node: DependencyNode) -> set[NormalizedName]:
 
     Args:
         node: The starting node to compute the closure for.
+        closures: Optional precomputed closures of the node's graph.
 
     Returns:
         Set of canonicalized package names in the transitive closure.
     """
+    if closures is not None:
+        return closures.to_names(closures.bits([node]) | closures.all_bits(node))
     dependency_names: set[NormalizedName] = set()
     if node.canonicalized_name != ROOT:
         dependency_names.add(node.canonicalized_name)
@@ -908,28 +1389,60 @@ class _CollectionScore(typing.NamedTuple):
     coverage_percentage: float
 
 
+class _PackageBits:
+    """Package name sets as bitsets for fast overlap counts
+
+    Every package name gets a bit position. The size of the intersection of
+    two sets is the number of set bits of their bitwise and.
+    """
+
+    def __init__(self) -> None:
+        self._positions: dict[NormalizedName, int] = {}
+
+    def bits(self, names: typing.Iterable[NormalizedName]) -> int:
+        positions: list[int] = []
+        for name in names:
+            position = self._positions.get(name)
+            if position is None:
+                position = self._positions[name] = len(self._positions)
+            positions.append(position)
+        if not positions:
+            return 0
+        buffer = bytearray(max(positions) // 8 + 1)
+        for position in positions:
+            buffer[position // 8] |= 1 << (position % 8)
+        return int.from_bytes(buffer, "little")
+
+
 def _analyze_suggestions(
     toplevel_nodes: list[DependencyNode],
     collection_packages: dict[str, set[NormalizedName]],
+    closures: GraphClosures | None = None,
 ) -> list[dict[str, typing.Any]]:
     """Score each onboarding top-level package against every collection.
 
     Args:
         toplevel_nodes: Top-level nodes from the onboarding graph.
         collection_packages: Mapping of collection name to its package name set.
+        closures: Optional precomputed closures of the onboarding graph.
 
     Returns:
         List of result dicts, one per top-level package, sorted by package name.
     """
     results: list[dict[str, typing.Any]] = []
+    package_bits = _PackageBits()
+    collection_bits = {
+        collection_name: package_bits.bits(packages)
+        for collection_name, packages in collection_packages.items()
+    }
 
     for node in sorted(toplevel_nodes, key=lambda n: n.canonicalized_name):
-        dependency_names = get_dependency_closure(node)
-        total_dependency_count = len(dependency_names)
+        dependency_bits = package_bits.bits(get_dependency_closure(node, closures))
+        total_dependency_count = dependency_bits.bit_count()
 
         scores: list[_CollectionScore] = []
-        for collection_name, packages in collection_packages.items():
-            existing_count = len(dependency_names & packages)
+        for collection_name, packages_bits in collection_bits.items():
+            existing_count = (dependency_bits & packages_bits).bit_count()
             new_count = total_dependency_count - existing_count
             coverage_percentage = (
                 (existing_count / total_dependency_count * 100)
@@ -1093,7 +1606,9 @@ def find_best_fit(
             len(collection_packages[collection_name]),
         )
 
-    results = _analyze_suggestions(toplevel_nodes, collection_packages)
+    results = _analyze_suggestions(
+        toplevel_nodes, collection_packages, onboarding.closures()
+    )
 
     if output_format == "json":
         click.echo(json.dumps(results, indent=2))
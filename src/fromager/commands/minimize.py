@@ -5,7 +5,8 @@ from collections.abc import Generator
 
 import click
 from packaging.requirements import Requirement
-from packaging.utils import canonicalize_name
+from packaging.utils import NormalizedName, canonicalize_name
+from packaging.version import Version
 
 from fromager import clickext, context, requirements_file
 from fromager.dependency_graph import DependencyGraph
@@ -94,6 +95,27 @@ def minimize(
     logger.info(f"Reduction: {removed_count / original_count * 100:.2f}%")
 
 
+def _dependency_versions(
+    graph: DependencyGraph,
+) -> dict[NormalizedName, list[Version]]:
+    """Index the versions pulled in as install dependencies of non-root nodes
+
+    Maps canonical package names to the versions that install requirement
+    edges of installed packages point to, in graph order.
+    """
+    versions: dict[NormalizedName, dict[Version, None]] = {}
+    for node in graph.get_install_dependencies():
+        # Skip the root/toplevel node
+        if node.key == "":
+            continue
+        for edge in node.children:
+            if not edge.req_type.is_install_requirement:
+                continue
+            dep = edge.destination_node
+            versions.setdefault(dep.canonicalized_name, {})[dep.version] = None
+    return {name: list(dep_versions) for name, dep_versions in versions.items()}
+
+
 def _minimize_requirements(
     requirements: list[Requirement], graph: DependencyGraph
 ) -> Generator[Requirement, None, None]:
@@ -101,6 +123,7 @@ def _minimize_requirements(
     Minimize a list of requirements by removing those that are dependencies
     of other nodes in the graph AND would resolve to the same version.
     """
+    dependency_versions = _dependency_versions(graph)
 
     for req in requirements:
         # Skip requirements that use exact version specification (==)
@@ -110,41 +133,23 @@ def _minimize_requirements(
             yield req
             continue
 
-        canonical_name = canonicalize_name(req.name)
-        should_keep = True
-
-        # Check if this requirement would be satisfied by any dependency
-        # of other nodes in the graph (excluding toplevel)
-        for node in graph.get_install_dependencies():
-            # Skip the root/toplevel node
-            if node.key == "":
-                continue
-
-            # Check all outgoing install/toplevel edges from this node
-            for edge in node.children:
-                if not edge.req_type.is_install_requirement:
-                    continue
-                dep_name = canonicalize_name(edge.destination_node.canonicalized_name)
-                if dep_name != canonical_name:
-                    continue
-                dep_version = edge.destination_node.version
-
-                # Only mark as removable if the requirement's specifier
-                # would be satisfied by the version that appears as a dependency
-                if req.specifier.contains(dep_version, prereleases=True):
-                    logger.debug(
-                        f"Candidate for removal: {req} "
-                        f"(satisfied by dependency version {dep_version})"
-                    )
-                    should_keep = False
-                    break
-
-            if not should_keep:
-                break
-
-        if should_keep:
+        # Only mark as removable if the requirement's specifier would be
+        # satisfied by a version that appears as a dependency of other nodes
+        # in the graph (excluding toplevel)
+        dep_version = next(
+            req.specifier.filter(
+                dependency_versions.get(canonicalize_name(req.name), []),
+                prereleases=True,
+            ),
+            None,
+        )
+        if dep_version is None:
             yield req
         else:
+            logger.debug(
+                f"Candidate for removal: {req} "
+                f"(satisfied by dependency version {dep_version})"
+            )
             logger.debug(
                 f"Removing {req} as it would be satisfied by dependencies of other nodes"
             )
@@ -1,6 +1,8 @@
+import pathlib
+
 import click
 
-from fromager import context, server
+from fromager import build_cache, clickext, context, server
 
 
 @click.command()
@@ -34,3 +36,49 @@ def wheel_server(
     )
     print(f"Listening on {wkctx.wheel_server_url}")
     thread.join()
+
+
+@click.command()
+@click.option(
+    "-p",
+    "--port",
+    type=int,
+    default=8081,
+    help="the port to listen on",
+)
+@click.option(
+    "-i",
+    "--ip",
+    "--address",
+    "address",
+    default="localhost",
+    help="the address to listen on, defaults to localhost",
+)
+@click.option(
+    "-d",
+    "--cache-dir",
+    type=clickext.ClickPath(),
+    default=None,
+    help="directory for cache entries, defaults to build-cache in the work dir",
+)
+@click.pass_obj
+def build_cache_server(
+    wkctx: context.WorkContext,
+    port: int,
+    address: str,
+    cache_dir: pathlib.Path | None,
+) -> None:
+    """Start a content-addressed build cache server
+
+    The server stores wheels uploaded by builds with --build-cache-url and
+    serves them to other builds with the same build inputs.
+    """
+    if cache_dir is None:
+        cache_dir = wkctx.work_dir / "build-cache"
+    _, _, thread, url = build_cache.run_build_cache_server(
+        cache_dir,
+        address=address,
+        port=port,
+    )
+    print(f"Listening on {url}")
+    thread.join()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import atexit
 import collections
 import datetime
 import logging
@@ -18,7 +19,10 @@ from . import (
     constraints,
     dependency_graph,
     external_commands,
+    network_sandbox,
     packagesettings,
+    resource_usage,
+    resources,
 )
 
 if typing.TYPE_CHECKING:
@@ -44,11 +48,14 @@ class WorkContext:
         cleanup: bool = True,
         variant: str = "cpu",
         network_isolation: bool = False,
+        network_isolation_sandbox: bool = False,
         max_jobs: int | None = None,
         settings_dir: pathlib.Path | None = None,
         wheel_server_url: str = "",
         cooldown: candidate.Cooldown | None = None,
         max_release_age: datetime.timedelta | None = None,
+        build_cache_url: str = "",
+        build_cache_upload: bool = True,
     ):
         if active_settings is None:
             active_settings = packagesettings.Settings(
@@ -72,12 +79,17 @@ class WorkContext:
         self.merged_constraints = self.work_dir / "merged-constraints.txt"
         self.uv_cache = self.work_dir / "uv-cache"
         self.wheel_server_url = wheel_server_url
+        self.build_cache_url = build_cache_url
+        self.build_cache_upload = build_cache_upload
         self.logs_dir = self.work_dir / "logs"
         self.cleanup = cleanup
         # separate value so bootstrap-parallel can keep build envs
         self.cleanup_buildenv = cleanup
         self.variant = variant
         self.network_isolation = network_isolation
+        self.network_isolation_sandbox = network_isolation_sandbox
+        # persistent network sandboxes of worker threads, see setup()
+        self.network_sandboxes: network_sandbox.SandboxPool | None = None
         self.settings_dir = settings_dir
 
         self.dependency_graph = dependency_graph.DependencyGraph()
@@ -92,8 +104,15 @@ class WorkContext:
             dict[str, float]
         )
         self.time_description_store: dict[str, str] = {}
+        # resource usage of external commands, keyed like time_store
+        self.resource_usage_store: dict[
+            str, dict[str, resource_usage.ResourceUsage]
+        ] = collections.defaultdict(dict[str, resource_usage.ResourceUsage])
+        # failure classes of retried builds, see build_retry
+        self.retry_store: dict[str, list[str]] = collections.defaultdict(list)
 
         self._parallel_builds = False
+        self._resource_pool: resources.ResourcePool | None = None
 
         self.cooldown: candidate.Cooldown | None = cooldown
         self._max_release_age: datetime.timedelta | None = max_release_age
@@ -111,6 +130,13 @@ class WorkContext:
     def enable_parallel_builds(self) -> None:
         self._parallel_builds = True
 
+    @property
+    def resource_pool(self) -> resources.ResourcePool:
+        """Resource class slots, shared by all builds of the run"""
+        if self._resource_pool is None:
+            self._resource_pool = resources.ResourcePool(self.settings.resource_classes)
+        return self._resource_pool
+
     @property
     def wheels_build(self) -> pathlib.Path:
         # when parallel builds are enabled, return a path that is unique for the
@@ -185,6 +211,12 @@ class WorkContext:
                 logger.debug("creating %s", p)
                 p.mkdir(parents=True)
         self.write_constraints()
+        if self.network_isolation and self.network_isolation_sandbox:
+            self.network_sandboxes = network_sandbox.SandboxPool(
+                external_commands.network_isolation_cmd()
+            )
+            external_commands.set_network_sandboxes(self.network_sandboxes)
+            atexit.register(self.network_sandboxes.close)
 
     def write_constraints(self) -> None:
         """Write combined constraints to disk"""
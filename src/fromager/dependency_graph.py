@@ -6,6 +6,8 @@ import graphlib
 import json
 import logging
 import pathlib
+import re
+import sys
 import threading
 import typing
 
@@ -13,7 +15,8 @@ from packaging.requirements import Requirement
 from packaging.utils import NormalizedName, canonicalize_name
 from packaging.version import Version
 
-from .read import open_file_or_url
+from . import graph_binary
+from .read import open_binary_file_or_url
 from .requirements_file import RequirementType
 
 if typing.TYPE_CHECKING:
@@ -23,6 +26,16 @@ logger = logging.getLogger(__name__)
 
 ROOT = ""
 
+# name of a PEP 508 requirement
+_REQ_NAME_RE = re.compile(r"\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)")
+
+
+def _requirement_name(req_string: str) -> NormalizedName:
+    """Get the canonical name of a requirement string without parsing it"""
+    match = _REQ_NAME_RE.match(req_string)
+    raw_name = match.group(1) if match else Requirement(req_string).name
+    return NormalizedName(sys.intern(canonicalize_name(raw_name)))
+
 
 class DependencyEdgeDict(typing.TypedDict):
     req_type: str
@@ -37,6 +50,8 @@ class DependencyNodeDict(typing.TypedDict):
     pre_built: bool
     # not set in older graph files
     constraint: typing.NotRequired[str | None]
+    # not set in older graph files and for nodes without a built wheel
+    build_fingerprint: typing.NotRequired[str | None]
     edges: list[DependencyEdgeDict]
 
 
@@ -47,6 +62,9 @@ class DependencyNode:
     download_url: str = dataclasses.field(default="", compare=False)
     pre_built: bool = dataclasses.field(default=False, compare=False)
     constraint: Requirement | None = dataclasses.field(default=None, compare=False)
+    build_fingerprint: str | None = dataclasses.field(
+        default=None, compare=False, repr=False
+    )
     # additional fields
     key: str = dataclasses.field(init=False, compare=False, repr=False)
     parents: list[DependencyEdge] = dataclasses.field(
@@ -61,6 +79,15 @@ class DependencyNode:
         compare=False,
         repr=False,
     )
+    # index of children by canonical requirement name and type
+    _children_index: dict[
+        tuple[NormalizedName, RequirementType], list[DependencyEdge]
+    ] = dataclasses.field(
+        default_factory=dict,
+        init=False,
+        compare=False,
+        repr=False,
+    )
 
     def __post_init__(self) -> None:
         if self.canonicalized_name == ROOT:
@@ -87,6 +114,9 @@ class DependencyNode:
             req=req, req_type=req_type, destination_node=child
         )
         self.children.append(current_to_child_edge)
+        self._children_index.setdefault(
+            (canonicalize_name(req.name), req_type), []
+        ).append(current_to_child_edge)
         child_to_current_edge = DependencyEdge(
             req=req, req_type=req_type, destination_node=self
         )
@@ -94,8 +124,23 @@ class DependencyNode:
         # not an issue for fromager since it is used as a short-lived process
         child.parents.append(child_to_current_edge)
 
+    def _add_loaded_child(
+        self,
+        child: DependencyNode,
+        req_string: str,
+        req_name: NormalizedName,
+        req_type: RequirementType,
+    ) -> None:
+        """Add a child from a graph file, parse the requirement lazily"""
+        edge = DependencyEdge(destination_node=child, req=req_string, req_type=req_type)
+        self.children.append(edge)
+        self._children_index.setdefault((req_name, req_type), []).append(edge)
+        child.parents.append(
+            DependencyEdge(destination_node=self, req=req_string, req_type=req_type)
+        )
+
     def to_dict(self) -> DependencyNodeDict:
-        return {
+        result: DependencyNodeDict = {
             "download_url": self.download_url,
             "pre_built": self.pre_built,
             "version": str(self.version),
@@ -103,6 +148,9 @@ class DependencyNode:
             "constraint": str(self.constraint) if self.constraint else None,
             "edges": [edge.to_dict() for edge in self.children],
         }
+        if self.build_fingerprint:
+            result["build_fingerprint"] = self.build_fingerprint
+        return result
 
     def get_incoming_install_edges(self) -> list[DependencyEdge]:
         return [
@@ -112,12 +160,19 @@ class DependencyNode:
     def get_outgoing_edges(
         self, req_name: str, req_type: RequirementType
     ) -> list[DependencyEdge]:
-        return [
-            edge
-            for edge in self.children
-            if canonicalize_name(edge.req.name) == canonicalize_name(req_name)
-            and edge.req_type == req_type
+        return list(
+            self._children_index.get((canonicalize_name(req_name), req_type), ())
+        )
+
+    def _remove_children(self, key: str) -> None:
+        """Remove all edges to the child with *key*"""
+        self.children[:] = [
+            edge for edge in self.children if edge.destination_node.key != key
         ]
+        for index_key, edges in list(self._children_index.items()):
+            edges[:] = [edge for edge in edges if edge.destination_node.key != key]
+            if not edges:
+                del self._children_index[index_key]
 
     @classmethod
     def construct_root_node(cls) -> DependencyNode:
@@ -202,27 +257,59 @@ class DependencyNode:
             )
 
 
-@dataclasses.dataclass(frozen=True, order=True, slots=True)
+@dataclasses.dataclass(frozen=True, order=True, slots=True, init=False)
 class DependencyEdge:
-    key: str = dataclasses.field(init=False, repr=True, compare=True)
+    """Edge to *destination_node*
+
+    *req* is a requirement or, for edges loaded from a graph file, a
+    requirement string that :attr:`req` parses on first access.
+    """
+
+    key: str = dataclasses.field(repr=True, compare=True)
     destination_node: DependencyNode = dataclasses.field(repr=False, compare=False)
-    req: Requirement = dataclasses.field(repr=True, compare=True)
+    _req_string: str = dataclasses.field(repr=True, compare=True)
     req_type: RequirementType = dataclasses.field(repr=True, compare=True)
+    _req: Requirement | None = dataclasses.field(repr=False, compare=False)
 
-    def __post_init__(self) -> None:
-        object.__setattr__(self, "key", self.destination_node.key)
+    def __init__(
+        self,
+        destination_node: DependencyNode,
+        req: Requirement | str,
+        req_type: RequirementType,
+    ) -> None:
+        object.__setattr__(self, "key", destination_node.key)
+        object.__setattr__(self, "destination_node", destination_node)
+        object.__setattr__(self, "req_type", req_type)
+        if isinstance(req, str):
+            object.__setattr__(self, "_req_string", req)
+            object.__setattr__(self, "_req", None)
+        else:
+            object.__setattr__(self, "_req_string", str(req))
+            object.__setattr__(self, "_req", req)
+
+    @property
+    def req(self) -> Requirement:
+        req = self._req
+        if req is None:
+            req = Requirement(self._req_string)
+            object.__setattr__(self, "_req", req)
+        return req
 
     def to_dict(self) -> DependencyEdgeDict:
         return {
             "key": self.key,
             "req_type": str(self.req_type),
-            "req": str(self.req),
+            "req": self._req_string,
         }
 
 
 class DependencyGraph:
     def __init__(self) -> None:
         self.nodes: dict[str, DependencyNode] = {}
+        # index of nodes by canonical name, in insertion order
+        self._nodes_by_name: dict[NormalizedName, dict[str, DependencyNode]] = {}
+        # memoized closures, reset when the graph changes
+        self._closures: GraphClosures | None = None
         self.clear()
 
     @classmethod
@@ -230,49 +317,163 @@ class DependencyGraph:
         cls,
         graph_file: pathlib.Path | str,
     ) -> DependencyGraph:
-        with open_file_or_url(graph_file) as f:
+        """Load a graph from a JSON or binary graph file or URL"""
+        with open_binary_file_or_url(graph_file) as f:
+            is_binary = graph_binary.is_binary_graph(f.read(len(graph_binary.MAGIC)))
+            f.seek(0)
+            if is_binary:
+                return cls.from_binary(f)
             # TODO: add JSON validation to ensure it is a parsable graph json
             raw_graph = typing.cast(dict[str, dict], json.load(f))
             return cls.from_dict(raw_graph)
 
+    @classmethod
+    def from_binary(cls, file_handle: typing.BinaryIO) -> DependencyGraph:
+        """Load a graph in the binary format of :meth:`serialize_binary`"""
+        with graph_binary.load(file_handle) as data:
+            return cls._from_binary_graph(data)
+
+    @classmethod
+    def _from_binary_graph(cls, data: graph_binary.BinaryGraph) -> DependencyGraph:
+        graph = cls()
+        strings = data.strings
+        node_count = data.node_count
+        # plain lists are faster to index than the mapped arrays
+        node_fields = list(data.nodes)
+        edge_fields = list(data.edges)
+        node_size = graph_binary.NODE_FIELDS
+        edge_size = graph_binary.EDGE_FIELDS
+        # node index -> index of its first edge
+        edge_starts = [0] * (node_count + 1)
+        for index in range(node_count):
+            edge_starts[index + 1] = (
+                edge_starts[index] + node_fields[(index + 1) * node_size - 1]
+            )
+        loaded: dict[int, DependencyNode] = {0: graph.nodes[ROOT]}
+        req_types: dict[int, RequirementType] = {}
+        req_names: dict[int, NormalizedName] = {}
+
+        def get_node(index: int) -> DependencyNode:
+            node = loaded.get(index)
+            if node is None:
+                start = index * node_size
+                record = graph_binary.NodeRecord(
+                    *node_fields[start : start + node_size]
+                )
+                constraint_value = data.string(record.constraint)
+                node = graph._add_node(
+                    req_name=NormalizedName(sys.intern(strings[record.name])),
+                    version=Version(strings[record.version]),
+                    download_url=strings[record.download_url],
+                    pre_built=bool(record.pre_built),
+                    constraint=(
+                        Requirement(constraint_value) if constraint_value else None
+                    ),
+                    build_fingerprint=data.string(record.build_fingerprint),
+                )
+                loaded[index] = node
+            return node
+
+        # same order of nodes and edges as from_dict()
+        stack = [0]
+        visited = set()
+        while stack:
+            curr = stack.pop()
+            if curr in visited:
+                continue
+            parent = loaded[curr]
+            for start in range(
+                edge_starts[curr] * edge_size,
+                edge_starts[curr + 1] * edge_size,
+                edge_size,
+            ):
+                destination, req_type_index, req_index = edge_fields[
+                    start : start + edge_size
+                ]
+                req_type = req_types.get(req_type_index)
+                if req_type is None:
+                    req_type = req_types[req_type_index] = RequirementType(
+                        strings[req_type_index]
+                    )
+                req_name = req_names.get(req_index)
+                if req_name is None:
+                    req_name = req_names[req_index] = _requirement_name(
+                        strings[req_index]
+                    )
+                parent._add_loaded_child(
+                    get_node(destination), strings[req_index], req_name, req_type
+                )
+                stack.append(destination)
+            visited.add(curr)
+        return graph
+
     @classmethod
     def from_dict(
         cls,
         graph_dict: dict[str, dict[str, typing.Any]],
     ) -> DependencyGraph:
+        """Load a graph from its serialized form
+
+        Every node is built once from its entry in *graph_dict* and linked
+        directly. Names and requirement strings are interned. The
+        requirements of edges are parsed on first access, most commands
+        never look at them.
+        """
         graph = cls()
+        # graph file key -> node, keys of equal versions share a node
+        loaded: dict[str, DependencyNode] = {ROOT: graph.nodes[ROOT]}
+        req_types: dict[str, RequirementType] = {}
+        req_names: dict[str, NormalizedName] = {}
+
+        def get_req_name(req_string: str) -> NormalizedName:
+            name = req_names.get(req_string)
+            if name is None:
+                name = req_names[req_string] = _requirement_name(req_string)
+            return name
+
+        def get_node(key: str, req_string: str) -> DependencyNode:
+            node = loaded.get(key)
+            if node is None:
+                node_dict = typing.cast(DependencyNodeDict, graph_dict[key])
+                constraint_value = node_dict.get("constraint")
+                # like add_dependency(), the name comes from the requirement
+                node = graph._add_node(
+                    req_name=get_req_name(req_string),
+                    version=Version(node_dict["version"]),
+                    download_url=node_dict["download_url"],
+                    pre_built=node_dict["pre_built"],
+                    constraint=(
+                        Requirement(constraint_value) if constraint_value else None
+                    ),
+                    build_fingerprint=node_dict.get("build_fingerprint"),
+                )
+                loaded[key] = node
+            return node
+
         # Stack-based DFS to reconstruct graph from serialized dict,
         # skipping nodes already visited to avoid processing shared
-        # dependencies twice.
+        # dependencies twice. Nodes are added in the same order as by
+        # add_dependency().
         stack = [ROOT]
         visited = set()
         while stack:
             curr_key = stack.pop()
             if curr_key in visited:
                 continue
+            parent = loaded[curr_key]
             node_dict = typing.cast(DependencyNodeDict, graph_dict[curr_key])
-            parent_name = parent_version = None
-            if curr_key != ROOT:
-                parent_name = canonicalize_name(node_dict["canonicalized_name"])
-                parent_version = Version(node_dict["version"])
             for raw_edge in node_dict["edges"]:
                 edge_dict = typing.cast(DependencyEdgeDict, raw_edge)
-                destination_node_dict = typing.cast(
-                    DependencyNodeDict, graph_dict[edge_dict["key"]]
-                )
-                constraint_value: str | None = destination_node_dict.get("constraint")
-                constraint: Requirement | None = (
-                    Requirement(constraint_value) if constraint_value else None
-                )
-                graph.add_dependency(
-                    parent_name=parent_name,
-                    parent_version=parent_version,
-                    req_type=RequirementType(edge_dict["req_type"]),
-                    req=Requirement(edge_dict["req"]),
-                    req_version=Version(destination_node_dict["version"]),
-                    download_url=destination_node_dict["download_url"],
-                    pre_built=destination_node_dict["pre_built"],
-                    constraint=constraint,
+                raw_req_type = edge_dict["req_type"]
+                req_type = req_types.get(raw_req_type)
+                if req_type is None:
+                    req_type = req_types[raw_req_type] = RequirementType(raw_req_type)
+                req_string = sys.intern(edge_dict["req"])
+                parent._add_loaded_child(
+                    get_node(edge_dict["key"], req_string),
+                    req_string,
+                    get_req_name(req_string),
+                    req_type,
                 )
                 stack.append(edge_dict["key"])
             visited.add(curr_key)
@@ -280,6 +481,8 @@ class DependencyGraph:
 
     def clear(self) -> None:
         self.nodes.clear()
+        self._nodes_by_name.clear()
+        self._closures = None
         self.nodes[ROOT] = DependencyNode.construct_root_node()
 
     def __len__(self) -> int:
@@ -303,6 +506,41 @@ class DependencyGraph:
         raw_graph = self._to_dict()
         json.dump(raw_graph, file_handle, indent=2, default=str)
 
+    def serialize_binary(self, file_handle: typing.BinaryIO) -> None:
+        """Write the graph in the compact binary format
+
+        See :mod:`fromager.graph_binary`. :meth:`from_file` detects the
+        format.
+        """
+        nodes = list(self.get_all_nodes())
+        ids = {node.key: index for index, node in enumerate(nodes)}
+        table = graph_binary.StringTable()
+        node_records: list[graph_binary.NodeRecord] = []
+        edge_records: list[graph_binary.EdgeRecord] = []
+        for node in nodes:
+            node_records.append(
+                graph_binary.NodeRecord(
+                    name=table.add(node.canonicalized_name),
+                    version=table.add(str(node.version)),
+                    download_url=table.add(node.download_url),
+                    constraint=table.add(
+                        str(node.constraint) if node.constraint else None
+                    ),
+                    build_fingerprint=table.add(node.build_fingerprint or None),
+                    pre_built=int(node.pre_built),
+                    edge_count=len(node.children),
+                )
+            )
+            for edge in node.children:
+                edge_records.append(
+                    graph_binary.EdgeRecord(
+                        destination=ids[edge.key],
+                        req_type=table.add(str(edge.req_type)),
+                        req=table.add(edge.to_dict()["req"]),
+                    )
+                )
+        graph_binary.dump(table.strings, node_records, edge_records, file_handle)
+
     def _add_node(
         self,
         req_name: NormalizedName,
@@ -310,6 +548,7 @@ class DependencyGraph:
         download_url: str,
         pre_built: bool,
         constraint: Requirement | None,
+        build_fingerprint: str | None = None,
     ) -> DependencyNode:
         new_node = DependencyNode(
             canonicalized_name=req_name,
@@ -317,11 +556,14 @@ class DependencyGraph:
             download_url=download_url,
             pre_built=pre_built,
             constraint=constraint,
+            build_fingerprint=build_fingerprint,
         )
         # check if a node with that key already exists. if it does then use that
-        node = self.nodes.get(new_node.key, new_node)
-        # store the node in case we are using new_node
-        self.nodes[node.key] = node
+        node = self.nodes.get(new_node.key)
+        if node is None:
+            node = new_node
+            self.nodes[node.key] = node
+            self._nodes_by_name.setdefault(node.canonicalized_name, {})[node.key] = node
         return node
 
     def add_dependency(
@@ -334,6 +576,7 @@ class DependencyGraph:
         download_url: str = "",
         pre_built: bool = False,
         constraint: Requirement | None = None,
+        build_fingerprint: str | None = None,
     ) -> None:
         logger.debug(
             "recording %s dependency %s%s -> %s==%s",
@@ -350,6 +593,7 @@ class DependencyGraph:
             download_url=download_url,
             pre_built=pre_built,
             constraint=constraint,
+            build_fingerprint=build_fingerprint,
         )
 
         parent_key = ROOT if parent_name is None else f"{parent_name}=={parent_version}"
@@ -359,6 +603,23 @@ class DependencyGraph:
             )
 
         self.nodes[parent_key].add_child(node, req=req, req_type=req_type)
+        self._closures = None
+
+    def set_build_fingerprint(
+        self,
+        req_name: NormalizedName,
+        req_version: Version,
+        build_fingerprint: str | None,
+    ) -> None:
+        """Record the build fingerprint of a node's wheel"""
+        key = f"{req_name}=={req_version}"
+        node = self.nodes.get(key)
+        if node is None:
+            logger.debug(f"Cannot set build fingerprint of {key} - not in graph")
+            return
+        # nodes are frozen to keep hash and ordering stable, the
+        # fingerprint is excluded from both.
+        object.__setattr__(node, "build_fingerprint", build_fingerprint)
 
     def remove_dependency(
         self,
@@ -379,6 +640,7 @@ class DependencyGraph:
             logger.debug(f"Cannot remove {key} - not in graph")
             return
 
+        self._closures = None
         queue: collections.deque[str] = collections.deque([key])
 
         # BFS over orphaned descendants
@@ -408,16 +670,13 @@ class DependencyGraph:
 
             # Remove references to this node from its direct parents
             for parent_edge in deleted_node.parents:
-                parent_node = parent_edge.destination_node
-                filtered_children = [
-                    edge
-                    for edge in parent_node.children
-                    if edge.destination_node.key != key
-                ]
-                parent_node.children.clear()
-                parent_node.children.extend(filtered_children)
+                parent_edge.destination_node._remove_children(key)
 
             del self.nodes[key]
+            same_name = self._nodes_by_name[deleted_node.canonicalized_name]
+            del same_name[key]
+            if not same_name:
+                del self._nodes_by_name[deleted_node.canonicalized_name]
 
             # Enqueue children that have become orphans
             for child in children:
@@ -446,11 +705,7 @@ class DependencyGraph:
     def get_nodes_by_name(self, req_name: str | None) -> list[DependencyNode]:
         if not req_name:
             return [self.nodes[ROOT]]
-        return [
-            node
-            for node in self.get_all_nodes()
-            if node.canonicalized_name == canonicalize_name(req_name)
-        ]
+        return list(self._nodes_by_name.get(canonicalize_name(req_name), {}).values())
 
     def get_root_node(self) -> DependencyNode:
         return self.nodes[ROOT]
@@ -483,6 +738,17 @@ class DependencyGraph:
                 edge.destination_node.children, visited, match_dep_types
             )
 
+    def closures(self) -> GraphClosures:
+        """Get memoized closures of the graph
+
+        The closures are computed on first use and are recomputed after the
+        graph was changed with :meth:`add_dependency`,
+        :meth:`remove_dependency`, or :meth:`clear`.
+        """
+        if self._closures is None:
+            self._closures = GraphClosures(self)
+        return self._closures
+
     def get_build_topology(self, context: WorkContext) -> TrackingTopologicalSorter:
         """Create build topology graph
 
@@ -491,15 +757,190 @@ class DependencyGraph:
         installation dependencies.
         """
         topo = TrackingTopologicalSorter()
+        closures = self.closures()
         for node in self.get_all_nodes():
             if node.key == ROOT:
                 continue
             pbi = context.package_build_info(node.canonicalized_name)
-            build_req = tuple(node.iter_build_requirements())
+            build_req = closures.build_requirements(node)
             topo.add(node, *build_req, exclusive=pbi.exclusive_build)
         return topo
 
 
+def _iter_bits(bits: int) -> typing.Iterator[int]:
+    """Iterate over the positions of set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def _reachability(successors: list[list[int]]) -> list[int]:
+    """Compute the nodes reachable from every node as bitsets
+
+    ``successors[i]`` are the direct successors of node *i*. A node reaches
+    itself only through a cycle. Uses an iterative variant of Tarjan's
+    algorithm, which finds strongly connected components in reverse
+    topological order, so every component's successors are complete when
+    the component is finished.
+    """
+    count = len(successors)
+    reach = [0] * count
+    index = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    stack: list[int] = []
+    counter = 0
+    for start in range(count):
+        if index[start] != -1:
+            continue
+        work: list[tuple[int, int]] = [(start, 0)]
+        while work:
+            node, pos = work.pop()
+            if pos == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            succ = successors[node]
+            while pos < len(succ):
+                child = succ[pos]
+                pos += 1
+                if index[child] == -1:
+                    work.append((node, pos))
+                    work.append((child, 0))
+                    break
+                if on_stack[child]:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                if lowlink[node] == index[node]:
+                    # pop the strongly connected component
+                    members: list[int] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        members.append(member)
+                        if member == node:
+                            break
+                    component = 0
+                    for member in members:
+                        component |= 1 << member
+                    bits = 0
+                    for member in members:
+                        for child in successors[member]:
+                            bits |= (1 << child) | reach[child]
+                    for member in members:
+                        reach[member] = bits
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+    return reach
+
+
+class GraphClosures:
+    """Transitive closures of all nodes of a dependency graph
+
+    Computes the install, build, and full dependency closures of every node
+    at once. Nodes get integer ids and closures are bitsets (Python ints),
+    so shared subtrees are computed once instead of once per node.
+
+    Use :meth:`DependencyGraph.closures` to get memoized closures of a graph.
+    The closures of the build requirements match
+    :meth:`DependencyNode.iter_build_requirements`, etc.
+    """
+
+    def __init__(self, graph: DependencyGraph) -> None:
+        self.nodes: list[DependencyNode] = list(graph.get_all_nodes())
+        self.ids: dict[str, int] = {
+            node.key: node_id for node_id, node in enumerate(self.nodes)
+        }
+        install: list[list[int]] = []
+        build: list[list[int]] = []
+        every: list[list[int]] = []
+        for node in self.nodes:
+            install_ids: list[int] = []
+            build_ids: list[int] = []
+            all_ids: list[int] = []
+            for edge in node.children:
+                child_id = self.ids[edge.key]
+                all_ids.append(child_id)
+                if edge.req_type.is_install_requirement:
+                    install_ids.append(child_id)
+                if edge.req_type.is_build_requirement:
+                    build_ids.append(child_id)
+            install.append(install_ids)
+            build.append(build_ids)
+            every.append(all_ids)
+        self._install = _reachability(install)
+        self._all = _reachability(every)
+        self._build: list[int] = []
+        for build_ids in build:
+            bits = 0
+            for child_id in build_ids:
+                bits |= (1 << child_id) | self._install[child_id]
+            self._build.append(bits)
+        self._dependents: list[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def bits(self, nodes: typing.Iterable[DependencyNode]) -> int:
+        """Get the bitset of *nodes*"""
+        bits = 0
+        for node in nodes:
+            bits |= 1 << self.ids[node.key]
+        return bits
+
+    def to_nodes(self, bits: int) -> list[DependencyNode]:
+        """Get the nodes of a bitset, in the order of the graph"""
+        return [self.nodes[node_id] for node_id in _iter_bits(bits)]
+
+    def to_keys(self, bits: int) -> set[str]:
+        return {self.nodes[node_id].key for node_id in _iter_bits(bits)}
+
+    def to_names(self, bits: int) -> set[NormalizedName]:
+        """Get the package names of a bitset, without ROOT"""
+        names = {self.nodes[node_id].canonicalized_name for node_id in _iter_bits(bits)}
+        names.discard(canonicalize_name(ROOT))
+        return names
+
+    def install_bits(self, node: DependencyNode) -> int:
+        """Recursive install requirements of *node*"""
+        return self._install[self.ids[node.key]]
+
+    def build_bits(self, node: DependencyNode) -> int:
+        """Build requirements of *node* and their recursive install requirements"""
+        return self._build[self.ids[node.key]]
+
+    def all_bits(self, node: DependencyNode) -> int:
+        """Recursive dependencies of *node* following every edge type
+
+        Like :meth:`DependencyNode.iter_all_dependencies`, the result does
+        not contain *node* itself.
+        """
+        node_id = self.ids[node.key]
+        return self._all[node_id] & ~(1 << node_id)
+
+    def dependents_bits(self, node: DependencyNode) -> int:
+        """Nodes that depend on *node* through any edge type"""
+        if self._dependents is None:
+            predecessors: list[list[int]] = [[] for _ in self.nodes]
+            for node_id, node_ in enumerate(self.nodes):
+                for edge in node_.children:
+                    predecessors[self.ids[edge.key]].append(node_id)
+            self._dependents = _reachability(predecessors)
+        return self._dependents[self.ids[node.key]]
+
+    def install_requirements(self, node: DependencyNode) -> list[DependencyNode]:
+        return self.to_nodes(self.install_bits(node))
+
+    def build_requirements(self, node: DependencyNode) -> list[DependencyNode]:
+        return self.to_nodes(self.build_bits(node))
+
+    def all_dependencies(self, node: DependencyNode) -> list[DependencyNode]:
+        return self.to_nodes(self.all_bits(node))
+
+
 class TrackingTopologicalSorter:
     """A thread-safe topological sorter that tracks nodes in progress
 
@@ -516,15 +957,28 @@ class TrackingTopologicalSorter:
     2. exactly one exclusive node that is a predecessor of another node
     3. exactly one exclusive node
 
-    The class uses a lock for ``is_active`, ``get_available`, and ``done``,
-    so the methods can be used from threading pool and future callback.
+    A *streaming* sorter accepts new nodes after ``prepare()``, e.g. while
+    the graph is still being discovered. It stays active until ``close()``
+    is called and all nodes are done. New nodes must not be predecessors
+    of nodes that are already done.
+
+    The class uses a lock for ``is_active`, ``get_available``, ``done``,
+    and ``add``, so the methods can be used from threading pool and future
+    callback. ``wait()`` blocks until the sorter changes.
     """
 
     __slots__ = (
+        "_closed",
+        "_cond",
         "_dep_nodes",
+        "_dirty",
+        "_done_nodes",
         "_exclusive_nodes",
+        "_generation",
+        "_graph",
         "_in_progress_nodes",
         "_lock",
+        "_prepared",
         "_topo",
     )
 
@@ -532,17 +986,30 @@ class TrackingTopologicalSorter:
         self,
         graph: typing.Mapping[DependencyNode, typing.Iterable[DependencyNode]]
         | None = None,
+        *,
+        streaming: bool = False,
     ) -> None:
         self._topo: graphlib.TopologicalSorter[DependencyNode] = (
             graphlib.TopologicalSorter()
         )
+        # all nodes and their predecessors
+        self._graph: dict[DependencyNode, set[DependencyNode]] = {}
         # set of nodes that are not done, yet
         self._in_progress_nodes: set[DependencyNode] = set()
+        # set of nodes that are done
+        self._done_nodes: set[DependencyNode] = set()
         # set of nodes that are predecessors of other nodes
         self._dep_nodes: set[DependencyNode] = set()
         # dict of nodes -> priority; dependency: -1, leaf: +1
         self._exclusive_nodes: dict[DependencyNode, int] = {}
         self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # incremented on every change, see wait()
+        self._generation: int = 0
+        self._prepared: bool = False
+        self._closed: bool = not streaming
+        # new nodes were added after prepare()
+        self._dirty: bool = False
         if graph is not None:
             for node, predecessors in graph.items():
                 self.add(node, *predecessors)
@@ -557,6 +1024,11 @@ class TrackingTopologicalSorter:
         """Nodes that are marked as exclusive"""
         return set(self._exclusive_nodes)
 
+    @property
+    def generation(self) -> int:
+        """Counter that changes whenever the sorter changes"""
+        return self._generation
+
     def add(
         self,
         node: DependencyNode,
@@ -567,38 +1039,121 @@ class TrackingTopologicalSorter:
 
         Can be called multiple times for a node to add more predecessors or
         to mark a node as exclusive. Exclusive nodes cannot be unmarked.
-        """
-        self._topo.add(node, *predecessors)
-        self._dep_nodes.update(predecessors)
-        if exclusive:
-            self._exclusive_nodes[node] = 1
 
-    def prepare(self) -> None:
-        """Prepare and check for cyclic dependencies"""
-        self._topo.prepare()
+        Streaming sorters accept new nodes after ``prepare()`` until
+        ``close()`` is called.
+        """
+        with self._lock:
+            self._graph.setdefault(node, set()).update(predecessors)
+            for predecessor in predecessors:
+                self._graph.setdefault(predecessor, set())
+            self._dep_nodes.update(predecessors)
+            if exclusive:
+                self._exclusive_nodes[node] = 1
+            if not self._prepared:
+                self._topo.add(node, *predecessors)
+                return
+            if self._closed:
+                raise ValueError("cannot add nodes to a prepared topology")
+            self._update_priorities()
+            self._dirty = True
+            self._changed()
+
+    def _update_priorities(self) -> None:
         for node in self._exclusive_nodes:
             if node in self._dep_nodes:
                 # give dependency nodes a higher priority
                 self._exclusive_nodes[node] = -1
 
+    def _rebuild(self) -> None:
+        """Rebuild the topological sorter with new nodes, keep state
+
+        Rebuilding is deferred until the sorter is queried, so adding many
+        nodes at once is cheap. Caller must hold the lock.
+        """
+        if not self._dirty:
+            return
+        self._dirty = False
+        topo = graphlib.TopologicalSorter(self._graph)
+        topo.prepare()
+        while True:
+            ready = topo.get_ready()
+            done = self._done_nodes.intersection(ready)
+            self._in_progress_nodes.update(node for node in ready if node not in done)
+            if not done:
+                break
+            topo.done(*done)
+        self._topo = topo
+
+    def _changed(self) -> None:
+        """Wake up waiters, caller must hold the lock"""
+        self._generation += 1
+        self._cond.notify_all()
+
+    def prepare(self) -> None:
+        """Prepare and check for cyclic dependencies"""
+        with self._lock:
+            self._topo.prepare()
+            self._prepared = True
+            self._update_priorities()
+
+    def close(self) -> None:
+        """Stop accepting new nodes"""
+        with self._lock:
+            self._closed = True
+            self._changed()
+
+    def notify(self) -> None:
+        """Wake up threads in ``wait()``, e.g. from a future callback"""
+        with self._lock:
+            self._changed()
+
+    def wait(self, generation: int, timeout: float | None = None) -> int:
+        """Wait until the sorter changes after *generation*
+
+        Returns the current generation.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._generation != generation, timeout)
+            return self._generation
+
     def is_active(self) -> bool:
         with self._lock:
-            return bool(self._in_progress_nodes) or self._topo.is_active()
+            self._rebuild()
+            return (
+                bool(self._in_progress_nodes)
+                or self._topo.is_active()
+                or not self._closed
+            )
 
     def __bool__(self) -> bool:
         return self.is_active()
 
+    def is_done(self, node: DependencyNode) -> bool:
+        with self._lock:
+            return node in self._done_nodes
+
+    def predecessors(self, node: DependencyNode) -> set[DependencyNode]:
+        """Nodes that *node* depends on"""
+        with self._lock:
+            return set(self._graph.get(node, ()))
+
     def get_available(self) -> set[DependencyNode]:
         """Get available nodes
 
         A node can be returned multiple times until it is marked as 'done'.
+        An open streaming sorter returns an empty set when it is waiting
+        for new nodes.
         """
         with self._lock:
+            self._rebuild()
             # get ready nodes, update in progress nodes.
             ready = self._topo.get_ready()
             self._in_progress_nodes.update(ready)
 
             if not self._in_progress_nodes:
+                if not self._closed:
+                    return set()
                 # API misuse, user did not check "is_active"
                 raise ValueError("topology is not active")
 
@@ -623,8 +1178,11 @@ class TrackingTopologicalSorter:
     def done(self, *nodes: DependencyNode) -> None:
         """Mark nodes as done"""
         with self._lock:
-            self._in_progress_nodes.difference_update(nodes)
+            self._rebuild()
             self._topo.done(*nodes)
+            self._in_progress_nodes.difference_update(nodes)
+            self._done_nodes.update(nodes)
+            self._changed()
 
     def static_batches(self) -> typing.Iterable[set[DependencyNode]]:
         self.prepare()
@@ -204,12 +204,15 @@ def download_git_source(
     destination_dir: pathlib.Path,
     vcs_url: str,
     require_ref: bool = True,
+    sparse_checkout: list[str] | None = None,
+    submodule_paths: list[str] | None = None,
 ) -> pathlib.Path:
     """Clone a git repository from a pip VCS URL.
 
     Parses *vcs_url* with :func:`~fromager.gitutils.parse_vcs_url`
     and clones using :func:`~fromager.gitutils.git_clone_fast`
-    with recursive submodules.
+    with recursive submodules. *sparse_checkout* and *submodule_paths*
+    restrict the checkout to a subset of the repository.
 
     Raises ``FileExistsError`` if the destination directory already
     exists.
@@ -230,5 +233,7 @@ def download_git_source(
         output_dir=destination_dir,
         repo_url=repo_url,
         ref=ref,
+        sparse_checkout=sparse_checkout,
+        submodule_paths=submodule_paths,
     )
     return destination_dir
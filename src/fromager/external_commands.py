@@ -1,13 +1,24 @@
+import codecs
+import collections
+import contextlib
+import contextvars
+import dataclasses
 import logging
 import os
 import pathlib
 import shlex
+import shutil
+import signal
 import subprocess
 import sys
+import threading
+import time
 import typing
 from io import TextIOWrapper
 
-from . import log
+import psutil
+
+from . import log, network_sandbox, resource_usage
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +43,18 @@ def network_isolation_cmd() -> typing.Sequence[str]:
     raise ValueError(f"unsupported platform {sys.platform}")
 
 
+_network_sandboxes: network_sandbox.SandboxPool | None = None
+
+
+def set_network_sandboxes(pool: network_sandbox.SandboxPool | None) -> None:
+    """Run isolated commands in the persistent sandbox of their thread
+
+    ``None`` restores a new network namespace for every command.
+    """
+    global _network_sandboxes
+    _network_sandboxes = pool
+
+
 def detect_network_isolation() -> None:
     """Detect if network isolation is available and working
 
@@ -48,6 +71,359 @@ class NetworkIsolationError(subprocess.CalledProcessError):
     pass
 
 
+class CommandTimeoutError(subprocess.CalledProcessError):
+    """The watchdog killed a command that hung
+
+    *reason* tells whether the command exceeded its wall-clock timeout or
+    stopped producing output.
+    """
+
+    def __init__(
+        self,
+        returncode: int,
+        cmd: typing.Sequence[str],
+        output: str | None = None,
+        *,
+        reason: str = "timed out",
+    ) -> None:
+        super().__init__(returncode, cmd, output)
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Command {self.cmd!r} {self.reason} and was killed."
+
+
+DumpHook = typing.Callable[[int], None]
+"""Called with the pid of a hung command before its process group is killed"""
+
+
+def dump_process_tree(pid: int) -> None:
+    """Log the process tree of a hung command and stacks of Python processes
+
+    Python stacks are dumped with ``py-spy dump`` when ``py-spy`` is
+    installed.
+    """
+    try:
+        parent = psutil.Process(pid)
+        procs = [parent, *parent.children(recursive=True)]
+    except psutil.Error:
+        return
+    lines: list[str] = []
+    for proc in procs:
+        try:
+            lines.append(f"{proc.pid} [{proc.status()}] {shlex.join(proc.cmdline())}")
+        except psutil.Error:
+            continue
+    logger.error("process tree of hung command:\n%s", "\n".join(lines))
+
+    py_spy = shutil.which("py-spy")
+    if py_spy is None:
+        return
+    for proc in procs:
+        try:
+            if "python" not in proc.name():
+                continue
+        except psutil.Error:
+            continue
+        try:
+            dump = subprocess.run(
+                [py_spy, "dump", "--pid", str(proc.pid)],
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+        except (OSError, subprocess.TimeoutExpired) as err:
+            logger.warning("py-spy dump of process %d failed: %s", proc.pid, err)
+            continue
+        logger.error(
+            "py-spy dump of process %d:\n%s", proc.pid, dump.stdout or dump.stderr
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class _Timeouts:
+    deadline: float | None = None
+    """``time.monotonic()`` deadline of all commands in the context"""
+    output_timeout: float | None = None
+    """Seconds a command may run without producing output"""
+    dump: DumpHook | None = dump_process_tree
+
+
+_timeouts: contextvars.ContextVar[_Timeouts | None] = contextvars.ContextVar(
+    "external_commands_timeouts", default=None
+)
+
+
+@contextlib.contextmanager
+def timeouts(
+    *,
+    wall_clock: float | None = None,
+    output: float | None = None,
+    dump: DumpHook | None = dump_process_tree,
+) -> typing.Generator[None, None, None]:
+    """Kill commands that hang in the current context
+
+    All commands that run in the context must finish within *wall_clock*
+    seconds. A command that does not produce output for *output* seconds
+    is killed, too. *dump* is called with the pid of a hung command before
+    its process group is killed.
+    """
+    deadline = time.monotonic() + wall_clock if wall_clock is not None else None
+    token = _timeouts.set(
+        _Timeouts(deadline=deadline, output_timeout=output, dump=dump)
+    )
+    try:
+        yield
+    finally:
+        _timeouts.reset(token)
+
+
+class _Watchdog:
+    """Kill the process group of a command that exceeds its timeouts
+
+    Output is tracked by the thread that reads the command's output pipe.
+    """
+
+    def __init__(self, proc: subprocess.Popen[bytes], timeouts: _Timeouts) -> None:
+        self.reason: str | None = None
+        self._proc = proc
+        self._timeouts = timeouts
+        self._last_output = time.monotonic()
+        self._stopped = threading.Event()
+        limits = [
+            timeout
+            for timeout in (
+                timeouts.output_timeout,
+                None
+                if timeouts.deadline is None
+                else timeouts.deadline - self._last_output,
+            )
+            if timeout is not None
+        ]
+        self._interval = max(0.01, min([1.0, *(limit / 10 for limit in limits)]))
+        self._thread = threading.Thread(
+            target=self._watch, name=f"watchdog-{proc.pid}", daemon=True
+        )
+
+    def __enter__(self) -> typing.Self:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def output_received(self) -> None:
+        self._last_output = time.monotonic()
+
+    def _check(self) -> str | None:
+        now = time.monotonic()
+        deadline = self._timeouts.deadline
+        if deadline is not None and now >= deadline:
+            return "exceeded its wall-clock timeout"
+        output_timeout = self._timeouts.output_timeout
+        if output_timeout is not None and now - self._last_output >= output_timeout:
+            return f"produced no output for {output_timeout:g}s"
+        return None
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self._interval):
+            reason = self._check()
+            if reason is None:
+                continue
+            self.reason = reason
+            logger.error("command %s, killing process group %d", reason, self._proc.pid)
+            if self._timeouts.dump is not None:
+                try:
+                    self._timeouts.dump(self._proc.pid)
+                except Exception:
+                    logger.exception("failed to dump hung command")
+            _kill_process_group(self._proc.pid)
+            return
+
+
+def _kill_process_group(pid: int) -> None:
+    """Kill a process, its process group, and descendants in other groups"""
+    try:
+        descendants = psutil.Process(pid).children(recursive=True)
+    except psutil.Error:
+        descendants = []
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        os.killpg(pid, signal.SIGKILL)
+    for proc in descendants:
+        with contextlib.suppress(psutil.Error):
+            proc.kill()
+
+
+#: characters of output that are kept for error messages of commands that
+#: write their output to a log file
+OUTPUT_TAIL_SIZE: typing.Final = 256 * 1024
+#: characters of output that are logged in one debug message
+_LOG_BATCH_SIZE: typing.Final = 64 * 1024
+_READ_SIZE: typing.Final = 64 * 1024
+
+# common messages that mean there is a network isolation problem
+_NETWORK_ISOLATION_ERRORS: typing.Final = (
+    "connection refused",
+    "network unreachable",
+    "Network is unreachable",
+)
+
+
+class _OutputCapture:
+    """Process the output of a command line by line while it runs
+
+    Lines are written to the log file and logged as debug messages in
+    batches, with the package prefix on every line. Only the last
+    ``OUTPUT_TAIL_SIZE`` characters are kept in memory unless *keep_all*
+    is set.
+    """
+
+    def __init__(
+        self,
+        *,
+        log_file: typing.TextIO | None = None,
+        keep_all: bool = True,
+        network_isolation: bool = False,
+    ) -> None:
+        self.truncated = False
+        self.network_error = False
+        self._log_file = log_file
+        self._keep_all = keep_all
+        self._network_isolation = network_isolation
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+        self._lines: collections.deque[str] = collections.deque()
+        self._size = 0
+        self._batch: list[str] = []
+        self._batch_size = 0
+        self._prefix = log.get_log_prefix()
+
+    @property
+    def output(self) -> str:
+        return "".join(self._lines)
+
+    def feed(self, data: bytes) -> None:
+        *lines, self._partial = (self._partial + self._decoder.decode(data)).split("\n")
+        for line in lines:
+            self._add(line + "\n")
+        if len(self._partial) > OUTPUT_TAIL_SIZE:
+            # very long line without a newline
+            self._add(self._partial)
+            self._partial = ""
+
+    def close(self) -> None:
+        self._partial += self._decoder.decode(b"", final=True)
+        if self._partial:
+            self._add(self._partial)
+            self._partial = ""
+        self._flush_batch()
+
+    def _add(self, line: str) -> None:
+        if self._log_file is not None:
+            self._log_file.write(line)
+        if self._network_isolation and not self.network_error:
+            self.network_error = any(
+                substr in line for substr in _NETWORK_ISOLATION_ERRORS
+            )
+
+        self._lines.append(line)
+        self._size += len(line)
+        if not self._keep_all:
+            while self._size > OUTPUT_TAIL_SIZE and len(self._lines) > 1:
+                self._size -= len(self._lines.popleft())
+                self.truncated = True
+
+        if logger.isEnabledFor(logging.DEBUG):
+            self._batch.append(line)
+            self._batch_size += len(line)
+            if self._batch_size >= _LOG_BATCH_SIZE:
+                self._flush_batch()
+
+    def _flush_batch(self) -> None:
+        if not self._batch:
+            return
+        logger.debug(self.format("".join(self._batch), continuation=True))
+        self._batch.clear()
+        self._batch_size = 0
+
+    def format(self, output: str, *, continuation: bool = False) -> str:
+        """Add package prefix to lines for greppability
+
+        FromagerLogRecord handles the first line of a log message, lines
+        that are embedded in a larger message need a prefix, too.
+        """
+        if not self._prefix:
+            return output
+        output = output.rstrip("\n").replace("\n", f"\n{self._prefix}: ")
+        if continuation:
+            return output
+        return f"{self._prefix}: {output}"
+
+
+class _CompletedCommand(subprocess.CompletedProcess[bytes]):
+    timeout_reason: str | None = None
+    """Set when the watchdog killed the command"""
+
+
+def _run_with_usage(
+    cmd: typing.Sequence[str],
+    *,
+    cwd: str | None,
+    env: dict[str, str],
+    stdin: TextIOWrapper | None,
+    output: _OutputCapture,
+    timeouts: _Timeouts | None = None,
+) -> _CompletedCommand:
+    """Run a process like ``subprocess.run`` and record its resource usage
+
+    ``wait4()`` returns the resource usage of exactly one child process and
+    its waited-for descendants, so concurrent commands in other threads do
+    not distort the measurement. The output is streamed to *output*.
+
+    With *timeouts*, the process runs in a new session and a watchdog kills
+    its process group when it hangs.
+    """
+    watch = timeouts is not None and (
+        timeouts.deadline is not None or timeouts.output_timeout is not None
+    )
+    with subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=stdin,
+        start_new_session=watch,
+    ) as proc:
+        assert proc.stdout is not None
+        with contextlib.ExitStack() as stack:
+            watchdog: _Watchdog | None = None
+            if timeouts is not None and watch:
+                watchdog = stack.enter_context(_Watchdog(proc, timeouts))
+            try:
+                while chunk := os.read(proc.stdout.fileno(), _READ_SIZE):
+                    if watchdog is not None:
+                        watchdog.output_received()
+                    output.feed(chunk)
+                output.close()
+            except BaseException:
+                if watch:
+                    _kill_process_group(proc.pid)
+                proc.kill()
+                raise
+            if hasattr(os, "wait4"):
+                _, status, ru = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                resource_usage.record(resource_usage.ResourceUsage.from_rusage(ru))
+            else:
+                proc.wait()
+    completed = _CompletedCommand(cmd, proc.returncode)
+    if watchdog is not None:
+        completed.timeout_reason = watchdog.reason
+    return completed
+
+
 # based on pyproject_hooks/_impl.py: quiet_subprocess_runner
 def run(
     cmd: typing.Sequence[str],
@@ -57,14 +433,41 @@ def run(
     network_isolation: bool = False,
     log_filename: str | None = None,
     stdin: TextIOWrapper | None = None,
+    timeout: float | None = None,
+    output_timeout: float | None = None,
 ) -> str:
     """Run a subprocess with optional network isolation and structured logging.
 
-    Captures output to a log file or in-memory pipe and prefixes each
-    line with the current package name for easier searching. Raises
-    ``NetworkIsolationError`` instead of ``CalledProcessError`` when the
-    failure output indicates a network access problem.
+    Output is processed line by line while the command runs. Lines are
+    written to *log_filename* and logged as debug messages with the current
+    package name as prefix for easier searching. Returns the output of the
+    command. With *log_filename*, only the last ``OUTPUT_TAIL_SIZE``
+    characters are kept in memory and returned, the log file has the
+    complete output. Raises ``NetworkIsolationError`` instead of
+    ``CalledProcessError`` when the failure output indicates a network
+    access problem.
+
+    The command is killed with its process group and ``CommandTimeoutError``
+    is raised when it runs longer than *timeout* seconds or produces no
+    output for *output_timeout* seconds. Both default to the limits of the
+    active :func:`timeouts` context.
     """
+    command_timeouts = _timeouts.get() or _Timeouts()
+    if timeout is not None or output_timeout is not None:
+        command_timeouts = dataclasses.replace(
+            command_timeouts,
+            deadline=(
+                time.monotonic() + timeout
+                if timeout is not None
+                else command_timeouts.deadline
+            ),
+            output_timeout=(
+                output_timeout
+                if output_timeout is not None
+                else command_timeouts.output_timeout
+            ),
+        )
+
     if extra_environ is None:
         extra_environ = {}
     env = os.environ.copy()
@@ -72,9 +475,14 @@ def run(
 
     if network_isolation:
         # prevent network access by creating a new network namespace that
-        # has no routing configured.
+        # has no routing configured, or by entering the namespace of the
+        # thread's persistent sandbox.
         cmd = [
-            *network_isolation_cmd(),
+            *(
+                _network_sandboxes.command_prefix()
+                if _network_sandboxes is not None
+                else network_isolation_cmd()
+            ),
             *cmd,
         ]
 
@@ -84,48 +492,33 @@ def run(
         " ".join(shlex.quote(str(s)) for s in cmd),
         cwd or ".",
     )
-    if log_filename:
-        with open(log_filename, "w") as log_file:
-            completed = subprocess.run(
-                cmd,
-                cwd=cwd,
-                env=env,
-                stdout=log_file,
-                stderr=subprocess.STDOUT,
-                stdin=stdin,
-            )
-        with open(log_filename, "r", encoding="utf-8") as f:
-            output = f.read()
-    else:
-        completed = subprocess.run(
+    with contextlib.ExitStack() as stack:
+        log_file: typing.TextIO | None = None
+        if log_filename:
+            log_file = stack.enter_context(open(log_filename, "w", encoding="utf-8"))
+        capture = _OutputCapture(
+            log_file=log_file,
+            keep_all=log_file is None,
+            network_isolation=network_isolation,
+        )
+        completed = _run_with_usage(
             cmd,
             cwd=cwd,
             env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
             stdin=stdin,
+            output=capture,
+            timeouts=command_timeouts,
         )
-        output = completed.stdout.decode("utf-8") if completed.stdout else ""
-
-    # Add package prefix to continuation lines for greppability
-    prefix = log.get_log_prefix()
-    formatted_output = None
-
-    if output:
-        if prefix:
-            # FromagerLogRecord handles first line, we handle continuation lines
-            formatted_output = output.rstrip("\n").replace("\n", f"\n{prefix}: ")
-        else:
-            formatted_output = output
+    output = capture.output
 
     if completed.returncode != 0:
-        # Prefix first line for error output (embedded in larger message)
-        if formatted_output and prefix:
-            output_to_log = f"\n{prefix}: {formatted_output}"
-        elif formatted_output:
-            output_to_log = f"\n{formatted_output}"
-        else:
-            output_to_log = ""
+        output_to_log = ""
+        if capture.truncated:
+            output_to_log = (
+                f"\n[output truncated, complete output is in {log_filename}]"
+            )
+        if output:
+            output_to_log += f"\n{capture.format(output)}"
         logger.error(
             "command failed with exit code %d: %s%s",
             completed.returncode,
@@ -133,22 +526,21 @@ def run(
             output_to_log,
         )
 
+        timeout_reason = (
+            completed.timeout_reason
+            if isinstance(completed, _CompletedCommand)
+            else None
+        )
+        if timeout_reason is not None:
+            raise CommandTimeoutError(
+                completed.returncode, cmd, output, reason=timeout_reason
+            )
+
         err_type = subprocess.CalledProcessError
-        if network_isolation:
-            # Look for a few common messages that mean there is a network
-            # isolation problem and change the exception type to make it easier
-            # for the caller to recognize that case.
-            for substr in [
-                "connection refused",
-                "network unreachable",
-                "Network is unreachable",
-            ]:
-                if substr in output:
-                    err_type = NetworkIsolationError
+        if capture.network_error:
+            # change the exception type to make it easier for the caller to
+            # recognize a network isolation problem.
+            err_type = NetworkIsolationError
         raise err_type(completed.returncode, cmd, output)
 
-    # Log command output for debugging
-    if formatted_output:
-        logger.debug(formatted_output)
-
     return output
@@ -0,0 +1,306 @@
+"""Build fingerprints: content hashes of all inputs of a wheel build.
+
+A fingerprint combines hashes of the source distribution, the applied
+patches, the package settings, the distributions in the build environment,
+and the relevant parts of the build host environment. Fromager stores the
+fingerprint in the ``.dist-info`` directory of every wheel it builds and in
+the dependency graph, so cached wheels can be compared with the inputs of
+the current run.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import logging
+import pathlib
+import platform
+import sys
+import sysconfig
+import typing
+import zipfile
+
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from . import overrides, sources
+
+if typing.TYPE_CHECKING:
+    from . import build_environment, context
+
+logger = logging.getLogger(__name__)
+
+FROMAGER_BUILD_FINGERPRINT = "fromager-build-fingerprint.json"
+
+#: Version of the fingerprint algorithm, bump when the inputs change
+FINGERPRINT_VERSION: typing.Final = 1
+
+
+@dataclasses.dataclass(frozen=True, order=True, slots=True)
+class BuildFingerprint:
+    """Hashes of the inputs of a wheel build
+
+    Components are ``None`` when the input is unknown, e.g. the build
+    environment before it has been created. Unknown components are
+    excluded from comparisons.
+    """
+
+    source: str | None = None
+    patches: str | None = None
+    settings: str | None = None
+    build_env: str | None = None
+    environment: str | None = None
+
+    @property
+    def digest(self) -> str:
+        """Combined hash of all components"""
+        h = hashlib.sha256(f"v{FINGERPRINT_VERSION}\n".encode())
+        for name, value in self.components().items():
+            h.update(f"{name}={value or ''}\n".encode())
+        return h.hexdigest()
+
+    def components(self) -> dict[str, str | None]:
+        return {
+            field.name: getattr(self, field.name) for field in dataclasses.fields(self)
+        }
+
+    def differences(self, other: BuildFingerprint) -> list[str]:
+        """Names of components that are known in both and differ"""
+        theirs = other.components()
+        return [
+            name
+            for name, value in self.components().items()
+            if value is not None and theirs[name] is not None and value != theirs[name]
+        ]
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "version": FINGERPRINT_VERSION,
+            "digest": self.digest,
+            "components": self.components(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, typing.Any]) -> BuildFingerprint:
+        if data.get("version") != FINGERPRINT_VERSION:
+            raise ValueError(
+                f"unsupported fingerprint version {data.get('version')!r}, "
+                f"expected {FINGERPRINT_VERSION}"
+            )
+        return cls(**data["components"])
+
+
+def _hash_json(data: typing.Any) -> str:
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _update_from_file(h: hashlib._Hash, path: pathlib.Path) -> None:
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+
+
+def hash_source(source_filename: pathlib.Path) -> str:
+    """Hash a source archive or a source tree (e.g. a git checkout)
+
+    Directories are hashed by relative file names and file content. The
+    ``.git`` directory is ignored.
+    """
+    h = hashlib.sha256()
+    if source_filename.is_dir():
+        for path in sorted(source_filename.rglob("*")):
+            relpath = path.relative_to(source_filename)
+            if relpath.parts[0] == ".git" or not path.is_file():
+                continue
+            h.update(f"{relpath.as_posix()}\0".encode())
+            _update_from_file(h, path)
+    else:
+        _update_from_file(h, source_filename)
+    return h.hexdigest()
+
+
+def hash_patches(patches: typing.Iterable[pathlib.Path]) -> str:
+    """Hash patch file names and content in order of application"""
+    h = hashlib.sha256()
+    for patch in patches:
+        h.update(f"{patch.name}\0".encode())
+        _update_from_file(h, patch)
+    return h.hexdigest()
+
+
+def hash_build_env(distributions: typing.Mapping[str, Version]) -> str:
+    """Hash names and versions of build environment distributions"""
+    return _hash_json(
+        sorted(
+            f"{canonicalize_name(name)}=={version}"
+            for name, version in distributions.items()
+        )
+    )
+
+
+def compute_build_fingerprint(
+    *,
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+    source_filename: pathlib.Path | None = None,
+    build_distributions: typing.Mapping[str, Version] | None = None,
+) -> BuildFingerprint:
+    """Compute the fingerprint of a build
+
+    *source_filename* is the downloaded source archive or checkout and
+    *build_distributions* maps the names of all distributions in the
+    build environment to their versions. Either one can be omitted when
+    it is not known, yet. The corresponding components are left unset.
+    """
+    pbi = ctx.package_build_info(req)
+    if pbi.has_config:
+        settings = pbi.serialize(mode="json", exclude_defaults=False)
+        # resource classes and timeouts only affect scheduling
+        build_options = settings.get("build_options", {})
+        for key in (
+            "resource_classes",
+            "build_timeout_minutes",
+            "output_timeout_minutes",
+        ):
+            build_options.pop(key, None)
+    else:
+        settings = {}
+    # env var templates are part of the settings. Parallel job settings
+    # and the build env's paths depend on the host, not on the inputs.
+    environment = {
+        "variant": str(ctx.variant),
+        "python": f"{platform.python_implementation()}-{platform.python_version()}{sys.abiflags}",
+        "platform": sysconfig.get_platform(),
+    }
+    return BuildFingerprint(
+        source=hash_source(source_filename) if source_filename is not None else None,
+        patches=hash_patches(pbi.get_patches(version)),
+        settings=_hash_json(settings),
+        build_env=(
+            hash_build_env(build_distributions)
+            if build_distributions is not None
+            else None
+        ),
+        environment=_hash_json(environment),
+    )
+
+
+def compute_build_env_fingerprint(
+    *,
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+    sdist_root_dir: pathlib.Path,
+    build_env: build_environment.BuildEnvironment,
+) -> BuildFingerprint:
+    """Compute the fingerprint of a prepared build
+
+    Looks up the source file from the build metadata that
+    :func:`~fromager.sources.prepare_source` writes next to *sdist_root_dir*
+    and gets the installed distributions from *build_env*.
+    """
+    return compute_build_fingerprint(
+        ctx=ctx,
+        req=req,
+        version=version,
+        source_filename=_source_from_build_meta(sdist_root_dir.parent),
+        build_distributions=build_env.get_distributions(),
+    )
+
+
+def _source_from_build_meta(unpack_dir: pathlib.Path) -> pathlib.Path | None:
+    try:
+        build_meta = sources.read_build_meta(unpack_dir)
+    except FileNotFoundError:
+        logger.debug("no build metadata in %s", unpack_dir)
+        return None
+    source_filename = pathlib.Path(build_meta["source-filename"])
+    if not source_filename.exists():
+        logger.debug("source %s does not exist", source_filename)
+        return None
+    return source_filename
+
+
+def find_local_source(
+    *,
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+) -> pathlib.Path | None:
+    """Find the source of an earlier run in the work directory
+
+    Returns ``None`` when the source has not been downloaded and prepared
+    on this host. Unlike :func:`~fromager.sources.download_source`, it
+    never downloads or clones, so checking existing wheels stays cheap.
+    """
+    module_name = overrides.pkgname_to_override_module(req.name)
+    return _source_from_build_meta(ctx.work_dir / f"{module_name}-{version}")
+
+
+def write_fingerprint(dist_info_dir: pathlib.Path, fp: BuildFingerprint) -> None:
+    """Write fingerprint into a wheel's dist-info directory"""
+    fp_file = dist_info_dir / FROMAGER_BUILD_FINGERPRINT
+    fp_file.write_text(json.dumps(fp.to_dict(), indent=2, sort_keys=True) + "\n")
+
+
+def read_wheel_fingerprint(wheel_filename: pathlib.Path) -> BuildFingerprint | None:
+    """Read the fingerprint from a wheel
+
+    Returns ``None`` for wheels without a (supported) fingerprint, e.g.
+    wheels built by older versions of Fromager.
+    """
+    try:
+        with zipfile.ZipFile(wheel_filename) as zf:
+            for name in zf.namelist():
+                parent, _, basename = name.rpartition("/")
+                if basename == FROMAGER_BUILD_FINGERPRINT and parent.endswith(
+                    ".dist-info"
+                ):
+                    return BuildFingerprint.from_dict(json.loads(zf.read(name)))
+    except (OSError, ValueError, KeyError, TypeError, zipfile.BadZipFile) as err:
+        logger.info("could not read fingerprint from %s: %s", wheel_filename.name, err)
+    return None
+
+
+def verify_wheel_fingerprint(
+    *,
+    ctx: context.WorkContext,
+    req: Requirement,
+    version: Version,
+    wheel_filename: pathlib.Path,
+    get_source_filename: typing.Callable[[], pathlib.Path | None] | None = None,
+    build_distributions: typing.Mapping[str, Version] | None = None,
+) -> bool:
+    """Check that an existing wheel was built from the current inputs
+
+    Wheels without a fingerprint are accepted. *get_source_filename* is
+    only called for wheels with a fingerprint, so callers can download
+    the source lazily, or return ``None`` when the source is not at hand,
+    see :func:`find_local_source`. Components that cannot be computed
+    from the given arguments are not compared.
+    """
+    existing = read_wheel_fingerprint(wheel_filename)
+    if existing is None:
+        logger.debug("wheel %s has no build fingerprint", wheel_filename.name)
+        return True
+    expected = compute_build_fingerprint(
+        ctx=ctx,
+        req=req,
+        version=version,
+        source_filename=get_source_filename() if get_source_filename else None,
+        build_distributions=build_distributions,
+    )
+    differences = expected.differences(existing)
+    if differences:
+        logger.info(
+            "wheel %s was built from different inputs: %s changed",
+            wheel_filename.name,
+            ", ".join(differences),
+        )
+        return False
+    logger.debug("wheel %s matches build fingerprint", wheel_filename.name)
+    return True
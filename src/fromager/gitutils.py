@@ -27,8 +27,14 @@ def git_clone(
     tag: str | None = None,
     ref: str | None = None,
     submodules: bool | list[str] = False,
+    sparse_checkout: list[str] | None = None,
 ) -> pathlib.Path:
-    """Clone a git repository"""
+    """Clone a git repository
+
+    If *sparse_checkout* is given, the working tree is restricted to the
+    top-level files and the listed directories (cone mode). Submodules
+    outside the sparse checkout are not cloned.
+    """
     if tag is not None and ref is not None:
         raise ValueError("tag and ref are mutually exclusive")
 
@@ -36,23 +42,33 @@ def git_clone(
     parsed_url = urlparse(repo_url)
     clean_url = parsed_url._replace(netloc=parsed_url.hostname or "").geturl()
     logger.info(
-        "%s: cloning %s, tag %r, ref %r, submodules %r, into %s",
+        "%s: cloning %s, tag %r, ref %r, submodules %r, sparse checkout %r, into %s",
         req.name,
         clean_url,
         tag,
         ref,
         submodules,
+        sparse_checkout,
         output_dir,
     )
     cmd: list[str] = ["git", "clone"]
     if tag is not None:
         # --branch works with branches and tags, but not with commits
         cmd.extend(["--branch", tag, "--depth", "1"])
+    if sparse_checkout:
+        # only check out top-level files, the sparse-checkout call below
+        # adds the requested directories.
+        cmd.append("--sparse")
     if submodules:
+        # limit submodules to the allowlist or the sparse checkout cone,
+        # git does not skip submodules outside of the sparse checkout.
         if isinstance(submodules, list):
-            for pathspec in submodules:
-                cmd.append(f"--recurse-submodules={pathspec}")
+            pathspecs = submodules
         else:
+            pathspecs = sparse_checkout or []
+        for pathspec in pathspecs:
+            cmd.append(f"--recurse-submodules={pathspec}")
+        if not pathspecs:
             # all submodules
             cmd.append("--recurse-submodules")
         if tag is not None:
@@ -60,6 +76,9 @@ def git_clone(
     cmd.extend([repo_url, str(output_dir)])
     external_commands.run(cmd, network_isolation=False)
 
+    if sparse_checkout:
+        _sparse_checkout_set(output_dir, sparse_checkout)
+
     # --branch only works with names, so we have to checkout the reference we
     # actually want if it is not a name
     if ref is not None:
@@ -77,6 +96,8 @@ def git_clone_fast(
     output_dir: pathlib.Path,
     repo_url: str,
     ref: str = GIT_HEAD,
+    sparse_checkout: list[str] | None = None,
+    submodule_paths: list[str] | None = None,
 ) -> None:
     """Efficient, blobless git clone with all submodules
 
@@ -89,6 +110,13 @@ def git_clone_fast(
     branch. To force a tag, use ``refs/tags/v1.0`` to fetch the ``v1.0`` tag.
 
     Like in :command:`pip`, submodules are automatically cloned recursively.
+    If *submodule_paths* is given, only the listed submodules (and their
+    nested submodules) are cloned.
+
+    If *sparse_checkout* is given, the working tree is restricted to the
+    top-level files and the listed directories (cone mode). Combined with
+    the blob filter, git only downloads blobs of the checked out files.
+    Submodules outside the sparse checkout are not cloned.
 
     .. note::
 
@@ -99,9 +127,10 @@ def git_clone_fast(
     # Create a clean URL without any credentials for logging
     clean_url = parsed_url._replace(netloc=parsed_url.hostname or "").geturl()
     logger.info(
-        "cloning %s, tree-ish %r, into %s",
+        "cloning %s, tree-ish %r, sparse checkout %r, into %s",
         clean_url,
         ref,
+        sparse_checkout,
         output_dir,
     )
 
@@ -112,11 +141,15 @@ def git_clone_fast(
         "clone",
         "--filter=blob:none",
         "--no-checkout",
-        repo_url,
-        str(output_dir),
     ]
+    if sparse_checkout:
+        cmd.append("--sparse")
+    cmd.extend([repo_url, str(output_dir)])
     external_commands.run(cmd, network_isolation=False)
 
+    if sparse_checkout:
+        _sparse_checkout_set(output_dir, sparse_checkout)
+
     # check out reference / tag
     logger.debug("check out ref")
     cmd = [
@@ -140,11 +173,24 @@ def git_clone_fast(
             "--filter=blob:none",
             "--jobs=4",
         ]
+        # limit submodules to the allowlist or the sparse checkout cone,
+        # git does not skip submodules outside of the sparse checkout.
+        pathspecs = submodule_paths or sparse_checkout
+        if pathspecs:
+            cmd.append("--")
+            cmd.extend(pathspecs)
         external_commands.run(cmd, cwd=str(output_dir), network_isolation=False)
     else:
         logger.debug("no .gitmodules file")
 
 
+def _sparse_checkout_set(output_dir: pathlib.Path, paths: list[str]) -> None:
+    """Restrict the working tree to *paths* (cone mode)"""
+    logger.debug("sparse checkout %s", paths)
+    cmd: list[str] = ["git", "sparse-checkout", "set", "--cone", "--", *paths]
+    external_commands.run(cmd, cwd=str(output_dir), network_isolation=False)
+
+
 def git_clean(source_dir: pathlib.Path) -> None:
     """Remove untracked files and directories from a git working tree.
 
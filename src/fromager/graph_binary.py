@@ -0,0 +1,195 @@
+"""Compact binary format of dependency graphs
+
+JSON is the interchange format of graphs. The binary format is for fast
+handoff between machines: a string table and integer arrays of nodes and
+edges that are read with ``mmap`` without parsing. All integers are
+little endian.
+
+Layout:
+
+- header: magic, format version, number of strings, size of the string
+  data, number of nodes, number of edges
+- string offsets (uint32, number of strings + 1) and UTF-8 string data,
+  padded to 4 bytes
+- nodes (int32 x :data:`NODE_FIELDS`), the first node is ROOT
+- edges (int32 x :data:`EDGE_FIELDS`), grouped by parent node in the order
+  of the nodes
+
+Fields that refer to strings are indexes into the string table, ``-1``
+means ``None``.
+"""
+
+from __future__ import annotations
+
+import array
+import contextlib
+import dataclasses
+import mmap
+import struct
+import sys
+import typing
+
+MAGIC: typing.Final = b"FRMGRAPH"
+FORMAT_VERSION: typing.Final = 1
+
+_HEADER = struct.Struct("<8sHxxIIII")
+# name, version, download_url, constraint, build_fingerprint, pre_built, edges
+NODE_FIELDS: typing.Final = 7
+# destination node, req_type, req
+EDGE_FIELDS: typing.Final = 3
+NONE: typing.Final = -1
+
+
+class NodeRecord(typing.NamedTuple):
+    name: int
+    version: int
+    download_url: int
+    constraint: int
+    build_fingerprint: int
+    pre_built: int
+    edge_count: int
+
+
+class EdgeRecord(typing.NamedTuple):
+    destination: int
+    req_type: int
+    req: int
+
+
+def is_binary_graph(header: bytes) -> bool:
+    return header.startswith(MAGIC)
+
+
+class StringTable:
+    """Deduplicate strings while writing a graph"""
+
+    def __init__(self) -> None:
+        self._index: dict[str, int] = {}
+
+    def add(self, value: str | None) -> int:
+        if value is None:
+            return NONE
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self._index)
+        return index
+
+    @property
+    def strings(self) -> list[str]:
+        return list(self._index)
+
+
+def dump(
+    strings: list[str],
+    nodes: typing.Sequence[NodeRecord],
+    edges: typing.Sequence[EdgeRecord],
+    file_handle: typing.BinaryIO,
+) -> None:
+    """Write a graph in the binary format"""
+    encoded = [value.encode("utf-8") for value in strings]
+    offsets = array.array("I", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    data = b"".join(encoded)
+    padding = b"\0" * (-len(data) % 4)
+    node_array = array.array("i", (field for node in nodes for field in node))
+    edge_array = array.array("i", (field for edge in edges for field in edge))
+    if sys.byteorder == "big":
+        for values in (offsets, node_array, edge_array):
+            values.byteswap()
+    file_handle.write(
+        _HEADER.pack(
+            MAGIC, FORMAT_VERSION, len(strings), len(data), len(nodes), len(edges)
+        )
+    )
+    file_handle.write(offsets.tobytes())
+    file_handle.write(data + padding)
+    file_handle.write(node_array.tobytes())
+    file_handle.write(edge_array.tobytes())
+
+
+@dataclasses.dataclass(frozen=True)
+class BinaryGraph:
+    """Decoded string table with node and edge arrays"""
+
+    strings: list[str]
+    nodes: typing.Sequence[int]
+    edges: typing.Sequence[int]
+
+    @property
+    def node_count(self) -> int:
+        return len(self.nodes) // NODE_FIELDS
+
+    def string(self, index: int) -> str | None:
+        return None if index == NONE else self.strings[index]
+
+    def release(self) -> None:
+        """Release the arrays of a memory-mapped file"""
+        for values in (self.nodes, self.edges):
+            if isinstance(values, memoryview):
+                values.release()
+
+
+def _int_view(
+    buffer: memoryview, fmt: typing.Literal["i", "I"]
+) -> typing.Sequence[int]:
+    if sys.byteorder == "big":
+        values = array.array(fmt, buffer.tobytes())
+        values.byteswap()
+        return values
+    return buffer.cast(fmt)
+
+
+def loads(buffer: bytes | mmap.mmap) -> BinaryGraph:
+    """Read a graph in the binary format from a buffer"""
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+        raise ValueError("binary graph is truncated")
+    magic, version, string_count, data_size, node_count, edge_count = (
+        _HEADER.unpack_from(view)
+    )
+    if magic != MAGIC:
+        raise ValueError("not a binary graph file")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            f"unsupported binary graph format version {version}, "
+            f"expected {FORMAT_VERSION}"
+        )
+    pos = _HEADER.size
+    offsets_end = pos + 4 * (string_count + 1)
+    data_end = offsets_end + data_size
+    nodes_start = data_end + (-data_size % 4)
+    edges_start = nodes_start + 4 * NODE_FIELDS * node_count
+    end = edges_start + 4 * EDGE_FIELDS * edge_count
+    if len(view) < end:
+        raise ValueError("binary graph is truncated")
+
+    offsets = _int_view(view[pos:offsets_end], "I")
+    data = view[offsets_end:data_end]
+    strings = [
+        str(data[offsets[i] : offsets[i + 1]], "utf-8") for i in range(string_count)
+    ]
+    return BinaryGraph(
+        strings=strings,
+        nodes=_int_view(view[nodes_start:edges_start], "i"),
+        edges=_int_view(view[edges_start:end], "i"),
+    )
+
+
+@contextlib.contextmanager
+def load(file_handle: typing.BinaryIO) -> typing.Generator[BinaryGraph, None, None]:
+    """Read a graph in the binary format, memory-map regular files
+
+    The arrays are only valid inside the context.
+    """
+    try:
+        fileno = file_handle.fileno()
+    except (AttributeError, OSError):
+        yield loads(file_handle.read())
+        return
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buffer:
+        graph = loads(buffer)
+        try:
+            yield graph
+        finally:
+            graph.release()
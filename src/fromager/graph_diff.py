@@ -0,0 +1,264 @@
+"""Differences between two dependency graphs
+
+Nodes are aligned by package name, so a new version of a package is a
+change of the package and not an unrelated pair of a removed and an added
+node. Edges are aligned by parent name, requirement type, and child name.
+Both alignments are dictionary lookups, the diff takes linear time in the
+size of the graphs.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from packaging.utils import NormalizedName
+from packaging.version import Version
+
+from .dependency_graph import ROOT, DependencyGraph, DependencyNode
+from .requirements_file import RequirementType
+
+
+@dataclasses.dataclass(frozen=True)
+class NodeChange:
+    """A package that was added, removed, or changed"""
+
+    name: NormalizedName
+    old_version: Version | None
+    new_version: Version | None
+    changes: dict[str, tuple[typing.Any, typing.Any]]
+    """Changed attributes, mapped to their old and new values"""
+    toplevel: list[NormalizedName]
+    """Top-level requirements that pull in the package"""
+
+    @property
+    def kind(self) -> str:
+        if self.old_version is None:
+            return "added"
+        if self.new_version is None:
+            return "removed"
+        return "changed"
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "name": str(self.name),
+            "kind": self.kind,
+            "old_version": str(self.old_version) if self.old_version else None,
+            "new_version": str(self.new_version) if self.new_version else None,
+            "changes": {
+                field: {"old": old, "new": new}
+                for field, (old, new) in self.changes.items()
+            },
+            "toplevel": [str(name) for name in self.toplevel],
+        }
+
+
+class EdgeEnd(typing.NamedTuple):
+    parent_version: str
+    req: str
+    child_version: str
+
+
+@dataclasses.dataclass(frozen=True)
+class EdgeChange:
+    """Edges between two packages that were added, removed, or changed"""
+
+    parent: NormalizedName
+    """Name of the parent, empty for top-level requirements"""
+    req_type: RequirementType
+    child: NormalizedName
+    old: list[EdgeEnd]
+    new: list[EdgeEnd]
+
+    @property
+    def kind(self) -> str:
+        if not self.old:
+            return "added"
+        if not self.new:
+            return "removed"
+        return "changed"
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "parent": str(self.parent),
+            "req_type": str(self.req_type),
+            "child": str(self.child),
+            "kind": self.kind,
+            "old": [end._asdict() for end in self.old],
+            "new": [end._asdict() for end in self.new],
+        }
+
+
+@dataclasses.dataclass(frozen=True)
+class GraphDiff:
+    nodes: list[NodeChange]
+    edges: list[EdgeChange]
+
+    def __bool__(self) -> bool:
+        return bool(self.nodes or self.edges)
+
+    def nodes_of_kind(self, kind: str) -> list[NodeChange]:
+        return [change for change in self.nodes if change.kind == kind]
+
+    def edges_of_kind(self, kind: str) -> list[EdgeChange]:
+        return [change for change in self.edges if change.kind == kind]
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "nodes": [change.to_dict() for change in self.nodes],
+            "edges": [change.to_dict() for change in self.edges],
+        }
+
+    def summary(self) -> str:
+        kinds = ("added", "removed", "changed")
+        nodes = ", ".join(f"{len(self.nodes_of_kind(k))} {k}" for k in kinds)
+        edges = ", ".join(f"{len(self.edges_of_kind(k))} {k}" for k in kinds)
+        lines = [f"packages: {nodes}", f"edges: {edges}"]
+        for change in self.nodes:
+            versions = " -> ".join(
+                str(v) for v in (change.old_version, change.new_version) if v
+            )
+            fields = ", ".join(f for f in change.changes if f != "version")
+            lines.append(
+                f"  {change.kind} {change.name} {versions}"
+                + (f" ({fields})" if fields else "")
+                + (f" via {', '.join(change.toplevel)}" if change.toplevel else "")
+            )
+        return "\n".join(lines)
+
+
+class _TopLevelIndex:
+    """Find the top-level requirements that pull in a node"""
+
+    def __init__(self, graph: DependencyGraph) -> None:
+        self._closures = graph.closures()
+        self._toplevel = self._closures.bits(
+            edge.destination_node
+            for edge in graph.get_root_node().children
+            if edge.req_type == RequirementType.TOP_LEVEL
+        )
+
+    def __call__(self, node: DependencyNode) -> list[NormalizedName]:
+        closures = self._closures
+        bits = closures.dependents_bits(node) | closures.bits([node])
+        return sorted(closures.to_names(bits & self._toplevel))
+
+
+def _node_attributes(node: DependencyNode) -> dict[str, typing.Any]:
+    """Node attributes that are compared besides the version"""
+    return {
+        "download_url": node.download_url,
+        "pre_built": node.pre_built,
+        "constraint": str(node.constraint) if node.constraint else None,
+    }
+
+
+def _nodes_by_name(
+    graph: DependencyGraph,
+) -> dict[NormalizedName, dict[Version, DependencyNode]]:
+    nodes: dict[NormalizedName, dict[Version, DependencyNode]] = {}
+    for node in graph.get_all_nodes():
+        if node.key != ROOT:
+            nodes.setdefault(node.canonicalized_name, {})[node.version] = node
+    return nodes
+
+
+def _edges_by_name(
+    graph: DependencyGraph,
+) -> dict[tuple[NormalizedName, RequirementType, NormalizedName], set[EdgeEnd]]:
+    edges: dict[
+        tuple[NormalizedName, RequirementType, NormalizedName], set[EdgeEnd]
+    ] = {}
+    for node in graph.get_all_nodes():
+        parent_version = "" if node.key == ROOT else str(node.version)
+        for edge in node.children:
+            child = edge.destination_node
+            edges.setdefault(
+                (node.canonicalized_name, edge.req_type, child.canonicalized_name),
+                set(),
+            ).add(EdgeEnd(parent_version, edge.to_dict()["req"], str(child.version)))
+    return edges
+
+
+def _node_changes(
+    old: DependencyNode, new: DependencyNode
+) -> dict[str, tuple[typing.Any, typing.Any]]:
+    changes: dict[str, tuple[typing.Any, typing.Any]] = {}
+    if old.version != new.version:
+        changes["version"] = (str(old.version), str(new.version))
+    new_attrs = _node_attributes(new)
+    for field, old_value in _node_attributes(old).items():
+        if old_value != new_attrs[field]:
+            changes[field] = (old_value, new_attrs[field])
+    return changes
+
+
+def diff_graphs(old_graph: DependencyGraph, new_graph: DependencyGraph) -> GraphDiff:
+    """Compute the differences between two graphs
+
+    A package with one version in each graph is changed when the version
+    or one of its attributes differ. Packages with several versions are
+    aligned by version, the remaining versions are added or removed.
+    Changes of the new graph are attributed to the top-level requirements
+    of the new graph, removed packages to the ones of the old graph.
+    """
+    old_nodes = _nodes_by_name(old_graph)
+    new_nodes = _nodes_by_name(new_graph)
+    old_toplevel = _TopLevelIndex(old_graph)
+    new_toplevel = _TopLevelIndex(new_graph)
+
+    node_changes: list[NodeChange] = []
+    for name in sorted(old_nodes.keys() | new_nodes.keys()):
+        old_versions = old_nodes.get(name, {})
+        new_versions = new_nodes.get(name, {})
+        pairs: list[tuple[DependencyNode | None, DependencyNode | None]] = [
+            (old_versions[version], new_versions[version])
+            for version in sorted(old_versions.keys() & new_versions.keys())
+        ]
+        removed = sorted(old_versions.keys() - new_versions.keys())
+        added = sorted(new_versions.keys() - old_versions.keys())
+        if len(removed) == 1 and len(added) == 1:
+            # a new version of the package
+            pairs.append((old_versions[removed[0]], new_versions[added[0]]))
+        else:
+            pairs.extend((old_versions[version], None) for version in removed)
+            pairs.extend((None, new_versions[version]) for version in added)
+        for old, new in pairs:
+            changes = {}
+            if new is None:
+                assert old is not None
+                toplevel = old_toplevel(old)
+            else:
+                if old is not None:
+                    changes = _node_changes(old, new)
+                    if not changes:
+                        continue
+                toplevel = new_toplevel(new)
+            node_changes.append(
+                NodeChange(
+                    name=name,
+                    old_version=old.version if old is not None else None,
+                    new_version=new.version if new is not None else None,
+                    changes=changes,
+                    toplevel=toplevel,
+                )
+            )
+
+    old_edges = _edges_by_name(old_graph)
+    new_edges = _edges_by_name(new_graph)
+    edge_changes: list[EdgeChange] = []
+    for key in sorted(old_edges.keys() | new_edges.keys()):
+        old_ends = old_edges.get(key, set())
+        new_ends = new_edges.get(key, set())
+        if old_ends != new_ends:
+            parent, req_type, child = key
+            edge_changes.append(
+                EdgeChange(
+                    parent=parent,
+                    req_type=req_type,
+                    child=child,
+                    old=sorted(old_ends),
+                    new=sorted(new_ends),
+                )
+            )
+    return GraphDiff(nodes=node_changes, edges=edge_changes)
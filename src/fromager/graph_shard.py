@@ -0,0 +1,168 @@
+"""Partition a build topology into shards for several build hosts
+
+Every host builds one shard against a shared wheel server. A shard gets
+packages that no other package needs to build (targets) together with
+their build dependencies, so most builds find their build environment on
+the same host. Targets are assigned by predicted build time, largest
+first, to the shard that ends up with the least work. Build dependencies
+that several shards need are duplicated when they are cheap to build.
+Expensive ones are built once by the shard with the least work and
+published, the other shards wait for the wheel on the wheel server.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import math
+import typing
+from datetime import timedelta
+
+from .build_simulator import BuildTask
+from .dependency_graph import DependencyNode
+
+#: shared build dependencies with a shorter predicted build time in seconds
+#: are built by every shard that needs them
+DEFAULT_DUPLICATE_BELOW: typing.Final = 120.0
+
+
+@dataclasses.dataclass(frozen=True)
+class Shard:
+    index: int
+    """1-based index of the shard"""
+    build: frozenset[DependencyNode]
+    """Packages that the shard builds"""
+    external: frozenset[DependencyNode]
+    """Packages that other shards build and publish"""
+    work: float
+    """Predicted total build time in seconds"""
+
+
+@dataclasses.dataclass(frozen=True)
+class ShardPlan:
+    shards: list[Shard]
+    duplicated: frozenset[DependencyNode]
+    """Packages that several shards build"""
+    published: dict[DependencyNode, int]
+    """Shared packages that one shard builds, mapped to its index"""
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            "shards": [
+                {
+                    "index": shard.index,
+                    "work": shard.work,
+                    "build": sorted(node.key for node in shard.build),
+                    "external": sorted(node.key for node in shard.external),
+                }
+                for shard in self.shards
+            ],
+            "duplicated": sorted(node.key for node in self.duplicated),
+            "published": {
+                node.key: index
+                for node, index in sorted(self.published.items(), key=lambda i: i[0])
+            },
+        }
+
+    def summary(self) -> str:
+        lines = []
+        for shard in self.shards:
+            lines.append(
+                f"shard {shard.index}/{len(self.shards)}: "
+                f"{len(shard.build)} builds, "
+                f"{timedelta(seconds=round(shard.work))} predicted, "
+                f"waits for {len(shard.external)} packages"
+            )
+        lines.append(f"{len(self.duplicated)} packages are built by several shards")
+        lines.append(f"{len(self.published)} packages are built once and published")
+        return "\n".join(lines)
+
+
+def plan_shards(
+    tasks: typing.Iterable[BuildTask],
+    shards: int,
+    duplicate_below: float = DEFAULT_DUPLICATE_BELOW,
+) -> ShardPlan:
+    """Partition build tasks into *shards* shards
+
+    A target is assigned together with the transitive closure of its
+    predecessors, so build dependencies of build dependencies end up in the
+    same shard. The plan only depends on the tasks, so all hosts compute
+    the same plan.
+    """
+    if shards < 1:
+        raise ValueError("at least one shard is required")
+    by_node = {task.node: task for task in tasks}
+    needed_by_others: set[DependencyNode] = set()
+    for task in by_node.values():
+        needed_by_others.update(task.predecessors)
+
+    def cost(nodes: typing.Iterable[DependencyNode]) -> float:
+        # fsum does not depend on the iteration order of sets
+        return math.fsum(by_node[node].duration for node in nodes)
+
+    def closure(target: DependencyNode) -> set[DependencyNode]:
+        # the predecessors of a task only cover the build dependencies of
+        # the task, not the build dependencies of its build dependencies
+        nodes = {target}
+        pending = [target]
+        while pending:
+            for predecessor in by_node[pending.pop()].predecessors:
+                if predecessor not in nodes:
+                    nodes.add(predecessor)
+                    pending.append(predecessor)
+        return nodes
+
+    # assign targets with their build closure, largest first
+    targets = [node for node in by_node if node not in needed_by_others]
+    closures = {target: closure(target) for target in targets}
+    targets.sort(key=lambda n: (-cost(closures[n]), n))
+    needed: list[set[DependencyNode]] = [set() for _ in range(shards)]
+    load = [0.0] * shards
+    for target in targets:
+        added = [cost(closures[target].difference(nodes)) for nodes in needed]
+        best = min(range(shards), key=lambda i: (load[i] + added[i], i))
+        needed[best].update(closures[target])
+        load[best] += added[best]
+
+    # expensive shared dependencies are built by one shard
+    sharing: dict[DependencyNode, list[int]] = {}
+    for index, nodes in enumerate(needed):
+        for node in nodes:
+            sharing.setdefault(node, []).append(index)
+    shared = sorted(
+        (node for node, indexes in sharing.items() if len(indexes) > 1),
+        key=lambda n: (-by_node[n].duration, n),
+    )
+    published: dict[DependencyNode, int] = {}
+    duplicated: set[DependencyNode] = set()
+    for node in shared:
+        indexes = sharing[node]
+        duration = by_node[node].duration
+        if duration < duplicate_below:
+            duplicated.add(node)
+            continue
+        owner = min(indexes, key=lambda i: (load[i], i))
+        published[node] = owner
+        for index in indexes:
+            if index != owner:
+                load[index] -= duration
+
+    result: list[Shard] = []
+    for index, nodes in enumerate(needed):
+        external = {node for node in nodes if published.get(node, index) != index}
+        build = nodes.difference(external)
+        # a shard can build all its packages once the external ones are published
+        assert all(by_node[node].predecessors <= nodes for node in build), index
+        result.append(
+            Shard(
+                index=index + 1,
+                build=frozenset(build),
+                external=frozenset(external),
+                work=cost(build),
+            )
+        )
+    return ShardPlan(
+        shards=result,
+        duplicated=frozenset(duplicated),
+        published={node: owner + 1 for node, owner in published.items()},
+    )
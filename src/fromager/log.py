@@ -1,6 +1,9 @@
 import contextlib
 import contextvars
 import logging
+import pathlib
+import queue
+import sys
 import threading
 import typing
 
@@ -88,3 +91,117 @@ class ThreadLogFilter(logging.Filter):
 
     def filter(self, record: logging.LogRecord) -> bool:
         return threading.current_thread().name == self._thread_name
+
+
+class _LogFile:
+    """Log file of a build, written by the writer thread of the handler"""
+
+    def __init__(self, filename: pathlib.Path) -> None:
+        self.filename = filename
+        self.stream = open(filename, "a", encoding="utf-8")
+
+
+_log_file_ctxvar: contextvars.ContextVar[_LogFile | None] = contextvars.ContextVar(
+    "log_file", default=None
+)
+
+
+class BuildLogHandler(logging.Handler):
+    """Route log records to the log file of the current context
+
+    One handler on the root logger serves all concurrent builds. The log
+    file of a build is stored in a context var, so routing a record costs
+    one context var lookup no matter how many builds run in parallel.
+    Records are formatted in the logging thread, because the message prefix
+    depends on the context, and are written by a background thread.
+
+    Use :func:`log_to_file` to route the records of a context to a file.
+    """
+
+    def __init__(self, fmt: str = VERBOSE_LOG_FMT) -> None:
+        super().__init__()
+        self.setFormatter(logging.Formatter(fmt))
+        self._queue: queue.SimpleQueue[
+            tuple[_LogFile, str | None, threading.Event | None]
+        ] = queue.SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._write, name="build-log-writer", daemon=True
+        )
+        self._writer.start()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # skip the handler lock, emit() only enqueues the formatted record
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return bool(rv)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        log_file = _log_file_ctxvar.get()
+        if log_file is None:
+            return
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+        else:
+            self._queue.put((log_file, msg + "\n", None))
+
+    @contextlib.contextmanager
+    def open(self, filename: pathlib.Path) -> typing.Generator[None, None, None]:
+        """Route records of the current context to *filename*
+
+        All records are written when the context exits.
+        """
+        log_file = _LogFile(filename)
+        token = _log_file_ctxvar.set(log_file)
+        try:
+            yield
+        finally:
+            _log_file_ctxvar.reset(token)
+            closed = threading.Event()
+            self._queue.put((log_file, None, closed))
+            closed.wait()
+
+    def _write(self) -> None:
+        while True:
+            log_file, text, closed = self._queue.get()
+            try:
+                if text is not None:
+                    log_file.stream.write(text)
+                else:
+                    log_file.stream.close()
+            except Exception as err:
+                print(
+                    f"failed to write log file {log_file.filename}: {err}",
+                    file=sys.stderr,
+                )
+            finally:
+                if closed is not None:
+                    closed.set()
+
+
+_build_log_handler: BuildLogHandler | None = None
+_build_log_handler_lock = threading.Lock()
+
+
+def get_build_log_handler() -> BuildLogHandler:
+    """Get the build log handler, add it to the root logger on first use"""
+    global _build_log_handler
+    with _build_log_handler_lock:
+        if _build_log_handler is None:
+            _build_log_handler = BuildLogHandler()
+            logging.getLogger(None).addHandler(_build_log_handler)
+        return _build_log_handler
+
+
+@contextlib.contextmanager
+def log_to_file(filename: pathlib.Path) -> typing.Generator[None, None, None]:
+    """Log all records of the current context to *filename*
+
+    Parallel builds log to their own files through one shared handler.
+    """
+    with get_build_log_handler().open(filename):
+        yield
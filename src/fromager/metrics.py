@@ -7,7 +7,7 @@ from datetime import timedelta
 from packaging.requirements import Requirement
 from packaging.version import Version
 
-from . import context
+from . import build_retry, context, resource_usage
 
 
 def timeit(description: str) -> typing.Callable:
@@ -22,7 +22,8 @@ def timeit(description: str) -> typing.Callable:
             ctx.time_description_store[func.__name__] = description
 
             start = time.perf_counter()
-            ret = func(ctx=ctx, req=req, **kwargs)
+            with resource_usage.collect() as usages:
+                ret = func(ctx=ctx, req=req, **kwargs)
             end = time.perf_counter()
             # get the logger for the module from which this function was called
             logger = logging.getLogger(func.__module__)
@@ -51,6 +52,13 @@ def timeit(description: str) -> typing.Callable:
                     ctx.time_store[f"{req.name}=={version}"].get(func.__name__, 0)
                     + runtime
                 )
+                if usages:
+                    # resource usage of external commands run by the function
+                    usage_store = ctx.resource_usage_store[f"{req.name}=={version}"]
+                    usage_store[func.__name__] = resource_usage.total(
+                        [usage_store.get(func.__name__, resource_usage.ResourceUsage())]
+                        + usages
+                    )
 
             return ret
 
@@ -64,9 +72,31 @@ def summarize(ctx: context.WorkContext, prefix: str) -> None:
     for req in sorted(ctx.time_store.keys()):
         total_time = sum(ctx.time_store[req].values())
         log = f"{prefix} {req} took {timedelta(seconds=round(total_time))} total"
+        usages = ctx.resource_usage_store.get(req, {})
         for fn_name, time_taken in ctx.time_store[req].items():
             log += f", {timedelta(seconds=round(time_taken))} to {ctx.time_description_store[fn_name]}"
+            usage = usages.get(fn_name)
+            if usage is not None:
+                log += f" ({usage.format()})"
+        failure_classes = ctx.retry_store.get(req)
+        if failure_classes:
+            log += f", retried {len(failure_classes)} time(s) ({', '.join(failure_classes)})"
         logger.info(log)
+    retries = build_retry.format_retries(ctx)
+    if retries:
+        logger.info(f"{prefix} {retries}")
+    if ctx.network_sandboxes is not None:
+        logger.info(f"{prefix} {ctx.network_sandboxes.format()}")
+
+
+def get_resource_usage(
+    ctx: context.WorkContext, key: str
+) -> resource_usage.ResourceUsage | None:
+    """Total resource usage of external commands for ``name==version``"""
+    usages = ctx.resource_usage_store.get(key)
+    if not usages:
+        return None
+    return resource_usage.total(usages.values())
 
 
 def _extract_version_from_return(ret: typing.Any) -> Version | None:
@@ -0,0 +1,128 @@
+"""Persistent network-isolated sandboxes for worker threads
+
+By default, :func:`fromager.external_commands.run` creates a new network
+namespace for every command that runs with network isolation. A build runs
+dozens of commands. With persistent sandboxes, every worker thread creates
+one namespace on first use and runs its commands inside the namespace with
+``nsenter``. A holder process keeps the namespace alive. It exits when
+fromager closes the sandbox or exits.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+# holder process, the namespace lives as long as its stdin is open
+_HOLDER_CMD: typing.Final = ["sh", "-c", "echo ready; exec cat >/dev/null"]
+
+
+class NetworkSandbox:
+    """A network namespace that runs many commands"""
+
+    def __init__(self, isolation_cmd: typing.Sequence[str]) -> None:
+        start = time.monotonic()
+        self._holder = subprocess.Popen(
+            [*isolation_cmd, *_HOLDER_CMD],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        assert self._holder.stdout is not None
+        ready = self._holder.stdout.readline()
+        if ready != b"ready\n":
+            _, stderr = self._holder.communicate()
+            raise RuntimeError(
+                f"failed to create network sandbox: {stderr.decode(errors='replace')}"
+            )
+        self.setup_time = time.monotonic() - start
+
+    @property
+    def pid(self) -> int:
+        return self._holder.pid
+
+    def command_prefix(self) -> list[str]:
+        """Command prefix to run a command inside the sandbox"""
+        # The user namespace maps the current user to root. Entering it with
+        # the current credentials makes the command root in the namespace.
+        return [
+            "nsenter",
+            f"--target={self.pid}",
+            "--user",
+            "--net",
+            "--uts",
+            "--preserve-credentials",
+        ]
+
+    def close(self) -> None:
+        if self._holder.poll() is not None:
+            return
+        assert self._holder.stdin is not None
+        self._holder.stdin.close()
+        try:
+            self._holder.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._holder.kill()
+            self._holder.wait()
+
+
+class SandboxPool:
+    """One network sandbox per worker thread
+
+    Sandboxes are created when a thread runs its first isolated command and
+    are reused for all later commands of the thread.
+    """
+
+    def __init__(self, isolation_cmd: typing.Sequence[str]) -> None:
+        self._isolation_cmd = list(isolation_cmd)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sandboxes: list[NetworkSandbox] = []
+
+    def get(self) -> NetworkSandbox:
+        """Get the sandbox of the current thread"""
+        sandbox: NetworkSandbox | None = getattr(self._local, "sandbox", None)
+        if sandbox is None:
+            sandbox = NetworkSandbox(self._isolation_cmd)
+            logger.debug(
+                "created network sandbox %d for thread %s in %.3fs",
+                sandbox.pid,
+                threading.current_thread().name,
+                sandbox.setup_time,
+            )
+            self._local.sandbox = sandbox
+            with self._lock:
+                self._sandboxes.append(sandbox)
+        return sandbox
+
+    def command_prefix(self) -> list[str]:
+        """Command prefix to run a command in the sandbox of the thread"""
+        return self.get().command_prefix()
+
+    @property
+    def setup_time(self) -> float:
+        """Total time spent on creating sandboxes"""
+        with self._lock:
+            return sum(sandbox.setup_time for sandbox in self._sandboxes)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sandboxes)
+
+    def format(self) -> str:
+        """Format sandbox statistics for a summary"""
+        return f"created {len(self)} network sandbox(es) in {self.setup_time:.2f}s"
+
+    def close(self) -> None:
+        """Stop all sandboxes"""
+        with self._lock:
+            sandboxes = self._sandboxes
+            self._sandboxes = []
+        for sandbox in sandboxes:
+            sandbox.close()
+        self._local = threading.local()
@@ -3,6 +3,8 @@
 from ._hooks import default_update_extra_environ, get_extra_environ
 from ._models import (
     BuildOptions,
+    BuildRetries,
+    BuildRetryPolicy,
     DownloadSource,
     ExternalCommands,
     GitOptions,
@@ -53,6 +55,8 @@ __all__ = (
     "Annotations",
     "BuildDirectory",
     "BuildOptions",
+    "BuildRetries",
+    "BuildRetryPolicy",
     "BuildSDist",
     "DownloadKind",
     "DownloadSource",
@@ -371,6 +371,10 @@ class BuildOptions(pydantic.BaseModel):
         build_ext_parallel: False  # DEPRECATED: ignored, will be removed
         cpu_cores_per_job: 1
         memory_per_job_gb: 1.0
+        resource_classes:
+          - huge-memory
+        build_timeout_minutes: 120
+        output_timeout_minutes: 30
     """
 
     model_config = MODEL_CONFIG
@@ -405,6 +409,170 @@ class BuildOptions(pydantic.BaseModel):
     exclusive_build: bool = False
     """If true, this package must be built on its own (not in parallel with other packages). Default: False."""
 
+    resource_classes: list[str] = Field(default_factory=list)
+    """Resource classes used by the build of this package
+
+    The global ``resource_classes`` setting defines how many builds can use
+    a class at the same time. Classes without a capacity allow one build.
+    Unlike ``exclusive_build``, builds without a shared class still run in
+    parallel.
+
+    .. versionadded:: 0.93.0
+    """
+
+    build_timeout_minutes: float | None = Field(default=None, gt=0.0)
+    """Kill the wheel build when it runs longer (wall-clock time)
+
+    .. versionadded:: 0.93.0
+    """
+
+    output_timeout_minutes: float | None = Field(default=None, gt=0.0)
+    """Kill the wheel build when a command produces no output for this long
+
+    .. versionadded:: 0.93.0
+    """
+
+
+class BuildRetryPolicy(pydantic.BaseModel):
+    """Failure class of wheel builds and its retry policy
+
+    A failed build belongs to the failure class when the exit code of the
+    build command is in ``exit_codes`` or its output matches one of the
+    regular expressions in ``patterns``. Builds that were killed because
+    they exceeded their ``build_timeout_minutes`` or
+    ``output_timeout_minutes`` only belong to classes with ``timeout``.
+
+    ::
+
+      name: oom
+      exit_codes: [-9, 137]
+      patterns:
+        - "Killed signal terminated program"
+      retries: 1
+      reduce_parallel_jobs: 0.5
+
+    .. versionadded:: 0.93.0
+    """
+
+    model_config = MODEL_CONFIG
+
+    name: str
+    """Name of the failure class, used in logs and statistics"""
+
+    exit_codes: list[int] = Field(default_factory=list)
+    """Exit codes of the build command, negative values are signals"""
+
+    patterns: list[str] = Field(default_factory=list)
+    """Regular expressions that are searched in the build output"""
+
+    retries: int = Field(default=1, ge=0)
+    """Number of retries before the build fails"""
+
+    backoff: float = Field(default=0.0, ge=0.0)
+    """Seconds to wait before the first retry, doubled for every retry"""
+
+    reduce_parallel_jobs: float | None = Field(default=None, gt=0.0, lt=1.0)
+    """Multiply the number of parallel jobs by this factor for the retry
+
+    Useful for builds that were killed by the out-of-memory killer.
+    """
+
+    timeout: bool = False
+    """The class matches builds that were killed by the hung-build watchdog"""
+
+    @pydantic.field_validator("patterns")
+    @classmethod
+    def validate_patterns(cls, patterns: list[str]) -> list[str]:
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as err:
+                raise ValueError(f"invalid pattern {pattern!r}: {err}") from err
+        return patterns
+
+    def matches(self, returncode: int, output: str, *, timed_out: bool = False) -> bool:
+        """Does a failed build belong to this failure class?"""
+        if self.timeout or timed_out:
+            return self.timeout and timed_out
+        if returncode in self.exit_codes:
+            return True
+        return any(re.search(pattern, output) for pattern in self.patterns)
+
+
+def _default_build_retry_policies() -> list[BuildRetryPolicy]:
+    return [
+        BuildRetryPolicy(
+            name="timeout",
+            timeout=True,
+            retries=0,
+        ),
+        BuildRetryPolicy(
+            name="oom",
+            exit_codes=[-9, 137],
+            patterns=[
+                r"Killed signal terminated program",
+                r"internal compiler error: Killed",
+                r"Cannot allocate memory",
+                r"\bMemoryError\b",
+            ],
+            retries=1,
+            reduce_parallel_jobs=0.5,
+        ),
+        BuildRetryPolicy(
+            name="network",
+            patterns=[
+                r"Temporary failure in name resolution",
+                r"Connection reset by peer",
+                r"Connection timed out",
+                r"Read timed out",
+                r"Could not resolve host",
+                r"RemoteDisconnected",
+                r"\b50[234] (Bad Gateway|Service Unavailable|Gateway Time-?out)\b",
+            ],
+            retries=2,
+            backoff=10.0,
+        ),
+    ]
+
+
+class BuildRetries(pydantic.BaseModel):
+    """Automatic retries of transient wheel build failures
+
+    Failed builds are classified by the first matching failure class.
+    Builds that fail with an unknown class or because of network isolation
+    are not retried. The default classes retry builds that were killed by
+    the out-of-memory killer with half the parallel jobs and builds with
+    network errors. Hung builds are classified as ``timeout`` and are not
+    retried by default.
+
+    ::
+
+      build_retries:
+        failure_classes:
+          - name: flaky-tests
+            patterns:
+              - "FAILED tests/test_timing.py"
+            retries: 2
+
+    .. versionadded:: 0.93.0
+    """
+
+    model_config = MODEL_CONFIG
+
+    failure_classes: list[BuildRetryPolicy] = Field(
+        default_factory=_default_build_retry_policies
+    )
+    """Failure classes and their retry policies, first match wins"""
+
+    def classify(
+        self, returncode: int, output: str, *, timed_out: bool = False
+    ) -> BuildRetryPolicy | None:
+        """Get the failure class of a failed build"""
+        for policy in self.failure_classes:
+            if policy.matches(returncode, output, timed_out=timed_out):
+                return policy
+        return None
+
 
 class ProjectOverride(pydantic.BaseModel):
     """Override pyproject.toml settings
@@ -492,6 +660,7 @@ class GitOptions(pydantic.BaseModel):
 
         submodules: False
         submodule_paths: []
+        sparse_checkout: []
     """
 
     model_config = MODEL_CONFIG
@@ -512,8 +681,39 @@ class GitOptions(pydantic.BaseModel):
     Examples:
     - ["third-party/openssl"]
     - ["vendor/lib1", "vendor/lib2"]
+
+    Resolvers with a ``git_checkout`` download kind clone all submodules
+    by default. For them, the list acts as an allowlist.
+    """
+
+    sparse_checkout: list[str] = Field(default_factory=list)
+    """Sparse checkout directories (cone mode)
+
+    If provided, only files in the top-level directory and in the listed
+    directories are materialized in the working tree. This is useful for
+    packages that live in a subdirectory of a large monorepo. The list must
+    include the package's ``build_dir`` and everything the build needs.
+    Submodules outside of the sparse checkout are not initialized.
+
+    Examples:
+    - ["python/mypackage"]
+    - ["python/mypackage", "proto"]
+
+    .. versionadded:: 0.93.0
     """
 
+    @pydantic.field_validator("sparse_checkout", mode="after")
+    @classmethod
+    def validate_sparse_checkout(cls, value: list[str]) -> list[str]:
+        for path in value:
+            p = pathlib.PurePosixPath(path)
+            if not path or p.is_absolute() or ".." in p.parts:
+                raise ValueError(
+                    f"sparse checkout path {path!r} must be a relative path "
+                    "inside the repository"
+                )
+        return value
+
 
 _DictStrAny = dict[str, typing.Any]
 
@@ -47,6 +47,7 @@ class PackageBuildInfo:
         self._patches_dir = settings.patches_dir
         self._variant_changelog = settings.variant_changelog()
         self._max_jobs: int | None = settings.max_jobs
+        self._parallel_jobs_limit: int | None = None
         self._ps = ps
         self._plugin_module: types.ModuleType | typing.Literal[False] | None = False
         self._patches: PatchMap | None = None
@@ -387,6 +388,9 @@ class PackageBuildInfo:
         # limit by smallest amount of CPU, memory, and --jobs parameter
         max_jobs = cpu_count if self._max_jobs is None else self._max_jobs
         parallel_builds = min(max_num_job_cores, max_num_jobs_memory, max_jobs)
+        if self._parallel_jobs_limit is not None:
+            # reduced after a failed build, see limit_parallel_jobs()
+            parallel_builds = min(parallel_builds, self._parallel_jobs_limit)
 
         logger.debug(
             f"{self.package}: parallel builds {parallel_builds=} "
@@ -395,6 +399,13 @@ class PackageBuildInfo:
 
         return parallel_builds
 
+    def limit_parallel_jobs(self, jobs: int) -> None:
+        """Limit parallel jobs for the rest of the run, e.g. after an OOM kill
+
+        .. versionadded:: 0.93.0
+        """
+        self._parallel_jobs_limit = max(1, jobs)
+
     @property
     def build_ext_parallel(self) -> bool:
         """Configure [build_ext]parallel for setuptools?"""
@@ -417,6 +428,32 @@ class PackageBuildInfo:
     def exclusive_build(self) -> bool:
         return self._ps.build_options.exclusive_build
 
+    @property
+    def resource_classes(self) -> frozenset[str]:
+        """Resource classes used by the build
+
+        .. versionadded:: 0.93.0
+        """
+        return frozenset(self._ps.build_options.resource_classes)
+
+    @property
+    def build_timeout(self) -> float | None:
+        """Wall-clock timeout of the wheel build in seconds
+
+        .. versionadded:: 0.93.0
+        """
+        minutes = self._ps.build_options.build_timeout_minutes
+        return minutes * 60 if minutes is not None else None
+
+    @property
+    def output_timeout(self) -> float | None:
+        """Seconds a build command may run without producing output
+
+        .. versionadded:: 0.93.0
+        """
+        minutes = self._ps.build_options.output_timeout_minutes
+        return minutes * 60 if minutes is not None else None
+
     @property
     def variants(self) -> Mapping[Variant, VariantInfo]:
         """Get the variant configuration for the current package"""
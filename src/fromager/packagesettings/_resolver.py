@@ -136,9 +136,12 @@ class AbstractResolver(pydantic.BaseModel):
                     / f"{req.name}-{candidate.version}"
                     / f"{req.name}-{candidate.version}"
                 )
+                git_options = ctx.package_build_info(req).git_options
                 path = downloads.download_git_source(
                     destination_dir=destination_dir,
                     vcs_url=candidate.url,
+                    sparse_checkout=git_options.sparse_checkout,
+                    submodule_paths=git_options.submodule_paths,
                 )
             case _:  # includes any_source and not_available
                 typing.assert_never(download_kind)  # type: ignore[arg-type]
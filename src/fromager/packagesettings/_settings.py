@@ -13,7 +13,7 @@ from packaging.utils import canonicalize_name
 from pydantic import Field
 
 from .. import overrides
-from ._models import ExternalCommands, PackageSettings, SbomSettings
+from ._models import BuildRetries, ExternalCommands, PackageSettings, SbomSettings
 from ._pbi import PackageBuildInfo
 from ._typedefs import MODEL_CONFIG, GlobalChangelog, Package, Variant
 
@@ -55,6 +55,28 @@ class SettingsFile(pydantic.BaseModel):
     .. versionadded:: 0.92.0
     """
 
+    resource_classes: dict[str, pydantic.PositiveInt] = Field(default_factory=dict)
+    """Capacities of resource classes
+
+    Maximum number of builds that use a resource class at the same time,
+    see ``build_options.resource_classes`` of the package settings.
+
+    ::
+
+      resource_classes:
+        huge-memory: 1
+        rust-link: 2
+        disk-io: 4
+
+    .. versionadded:: 0.93.0
+    """
+
+    build_retries: BuildRetries = Field(default_factory=BuildRetries)
+    """Retry policies for transient wheel build failures
+
+    .. versionadded:: 0.93.0
+    """
+
     @classmethod
     def from_string(
         cls,
@@ -193,6 +215,22 @@ class Settings:
         """
         return self._settings.external_commands
 
+    @property
+    def resource_classes(self) -> dict[str, int]:
+        """Get capacities of resource classes.
+
+        .. versionadded:: 0.93.0
+        """
+        return dict(self._settings.resource_classes)
+
+    @property
+    def build_retries(self) -> BuildRetries:
+        """Get retry policies for failed wheel builds.
+
+        .. versionadded:: 0.93.0
+        """
+        return self._settings.build_retries
+
     def variant_changelog(self) -> list[str]:
         """Get global changelog for current variant"""
         return list(self._settings.changelog.get(self.variant, []))
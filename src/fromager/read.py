@@ -25,3 +25,23 @@ def open_file_or_url(
     else:
         with open(location, "r") as f:
             yield f
+
+
+@contextmanager
+def open_binary_file_or_url(
+    path_or_url: str | pathlib.Path,
+) -> typing.Generator[typing.BinaryIO, typing.Any, None]:
+    location = str(path_or_url)
+    if location.startswith("file://"):
+        location = urlparse(location).path
+
+    if location.startswith(("https://", "http://")):
+        try:
+            response = session.get(location)
+            response.raise_for_status()
+            yield io.BytesIO(response.content)
+        except Exception as e:
+            raise OSError(f"Failed to read from URL {location}: {e}") from e
+    else:
+        with open(location, "rb") as f:
+            yield f
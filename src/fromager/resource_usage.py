@@ -0,0 +1,109 @@
+"""Resource usage of external commands
+
+:func:`fromager.external_commands.run` measures the CPU time, peak memory,
+and block I/O of every command with ``wait4()``. The measurements are
+collected by the innermost :func:`collect` context of the current thread,
+e.g. by :func:`fromager.metrics.timeit`, which attributes them to a
+package, version, and build step.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import resource
+import sys
+import typing
+
+# ru_maxrss is in KiB on Linux and in bytes on macOS
+_MAXRSS_FACTOR: typing.Final = 1 if sys.platform == "darwin" else 1024
+# ru_inblock and ru_oublock count 512 byte blocks
+BLOCK_SIZE: typing.Final = 512
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ResourceUsage:
+    """CPU time, peak memory, and block I/O of one or more processes"""
+
+    user_time: float = 0.0
+    system_time: float = 0.0
+    max_rss: int = 0
+    """Largest resident set size of any process in bytes"""
+    read_blocks: int = 0
+    write_blocks: int = 0
+
+    @classmethod
+    def from_rusage(cls, ru: resource.struct_rusage) -> ResourceUsage:
+        return cls(
+            user_time=ru.ru_utime,
+            system_time=ru.ru_stime,
+            max_rss=ru.ru_maxrss * _MAXRSS_FACTOR,
+            read_blocks=ru.ru_inblock,
+            write_blocks=ru.ru_oublock,
+        )
+
+    def __add__(self, other: ResourceUsage) -> ResourceUsage:
+        # processes run one after another, peak memory is the largest peak
+        return ResourceUsage(
+            user_time=self.user_time + other.user_time,
+            system_time=self.system_time + other.system_time,
+            max_rss=max(self.max_rss, other.max_rss),
+            read_blocks=self.read_blocks + other.read_blocks,
+            write_blocks=self.write_blocks + other.write_blocks,
+        )
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.system_time
+
+    @property
+    def read_bytes(self) -> int:
+        return self.read_blocks * BLOCK_SIZE
+
+    @property
+    def write_bytes(self) -> int:
+        return self.write_blocks * BLOCK_SIZE
+
+    def format(self) -> str:
+        return (
+            f"{self.user_time:.0f}s user + {self.system_time:.0f}s sys CPU, "
+            f"max RSS {format_bytes(self.max_rss)}, "
+            f"I/O {format_bytes(self.read_bytes)} read / "
+            f"{format_bytes(self.write_bytes)} written"
+        )
+
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+_collector: contextvars.ContextVar[list[ResourceUsage] | None] = contextvars.ContextVar(
+    "resource_usage_collector", default=None
+)
+
+
+@contextlib.contextmanager
+def collect() -> typing.Generator[list[ResourceUsage], None, None]:
+    """Collect resource usage of external commands in the current context"""
+    usages: list[ResourceUsage] = []
+    token = _collector.set(usages)
+    try:
+        yield usages
+    finally:
+        _collector.reset(token)
+
+
+def record(usage: ResourceUsage) -> None:
+    """Add resource usage of a command to the active collector"""
+    usages = _collector.get()
+    if usages is not None:
+        usages.append(usage)
+
+
+def total(usages: typing.Iterable[ResourceUsage]) -> ResourceUsage:
+    return sum(usages, ResourceUsage())
@@ -0,0 +1,82 @@
+"""Resource classes limit how many builds use a resource at the same time
+
+Package settings declare the resource classes a build uses, e.g.
+``huge-memory`` or ``rust-link``. The global settings define the capacity
+of each class. A build starts only when all of its classes have a free
+slot, so heavy builds can run next to light builds instead of alone.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import logging
+import threading
+import typing
+
+logger = logging.getLogger(__name__)
+
+#: capacity of resource classes that are not defined in the settings
+DEFAULT_CAPACITY: typing.Final = 1
+
+
+class ResourcePool:
+    """Thread-safe counters for resource classes with capacities"""
+
+    def __init__(self, capacities: typing.Mapping[str, int] | None = None) -> None:
+        self._capacities: dict[str, int] = dict(capacities or {})
+        self._in_use: collections.Counter[str] = collections.Counter()
+        self._cond = threading.Condition()
+
+    def capacity(self, name: str) -> int:
+        """Capacity of a resource class"""
+        return self._capacities.get(name, DEFAULT_CAPACITY)
+
+    def in_use(self) -> dict[str, int]:
+        """Used slots of all resource classes"""
+        with self._cond:
+            return {name: count for name, count in self._in_use.items() if count}
+
+    def _available(self, classes: typing.AbstractSet[str]) -> bool:
+        return all(self._in_use[name] < self.capacity(name) for name in classes)
+
+    def try_acquire(self, classes: typing.AbstractSet[str]) -> bool:
+        """Take a slot of all *classes*, return False when one is full"""
+        if not classes:
+            return True
+        with self._cond:
+            if not self._available(classes):
+                return False
+            self._in_use.update(classes)
+            return True
+
+    def acquire(self, classes: typing.AbstractSet[str]) -> None:
+        """Take a slot of all *classes*, wait until all are free"""
+        if not classes:
+            return
+        with self._cond:
+            if not self._available(classes):
+                logger.info(
+                    "waiting for resource classes %s", ", ".join(sorted(classes))
+                )
+                self._cond.wait_for(lambda: self._available(classes))
+            self._in_use.update(classes)
+
+    def release(self, classes: typing.AbstractSet[str]) -> None:
+        """Return the slots of *classes*"""
+        if not classes:
+            return
+        with self._cond:
+            self._in_use.subtract(classes)
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def hold(
+        self, classes: typing.AbstractSet[str]
+    ) -> typing.Generator[None, None, None]:
+        """Hold slots of *classes* while the context is active"""
+        self.acquire(classes)
+        try:
+            yield
+        finally:
+            self.release(classes)
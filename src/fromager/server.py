@@ -40,13 +40,14 @@ def run_wheel_server(
     ctx: context.WorkContext,
     address: str = "127.0.0.1",
     port: int = 0,
+    routes: typing.Sequence[Route] = (),
 ) -> tuple[uvicorn.Server, socket.socket, threading.Thread]:
     try:
         loop = asyncio.get_running_loop()
     except RuntimeError:
         loop = asyncio.new_event_loop()
 
-    app = make_app(ctx.wheel_server_dir)
+    app = make_app(ctx.wheel_server_dir, routes)
     server, sock, thread = _run_background_thread(
         loop=loop, app=app, host=address, port=port
     )
@@ -196,16 +197,20 @@ class SimpleHTMLIndex:
         return FileResponse(path, media_type=media_type, stat_result=stat_result)
 
 
-def make_app(basedir: pathlib.Path) -> Starlette:
-    """Create a Starlette app with routing"""
+def make_app(basedir: pathlib.Path, routes: typing.Sequence[Route] = ()) -> Starlette:
+    """Create a Starlette app with routing
+
+    *routes* are served next to the simple index.
+    """
     si = SimpleHTMLIndex(basedir)
-    routes: list[Route] = [
+    app_routes: list[Route] = [
         Route("/", endpoint=si.root),
         Route("/simple", endpoint=si.index_page),
         Route("/simple/{project:str}", endpoint=si.project_page),
         Route("/simple/{project:str}/{filename:str}", endpoint=si.server_file),
+        *routes,
     ]
-    return Starlette(routes=routes)
+    return Starlette(routes=app_routes)
 
 
 def _run_background_thread(
@@ -240,6 +240,7 @@ def download_git_source(
         output_dir=destination_dir,
         repo_url=url_to_clone,
         submodules=submodules,
+        sparse_checkout=git_opts.sparse_checkout,
         ref=ref,
     )
 
@@ -21,9 +21,13 @@ from packaging.utils import (
 from packaging.version import Version
 
 from . import (
+    build_cache,
+    build_retry,
+    cache_index,
     dependencies,
     downloads,
     external_commands,
+    fingerprint,
     metrics,
     overrides,
     packagesettings,
@@ -170,12 +174,14 @@ def add_extra_metadata_to_wheels(
     extra_environ: dict[str, str],
     sdist_root_dir: pathlib.Path,
     wheel_file: pathlib.Path,
+    build_fingerprint: fingerprint.BuildFingerprint | None = None,
 ) -> pathlib.Path:
     """Unpack a wheel, inject extra metadata, and repack with a build tag.
 
     Unpacks the wheel, validates dist-info, adds plugin metadata, build
-    settings, requirement files, ELF dependency info (Linux only), and
-    an SBOM. Repacks with ``wheel pack`` and deletes the original.
+    settings, build fingerprint, requirement files, ELF dependency info
+    (Linux only), and an SBOM. Repacks with ``wheel pack`` and deletes the
+    original.
     """
     pbi = ctx.package_build_info(req)
     dist_name, dist_version, _, wheel_tags = extract_info_from_wheel_file(
@@ -232,6 +238,9 @@ def add_extra_metadata_to_wheels(
         build_file = dist_info_dir / FROMAGER_BUILD_SETTINGS
         build_file.write_text(tomlkit.dumps(settings))
 
+        if build_fingerprint is not None:
+            fingerprint.write_fingerprint(dist_info_dir, build_fingerprint)
+
         req_files = sdist_root_dir.parent.glob("*-requirements.txt")
         for req_file in req_files:
             shutil.copy(
@@ -324,15 +333,16 @@ def build_wheel(
         f"writing to {ctx.wheels_build}"
     )
 
-    # add package and variant env vars, package's parallel job vars, and
-    # build_env's virtual env vars.
-    extra_environ = packagesettings.get_extra_environ(
+    # fingerprint the inputs before the build backend can modify the
+    # source tree or the build environment.
+    build_fingerprint = fingerprint.compute_build_env_fingerprint(
         ctx=ctx,
         req=req,
-        sdist_root_dir=sdist_root_dir,
         version=version,
+        sdist_root_dir=sdist_root_dir,
         build_env=build_env,
     )
+    logger.info("build fingerprint %s", build_fingerprint.digest)
 
     if pbi.build_ext_parallel:
         logger.warning(
@@ -342,17 +352,36 @@ def build_wheel(
             req.name,
         )
 
-    overrides.find_and_invoke(
-        req.name,
-        "build_wheel",
-        default_build_wheel,
-        ctx=ctx,
-        build_env=build_env,
-        extra_environ=extra_environ,
-        req=req,
-        version=version,
-        sdist_root_dir=sdist_root_dir,
-        build_dir=pbi.build_dir(sdist_root_dir),
+    def _invoke_build_wheel() -> dict[str, str]:
+        # add package and variant env vars, package's parallel job vars, and
+        # build_env's virtual env vars. Parallel jobs can change between
+        # attempts. Every attempt gets the full wall-clock timeout.
+        extra_environ = packagesettings.get_extra_environ(
+            ctx=ctx,
+            req=req,
+            sdist_root_dir=sdist_root_dir,
+            version=version,
+            build_env=build_env,
+        )
+        with external_commands.timeouts(
+            wall_clock=pbi.build_timeout, output=pbi.output_timeout
+        ):
+            overrides.find_and_invoke(
+                req.name,
+                "build_wheel",
+                default_build_wheel,
+                ctx=ctx,
+                build_env=build_env,
+                extra_environ=extra_environ,
+                req=req,
+                version=version,
+                sdist_root_dir=sdist_root_dir,
+                build_dir=pbi.build_dir(sdist_root_dir),
+            )
+        return extra_environ
+
+    extra_environ = build_retry.call_with_retries(
+        ctx=ctx, req=req, version=version, func=_invoke_build_wheel
     )
 
     wheels = list(ctx.wheels_build.glob("*.whl"))
@@ -377,6 +406,7 @@ def build_wheel(
         extra_environ=extra_environ,
         sdist_root_dir=sdist_root_dir,
         wheel_file=tmp_wheel_file,
+        build_fingerprint=build_fingerprint,
     )
     validate_wheel_filename(req=req, version=version, wheel_file=new_wheel_file)
 
@@ -385,6 +415,8 @@ def build_wheel(
     # without bumping the build tag.
     ctx.uv_clean_cache(req)
 
+    build_cache.upload_wheel(ctx, req, version, new_wheel_file)
+
     return new_wheel_file
 
 
@@ -538,6 +570,12 @@ def resolve_all_prebuilt_wheels(
             if ctx.wheel_server_url and url == ctx.wheel_server_url:
                 provider.supports_upload_time = False
 
+            # Answer from the prefetched index of a cache server, if there
+            # is one and the provider is not customized.
+            indexed = cache_index.lookup_for_provider(provider, url, req)
+            if indexed is not None:
+                return indexed
+
             # Get all matching candidates from provider
             results = resolver.find_all_matching_from_provider(provider, req)
             # find_all_matching_from_provider never returns empty list - raises instead
@@ -1,10 +1,15 @@
+import json
 import pathlib
 import typing
+import zipfile
 
 import pytest
 from click.testing import CliRunner
+from packaging.utils import canonicalize_name
+from packaging.version import Version
 
-from fromager import context, packagesettings
+from fromager import context, fingerprint, packagesettings
+from fromager.dependency_graph import DependencyNode
 from fromager.packagesettings import SbomSettings
 
 TESTDATA_PATH = pathlib.Path(__file__).parent.absolute() / "testdata"
@@ -81,6 +86,28 @@ def testdata_context(
     return ctx
 
 
+def mknode(name: str, version: str = "1.0", **kwargs: typing.Any) -> DependencyNode:
+    return DependencyNode(canonicalize_name(name), Version(version), **kwargs)
+
+
+def mkwheel(
+    directory: pathlib.Path, fp: fingerprint.BuildFingerprint | None
+) -> pathlib.Path:
+    """Create a minimal test-pkg 1.0.2 wheel with an optional build fingerprint"""
+    directory.mkdir(parents=True, exist_ok=True)
+    wheel_file = directory / "test_pkg-1.0.2-py3-none-any.whl"
+    dist_info = "test_pkg-1.0.2.dist-info"
+    with zipfile.ZipFile(wheel_file, "w") as zf:
+        zf.writestr(f"{dist_info}/METADATA", "Name: test-pkg\nVersion: 1.0.2\n")
+        zf.writestr(f"{dist_info}/RECORD", "")
+        if fp is not None:
+            zf.writestr(
+                f"{dist_info}/{fingerprint.FROMAGER_BUILD_FINGERPRINT}",
+                json.dumps(fp.to_dict()),
+            )
+    return wheel_file
+
+
 def make_sbom_ctx(
     tmp_path: pathlib.Path,
     sbom_settings: SbomSettings | None = None,
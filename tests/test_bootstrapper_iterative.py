@@ -420,7 +420,11 @@ class TestPhaseResolve:
         )
 
         def mock_cache(
-            ctx: object, cache_url: object, req: Requirement, version: Version
+            ctx: object,
+            cache_url: object,
+            req: Requirement,
+            version: Version,
+            source_url: str | None = None,
         ) -> tuple:
             if str(version) == "2.0":
                 return (tmp_context.work_dir / "pkg-2.0-py3-none-any.whl", None)
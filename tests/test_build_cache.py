@@ -0,0 +1,248 @@
+import concurrent.futures
+import pathlib
+import typing
+import zipfile
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+from conftest import mkwheel
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from fromager import build_cache, context, fingerprint
+
+_REQ = Requirement("test-pkg")
+_VERSION = Version("1.0.2")
+
+
+@pytest.fixture
+def cache_url(tmp_path: pathlib.Path) -> typing.Generator[str, None, None]:
+    cache_server, _, thread, url = build_cache.run_build_cache_server(
+        tmp_path / "build-cache"
+    )
+    yield url
+    cache_server.should_exit = True
+    thread.join(timeout=10)
+
+
+def test_compute_cache_key(testdata_context: context.WorkContext) -> None:
+    key = build_cache.compute_cache_key(testdata_context, _REQ, _VERSION)
+    assert len(key) == 64
+    assert key == build_cache.compute_cache_key(testdata_context, _REQ, _VERSION)
+    assert key != build_cache.compute_cache_key(
+        testdata_context, _REQ, Version("1.0.1")
+    )
+    assert key != build_cache.compute_cache_key(
+        testdata_context, Requirement("other-pkg"), _VERSION
+    )
+
+
+def test_client_roundtrip(tmp_path: pathlib.Path, cache_url: str) -> None:
+    client = build_cache.BuildCacheClient(cache_url)
+    key = "a" * 64
+    assert client.get_entries(key) == []
+
+    wheel_file = mkwheel(tmp_path / "build", None)
+    assert client.upload(key, wheel_file)
+    # entries are immutable
+    assert not client.upload(key, wheel_file)
+
+    (entry,) = client.get_entries(key)
+    assert entry.filename == wheel_file.name
+    assert entry.name == "test-pkg"
+    assert entry.size == wheel_file.stat().st_size
+    # wheels without fingerprint are stored by their hash
+    assert entry.digest == entry.sha256
+    assert entry.fingerprint is None
+
+    # an existing file with the same name is replaced
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    downloads.joinpath(wheel_file.name).write_bytes(b"stale")
+    downloaded = client.download(entry, _REQ, _VERSION, downloads)
+    assert downloaded.read_bytes() == wheel_file.read_bytes()
+
+    broken = build_cache.CacheEntry(**(entry.to_dict() | {"sha256": "0" * 64}))
+    with pytest.raises(build_cache.BuildCacheError, match="sha256"):
+        client.download(broken, _REQ, _VERSION, tmp_path / "broken")
+
+    # the server chooses the file name, it must be a wheel of the request
+    for filename, name, version in [
+        ("../test_pkg-1.0.2-py3-none-any.whl", "test-pkg", "1.0.2"),
+        ("sub/test_pkg-1.0.2-py3-none-any.whl", "test-pkg", "1.0.2"),
+        ("other-1.0.2-py3-none-any.whl", "test-pkg", "1.0.2"),
+        ("test_pkg-1.0.1-py3-none-any.whl", "test-pkg", "1.0.2"),
+        (wheel_file.name, "other", "1.0.2"),
+        (wheel_file.name, "test-pkg", "1.0.1"),
+        ("setup.py", "test-pkg", "1.0.2"),
+    ]:
+        invalid = build_cache.CacheEntry(
+            **(
+                entry.to_dict()
+                | {"filename": filename, "name": name, "version": version}
+            )
+        )
+        with pytest.raises(build_cache.BuildCacheError):
+            client.download(invalid, _REQ, _VERSION, downloads)
+    assert [p.name for p in downloads.iterdir()] == [wheel_file.name]
+    assert not tmp_path.joinpath(wheel_file.name).exists()
+
+
+def test_entries_per_fingerprint(tmp_path: pathlib.Path, cache_url: str) -> None:
+    client = build_cache.BuildCacheClient(cache_url)
+    key = "c" * 64
+    fp1 = fingerprint.BuildFingerprint(source="1", settings="s")
+    fp2 = fingerprint.BuildFingerprint(source="2", settings="s")
+    assert client.upload(key, mkwheel(tmp_path / "host1", fp1))
+    # another host with a different source adds its own entry
+    assert client.upload(key, mkwheel(tmp_path / "host2", fp2))
+    assert not client.upload(key, mkwheel(tmp_path / "host3", fp2))
+
+    entries = client.get_entries(key)
+    assert sorted(e.digest for e in entries) == sorted([fp1.digest, fp2.digest])
+    selected = build_cache._select_entry(entries, fp2)
+    assert selected is not None and selected.digest == fp2.digest
+    # unknown components are not compared, the newest entry wins
+    selected = build_cache._select_entry(
+        entries, fingerprint.BuildFingerprint(settings="s")
+    )
+    assert selected is not None and selected.digest == fp2.digest
+    assert not build_cache._select_entry(
+        entries, fingerprint.BuildFingerprint(settings="other")
+    )
+
+
+def test_concurrent_uploads(tmp_path: pathlib.Path, cache_url: str) -> None:
+    client = build_cache.BuildCacheClient(cache_url)
+    key = "d" * 64
+    fp = fingerprint.BuildFingerprint(source="1")
+    wheels = []
+    for index in range(8):
+        wheel_file = mkwheel(tmp_path / f"host{index}", fp)
+        # builds are not reproducible, every wheel has different content
+        with zipfile.ZipFile(wheel_file, "a") as zf:
+            zf.writestr("test_pkg/build.txt", str(index))
+        wheels.append(wheel_file)
+    with concurrent.futures.ThreadPoolExecutor(len(wheels)) as executor:
+        results = list(executor.map(lambda w: client.upload(key, w), wheels))
+    assert results.count(True) == 1
+
+    # the entry has the wheel of the winning upload
+    (entry,) = client.get_entries(key)
+    downloaded = client.download(entry, _REQ, _VERSION, tmp_path / "dl")
+    assert downloaded.read_bytes() == wheels[results.index(True)].read_bytes()
+    key_dir = tmp_path / "build-cache" / key[:2] / key
+    assert [d.name for d in key_dir.iterdir()] == [fp.digest]
+
+
+def test_server_rejects_invalid_requests(cache_url: str) -> None:
+    base = cache_url.rstrip("/")
+    key = "b" * 64
+    wheel = "test_pkg-1.0.2-py3-none-any.whl"
+    assert requests.put(f"{base}/v1/bb/{key}/{wheel}", data=b"junk").status_code == 400
+    assert requests.get(f"{base}/v1/bb/{key}/index.json").status_code == 404
+    # invalid key and file names
+    assert requests.get(f"{base}/v1/bb/{key[:10]}/index.json").status_code == 404
+    assert requests.put(f"{base}/v1/cc/{key}/{wheel}", data=b"").status_code == 404
+    assert requests.put(f"{base}/v1/bb/{key}/setup.py", data=b"").status_code == 404
+    assert requests.get(f"{base}/v1/bb/{key}/../{wheel}").status_code == 404
+
+
+def test_fetch_and_upload_wheel(
+    tmp_path: pathlib.Path, testdata_context: context.WorkContext, cache_url: str
+) -> None:
+    ctx = testdata_context
+    ctx.build_cache_url = cache_url
+    expected = fingerprint.compute_build_fingerprint(
+        ctx=ctx, req=_REQ, version=_VERSION
+    )
+    assert build_cache.fetch_wheel(ctx, _REQ, _VERSION, tmp_path / "dl") is None
+
+    wheel_file = mkwheel(tmp_path / "build", expected)
+    build_cache.upload_wheel(ctx, _REQ, _VERSION, wheel_file)
+    cached = build_cache.fetch_wheel(ctx, _REQ, _VERSION, tmp_path / "dl")
+    assert cached is not None
+    assert cached.read_bytes() == wheel_file.read_bytes()
+
+    # uploads can be disabled
+    ctx.build_cache_upload = False
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(
+            build_cache.BuildCacheClient,
+            "upload",
+            lambda *args: pytest.fail("unexpected upload"),
+        )
+        build_cache.upload_wheel(ctx, _REQ, _VERSION, wheel_file)
+
+
+def test_fetch_wheel_fingerprint_mismatch(
+    tmp_path: pathlib.Path, testdata_context: context.WorkContext, cache_url: str
+) -> None:
+    ctx = testdata_context
+    ctx.build_cache_url = cache_url
+    expected = fingerprint.compute_build_fingerprint(
+        ctx=ctx, req=_REQ, version=_VERSION
+    )
+    changed = fingerprint.BuildFingerprint(
+        **(expected.components() | {"settings": "changed"})
+    )
+    wheel_file = mkwheel(tmp_path / "build", changed)
+    build_cache.upload_wheel(ctx, _REQ, _VERSION, wheel_file)
+    assert build_cache.fetch_wheel(ctx, _REQ, _VERSION, tmp_path / "dl") is None
+    assert not tmp_path.joinpath("dl", wheel_file.name).exists()
+
+
+def test_fetch_wheel_verifies_source_and_build_env(
+    tmp_path: pathlib.Path, testdata_context: context.WorkContext, cache_url: str
+) -> None:
+    ctx = testdata_context
+    ctx.build_cache_url = cache_url
+    source = tmp_path / "test-pkg-1.0.2.tar.gz"
+    source.write_bytes(b"original sdist")
+    build_env = {"setuptools": Version("80.0")}
+    built = fingerprint.compute_build_fingerprint(
+        ctx=ctx,
+        req=_REQ,
+        version=_VERSION,
+        source_filename=source,
+        build_distributions=build_env,
+    )
+    wheel_file = mkwheel(tmp_path / "build", built)
+    build_cache.upload_wheel(ctx, _REQ, _VERSION, wheel_file)
+
+    def fetch(**kwargs: typing.Any) -> pathlib.Path | None:
+        return build_cache.fetch_wheel(ctx, _REQ, _VERSION, tmp_path / "dl", **kwargs)
+
+    assert fetch(get_source_filename=lambda: source, build_distributions=build_env)
+    # same key, different build dependencies
+    assert fetch(build_distributions={"setuptools": Version("81.0")}) is None
+    # same key, different sdist
+    other = tmp_path / "other" / source.name
+    other.parent.mkdir()
+    other.write_bytes(b"changed sdist")
+    assert fetch(get_source_filename=lambda: other) is None
+
+    # a host with the other sdist shares its build under the same key
+    rebuilt = fingerprint.compute_build_fingerprint(
+        ctx=ctx, req=_REQ, version=_VERSION, source_filename=other
+    )
+    build_cache.upload_wheel(ctx, _REQ, _VERSION, mkwheel(tmp_path / "b2", rebuilt))
+    cached = fetch(get_source_filename=lambda: other)
+    assert cached is not None
+    assert fingerprint.read_wheel_fingerprint(cached) == rebuilt
+    cached = fetch(get_source_filename=lambda: source)
+    assert cached is not None
+    assert fingerprint.read_wheel_fingerprint(cached) == built
+
+
+def test_fetch_wheel_unreachable(
+    tmp_path: pathlib.Path, testdata_context: context.WorkContext
+) -> None:
+    ctx = testdata_context
+    ctx.build_cache_url = "http://cache.test/"
+    http_session = Mock()
+    http_session.get.side_effect = requests.exceptions.ConnectionError("refused")
+    with patch.object(build_cache, "session", http_session):
+        assert build_cache.fetch_wheel(ctx, _REQ, _VERSION, tmp_path / "dl") is None
+    http_session.get.assert_called_once()
@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import pathlib
+import threading
+
+from click.testing import CliRunner
+from conftest import mknode
+
+from fromager import build_coordinator, context, server
+from fromager.__main__ import main as fromager
+from fromager.build_coordinator import (
+    BuildCoordinator,
+    CoordinatorClient,
+    Task,
+    TaskResult,
+)
+from fromager.commands import build
+from fromager.dependency_graph import DependencyNode, TrackingTopologicalSorter
+
+A, B, C, D = (mknode(name) for name in "abcd")
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _topo(*nodes: tuple[DependencyNode, ...]) -> TrackingTopologicalSorter:
+    topo = TrackingTopologicalSorter()
+    for node, *predecessors in nodes:
+        topo.add(node, *predecessors)
+    topo.prepare()
+    return topo
+
+
+def _coordinator(
+    wkctx: context.WorkContext,
+    topo: TrackingTopologicalSorter,
+    **kwargs: object,
+) -> BuildCoordinator:
+    return BuildCoordinator(
+        wkctx,
+        topo,
+        get_build_requirements=lambda node: {
+            dep.canonicalized_name: dep.version for dep in topo.predecessors(node)
+        },
+        record_blocked=build._record_blocked,
+        lease_timeout=10,
+        **kwargs,  # type: ignore[arg-type]
+    )
+
+
+def _upload(wkctx: context.WorkContext, task: Task) -> TaskResult:
+    wheel = f"{task.name}-{task.version}-py3-none-any.whl"
+    wkctx.wheels_downloads.mkdir(parents=True, exist_ok=True)
+    wkctx.wheels_downloads.joinpath(wheel).write_bytes(b"wheel")
+    return TaskResult(key=task.key, wheel_filename=wheel)
+
+
+def test_coordinator_lease(tmp_context: context.WorkContext) -> None:
+    clock = _Clock()
+    failures: list = []
+    coordinator = _coordinator(
+        tmp_context,
+        _topo((A,), (B, A), (C,), (D, C)),
+        failures=failures,
+        clock=clock,
+    )
+    a = coordinator.lease("w1")
+    c = coordinator.lease("w2")
+    assert a is not None and c is not None
+    assert (a.key, c.key) == ("a==1.0", "c==1.0")
+    assert coordinator.lease("w3") is None
+    assert not coordinator.renew("w2", a.key)
+    assert coordinator.renew("w1", a.key)
+
+    # the leases of w1 and w2 expire, a is given to w3
+    clock.now += 11
+    retry = coordinator.lease("w3")
+    assert retry is not None and retry.key == "a==1.0"
+    # the late result of w1 wins, w3 is ignored
+    assert coordinator.complete("w1", _upload(tmp_context, a))
+    assert not coordinator.complete("w3", _upload(tmp_context, retry))
+
+    # c fails, d is blocked
+    error = {
+        "exception_type": "ValueError",
+        "exception_message": "boom",
+        "failure_type": "build",
+    }
+    assert coordinator.complete("w2", TaskResult(key=c.key, error=error))
+    b = coordinator.lease("w1")
+    assert b is not None and b.key == "b==1.0"
+    assert b.build_requirements == {"a": "1.0"}
+    assert coordinator.complete("w1", _upload(tmp_context, b))
+    assert coordinator.lease("w1") is None
+    assert coordinator.finished
+    assert [node.key for node, _ in coordinator.completed] == ["a==1.0", "b==1.0"]
+    assert [(f["package"], f["failure_type"]) for f in failures] == [
+        ("c", "build"),
+        ("d", "blocked"),
+    ]
+    assert coordinator.dismiss_workers(timeout=0) is False
+    coordinator.lease("w2")
+    coordinator.lease("w3")
+    assert coordinator.dismiss_workers(timeout=0)
+
+
+def test_coordinator_worker_lost(tmp_context: context.WorkContext) -> None:
+    clock = _Clock()
+    failures: list = []
+    coordinator = _coordinator(tmp_context, _topo((A,)), failures=failures, clock=clock)
+    for attempt in range(build_coordinator.MAX_ATTEMPTS):
+        assert coordinator.lease(f"w{attempt}") is not None
+        clock.now += 11
+    coordinator.expire()
+    assert coordinator.finished
+    assert failures[0]["exception_type"] == "WorkerLost"
+
+    # without a failure list, the first failure finishes the build
+    coordinator = _coordinator(tmp_context, _topo((A,), (B,)))
+    task = coordinator.lease("w1")
+    assert task is not None
+    assert coordinator.complete("w1", TaskResult(key=task.key))
+    assert coordinator.finished
+    assert coordinator.error == "Failed to build a==1.0: the wheel was not uploaded"
+    assert coordinator.lease("w1") is None
+
+
+def _run_worker(url: str, worker: str, tmp_path: pathlib.Path) -> None:
+    """Worker process, the first build of b kills its worker"""
+
+    def fake_build(task: Task) -> tuple[TaskResult, pathlib.Path]:
+        marker = tmp_path / "died"
+        if task.name == "b" and not marker.exists():
+            marker.touch()
+            os._exit(3)
+        wheel = tmp_path / worker / f"{task.name}-{task.version}-py3-none-any.whl"
+        wheel.parent.mkdir(parents=True, exist_ok=True)
+        wheel.write_bytes(task.key.encode())
+        return TaskResult(key=task.key, wheel_filename=wheel.name), wheel
+
+    client = CoordinatorClient(url, worker)
+    build_coordinator.run_worker(client, fake_build, poll_interval=0.1)
+
+
+def test_worker_processes(
+    tmp_context: context.WorkContext, tmp_path: pathlib.Path
+) -> None:
+    coordinator = BuildCoordinator(
+        tmp_context,
+        _topo((A,), (B, A), (C,), (D, B, C)),
+        get_build_requirements=lambda node: {},
+        lease_timeout=1,
+    )
+    uvicorn_server, sock, thread = server.run_wheel_server(
+        tmp_context, routes=coordinator.routes()
+    )
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+    mp = multiprocessing.get_context("spawn")
+    workers = [
+        mp.Process(target=_run_worker, args=(url, f"w{i}", tmp_path)) for i in range(3)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        waiter = threading.Thread(target=coordinator.wait, args=(0.1,))
+        waiter.start()
+        waiter.join(timeout=60)
+        assert not waiter.is_alive()
+        assert coordinator.dismiss_workers(timeout=10)
+        for worker in workers:
+            worker.join(timeout=10)
+    finally:
+        for worker in workers:
+            worker.kill()
+        uvicorn_server.should_exit = True
+        thread.join(timeout=10)
+
+    assert coordinator.error is None
+    exitcodes = [worker.exitcode for worker in workers]
+    assert (exitcodes.count(0), exitcodes.count(3)) == (2, 1)
+    # b was built again after its worker died, in build order
+    order = [node.key for node, _ in coordinator.completed]
+    assert sorted(order) == ["a==1.0", "b==1.0", "c==1.0", "d==1.0"]
+    assert order.index("a==1.0") < order.index("b==1.0") < order.index("d==1.0")
+    assert coordinator._attempts[B] == 2
+    wheel = tmp_context.wheel_server_dir / "d" / "d-1.0-py3-none-any.whl"
+    assert wheel.read_bytes() == b"d==1.0"
+
+
+def test_coordinator_options(cli_runner: CliRunner, tmp_path: pathlib.Path) -> None:
+    graph_file = tmp_path / "graph.json"
+    graph_file.write_text("{}")
+    result = cli_runner.invoke(
+        fromager,
+        [
+            "build-parallel",
+            "--coordinator",
+            "--shard",
+            "1/2",
+            "-c",
+            "http://cache.test/simple/",
+            str(graph_file),
+        ],
+    )
+    assert result.exit_code == 2
+    assert "--shard cannot be combined with --coordinator" in result.stderr
@@ -0,0 +1,125 @@
+import subprocess
+import typing
+from unittest.mock import patch
+
+import pytest
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from fromager import build_retry, context, external_commands, packagesettings
+
+_REQ = Requirement("test-pkg")
+_VERSION = Version("1.0")
+
+
+def _failing(
+    *errors: subprocess.CalledProcessError,
+) -> typing.Callable[[], str]:
+    remaining = list(errors)
+
+    def func() -> str:
+        if remaining:
+            raise remaining.pop(0)
+        return "ok"
+
+    return func
+
+
+def test_classify_defaults() -> None:
+    retries = packagesettings.BuildRetries()
+    policy = retries.classify(-9, "")
+    assert policy is not None and policy.name == "oom"
+    policy = retries.classify(1, "cc1plus: Killed signal terminated program")
+    assert policy is not None and policy.name == "oom"
+    policy = retries.classify(1, "error: Temporary failure in name resolution")
+    assert policy is not None and policy.name == "network"
+    assert retries.classify(1, "error: undefined reference to `foo'") is None
+    # killed by the watchdog, not by the out-of-memory killer
+    policy = retries.classify(-9, "", timed_out=True)
+    assert policy is not None and policy.name == "timeout"
+
+
+def test_timeout_not_retried(tmp_context: context.WorkContext) -> None:
+    func = _failing(
+        external_commands.CommandTimeoutError(
+            -9, ["cc"], output="", reason="exceeded its wall-clock timeout"
+        )
+    )
+    with pytest.raises(external_commands.CommandTimeoutError):
+        build_retry.call_with_retries(
+            ctx=tmp_context, req=_REQ, version=_VERSION, func=func
+        )
+    assert not tmp_context.retry_store
+
+
+def test_invalid_pattern() -> None:
+    with pytest.raises(ValueError):
+        packagesettings.BuildRetryPolicy(name="broken", patterns=["("])
+
+
+@patch("time.sleep")
+def test_retry_oom_reduces_jobs(
+    sleep: typing.Any, tmp_context: context.WorkContext
+) -> None:
+    pbi = tmp_context.package_build_info(_REQ)
+    jobs = pbi.parallel_jobs()
+    func = _failing(subprocess.CalledProcessError(-9, ["cc"], output=""))
+    result = build_retry.call_with_retries(
+        ctx=tmp_context, req=_REQ, version=_VERSION, func=func
+    )
+    assert result == "ok"
+    assert pbi.parallel_jobs() == max(1, int(jobs * 0.5))
+    assert tmp_context.retry_store == {"test-pkg==1.0": ["oom"]}
+    assert build_retry.count_retries(tmp_context) == {"oom": 1}
+    assert build_retry.format_retries(tmp_context) == "retried 1 build(s): 1 oom"
+    sleep.assert_not_called()
+
+
+@patch("time.sleep")
+def test_retry_gives_up(sleep: typing.Any, tmp_context: context.WorkContext) -> None:
+    err = subprocess.CalledProcessError(1, ["pip"], output="Connection reset by peer")
+    func = _failing(err, err, err)
+    with pytest.raises(subprocess.CalledProcessError):
+        build_retry.call_with_retries(
+            ctx=tmp_context, req=_REQ, version=_VERSION, func=func
+        )
+    assert tmp_context.retry_store["test-pkg==1.0"] == ["network", "network"]
+    # exponential backoff
+    assert [c.args[0] for c in sleep.call_args_list] == [10.0, 20.0]
+
+
+def test_no_retry(tmp_context: context.WorkContext) -> None:
+    # unknown failure
+    func = _failing(subprocess.CalledProcessError(1, ["pip"], output="syntax error"))
+    with pytest.raises(subprocess.CalledProcessError):
+        build_retry.call_with_retries(
+            ctx=tmp_context, req=_REQ, version=_VERSION, func=func
+        )
+    # network isolation errors are not transient
+    func = _failing(
+        external_commands.NetworkIsolationError(
+            1, ["pip"], output="Network is unreachable"
+        )
+    )
+    with pytest.raises(external_commands.NetworkIsolationError):
+        build_retry.call_with_retries(
+            ctx=tmp_context, req=_REQ, version=_VERSION, func=func
+        )
+    assert not tmp_context.retry_store
+
+
+def test_settings_file_build_retries() -> None:
+    settings = packagesettings.SettingsFile.from_string(
+        """
+build_retries:
+  failure_classes:
+    - name: flaky-tests
+      patterns:
+        - "FAILED tests/test_timing.py"
+      retries: 2
+"""
+    )
+    (policy,) = settings.build_retries.failure_classes
+    assert policy.name == "flaky-tests"
+    assert settings.build_retries.classify(1, "FAILED tests/test_timing.py::x")
+    assert settings.build_retries.classify(-9, "") is None
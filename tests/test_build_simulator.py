@@ -0,0 +1,187 @@
+import json
+import pathlib
+
+import pytest
+from click.testing import CliRunner
+from conftest import mknode
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from fromager import build_simulator, context
+from fromager.__main__ import main as fromager
+from fromager.build_simulator import BuildTask, Durations
+from fromager.dependency_graph import DependencyGraph, DependencyNode
+from fromager.requirements_file import RequirementType
+
+
+def _task(
+    node: DependencyNode,
+    duration: float,
+    *predecessors: DependencyNode,
+    exclusive: bool = False,
+    resource_classes: frozenset[str] = frozenset(),
+) -> BuildTask:
+    return BuildTask(
+        node,
+        duration,
+        frozenset(predecessors),
+        exclusive=exclusive,
+        resource_classes=resource_classes,
+    )
+
+
+A, B, C, D, E = (mknode(name) for name in "abcde")
+
+
+def _timeline(result: build_simulator.Simulation) -> dict[str, tuple[float, float]]:
+    return {entry.node.key: (entry.start, entry.end) for entry in result.timeline}
+
+
+def test_simulate() -> None:
+    # a and b are independent, c needs both, d is a long leaf
+    tasks = [
+        _task(A, 10),
+        _task(B, 20),
+        _task(C, 5, A, B),
+        _task(D, 30),
+    ]
+    result = build_simulator.simulate(tasks, workers=2)
+    assert _timeline(result) == {
+        "a==1.0": (0, 10),
+        "b==1.0": (0, 20),
+        "d==1.0": (10, 40),
+        "c==1.0": (20, 25),
+    }
+    assert result.makespan == 40
+    assert result.critical_path == [D]
+    assert result.critical_path_duration == 30
+    assert result.utilization() == [1.0, 0.625]
+
+    # start the long leaf first
+    result = build_simulator.simulate(tasks, workers=2, policy="critical-path")
+    assert _timeline(result)["d==1.0"] == (0, 30)
+    assert result.makespan == 35
+
+    data = result.to_dict()
+    assert data["critical_path"] == ["d==1.0"]
+    assert len(data["timeline"]) == 4
+    assert "c==1.0" in result.to_html()
+
+
+def test_simulate_exclusive_and_resources() -> None:
+    heavy = frozenset({"huge-memory"})
+    tasks = [
+        _task(A, 10, resource_classes=heavy),
+        _task(B, 10, resource_classes=heavy),
+        _task(C, 10),
+        _task(D, 5, exclusive=True),
+        _task(E, 1, D),
+    ]
+    result = build_simulator.simulate(
+        tasks, workers=4, resource_classes={"huge-memory": 1}
+    )
+    # one build with a huge-memory slot at a time, exclusive build runs alone
+    assert _timeline(result) == {
+        "a==1.0": (0, 10),
+        "c==1.0": (0, 10),
+        "b==1.0": (10, 20),
+        "d==1.0": (20, 25),
+        "e==1.0": (25, 26),
+    }
+
+    with pytest.raises(ValueError, match="cycle"):
+        build_simulator.simulate([_task(A, 1, B), _task(B, 1, A)], workers=1)
+    with pytest.raises(ValueError, match="unknown policy"):
+        build_simulator.simulate(tasks, workers=1, policy="random")
+
+
+def test_durations(tmp_path: pathlib.Path, tmp_context: context.WorkContext) -> None:
+    durations_file = tmp_path / "build-timings.json"
+    durations_file.write_text(
+        json.dumps(
+            {
+                "Lib==2.0": {"download_source": 1.5, "build_wheel": 10},
+                "app": 30,
+                "tool==1.0": 7,
+            }
+        )
+    )
+    durations = Durations.from_file(durations_file, default=3)
+
+    graph = DependencyGraph()
+    for parent, req_type, req, version in [
+        (None, RequirementType.TOP_LEVEL, "app", "1.0"),
+        ("app", RequirementType.BUILD_SYSTEM, "lib", "3.0"),
+        ("app", RequirementType.INSTALL, "other", "1.0"),
+    ]:
+        graph.add_dependency(
+            parent_name=canonicalize_name(parent) if parent else None,
+            parent_version=Version("1.0") if parent else None,
+            req_type=req_type,
+            req=Requirement(req),
+            req_version=Version(version),
+        )
+    tasks = {
+        task.node.key: task
+        for task in build_simulator.get_build_tasks(graph, tmp_context, durations)
+    }
+    assert tasks["app==1.0"].duration == 30
+    # other versions of a package use the longest known version
+    assert tasks["lib==3.0"].duration == 11.5
+    assert tasks["other==1.0"].duration == 3
+    assert tasks["other==1.0"].estimated
+    assert [node.key for node in tasks["app==1.0"].predecessors] == ["lib==3.0"]
+
+    durations_file.write_text(json.dumps({"app": -1}))
+    with pytest.raises(ValueError, match="invalid duration"):
+        Durations.from_file(durations_file)
+
+
+def test_build_graph_simulate(cli_runner: CliRunner, tmp_path: pathlib.Path) -> None:
+    graph = DependencyGraph()
+    graph.add_dependency(
+        parent_name=None,
+        parent_version=None,
+        req_type=RequirementType.TOP_LEVEL,
+        req=Requirement("app"),
+        req_version=Version("1.0"),
+    )
+    graph.add_dependency(
+        parent_name=canonicalize_name("app"),
+        parent_version=Version("1.0"),
+        req_type=RequirementType.BUILD_SYSTEM,
+        req=Requirement("setuptools"),
+        req_version=Version("70.0"),
+    )
+    graph_file = tmp_path / "graph.json"
+    with graph_file.open("w") as f:
+        graph.serialize(f)
+    durations_file = tmp_path / "durations.json"
+    durations_file.write_text(json.dumps({"app": 120, "setuptools": 60}))
+    timeline_json = tmp_path / "timeline.json"
+    timeline_html = tmp_path / "timeline.html"
+
+    result = cli_runner.invoke(
+        fromager,
+        [
+            "graph",
+            "build-graph",
+            "--durations",
+            str(durations_file),
+            "--workers",
+            "2",
+            "--timeline-json",
+            str(timeline_json),
+            "--timeline-html",
+            str(timeline_html),
+            str(graph_file),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "with 2 workers (name policy): 0:03:00" in result.stdout
+    assert "setuptools==70.0 -> app==1.0" in result.stdout
+    data = json.loads(timeline_json.read_text())
+    assert data["makespan"] == 180
+    assert data["utilization"] == [1.0, 0.0]
+    assert timeline_html.read_text().startswith("<!DOCTYPE html>")
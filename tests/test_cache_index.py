@@ -0,0 +1,159 @@
+import datetime
+import typing
+
+import pytest
+import requests_mock
+import resolvelib
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from fromager import cache_index, constraints, finders, resolver
+from fromager.candidate import Cooldown
+
+_URL = "https://cache.test/simple/"
+
+_root_response = """
+<!DOCTYPE html>
+<html>
+<body>
+<a href="/simple/numpy/">numpy</a>
+<a href="/simple/test-pkg/">test-pkg</a>
+</body>
+</html>
+"""
+
+_numpy_response = """
+<!DOCTYPE html>
+<html>
+<body>
+<a href="https://cache.test/files/numpy-1.26.4.tar.gz">numpy-1.26.4.tar.gz</a><br/>
+<a href="https://cache.test/files/numpy-1.26.4-py3-none-any.whl">numpy-1.26.4-py3-none-any.whl</a><br/>
+<a href="https://cache.test/files/numpy-1.26.4-1-py3-none-any.whl">numpy-1.26.4-1-py3-none-any.whl</a><br/>
+<a href="https://cache.test/files/numpy-2.2.0-py3-none-any.whl">numpy-2.2.0-py3-none-any.whl</a><br/>
+</body>
+</html>
+"""
+
+_test_pkg_response = """
+<!DOCTYPE html>
+<html>
+<body>
+<a href="https://cache.test/files/test_pkg-1.0.2-py3-none-any.whl">test_pkg-1.0.2-py3-none-any.whl</a><br/>
+</body>
+</html>
+"""
+
+
+@pytest.fixture(autouse=True)
+def reset_indexes() -> typing.Generator[None, None, None]:
+    cache_index.clear()
+    yield
+    cache_index.clear()
+
+
+def _register_pages(r: requests_mock.Mocker) -> None:
+    r.get(_URL, text=_root_response)
+    r.get(f"{_URL}numpy/", text=_numpy_response)
+    r.get(f"{_URL}test-pkg/", text=_test_pkg_response)
+
+
+def test_prefetch_lists_index_once() -> None:
+    with requests_mock.Mocker() as r:
+        _register_pages(r)
+        index = cache_index.prefetch(_URL, ["NumPy", "test_pkg", "missing-pkg"])
+        assert r.call_count == 3
+        # missing-pkg is not listed on the server and was not requested
+        assert not any("missing-pkg" in req.url for req in r.request_history)
+
+        assert len(index) == 3
+        assert "numpy" in index
+        assert "missing-pkg" in index
+        assert cache_index.get_index(_URL) is index
+
+        # indexed packages are not fetched again
+        cache_index.prefetch(_URL, ["numpy", "missing-pkg"])
+        assert r.call_count == 3
+
+        assert index.lookup(Requirement("numpy==1.26.4")) == [
+            (
+                "https://cache.test/files/numpy-1.26.4-1-py3-none-any.whl",
+                Version("1.26.4"),
+            ),
+            (
+                "https://cache.test/files/numpy-1.26.4-py3-none-any.whl",
+                Version("1.26.4"),
+            ),
+        ]
+        assert index.lookup(Requirement("test-pkg==1.0.2")) == [
+            (
+                "https://cache.test/files/test_pkg-1.0.2-py3-none-any.whl",
+                Version("1.0.2"),
+            ),
+        ]
+        with pytest.raises(resolvelib.resolvers.ResolverException):
+            index.lookup(Requirement("numpy==1.0"))
+        with pytest.raises(resolvelib.resolvers.ResolverException):
+            index.lookup(Requirement("missing-pkg==1.0"))
+        # not prefetched
+        assert index.lookup(Requirement("other==1.0")) is None
+        assert r.call_count == 3
+
+
+def test_prefetch_without_root_index() -> None:
+    with requests_mock.Mocker() as r:
+        r.get(_URL, status_code=403)
+        r.get(f"{_URL}numpy/", text=_numpy_response)
+        r.get(f"{_URL}missing-pkg/", status_code=404)
+        r.get(f"{_URL}broken/", status_code=403)
+        index = cache_index.prefetch(_URL, ["numpy", "missing-pkg", "broken"])
+
+    assert "numpy" in index
+    with pytest.raises(resolvelib.resolvers.ResolverException):
+        index.lookup(Requirement("missing-pkg==1.0"))
+    # errors leave the package unknown
+    assert "broken" not in index
+    assert index.lookup(Requirement("broken==1.0")) is None
+
+
+def test_lookup_constraints() -> None:
+    c = constraints.Constraints()
+    c.add_constraint("numpy<2")
+    with requests_mock.Mocker() as r:
+        _register_pages(r)
+        index = cache_index.prefetch(_URL, ["numpy"])
+
+    results = index.lookup(Requirement("numpy"), c)
+    assert results is not None
+    assert {version for _, version in results} == {Version("1.26.4")}
+    with pytest.raises(resolvelib.resolvers.ResolverException):
+        index.lookup(Requirement("numpy==2.2.0"), c)
+
+
+def test_lookup_for_provider() -> None:
+    req = Requirement("numpy==2.2.0")
+    provider = resolver.PyPIProvider(
+        include_sdists=False, include_wheels=True, sdist_server_url=_URL
+    )
+    assert cache_index.lookup_for_provider(provider, _URL, req) is None
+    with requests_mock.Mocker() as r:
+        _register_pages(r)
+        cache_index.prefetch(_URL, ["numpy"])
+
+    assert cache_index.lookup_for_provider(provider, _URL, req) == [
+        ("https://cache.test/files/numpy-2.2.0-py3-none-any.whl", Version("2.2.0"))
+    ]
+    cache_provider = finders.PyPICacheProvider(cache_server_url=_URL)
+    assert cache_index.lookup_for_provider(cache_provider, _URL, req)
+
+    # the index does not know upload times
+    provider.cooldown = Cooldown(min_age=datetime.timedelta(days=1))
+    assert cache_index.lookup_for_provider(provider, _URL, req) is None
+
+    # providers of plugins are always asked
+    class PluginProvider(resolver.PyPIProvider):
+        pass
+
+    plugin_provider = PluginProvider(
+        include_sdists=False, include_wheels=True, sdist_server_url=_URL
+    )
+    assert cache_index.lookup_for_provider(plugin_provider, _URL, req) is None
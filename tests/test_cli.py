@@ -135,9 +135,11 @@ KNOWN_COMMANDS: set[str] = {
     "bootstrap",
     "bootstrap-parallel",
     "build",
+    "build-cache-server",
     "build-order",
     "build-parallel",
     "build-sequence",
+    "build-worker",
     "canonicalize",
     "download-sequence",
     "find-updates",
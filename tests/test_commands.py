@@ -1,8 +1,25 @@
+import json
+import pathlib
+import threading
 import typing
 
 import click
+import pytest
+from conftest import mknode, mkwheel
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
 
+from fromager import (
+    context,
+    dependency_graph,
+    fingerprint,
+    packagesettings,
+    progress,
+)
+from fromager.bootstrapper import FailureRecord
 from fromager.commands import bootstrap, build
+from fromager.requirements_file import RequirementType
 
 
 def get_option_names(cmd: click.Command) -> typing.Iterable[str]:
@@ -18,5 +35,521 @@ def test_bootstrap_parallel_options() -> None:
     expected.discard("sdist_only")
     expected.discard("graph_file")
     expected.discard("test_mode")
+    # shards need the same graph on every host, build-parallel only
+    expected.difference_update(
+        {"shard_index", "durations_file", "duplicate_below", "shard_wait_timeout"}
+    )
+    # build workers build a graph, build-parallel only
+    expected.difference_update(
+        {"coordinator", "coordinator_host", "coordinator_port", "lease_timeout"}
+    )
+    # bootstrap-parallel only
+    expected.add("streaming")
 
     assert set(get_option_names(bootstrap.bootstrap_parallel)) == expected
+
+
+def test_source_preparer(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    nodes = [mknode(name) for name in ["a", "b", "c", "d"]]
+    prepared: list[str] = []
+    release = threading.Event()
+
+    def fake_prepare_build(
+        *, req: Requirement, **kwargs: typing.Any
+    ) -> build.PreparedBuild:
+        if req.name == "a":
+            release.wait(timeout=10)
+        prepared.append(req.name)
+        return build.PreparedBuild(prebuilt=False, source_root_dir=tmp_context.work_dir)
+
+    monkeypatch.setattr(build, "_prepare_build", fake_prepare_build)
+
+    with build._SourcePreparer(
+        wkctx=tmp_context,
+        build_order=nodes,
+        force=False,
+        cache_wheel_server_url=None,
+        prepare_workers=1,
+        prepare_ahead=2,
+    ) as preparer:
+        # "a" blocks the only worker, "b" is queued, "c" and "d" wait
+        assert list(preparer._futures) == nodes[:2]
+        # queued preparation is cancelled, caller prepares itself
+        assert preparer.take(nodes[1]) is None
+        assert list(preparer._futures) == [nodes[0], nodes[2]]
+        # not scheduled, yet
+        assert preparer.take(nodes[3]) is None
+        release.set()
+        result = preparer.take(nodes[0])
+        assert result is not None
+        assert result.source_root_dir == tmp_context.work_dir
+        assert preparer.take(nodes[2]) is not None
+
+    assert prepared == ["a", "c"]
+
+
+def test_streaming_build(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    graph = tmp_context.dependency_graph
+    # a requires b to build and c to install
+    graph.add_dependency(
+        parent_name=None,
+        parent_version=None,
+        req_type=RequirementType.TOP_LEVEL,
+        req=Requirement("a==1.0"),
+        req_version=Version("1.0"),
+    )
+    for child, req_type in [
+        ("b", RequirementType.BUILD_SYSTEM),
+        ("c", RequirementType.INSTALL),
+    ]:
+        graph.add_dependency(
+            parent_name=canonicalize_name("a"),
+            parent_version=Version("1.0"),
+            req_type=req_type,
+            req=Requirement(f"{child}==1.0"),
+            req_version=Version("1.0"),
+        )
+    built: list[str] = []
+
+    def fake_build_parallel(
+        *, req: Requirement, resolved_version: Version, **kwargs: typing.Any
+    ) -> build.BuildSequenceEntry:
+        built.append(req.name)
+        return build.BuildSequenceEntry(
+            name=req.name,
+            version=resolved_version,
+            prebuilt=False,
+            download_url="",
+            wheel_filename=tmp_context.wheels_build
+            / f"{req.name}-1.0-py3-none-any.whl",
+        )
+
+    monkeypatch.setattr(build, "_build_parallel", fake_build_parallel)
+
+    with build.StreamingBuild(
+        tmp_context,
+        force=False,
+        cache_wheel_server_url=None,
+        max_workers=2,
+        prepare_workers=0,
+    ) as stream:
+        # the build closure of "a" is not complete
+        stream.package_completed(Requirement("a"), Version("1.0"))
+        assert stream._added == {}
+        stream.package_completed(Requirement("b"), Version("1.0"))
+        assert set(stream._added) == {"a==1.0", "b==1.0"}
+        stream.package_started(Requirement("b"), Version("1.0"))
+        assert stream.topo.is_done(stream._added["b==1.0"])
+        # "c" is never completed, e.g. because of an error path
+        entries = stream.finish()
+
+    assert built.index("b") < built.index("a")
+    assert sorted(e.name for e in entries) == ["a", "b", "c"]
+
+
+def test_streaming_build_error(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    tmp_context.dependency_graph.add_dependency(
+        parent_name=None,
+        parent_version=None,
+        req_type=RequirementType.TOP_LEVEL,
+        req=Requirement("a==1.0"),
+        req_version=Version("1.0"),
+    )
+
+    def fake_build_parallel(**kwargs: typing.Any) -> build.BuildSequenceEntry:
+        raise ValueError("boom")
+
+    monkeypatch.setattr(build, "_build_parallel", fake_build_parallel)
+
+    with build.StreamingBuild(
+        tmp_context,
+        force=False,
+        cache_wheel_server_url=None,
+        max_workers=1,
+        prepare_workers=0,
+    ) as stream:
+        stream.package_completed(Requirement("a"), Version("1.0"))
+        with pytest.raises(RuntimeError):
+            stream.finish()
+
+
+def test_run_parallel_builds_keep_going(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    a, b, c, d = (mknode(name) for name in ["a", "b", "c", "d"])
+    # b fails, a and d need b to build, c is independent
+    topo = dependency_graph.TrackingTopologicalSorter({a: [b], b: [], c: [], d: [a]})
+    topo.prepare()
+
+    def fake_build_parallel(
+        *, req: Requirement, resolved_version: Version, **kwargs: typing.Any
+    ) -> build.BuildSequenceEntry:
+        if req.name == "b":
+            raise ValueError("compiler error")
+        return build.BuildSequenceEntry(
+            name=req.name,
+            version=resolved_version,
+            prebuilt=False,
+            download_url="",
+            wheel_filename=tmp_context.wheels_build
+            / f"{req.name}-1.0-py3-none-any.whl",
+        )
+
+    monkeypatch.setattr(build, "_build_parallel", fake_build_parallel)
+
+    failures: list[FailureRecord] = []
+    entries = build._run_parallel_builds(
+        wkctx=tmp_context,
+        topo=topo,
+        force=False,
+        cache_wheel_server_url=None,
+        max_workers=2,
+        progressbar=progress.Progressbar(None),
+        get_build_requirements=lambda node: {},
+        failures=failures,
+    )
+    assert [e.name for e in entries] == ["c"]
+    assert not topo.is_active()
+    assert {f["package"]: f["failure_type"] for f in failures} == {
+        "b": "build",
+        "a": "blocked",
+        "d": "blocked",
+    }
+    blocked = failures[-1]
+    assert blocked["exception_type"] == "ValueError"
+    assert "blocked by failed build of b==1.0" in blocked["exception_message"]
+
+    build._write_failure_report(tmp_context, failures)
+    (report,) = tmp_context.work_dir.glob("build-parallel-failures-*.json")
+    assert json.loads(report.read_text()) == {"failures": failures}
+
+    # without a failures list, the first failure stops the build
+    topo = dependency_graph.TrackingTopologicalSorter({a: [b], b: []})
+    topo.prepare()
+    with pytest.raises(RuntimeError, match=r"Failed to build b==1\.0"):
+        build._run_parallel_builds(
+            wkctx=tmp_context,
+            topo=topo,
+            force=False,
+            cache_wheel_server_url=None,
+            max_workers=2,
+            progressbar=progress.Progressbar(None),
+            get_build_requirements=lambda node: {},
+        )
+
+
+def test_run_parallel_builds_keep_going_prepare_ahead(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    b, c, x1, x2 = (mknode(name) for name in ["b", "c", "x1", "x2"])
+    # b fails, x1 and x2 need b to build
+    graph = {b: [], c: [], x1: [b], x2: [b]}
+    topo = dependency_graph.TrackingTopologicalSorter(graph)
+    topo.prepare()
+
+    def fake_prepare_build(
+        *, req: Requirement, **kwargs: typing.Any
+    ) -> build.PreparedBuild:
+        return build.PreparedBuild(prebuilt=False, source_root_dir=tmp_context.work_dir)
+
+    def fake_build(
+        *, req: Requirement, resolved_version: Version, **kwargs: typing.Any
+    ) -> build.BuildSequenceEntry:
+        if req.name == "b":
+            raise ValueError("compiler error")
+        return build.BuildSequenceEntry(
+            name=req.name,
+            version=resolved_version,
+            prebuilt=False,
+            download_url="",
+            wheel_filename=tmp_context.wheels_build
+            / f"{req.name}-1.0-py3-none-any.whl",
+        )
+
+    monkeypatch.setattr(build, "_prepare_build", fake_prepare_build)
+    monkeypatch.setattr(build, "_build", fake_build)
+
+    failures: list[FailureRecord] = []
+    with build._SourcePreparer(
+        wkctx=tmp_context,
+        build_order=[b, c, x1, x2],
+        force=False,
+        cache_wheel_server_url=None,
+        prepare_workers=1,
+        prepare_ahead=2,
+    ) as preparer:
+        entries = build._run_parallel_builds(
+            wkctx=tmp_context,
+            topo=topo,
+            force=False,
+            cache_wheel_server_url=None,
+            max_workers=2,
+            progressbar=progress.Progressbar(None),
+            preparer=preparer,
+            get_build_requirements=lambda node: {},
+            failures=failures,
+        )
+        # blocked nodes do not keep slots of the prepare-ahead window
+        assert not preparer._futures
+        assert not preparer._queue
+
+    assert [e.name for e in entries] == ["c"]
+    assert sorted(f["package"] for f in failures) == ["b", "x1", "x2"]
+
+
+def test_run_parallel_builds_resource_classes(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    tmp_context.settings = packagesettings.Settings(
+        settings=packagesettings.SettingsFile(resource_classes={"huge-memory": 1}),
+        package_settings=[
+            packagesettings.PackageSettings.from_string(
+                name, "build_options:\n  resource_classes: [huge-memory]\n"
+            )
+            for name in ["a", "b"]
+        ],
+        variant=tmp_context.variant,
+        patches_dir=tmp_context.settings.patches_dir,
+        max_jobs=None,
+    )
+    nodes = {name: mknode(name) for name in ["a", "b", "c"]}
+    topo = dependency_graph.TrackingTopologicalSorter(
+        {node: [] for node in nodes.values()}
+    )
+    topo.prepare()
+    lock = threading.Lock()
+    running: set[str] = set()
+    overlaps: list[set[str]] = []
+
+    def fake_build_parallel(
+        *, req: Requirement, resolved_version: Version, **kwargs: typing.Any
+    ) -> build.BuildSequenceEntry:
+        with lock:
+            running.add(req.name)
+            overlaps.append(set(running))
+        threading.Event().wait(0.05)
+        with lock:
+            running.discard(req.name)
+        return build.BuildSequenceEntry(
+            name=req.name,
+            version=resolved_version,
+            prebuilt=False,
+            download_url="",
+            wheel_filename=tmp_context.wheels_build
+            / f"{req.name}-1.0-py3-none-any.whl",
+        )
+
+    monkeypatch.setattr(build, "_build_parallel", fake_build_parallel)
+
+    entries = build._run_parallel_builds(
+        wkctx=tmp_context,
+        topo=topo,
+        force=False,
+        cache_wheel_server_url=None,
+        max_workers=3,
+        progressbar=progress.Progressbar(None),
+        get_build_requirements=lambda node: {},
+    )
+    assert sorted(e.name for e in entries) == ["a", "b", "c"]
+    # a and b share a resource class with capacity 1, c runs next to them
+    assert not any({"a", "b"} <= overlap for overlap in overlaps)
+    assert any("c" in overlap and len(overlap) > 1 for overlap in overlaps)
+    assert tmp_context.resource_pool.in_use() == {}
+
+
+def test_run_parallel_builds_external(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    a, b, c = (mknode(name) for name in ["a", "b", "c"])
+    # another shard builds b, a needs b to build
+    topo = dependency_graph.TrackingTopologicalSorter({a: [b], b: [], c: []})
+    topo.prepare()
+    order: list[str] = []
+
+    def entry(name: str) -> build.BuildSequenceEntry:
+        order.append(name)
+        return build.BuildSequenceEntry(
+            name=name,
+            version=Version("1.0"),
+            prebuilt=False,
+            download_url="",
+            wheel_filename=tmp_context.wheels_build / f"{name}-1.0-py3-none-any.whl",
+        )
+
+    def fake_build_parallel(*, req: Requirement, **kwargs: typing.Any) -> typing.Any:
+        return entry(req.name)
+
+    def get_external_wheel(
+        node: dependency_graph.DependencyNode, stop: threading.Event
+    ) -> build.BuildSequenceEntry:
+        assert not stop.is_set()
+        return entry(node.canonicalized_name)
+
+    monkeypatch.setattr(build, "_build_parallel", fake_build_parallel)
+
+    entries = build._run_parallel_builds(
+        wkctx=tmp_context,
+        topo=topo,
+        force=False,
+        cache_wheel_server_url=None,
+        max_workers=1,
+        progressbar=progress.Progressbar(None),
+        get_build_requirements=lambda node: {},
+        external={b},
+        get_external_wheel=get_external_wheel,
+    )
+    assert sorted(e.name for e in entries) == ["a", "b", "c"]
+    assert order.index("b") < order.index("a")
+
+
+def test_is_wheel_built_old_build_tag(
+    testdata_context: context.WorkContext,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # the changelog of test-pkg 1.0.2 expects build tag 2
+    cached = tmp_path / "test_pkg-1.0.2-2-py3-none-any.whl"
+    fetched: list[Version] = []
+
+    def fake_fetch_wheel(
+        wkctx: context.WorkContext,
+        req: Requirement,
+        version: Version,
+        destination_dir: pathlib.Path,
+        **kwargs: typing.Any,
+    ) -> pathlib.Path:
+        fetched.append(version)
+        return cached
+
+    monkeypatch.setattr(
+        build.wheels,
+        "resolve_prebuilt_wheel",
+        lambda **kwargs: ("https://wheel.test/test_pkg-1.0.2-1-py3-none-any.whl", None),
+    )
+    monkeypatch.setattr(build.build_cache, "fetch_wheel", fake_fetch_wheel)
+    wheel_filename = build._is_wheel_built(
+        testdata_context, "test-pkg", Version("1.0.2"), ["https://wheel.test/"]
+    )
+    assert wheel_filename == cached
+    assert fetched == [Version("1.0.2")]
+
+
+def test_prepare_build_existing_wheel(
+    tmp_context: context.WorkContext,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    req = Requirement("test-pkg==1.0.2")
+    version = Version("1.0.2")
+    expected = fingerprint.compute_build_fingerprint(
+        ctx=tmp_context, req=req, version=version
+    )
+    changed = fingerprint.BuildFingerprint(
+        **(expected.components() | {"settings": "changed"})
+    )
+    server_wheels = {
+        "match": mkwheel(tmp_path / "match", expected),
+        "changed": mkwheel(tmp_path / "changed", changed),
+    }
+    cached = mkwheel(tmp_path / "build-cache", expected)
+    server_wheel = "match"
+    verified: list[pathlib.Path] = []
+    verify_wheel_fingerprint = fingerprint.verify_wheel_fingerprint
+
+    def fake_verify(**kwargs: typing.Any) -> bool:
+        verified.append(kwargs["wheel_filename"])
+        return verify_wheel_fingerprint(**kwargs)
+
+    def prepare() -> build.PreparedBuild:
+        return build._prepare_build(
+            wkctx=tmp_context,
+            resolved_version=version,
+            req=req,
+            source_download_url="https://sdist.test/test_pkg-1.0.2.tar.gz",
+            force=False,
+            cache_wheel_server_url="https://wheel.test/simple/",
+            build_requirements={},
+        )
+
+    # existing wheels are checked without downloading the source
+    monkeypatch.setattr(
+        build.sources,
+        "download_source",
+        lambda **kwargs: pytest.fail("unexpected download"),
+    )
+    monkeypatch.setattr(
+        build,
+        "_find_wheel_on_servers",
+        lambda *args: server_wheels[server_wheel],
+    )
+    monkeypatch.setattr(
+        build.build_cache, "fetch_wheel", lambda *args, **kwargs: cached
+    )
+    monkeypatch.setattr(build.fingerprint, "verify_wheel_fingerprint", fake_verify)
+
+    prepared = prepare()
+    assert prepared.wheel_filename == server_wheels["match"]
+    assert prepared.use_existing_wheel
+
+    # a mismatch falls back to the build cache, its wheel is not verified again
+    server_wheel = "changed"
+    verified.clear()
+    prepared = prepare()
+    assert prepared.wheel_filename == cached
+    assert verified == [server_wheels["changed"]]
+
+
+def test_wait_for_wheel(
+    tmp_context: context.WorkContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tmp_context.setup()
+    node = mknode("a")
+    wheel = tmp_context.wheels_downloads / "a-1.0-py3-none-any.whl"
+    polls: list[list[str]] = []
+
+    def fake_is_wheel_built(
+        wkctx: context.WorkContext,
+        dist_name: str,
+        resolved_version: Version,
+        wheel_server_urls: list[str],
+    ) -> typing.Any:
+        polls.append(wheel_server_urls)
+        return wheel if len(polls) == 3 else None
+
+    monkeypatch.setattr(build, "_is_wheel_built", fake_is_wheel_built)
+    monkeypatch.setattr(build.server, "update_wheel_mirror", lambda wkctx: None)
+    monkeypatch.setattr(build, "SHARD_POLL_INTERVAL", 0.0)
+
+    entry = build._wait_for_wheel(
+        node,
+        threading.Event(),
+        wkctx=tmp_context,
+        cache_wheel_server_url="https://wheels.example/simple",
+        timeout=60,
+    )
+    assert entry.wheel_filename == wheel
+    assert entry.skipped
+    assert polls == [["https://wheels.example/simple"]] * 3
+
+    polls.clear()
+    with pytest.raises(TimeoutError, match=r"a==1\.0 was not published"):
+        build._wait_for_wheel(
+            node,
+            threading.Event(),
+            wkctx=tmp_context,
+            cache_wheel_server_url="https://wheels.example/simple",
+            timeout=0,
+        )
@@ -208,3 +208,93 @@ def test_graph_subset_structure_integrity(
     assert "pyyaml==6.0.2" in subset_data
     # Verify its dependent is included
     assert "imapautofiler==1.14.0" in subset_data
+
+
+def _write_graph_with_fingerprints(
+    source: pathlib.Path, dest: pathlib.Path, changed: set[str]
+) -> None:
+    graph_data = json.loads(source.read_text())
+    for key, node in graph_data.items():
+        if key:
+            node["build_fingerprint"] = "new" if key in changed else "old"
+    dest.write_text(json.dumps(graph_data))
+
+
+def test_graph_rebuild_plan(
+    cli_runner: CliRunner, e2e_path: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    graph_json = e2e_path / "build-parallel" / "graph.json"
+    old_graph = tmp_path / "old.json"
+    _write_graph_with_fingerprints(graph_json, old_graph, set())
+
+    # nothing changed
+    result = cli_runner.invoke(
+        fromager,
+        ["graph", "rebuild-plan", "--no-check-wheels", str(old_graph)],
+    )
+    assert result.exit_code == 0, result.output
+    assert list(json.loads(result.stdout)) == [""]
+
+    # markupsafe is only an install requirement
+    new_graph = tmp_path / "new.json"
+    _write_graph_with_fingerprints(graph_json, new_graph, {"markupsafe==3.0.2"})
+    result = cli_runner.invoke(
+        fromager,
+        [
+            "graph",
+            "rebuild-plan",
+            "--no-check-wheels",
+            "--new-graph",
+            str(new_graph),
+            str(old_graph),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert set(json.loads(result.stdout)) == {"", "markupsafe==3.0.2"}
+
+    # packaging is in the build environment of setuptools-scm and wheel
+    _write_graph_with_fingerprints(graph_json, new_graph, {"packaging==25.0"})
+    output = tmp_path / "pruned.json"
+    result = cli_runner.invoke(
+        fromager,
+        [
+            "graph",
+            "rebuild-plan",
+            "--no-check-wheels",
+            "--new-graph",
+            str(new_graph),
+            "-o",
+            str(output),
+            str(old_graph),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    pruned = json.loads(output.read_text())
+    assert set(pruned) == {
+        "",
+        "packaging==25.0",
+        "wheel==0.46.1",
+        "setuptools-scm==8.3.1",
+        "pyyaml==6.0.2",
+        "imapautofiler==1.14.0",
+        "keyring==25.6.0",
+        "jaraco-functools==4.1.0",
+        "jaraco-context==6.0.1",
+        "jaraco-classes==3.4.0",
+    }
+    # build order is preserved
+    result = cli_runner.invoke(fromager, ["graph", "build-graph", str(output)])
+    assert result.exit_code == 0, result.output
+    assert "1. packaging==25.0\n" in result.stdout
+    assert "2. setuptools-scm==8.3.1, wheel==0.46.1\n" in result.stdout
+    assert "Building 9 packages in 3 rounds" in result.stdout
+
+
+def test_graph_rebuild_plan_no_wheels(
+    cli_runner: CliRunner, e2e_path: pathlib.Path
+) -> None:
+    graph_json = e2e_path / "build-parallel" / "graph.json"
+    result = cli_runner.invoke(fromager, ["graph", "rebuild-plan", str(graph_json)])
+    assert result.exit_code == 0, result.output
+    # wheels repository is empty, everything has to be built
+    assert len(json.loads(result.stdout)) == 17
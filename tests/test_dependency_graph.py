@@ -1,11 +1,13 @@
 import dataclasses
 import graphlib
 import pathlib
+import random
 import threading
 import time
 import typing
 
 import pytest
+from conftest import mknode
 from packaging.requirements import Requirement
 from packaging.utils import canonicalize_name
 from packaging.version import Version
@@ -19,10 +21,6 @@ from fromager.dependency_graph import (
 from fromager.requirements_file import RequirementType
 
 
-def mknode(name: str, version: str = "1.0", **kwargs: typing.Any) -> DependencyNode:
-    return DependencyNode(canonicalize_name(name), Version(version), **kwargs)
-
-
 def test_dependencynode_compare() -> None:
     a_10 = mknode("a", "1.0")
     a_20 = mknode("a", "2.0")
@@ -470,6 +468,63 @@ def test_tracking_topology_sorter_empty_graph() -> None:
     assert "topology is not active" in str(excinfo.value)
 
 
+def test_tracking_topology_sorter_streaming() -> None:
+    a = mknode("a")
+    b = mknode("b")
+    c = mknode("c")
+    topo = TrackingTopologicalSorter(streaming=True)
+    topo.prepare()
+
+    # open streaming sorter is active and waits for new nodes
+    assert topo.is_active()
+    assert topo.get_available() == set()
+
+    generation = topo.generation
+    topo.add(a)
+    assert topo.wait(generation, timeout=0) != generation
+    assert topo.get_available() == {a}
+    topo.add(b, a)
+    assert topo.get_available() == {a}
+    topo.done(a)
+    assert topo.is_done(a)
+    assert topo.get_available() == {b}
+
+    # new node depends on a node that is done
+    topo.add(c, a)
+    assert topo.get_available() == {b, c}
+    topo.done(b, c)
+    assert topo.get_available() == set()
+    assert topo.is_active()
+
+    topo.close()
+    assert not topo.is_active()
+    with pytest.raises(ValueError):
+        topo.add(mknode("d"))
+
+
+def test_tracking_topology_sorter_wait() -> None:
+    a = mknode("a")
+    topo = TrackingTopologicalSorter(streaming=True)
+    topo.prepare()
+    generation = topo.generation
+    # times out without changes
+    assert topo.wait(generation, timeout=0.01) == generation
+
+    timer = threading.Timer(0.05, topo.add, args=(a,))
+    timer.start()
+    assert topo.wait(generation, timeout=10) != generation
+    timer.join()
+    assert topo.get_available() == {a}
+
+
+def test_tracking_topology_sorter_closed_add_error() -> None:
+    topo = TrackingTopologicalSorter({mknode("a"): []})
+    topo.prepare()
+    with pytest.raises(ValueError) as excinfo:
+        topo.add(mknode("b"))
+    assert "cannot add nodes" in str(excinfo.value)
+
+
 def _build_graph(*edges: tuple[str, str, str]) -> DependencyGraph:
     """Build a DependencyGraph from (parent, child, req_type) triples.
 
@@ -705,3 +760,149 @@ def test_remove_dependency_nonexistent() -> None:
     graph.remove_dependency(canonicalize_name("nonexistent"), Version("1.0"))
 
     assert len(graph.nodes) == node_count
+
+
+def test_graph_indexes() -> None:
+    graph = _build_graph(
+        ("ROOT", "a", "toplevel"),
+        ("a", "b", "install"),
+        ("a", "b", "build-system"),
+        ("a", "c", "install"),
+        ("c", "b", "install"),
+    )
+    graph.add_dependency(
+        parent_name=canonicalize_name("a"),
+        parent_version=Version("1.0"),
+        req_type=RequirementType.INSTALL,
+        req=Requirement("B_Pkg.x>=2"),
+        req_version=Version("2.0"),
+    )
+    assert [n.key for n in graph.get_nodes_by_name("a")] == ["a==1.0"]
+    assert [n.key for n in graph.get_nodes_by_name("B-Pkg_X")] == ["b-pkg-x==2.0"]
+    assert graph.get_nodes_by_name("missing") == []
+    assert graph.get_nodes_by_name(None) == [graph.get_root_node()]
+
+    a = graph.nodes["a==1.0"]
+    edges = a.get_outgoing_edges("B", RequirementType.INSTALL)
+    assert [e.key for e in edges] == ["b==1.0"]
+    edges = a.get_outgoing_edges("b-pkg-x", RequirementType.INSTALL)
+    assert [e.key for e in edges] == ["b-pkg-x==2.0"]
+    assert a.get_outgoing_edges("b", RequirementType.BUILD_BACKEND) == []
+    root = graph.get_root_node()
+    assert len(root.get_outgoing_edges("a", RequirementType.TOP_LEVEL)) == 1
+
+    # removal keeps the indexes current
+    graph.remove_dependency(canonicalize_name("c"), Version("1.0"))
+    assert graph.get_nodes_by_name("c") == []
+    assert a.get_outgoing_edges("c", RequirementType.INSTALL) == []
+    assert len(a.get_outgoing_edges("b", RequirementType.BUILD_SYSTEM)) == 1
+    graph.remove_dependency(canonicalize_name("b-pkg-x"), Version("2.0"))
+    assert graph.get_nodes_by_name("b-pkg-x") == []
+    assert a.get_outgoing_edges("b-pkg-x", RequirementType.INSTALL) == []
+
+
+def _assert_closures_match(graph: DependencyGraph) -> None:
+    closures = graph.closures()
+    for node in graph.get_all_nodes():
+        assert {n.key for n in closures.build_requirements(node)} == {
+            n.key for n in node.iter_build_requirements()
+        }
+        assert {n.key for n in closures.install_requirements(node)} == {
+            n.key for n in node.iter_install_requirements()
+        }
+        assert {n.key for n in closures.all_dependencies(node)} == {
+            n.key for n in node.iter_all_dependencies()
+        }
+
+
+def test_graph_closures() -> None:
+    graph = _build_graph(
+        ("ROOT", "a", "toplevel"),
+        ("a", "b", "install"),
+        ("a", "c", "build-system"),
+        ("c", "d", "install"),
+        ("d", "c", "install"),
+        ("d", "e", "build-backend"),
+        ("e", "e", "install"),
+        ("b", "a", "install"),
+    )
+    _assert_closures_match(graph)
+    closures = graph.closures()
+    assert graph.closures() is closures
+    a = graph.nodes["a==1.0"]
+    d = graph.nodes["d==1.0"]
+    assert closures.to_keys(closures.build_bits(a)) == {"c==1.0", "d==1.0"}
+    assert closures.to_names(closures.dependents_bits(d)) == {"a", "b", "c", "d"}
+    assert closures.to_keys(closures.dependents_bits(d)) == {
+        "",
+        "a==1.0",
+        "b==1.0",
+        "c==1.0",
+        "d==1.0",
+    }
+
+    # changes reset the memoized closures
+    graph.remove_dependency(canonicalize_name("d"), Version("1.0"))
+    assert graph.closures() is not closures
+    _assert_closures_match(graph)
+
+
+def test_graph_closures_random() -> None:
+    rng = random.Random(42)
+    names = [f"pkg{i}" for i in range(40)]
+    req_types = ["install", "build-system", "build-backend", "build-sdist"]
+    graph = _build_graph(*(("ROOT", name, "toplevel") for name in names[:5]))
+    # parents must exist before their edges are added
+    for name in names[5:]:
+        graph.add_dependency(
+            parent_name=canonicalize_name(names[0]),
+            parent_version=Version("1.0"),
+            req_type=RequirementType.INSTALL,
+            req=Requirement(f"{name}==1.0"),
+            req_version=Version("1.0"),
+        )
+    for _ in range(200):
+        graph.add_dependency(
+            parent_name=canonicalize_name(rng.choice(names)),
+            parent_version=Version("1.0"),
+            req_type=RequirementType(rng.choice(req_types)),
+            req=Requirement(f"{rng.choice(names)}==1.0"),
+            req_version=Version("1.0"),
+        )
+    _assert_closures_match(graph)
+
+
+def test_from_dict_lazy_requirements() -> None:
+    graph = _build_graph(
+        ("ROOT", "a", "toplevel"),
+        ("a", "b", "install"),
+        ("a", "c", "build-system"),
+        ("c", "b", "install"),
+    )
+    graph.add_dependency(
+        parent_name=canonicalize_name("b"),
+        parent_version=Version("1.0"),
+        req_type=RequirementType.INSTALL,
+        req=Requirement("D_Pkg[extra]>=1.0; python_version>='3.8'"),
+        req_version=Version("1.0"),
+        constraint=Requirement("d-pkg<2"),
+    )
+    raw_graph = graph._to_dict()
+    loaded = DependencyGraph.from_dict(raw_graph)
+
+    assert list(loaded.nodes) == list(graph.nodes)
+    assert loaded._to_dict() == raw_graph
+    b = loaded.nodes["b==1.0"]
+    edge = b.children[0]
+    # requirement is parsed on first access and kept
+    assert edge._req_string == 'D_Pkg[extra]>=1.0; python_version >= "3.8"'
+    assert edge._req is None
+    assert isinstance(edge.req, Requirement)
+    assert edge.req is edge.req
+    assert b.get_outgoing_edges("d_pkg", RequirementType.INSTALL) == [edge]
+    assert loaded.nodes["d-pkg==1.0"].constraint == Requirement("d-pkg<2")
+    for key, node in graph.nodes.items():
+        loaded_node = loaded.nodes[key]
+        assert loaded_node.children == node.children
+        assert loaded_node.parents == node.parents
+    assert loaded.get_nodes_by_name("d-pkg") == [loaded.nodes["d-pkg==1.0"]]
@@ -2,14 +2,16 @@ import logging
 import os
 import pathlib
 import subprocess
+import sys
 import typing
 from unittest import mock
 
+import psutil
 import pytest
 from packaging.requirements import Requirement
 from packaging.version import Version
 
-from fromager import external_commands, log
+from fromager import external_commands, log, resource_usage
 
 
 def test_external_commands_environ() -> None:
@@ -33,7 +35,7 @@ def test_external_commands_log_file(tmp_path: pathlib.Path) -> None:
 
 
 @mock.patch(
-    "subprocess.run",
+    "fromager.external_commands._run_with_usage",
     return_value=mock.Mock(returncode=0, stdout=b"test output\n"),
 )
 @mock.patch(
@@ -62,12 +64,73 @@ def test_external_commands_network_isolation(
         ],
         cwd=None,
         env={},
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
         stdin=None,
+        output=mock.ANY,
+        timeouts=external_commands._Timeouts(),
     )
 
 
+_MANY_LINES = "for i in range(1000): print(f'line {i}')"
+
+
+def test_external_commands_log_file_tail(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(external_commands, "OUTPUT_TAIL_SIZE", 100)
+    log_filename = tmp_path / "test.log"
+    output = external_commands.run(
+        [sys.executable, "-c", _MANY_LINES], log_filename=str(log_filename)
+    )
+    # complete output in the log file, bounded tail in memory
+    assert log_filename.read_text() == "".join(f"line {i}\n" for i in range(1000))
+    assert output.endswith("line 998\nline 999\n")
+    assert len(output) <= 100
+
+    # without a log file, the caller gets the complete output
+    output = external_commands.run([sys.executable, "-c", _MANY_LINES])
+    assert output.count("\n") == 1000
+
+
+@mock.patch(
+    "fromager.external_commands.network_isolation_cmd",
+    return_value=["env"],
+)
+def test_external_commands_error_tail(
+    m_network_isolation_cmd: mock.Mock,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(external_commands, "OUTPUT_TAIL_SIZE", 100)
+    log_filename = tmp_path / "test.log"
+    script = f"print('connect: Network is unreachable')\n{_MANY_LINES}\nexit(1)"
+    with pytest.raises(external_commands.NetworkIsolationError) as excinfo:
+        external_commands.run(
+            [sys.executable, "-c", script],
+            log_filename=str(log_filename),
+            network_isolation=True,
+        )
+    assert "Network is unreachable" not in excinfo.value.output
+    assert excinfo.value.output.endswith("line 999\n")
+    assert "[output truncated, complete output is in" in caplog.text
+
+
+def test_external_commands_resource_usage(tmp_path: pathlib.Path) -> None:
+    with resource_usage.collect() as usages:
+        external_commands.run(
+            [sys.executable, "-c", "x = bytearray(64 * 1024 * 1024)"],
+            log_filename=str(tmp_path / "test.log"),
+        )
+        with pytest.raises(subprocess.CalledProcessError):
+            external_commands.run(["sh", "-c", "exit 3"])
+    assert len(usages) == 2
+    assert usages[0].max_rss >= 64 * 1024 * 1024
+    assert usages[0].cpu_time > 0
+    total = resource_usage.total(usages)
+    assert total.max_rss == usages[0].max_rss
+    assert total.user_time == usages[0].user_time + usages[1].user_time
+
+
 NETWORK_ISOLATION_ERROR: Exception | None = None
 try:
     external_commands.detect_network_isolation()
@@ -176,3 +239,52 @@ def test_format_exception_formats_chained_exceptions() -> None:
         assert "Higher level error" in formatted
         assert "because" in formatted
         assert "Root cause" in formatted
+
+
+_HANG = "import time; print('started', flush=True); time.sleep(60)"
+
+
+def test_external_commands_output_timeout() -> None:
+    dump = mock.Mock()
+    with external_commands.timeouts(output=0.5, dump=dump):
+        with pytest.raises(external_commands.CommandTimeoutError) as excinfo:
+            external_commands.run([sys.executable, "-c", _HANG])
+    err = excinfo.value
+    assert err.reason == "produced no output for 0.5s"
+    assert err.returncode == -9
+    assert "started" in err.output
+    dump.assert_called_once()
+
+
+def test_external_commands_timeout_kills_process_group(
+    tmp_path: pathlib.Path,
+) -> None:
+    log_filename = tmp_path / "test.log"
+    # child process keeps writing output, grandchild hangs
+    script = (
+        "import subprocess, sys, time\n"
+        "p = subprocess.Popen(['sleep', '60'])\n"
+        "print(p.pid, flush=True)\n"
+        "while True:\n"
+        "    print('.', flush=True)\n"
+        "    time.sleep(0.05)\n"
+    )
+    with pytest.raises(external_commands.CommandTimeoutError) as excinfo:
+        external_commands.run(
+            [sys.executable, "-c", script],
+            log_filename=str(log_filename),
+            timeout=0.5,
+            output_timeout=30,
+        )
+    assert excinfo.value.reason == "exceeded its wall-clock timeout"
+    grandchild = int(log_filename.read_text().split()[0])
+    try:
+        assert psutil.Process(grandchild).status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        pass
+
+
+def test_external_commands_output_resets_timeout() -> None:
+    script = "import time\nfor _ in range(10):\n    print('.', flush=True)\n    time.sleep(0.1)\n"
+    output = external_commands.run([sys.executable, "-c", script], output_timeout=0.5)
+    assert output == ".\n" * 10
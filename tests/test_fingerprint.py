@@ -0,0 +1,158 @@
+import pathlib
+
+import pytest
+from conftest import mkwheel
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from fromager import context, fingerprint, sources
+
+_REQ = Requirement("test-pkg")
+_VERSION = Version("1.0.2")
+
+
+def test_fingerprint_digest() -> None:
+    fp1 = fingerprint.BuildFingerprint(source="a", patches="b", settings="c")
+    fp2 = fingerprint.BuildFingerprint(source="a", patches="b", settings="c")
+    fp3 = fingerprint.BuildFingerprint(source="x", patches="b", settings="c")
+    assert fp1.digest == fp2.digest
+    assert fp1.digest != fp3.digest
+    assert len(fp1.digest) == 64
+
+
+def test_fingerprint_differences() -> None:
+    fp1 = fingerprint.BuildFingerprint(
+        source="a", patches="b", settings="c", build_env="d", environment="e"
+    )
+    fp2 = fingerprint.BuildFingerprint(
+        source="a", patches="x", settings="c", build_env=None, environment="y"
+    )
+    assert fp1.differences(fp2) == ["patches", "environment"]
+    assert fp2.differences(fp1) == ["patches", "environment"]
+    assert fp1.differences(fp1) == []
+
+
+def test_fingerprint_roundtrip() -> None:
+    fp = fingerprint.BuildFingerprint(source="a", patches="b", build_env=None)
+    data = fp.to_dict()
+    assert data["digest"] == fp.digest
+    assert fingerprint.BuildFingerprint.from_dict(data) == fp
+    data["version"] = 999
+    with pytest.raises(ValueError, match="unsupported fingerprint version"):
+        fingerprint.BuildFingerprint.from_dict(data)
+
+
+def test_hash_source(tmp_path: pathlib.Path) -> None:
+    sdist = tmp_path / "test_pkg-1.0.2.tar.gz"
+    sdist.write_bytes(b"content")
+    digest = fingerprint.hash_source(sdist)
+    sdist.write_bytes(b"other content")
+    assert fingerprint.hash_source(sdist) != digest
+
+    checkout = tmp_path / "checkout"
+    checkout.joinpath("src").mkdir(parents=True)
+    checkout.joinpath("src", "mod.py").write_text("x = 1\n")
+    digest = fingerprint.hash_source(checkout)
+    # git metadata is ignored
+    checkout.joinpath(".git").mkdir()
+    checkout.joinpath(".git", "HEAD").write_text("ref: refs/heads/main\n")
+    assert fingerprint.hash_source(checkout) == digest
+    checkout.joinpath("src", "mod.py").write_text("x = 2\n")
+    assert fingerprint.hash_source(checkout) != digest
+
+
+def test_hash_build_env() -> None:
+    assert fingerprint.hash_build_env(
+        {"Setuptools": Version("80.0"), "wheel": Version("0.45")}
+    ) == fingerprint.hash_build_env(
+        {"wheel": Version("0.45"), "setuptools": Version("80.0")}
+    )
+    assert fingerprint.hash_build_env(
+        {"setuptools": Version("80.0")}
+    ) != fingerprint.hash_build_env({"setuptools": Version("80.1")})
+
+
+def test_compute_build_fingerprint(
+    tmp_path: pathlib.Path, testdata_context: context.WorkContext
+) -> None:
+    sdist = tmp_path / "test_pkg-1.0.2.tar.gz"
+    sdist.write_bytes(b"content")
+    fp = fingerprint.compute_build_fingerprint(
+        ctx=testdata_context,
+        req=_REQ,
+        version=_VERSION,
+        source_filename=sdist,
+        build_distributions={"setuptools": Version("80.0")},
+    )
+    assert fp.source == fingerprint.hash_source(sdist)
+    assert fp.build_env is not None
+    # test-pkg has patches
+    assert fp.patches != fingerprint.hash_patches([])
+    assert fp == fingerprint.compute_build_fingerprint(
+        ctx=testdata_context,
+        req=_REQ,
+        version=_VERSION,
+        source_filename=sdist,
+        build_distributions={"setuptools": Version("80.0")},
+    )
+
+    partial = fingerprint.compute_build_fingerprint(
+        ctx=testdata_context, req=_REQ, version=_VERSION
+    )
+    assert partial.source is None
+    assert partial.build_env is None
+    assert partial.differences(fp) == []
+
+
+def test_find_local_source(tmp_context: context.WorkContext) -> None:
+    assert (
+        fingerprint.find_local_source(ctx=tmp_context, req=_REQ, version=_VERSION)
+        is None
+    )
+
+    source = tmp_context.sdists_downloads / "test_pkg-1.0.2.tar.gz"
+    source.parent.mkdir(parents=True, exist_ok=True)
+    source.write_bytes(b"sdist")
+    unpack_dir = tmp_context.work_dir / "test_pkg-1.0.2"
+    unpack_dir.mkdir(parents=True)
+    sources.write_build_meta(unpack_dir, _REQ, source, _VERSION)
+    assert (
+        fingerprint.find_local_source(ctx=tmp_context, req=_REQ, version=_VERSION)
+        == source
+    )
+
+    # a removed source is not downloaded again
+    source.unlink()
+    assert (
+        fingerprint.find_local_source(ctx=tmp_context, req=_REQ, version=_VERSION)
+        is None
+    )
+
+
+def test_verify_wheel_fingerprint(
+    tmp_path: pathlib.Path, testdata_context: context.WorkContext
+) -> None:
+    expected = fingerprint.compute_build_fingerprint(
+        ctx=testdata_context, req=_REQ, version=_VERSION
+    )
+
+    # wheels without fingerprint are accepted
+    wheel_file = mkwheel(tmp_path / "legacy", None)
+    assert fingerprint.read_wheel_fingerprint(wheel_file) is None
+    assert fingerprint.verify_wheel_fingerprint(
+        ctx=testdata_context, req=_REQ, version=_VERSION, wheel_filename=wheel_file
+    )
+
+    wheel_file = mkwheel(tmp_path / "match", expected)
+    assert fingerprint.read_wheel_fingerprint(wheel_file) == expected
+    assert fingerprint.verify_wheel_fingerprint(
+        ctx=testdata_context, req=_REQ, version=_VERSION, wheel_filename=wheel_file
+    )
+
+    changed = fingerprint.BuildFingerprint(
+        **(expected.components() | {"settings": "changed"})
+    )
+    wheel_file = mkwheel(tmp_path / "changed", changed)
+    assert not fingerprint.verify_wheel_fingerprint(
+        ctx=testdata_context, req=_REQ, version=_VERSION, wheel_filename=wheel_file
+    )
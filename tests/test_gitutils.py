@@ -5,9 +5,17 @@ import sys
 from unittest.mock import Mock, patch
 
 import pytest
+from packaging.requirements import Requirement
 from packaging.version import Version
 
-from fromager.gitutils import GIT_HEAD, git_clean, git_clone_fast, parse_vcs_url
+from fromager import context
+from fromager.gitutils import (
+    GIT_HEAD,
+    git_clean,
+    git_clone,
+    git_clone_fast,
+    parse_vcs_url,
+)
 
 needs_git_command = pytest.mark.skipif(
     shutil.which("git") is None, reason="requires 'git' command"
@@ -76,6 +84,106 @@ def test_git_clone_fast_submodules(m_run: Mock, tmp_path: pathlib.Path) -> None:
     )
 
 
+@patch("fromager.external_commands.run")
+def test_git_clone_fast_sparse_checkout(m_run: Mock, tmp_path: pathlib.Path) -> None:
+    repo_url = "https://git.test/project.git"
+    tmp_path.joinpath(".gitmodules").touch()
+    git_clone_fast(
+        output_dir=tmp_path,
+        repo_url=repo_url,
+        sparse_checkout=["python/pkg"],
+    )
+
+    assert m_run.call_count == 4
+    assert m_run.call_args_list[0].args[0] == [
+        "git",
+        "clone",
+        "--filter=blob:none",
+        "--no-checkout",
+        "--sparse",
+        repo_url,
+        str(tmp_path),
+    ]
+    assert m_run.call_args_list[1].args[0] == [
+        "git",
+        "sparse-checkout",
+        "set",
+        "--cone",
+        "--",
+        "python/pkg",
+    ]
+    # submodules are limited to the sparse checkout
+    assert m_run.call_args_list[3].args[0][-2:] == ["--", "python/pkg"]
+
+
+@pytest.mark.parametrize(
+    "submodules,expected",
+    [
+        (True, ["--recurse-submodules=python/pkg"]),
+        (["vendor/lib1"], ["--recurse-submodules=vendor/lib1"]),
+        (False, []),
+    ],
+)
+@patch("fromager.external_commands.run")
+def test_git_clone_sparse_checkout_submodules(
+    m_run: Mock,
+    tmp_context: context.WorkContext,
+    tmp_path: pathlib.Path,
+    submodules: bool | list[str],
+    expected: list[str],
+) -> None:
+    repo_url = "https://git.test/project.git"
+    output_dir = tmp_path / "project"
+    git_clone(
+        ctx=tmp_context,
+        req=Requirement("project"),
+        output_dir=output_dir,
+        repo_url=repo_url,
+        submodules=submodules,
+        sparse_checkout=["python/pkg"],
+    )
+
+    # submodules are limited to the allowlist or the sparse checkout
+    assert m_run.call_args_list[0].args[0] == [
+        "git",
+        "clone",
+        "--sparse",
+        *expected,
+        repo_url,
+        str(output_dir),
+    ]
+    assert m_run.call_args_list[1].args[0][:3] == ["git", "sparse-checkout", "set"]
+
+
+@patch("fromager.external_commands.run")
+def test_git_clone_fast_submodule_paths(m_run: Mock, tmp_path: pathlib.Path) -> None:
+    repo_url = "https://git.test/project.git"
+    tmp_path.joinpath(".gitmodules").touch()
+    git_clone_fast(
+        output_dir=tmp_path,
+        repo_url=repo_url,
+        submodule_paths=["vendor/lib1", "vendor/lib2"],
+    )
+
+    assert m_run.call_count == 3
+    m_run.assert_called_with(
+        [
+            "git",
+            "submodule",
+            "update",
+            "--init",
+            "--recursive",
+            "--filter=blob:none",
+            "--jobs=4",
+            "--",
+            "vendor/lib1",
+            "vendor/lib2",
+        ],
+        cwd=str(tmp_path),
+        network_isolation=False,
+    )
+
+
 @patch("fromager.external_commands.run")
 def test_git_clean(m_run: Mock, tmp_path: pathlib.Path) -> None:
     git_clean(tmp_path)
@@ -105,6 +105,20 @@ def test_graph_from_dict() -> None:
     assert graph._to_dict() == raw_graph
 
 
+def test_graph_build_fingerprint() -> None:
+    graph = dependency_graph.DependencyGraph.from_dict(raw_graph)
+    graph.set_build_fingerprint(canonicalize_name("b"), Version("3.0"), "abc123")
+    # unknown nodes are ignored
+    graph.set_build_fingerprint(canonicalize_name("z"), Version("1.0"), "abc123")
+    graph_dict = graph._to_dict()
+    assert graph_dict["b==3.0"]["build_fingerprint"] == "abc123"
+    assert "build_fingerprint" not in graph_dict["c==4.0"]
+
+    graph = dependency_graph.DependencyGraph.from_dict(graph_dict)
+    assert graph.nodes["b==3.0"].build_fingerprint == "abc123"
+    assert graph.nodes["c==4.0"].build_fingerprint is None
+
+
 def test_get_install_dependencies() -> None:
     graph = dependency_graph.DependencyGraph.from_dict(raw_graph)
     graph.add_dependency(
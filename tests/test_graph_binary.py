@@ -0,0 +1,114 @@
+import io
+import json
+import pathlib
+
+import pytest
+from click.testing import CliRunner
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from fromager import graph_binary
+from fromager.__main__ import main as fromager
+from fromager.dependency_graph import DependencyGraph
+from fromager.requirements_file import RequirementType
+
+
+def _make_graph() -> DependencyGraph:
+    graph = DependencyGraph()
+    graph.add_dependency(
+        parent_name=None,
+        parent_version=None,
+        req_type=RequirementType.TOP_LEVEL,
+        req=Requirement("app[extra]>=1.0"),
+        req_version=Version("1.0"),
+        download_url="https://example.com/äpp-1.0.tar.gz",
+        constraint=Requirement("app<2"),
+    )
+    for name, req_type in [
+        ("setuptools", RequirementType.BUILD_SYSTEM),
+        ("lib", RequirementType.INSTALL),
+    ]:
+        graph.add_dependency(
+            parent_name=canonicalize_name("app"),
+            parent_version=Version("1.0"),
+            req_type=req_type,
+            req=Requirement(f"{name}; python_version >= '3.9'"),
+            req_version=Version("2.0"),
+            pre_built=name == "setuptools",
+        )
+    graph.add_dependency(
+        parent_name=canonicalize_name("lib"),
+        parent_version=Version("2.0"),
+        req_type=RequirementType.INSTALL,
+        req=Requirement("app"),
+        req_version=Version("1.0"),
+    )
+    graph.set_build_fingerprint(canonicalize_name("app"), Version("1.0"), "abc123")
+    return graph
+
+
+def test_binary_roundtrip(tmp_path: pathlib.Path) -> None:
+    graph = _make_graph()
+    graph_file = tmp_path / "graph.bin"
+    with graph_file.open("wb") as f:
+        graph.serialize_binary(f)
+    assert graph_file.read_bytes().startswith(graph_binary.MAGIC)
+
+    # memory-mapped file and in-memory buffer load the same graph
+    loaded = DependencyGraph.from_file(graph_file)
+    buffer = io.BytesIO(graph_file.read_bytes())
+    from_buffer = DependencyGraph.from_binary(buffer)
+    json_graph = DependencyGraph.from_dict(graph._to_dict())
+    for other in (loaded, from_buffer):
+        assert other._to_dict() == graph._to_dict()
+        assert list(other.nodes) == list(json_graph.nodes)
+        for key, node in json_graph.nodes.items():
+            assert other.nodes[key].parents == node.parents
+
+    app = loaded.nodes["app==1.0"]
+    assert app.build_fingerprint == "abc123"
+    assert app.constraint == Requirement("app<2")
+    assert loaded.nodes["setuptools==2.0"].pre_built
+    edges = app.get_outgoing_edges("Lib", RequirementType.INSTALL)
+    assert [edge.key for edge in edges] == ["lib==2.0"]
+
+
+def test_binary_errors() -> None:
+    buffer = io.BytesIO()
+    _make_graph().serialize_binary(buffer)
+    data = buffer.getvalue()
+    with pytest.raises(ValueError, match="truncated"):
+        graph_binary.loads(data[:-4])
+    with pytest.raises(ValueError, match="not a binary graph"):
+        graph_binary.loads(b"X" + data[1:])
+    newer = data[:8] + (graph_binary.FORMAT_VERSION + 1).to_bytes(2, "little")
+    with pytest.raises(ValueError, match="unsupported binary graph format"):
+        graph_binary.loads(newer + data[10:])
+
+
+def test_migrate_graph_formats(cli_runner: CliRunner, tmp_path: pathlib.Path) -> None:
+    graph = _make_graph()
+    json_file = tmp_path / "graph.json"
+    with json_file.open("w") as f:
+        graph.serialize(f)
+
+    binary_file = tmp_path / "graph.bin"
+    result = cli_runner.invoke(
+        fromager,
+        [
+            "graph",
+            "migrate-graph",
+            "--format",
+            "binary",
+            "-o",
+            str(binary_file),
+            str(json_file),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert graph_binary.is_binary_graph(binary_file.read_bytes())
+
+    result = cli_runner.invoke(fromager, ["graph", "migrate-graph", str(binary_file)])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == graph._to_dict()
@@ -0,0 +1,110 @@
+import json
+import pathlib
+
+from click.testing import CliRunner
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from fromager import graph_diff
+from fromager.__main__ import main as fromager
+from fromager.dependency_graph import DependencyGraph
+from fromager.requirements_file import RequirementType
+
+
+def _build_graph(*edges: tuple[str, str, str, str]) -> DependencyGraph:
+    """Build a graph from (parent key, req type, req, child version) tuples"""
+    graph = DependencyGraph()
+    for parent, req_type, req, version in edges:
+        parent_name, _, parent_version = parent.partition("==")
+        graph.add_dependency(
+            parent_name=canonicalize_name(parent_name) if parent_name else None,
+            parent_version=Version(parent_version) if parent_version else None,
+            req_type=RequirementType(req_type),
+            req=Requirement(req),
+            req_version=Version(version),
+            download_url=f"https://example.com/{req}-{version}",
+        )
+    return graph
+
+
+OLD = _build_graph(
+    ("", "toplevel", "app", "1.0"),
+    ("", "toplevel", "tool", "1.0"),
+    ("app==1.0", "install", "lib>=1", "1.0"),
+    ("app==1.0", "build-system", "setuptools", "70.0"),
+    ("tool==1.0", "install", "old-dep", "1.0"),
+)
+NEW = _build_graph(
+    ("", "toplevel", "app", "1.0"),
+    ("", "toplevel", "tool", "1.0"),
+    ("app==1.0", "install", "lib>=2", "2.0"),
+    ("app==1.0", "build-system", "setuptools", "70.0"),
+    ("tool==1.0", "install", "new-dep", "1.0"),
+)
+
+
+def test_diff_graphs() -> None:
+    result = graph_diff.diff_graphs(OLD, NEW)
+    assert [(c.kind, c.name) for c in result.nodes] == [
+        ("changed", "lib"),
+        ("added", "new-dep"),
+        ("removed", "old-dep"),
+    ]
+    lib = result.nodes[0]
+    assert lib.changes == {
+        "version": ("1.0", "2.0"),
+        "download_url": (
+            "https://example.com/lib>=1-1.0",
+            "https://example.com/lib>=2-2.0",
+        ),
+    }
+    assert lib.toplevel == ["app"]
+    assert result.nodes[2].toplevel == ["tool"]
+
+    edges: dict[tuple[str, str], graph_diff.EdgeChange] = {
+        (c.parent, c.child): c for c in result.edges
+    }
+    assert set(edges) == {("app", "lib"), ("tool", "new-dep"), ("tool", "old-dep")}
+    assert edges["app", "lib"].kind == "changed"
+    assert edges["app", "lib"].old == [graph_diff.EdgeEnd("1.0", "lib>=1", "1.0")]
+    assert edges["app", "lib"].new == [graph_diff.EdgeEnd("1.0", "lib>=2", "2.0")]
+    assert edges["tool", "new-dep"].kind == "added"
+
+    assert not graph_diff.diff_graphs(OLD, OLD)
+    assert "packages: 1 added, 1 removed, 1 changed" in result.summary()
+
+
+def test_diff_multiple_versions() -> None:
+    old = _build_graph(
+        ("", "toplevel", "a", "1.0"),
+        ("", "toplevel", "a", "2.0"),
+    )
+    new = _build_graph(
+        ("", "toplevel", "a", "2.0"),
+        ("", "toplevel", "a", "3.0"),
+        ("", "toplevel", "a", "4.0"),
+    )
+    result = graph_diff.diff_graphs(old, new)
+    assert [(c.kind, c.old_version, c.new_version) for c in result.nodes] == [
+        ("removed", Version("1.0"), None),
+        ("added", None, Version("3.0")),
+        ("added", None, Version("4.0")),
+    ]
+
+
+def test_graph_diff_command(cli_runner: CliRunner, tmp_path: pathlib.Path) -> None:
+    old_file = tmp_path / "old.json"
+    new_file = tmp_path / "new.json"
+    for graph, path in ((OLD, old_file), (NEW, new_file)):
+        with path.open("w") as f:
+            graph.serialize(f)
+
+    result = cli_runner.invoke(
+        fromager, ["graph", "diff", str(old_file), str(new_file)]
+    )
+    assert result.exit_code == 0, result.output
+    data = json.loads(result.stdout)
+    assert [node["name"] for node in data["nodes"]] == ["lib", "new-dep", "old-dep"]
+    assert data["nodes"][0]["changes"]["version"] == {"old": "1.0", "new": "2.0"}
+    assert "changed lib 1.0 -> 2.0 (download_url) via app" in result.stderr
@@ -0,0 +1,148 @@
+import itertools
+import json
+import pathlib
+
+import pytest
+from click.testing import CliRunner
+from conftest import mknode
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import Version
+
+from fromager import context, graph_shard
+from fromager.__main__ import main as fromager
+from fromager.build_simulator import BuildTask, Durations, get_build_tasks
+from fromager.commands import build
+from fromager.dependency_graph import DependencyGraph, DependencyNode
+from fromager.requirements_file import RequirementType
+
+
+def _task(name: str, duration: float, *predecessors: str) -> BuildTask:
+    return BuildTask(mknode(name), duration, frozenset(mknode(p) for p in predecessors))
+
+
+def _keys(nodes: frozenset[DependencyNode]) -> list[str]:
+    return sorted(node.canonicalized_name for node in nodes)
+
+
+def test_plan_shards() -> None:
+    # cmake is an expensive build dependency of both apps, wheel is cheap
+    tasks = [
+        _task("wheel", 10),
+        _task("cmake", 600),
+        _task("app1", 900, "cmake", "wheel"),
+        _task("app2", 800, "cmake", "wheel"),
+        _task("lib1", 300),
+        _task("lib2", 200, "wheel"),
+    ]
+    plan = graph_shard.plan_shards(tasks, 2)
+    shard1, shard2 = plan.shards
+    assert _keys(shard1.build) == ["app1", "cmake", "lib2", "wheel"]
+    assert _keys(shard1.external) == []
+    assert _keys(shard2.build) == ["app2", "lib1", "wheel"]
+    assert _keys(shard2.external) == ["cmake"]
+    assert _keys(plan.duplicated) == ["wheel"]
+    assert plan.published == {mknode("cmake"): 1}
+    assert shard1.work == 1710
+    assert shard2.work == 1110
+
+    # every package is built by at least one shard
+    built = set().union(*(shard.build for shard in plan.shards))
+    assert built == {task.node for task in tasks}
+
+    # without duplication, wheel is built once
+    plan = graph_shard.plan_shards(tasks, 2, duplicate_below=0)
+    assert not plan.duplicated
+    assert set(plan.published) == {mknode("cmake"), mknode("wheel")}
+
+    # a single shard builds everything
+    (shard,) = graph_shard.plan_shards(tasks, 1).shards
+    assert len(shard.build) == len(tasks)
+    assert not shard.external
+
+    with pytest.raises(ValueError):
+        graph_shard.plan_shards(tasks, 0)
+
+
+def test_plan_shards_nested_build_dependencies() -> None:
+    # predecessors are the build closure of one level, flit is only a build
+    # dependency of toolbackend
+    tasks = [
+        _task("flit", 10),
+        _task("toolbackend", 20, "flit"),
+        _task("tool", 30, "toolbackend"),
+        _task("app", 100, "tool"),
+        _task("lib", 50),
+    ]
+    plan = graph_shard.plan_shards(tasks, 2)
+    shard1, shard2 = plan.shards
+    assert _keys(shard1.build) == ["app", "flit", "tool", "toolbackend"]
+    assert _keys(shard2.build) == ["lib"]
+    assert shard1.work == 160
+
+    built = set().union(*(shard.build for shard in plan.shards))
+    assert built == {task.node for task in tasks}
+
+
+def test_shard_build_topology_nested(tmp_context: context.WorkContext) -> None:
+    # app -build-> tool -build-> toolbackend -build-> flit
+    graph = DependencyGraph()
+    graph.add_dependency(
+        parent_name=None,
+        parent_version=None,
+        req_type=RequirementType.TOP_LEVEL,
+        req=Requirement("app"),
+        req_version=Version("1.0"),
+    )
+    chain = ["app", "tool", "toolbackend", "flit"]
+    for parent, child in itertools.pairwise(chain):
+        graph.add_dependency(
+            parent_name=canonicalize_name(parent),
+            parent_version=Version("1.0"),
+            req_type=RequirementType.BUILD_SYSTEM,
+            req=Requirement(child),
+            req_version=Version("1.0"),
+        )
+    tasks = get_build_tasks(graph, tmp_context, Durations())
+    shard = graph_shard.plan_shards(tasks, 2).shards[0]
+    assert _keys(shard.build) == sorted(chain)
+
+    topo = build._get_build_topology(tmp_context, graph, shard)
+    batches = [_keys(frozenset(batch)) for batch in topo.static_batches()]
+    assert batches == [["flit"], ["toolbackend"], ["tool"], ["app"]]
+
+
+def test_graph_shard_command(cli_runner: CliRunner, tmp_path: pathlib.Path) -> None:
+    graph = DependencyGraph()
+    for name in ["app1", "app2"]:
+        graph.add_dependency(
+            parent_name=None,
+            parent_version=None,
+            req_type=RequirementType.TOP_LEVEL,
+            req=Requirement(name),
+            req_version=Version("1.0"),
+        )
+        graph.add_dependency(
+            parent_name=canonicalize_name(name),
+            parent_version=Version("1.0"),
+            req_type=RequirementType.BUILD_SYSTEM,
+            req=Requirement("setuptools"),
+            req_version=Version("70.0"),
+        )
+    graph_file = tmp_path / "graph.json"
+    with graph_file.open("w") as f:
+        graph.serialize(f)
+    plan_file = tmp_path / "plan.json"
+
+    result = cli_runner.invoke(
+        fromager,
+        ["graph", "shard", "-n", "2", "-o", str(plan_file), str(graph_file)],
+    )
+    assert result.exit_code == 0, result.output
+    assert "shard 2/2: 2 builds" in result.stdout
+    data = json.loads(plan_file.read_text())
+    assert [shard["build"] for shard in data["shards"]] == [
+        ["app1==1.0", "setuptools==70.0"],
+        ["app2==1.0", "setuptools==70.0"],
+    ]
+    assert data["duplicated"] == ["setuptools==70.0"]
@@ -0,0 +1,53 @@
+import concurrent.futures
+import logging
+import pathlib
+
+import pytest
+
+from fromager import log
+
+logger = logging.getLogger("fromager.test_log")
+
+
+def test_log_to_file_routes_by_context(
+    tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    caplog.set_level(logging.INFO)
+
+    def build(name: str) -> None:
+        with log.log_to_file(tmp_path / f"{name}.log"):
+            for i in range(100):
+                logger.info("%s line %d", name, i)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(build, ["a", "b", "c", "d"]))
+    logger.info("not in a build log")
+
+    for name in ["a", "b", "c", "d"]:
+        lines = (tmp_path / f"{name}.log").read_text().splitlines()
+        assert len(lines) == 100
+        assert all(f"{name} line" in line for line in lines)
+        assert lines[-1].endswith(f"{name} line 99")
+
+    # one handler serves all builds
+    handlers = [
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, log.BuildLogHandler)
+    ]
+    assert handlers == [log.get_build_log_handler()]
+
+
+def test_log_to_file_nested(
+    tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    caplog.set_level(logging.INFO)
+    with log.log_to_file(tmp_path / "outer.log"):
+        logger.info("outer")
+        with log.log_to_file(tmp_path / "inner.log"):
+            logger.info("inner")
+        logger.info("outer again")
+    assert (tmp_path / "inner.log").read_text().count("\n") == 1
+    outer = (tmp_path / "outer.log").read_text()
+    assert "outer again" in outer
+    assert "inner" not in outer
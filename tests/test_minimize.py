@@ -8,7 +8,7 @@ from packaging.utils import canonicalize_name
 from packaging.version import Version
 
 from fromager.__main__ import main as fromager
-from fromager.commands.minimize import _minimize_requirements
+from fromager.commands.minimize import _dependency_versions, _minimize_requirements
 from fromager.dependency_graph import DependencyGraph
 from fromager.requirements_file import RequirementType
 
@@ -490,3 +490,48 @@ def test_minimize_requirements_exact_version_preserved() -> None:
     assert "package-a==1.0.0" in minimal_strs
     assert "package-c==1.0.0" in minimal_strs
     assert "package-c>=1.0.0" not in minimal_strs
+
+
+def test_dependency_versions_index() -> None:
+    """Only install edges of non-root installed nodes are indexed"""
+    graph = DependencyGraph()
+    for name in ("package-a", "package-d"):
+        graph.add_dependency(
+            parent_name=None,
+            parent_version=None,
+            req_type=RequirementType.TOP_LEVEL,
+            req=Requirement(name),
+            req_version=Version("1.0"),
+        )
+    for req_type, dep, version in [
+        (RequirementType.INSTALL, "Package_C", "1.0"),
+        (RequirementType.INSTALL, "package-c", "2.0rc1"),
+        (RequirementType.BUILD_SYSTEM, "package-b", "1.0"),
+        (RequirementType.INSTALL, "package-c", "1.0"),
+    ]:
+        graph.add_dependency(
+            parent_name=canonicalize_name("package-a"),
+            parent_version=Version("1.0"),
+            req_type=req_type,
+            req=Requirement(dep),
+            req_version=Version(version),
+        )
+
+    assert _dependency_versions(graph) == {
+        "package-c": [Version("1.0"), Version("2.0rc1")],
+    }
+    minimal = _minimize_requirements(
+        [
+            Requirement("package-b"),
+            Requirement("package-c>=1.5"),
+            Requirement("package-c<1"),
+            Requirement("package-d"),
+        ],
+        graph,
+    )
+    # pre-releases satisfy requirements, top-level packages are kept
+    assert [str(req) for req in minimal] == [
+        "package-b",
+        "package-c<1",
+        "package-d",
+    ]
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from fromager import external_commands, network_sandbox
+
+try:
+    external_commands.detect_network_isolation()
+except Exception as err:
+    NETWORK_ISOLATION_ERROR: str | None = str(err)
+else:
+    NETWORK_ISOLATION_ERROR = None
+
+pytestmark = pytest.mark.skipif(
+    NETWORK_ISOLATION_ERROR is not None,
+    reason=f"network isolation is not supported: {NETWORK_ISOLATION_ERROR}",
+)
+
+_NETNS = ["readlink", "/proc/self/ns/net"]
+
+
+def _netns() -> str:
+    return external_commands.run(_NETNS, network_isolation=True).strip()
+
+
+def test_sandbox_pool_per_thread() -> None:
+    pool = network_sandbox.SandboxPool(external_commands.network_isolation_cmd())
+    try:
+        sandbox = pool.get()
+        assert pool.get() is sandbox
+        others: list[network_sandbox.NetworkSandbox] = []
+        thread = threading.Thread(target=lambda: others.append(pool.get()))
+        thread.start()
+        thread.join()
+        assert others[0] is not sandbox
+        # both holders are alive, their namespaces cannot share an inode
+        netns = [
+            external_commands.run([*s.command_prefix(), *_NETNS]).strip()
+            for s in (sandbox, others[0])
+        ]
+        assert netns[0] != netns[1]
+        assert len(pool) == 2
+        assert pool.setup_time > 0
+        assert pool.format().startswith("created 2 network sandbox(es) in ")
+    finally:
+        pool.close()
+    assert len(pool) == 0
+
+
+def test_run_in_sandbox() -> None:
+    host_netns = external_commands.run(_NETNS).strip()
+    # without a pool, every command runs in a new namespace
+    assert _netns() != host_netns
+
+    pool = network_sandbox.SandboxPool(external_commands.network_isolation_cmd())
+    external_commands.set_network_sandboxes(pool)
+    try:
+        first = _netns()
+        assert first != host_netns
+        assert _netns() == first
+        assert external_commands.run(["hostname"], network_isolation=True) == (
+            "localhost\n"
+        )
+        assert len(pool) == 1
+    finally:
+        external_commands.set_network_sandboxes(None)
+        pool.close()
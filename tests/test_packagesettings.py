@@ -12,6 +12,7 @@ from fromager import build_environment, context
 from fromager.packagesettings import (
     Annotations,
     BuildDirectory,
+    BuildOptions,
     EnvVars,
     ExternalCommands,
     GitOptions,
@@ -45,6 +46,9 @@ FULL_EXPECTED: dict[str, typing.Any] = {
         "cpu_cores_per_job": 4,
         "memory_per_job_gb": 4.0,
         "exclusive_build": False,
+        "resource_classes": [],
+        "build_timeout_minutes": None,
+        "output_timeout_minutes": None,
     },
     "changelog": {
         Version("1.0.1"): ["fixed bug"],
@@ -73,6 +77,7 @@ FULL_EXPECTED: dict[str, typing.Any] = {
     "git_options": {
         "submodules": False,
         "submodule_paths": [],
+        "sparse_checkout": [],
     },
     "name": "test-pkg",
     "has_config": True,
@@ -125,6 +130,9 @@ EMPTY_EXPECTED: dict[str, typing.Any] = {
         "cpu_cores_per_job": 1,
         "memory_per_job_gb": 1.0,
         "exclusive_build": False,
+        "resource_classes": [],
+        "build_timeout_minutes": None,
+        "output_timeout_minutes": None,
     },
     "changelog": {},
     "config_settings": {},
@@ -136,6 +144,7 @@ EMPTY_EXPECTED: dict[str, typing.Any] = {
     "git_options": {
         "submodules": False,
         "submodule_paths": [],
+        "sparse_checkout": [],
     },
     "has_config": True,
     "purl": None,
@@ -164,6 +173,9 @@ PREBUILT_PKG_EXPECTED: dict[str, typing.Any] = {
         "cpu_cores_per_job": 1,
         "memory_per_job_gb": 1.0,
         "exclusive_build": False,
+        "resource_classes": [],
+        "build_timeout_minutes": None,
+        "output_timeout_minutes": None,
     },
     "changelog": {
         Version("1.0.1"): ["onboard"],
@@ -177,6 +189,7 @@ PREBUILT_PKG_EXPECTED: dict[str, typing.Any] = {
     "git_options": {
         "submodules": False,
         "submodule_paths": [],
+        "sparse_checkout": [],
     },
     "has_config": True,
     "purl": None,
@@ -678,6 +691,17 @@ def test_git_options_default() -> None:
     git_opts = GitOptions()
     assert git_opts.submodules is False
     assert git_opts.submodule_paths == []
+    assert git_opts.sparse_checkout == []
+
+
+def test_git_options_sparse_checkout() -> None:
+    """Test GitOptions with sparse checkout paths."""
+    paths = ["python/pkg", "proto"]
+    git_opts = GitOptions(sparse_checkout=paths)
+    assert git_opts.sparse_checkout == paths
+    for invalid in ["", "/abs/path", "../outside", "python/../../outside"]:
+        with pytest.raises(pydantic.ValidationError):
+            GitOptions(sparse_checkout=[invalid])
 
 
 def test_git_options_with_submodules_enabled() -> None:
@@ -810,6 +834,31 @@ build_options:
     assert custom_pbi.exclusive_build is True
 
 
+def test_package_build_info_timeouts(testdata_context: context.WorkContext) -> None:
+    pbi = testdata_context.package_build_info(Requirement("test-empty-pkg==1.0.0"))
+    assert pbi.build_timeout is None
+    assert pbi.output_timeout is None
+
+    settings = Settings(
+        settings=SettingsFile(),
+        package_settings=[
+            PackageSettings.from_string(
+                "hung-pkg",
+                "build_options:\n  build_timeout_minutes: 90\n  output_timeout_minutes: 0.5\n",
+            )
+        ],
+        variant="cpu",
+        patches_dir=pathlib.Path("/tmp"),
+        max_jobs=1,
+    )
+    pbi = settings.package_build_info("hung-pkg")
+    assert pbi.build_timeout == 5400
+    assert pbi.output_timeout == 30
+
+    with pytest.raises(pydantic.ValidationError):
+        BuildOptions(output_timeout_minutes=0)
+
+
 def test_resolver_dist_validator() -> None:
     with pytest.raises(pydantic.ValidationError):
         ResolverDist(include_wheels=False, ignore_platform=True)
@@ -380,6 +380,8 @@ class TestPyPIGitResolver:
         mock_dl.assert_called_once_with(
             destination_dir=expected_dest,
             vcs_url=_CANDIDATE_GIT.url,
+            sparse_checkout=[],
+            submodule_paths=[],
         )
 
 
@@ -545,6 +547,8 @@ class TestGitHubTagCloneResolver:
         mock_dl.assert_called_once_with(
             destination_dir=expected_dest,
             vcs_url=_CANDIDATE_GITHUB_CLONE.url,
+            sparse_checkout=[],
+            submodule_paths=[],
         )
 
 
@@ -632,6 +636,8 @@ class TestGitLabTagCloneResolver:
         mock_dl.assert_called_once_with(
             destination_dir=expected_dest,
             vcs_url=_CANDIDATE_GITLAB_CLONE.url,
+            sparse_checkout=[],
+            submodule_paths=[],
         )
 
 
@@ -22,3 +22,15 @@ def test_read_from_url() -> None:
         with read.open_file_or_url(url) as f:
             for index, line in enumerate(f):
                 assert line.strip() == text[index]
+
+
+def test_read_binary_from_file_and_url(tmp_path: pathlib.Path) -> None:
+    file = tmp_path / "test"
+    file.write_bytes(b"\x00binary")
+    with read.open_binary_file_or_url(file) as f:
+        assert f.read() == b"\x00binary"
+    url = "https://someurl.com"
+    with requests_mock.Mocker() as r:
+        r.get(url, content=b"\x00binary")
+        with read.open_binary_file_or_url(url) as f:
+            assert f.read() == b"\x00binary"
@@ -0,0 +1,63 @@
+import sys
+
+from packaging.requirements import Requirement
+from packaging.version import Version
+
+from fromager import context, external_commands, metrics, resource_usage
+
+
+def test_resource_usage_add() -> None:
+    a = resource_usage.ResourceUsage(
+        user_time=1.0, system_time=0.5, max_rss=100, read_blocks=1, write_blocks=2
+    )
+    b = resource_usage.ResourceUsage(
+        user_time=2.0, system_time=0.5, max_rss=50, read_blocks=3, write_blocks=4
+    )
+    assert a + b == resource_usage.ResourceUsage(
+        user_time=3.0, system_time=1.0, max_rss=100, read_blocks=4, write_blocks=6
+    )
+    assert resource_usage.total([a, b]) == a + b
+    assert (a + b).cpu_time == 4.0
+    assert (a + b).write_bytes == 6 * resource_usage.BLOCK_SIZE
+
+
+def test_format_bytes() -> None:
+    assert resource_usage.format_bytes(512) == "512 B"
+    assert resource_usage.format_bytes(1536) == "1.5 KiB"
+    assert resource_usage.format_bytes(3 * 1024**3) == "3.0 GiB"
+
+
+def test_record_without_collector() -> None:
+    # no error outside of a collect() context
+    resource_usage.record(resource_usage.ResourceUsage())
+
+
+def test_collect_nested() -> None:
+    usage = resource_usage.ResourceUsage(user_time=1.0)
+    with resource_usage.collect() as outer:
+        with resource_usage.collect() as inner:
+            resource_usage.record(usage)
+        resource_usage.record(usage)
+    assert inner == [usage]
+    assert outer == [usage]
+
+
+def test_timeit_stores_resource_usage(tmp_context: context.WorkContext) -> None:
+    @metrics.timeit(description="run python")
+    def run_python(
+        *, ctx: context.WorkContext, req: Requirement, version: Version
+    ) -> None:
+        external_commands.run([sys.executable, "-c", "pass"])
+        external_commands.run([sys.executable, "-c", "pass"])
+
+    req = Requirement("test-pkg")
+    run_python(ctx=tmp_context, req=req, version=Version("1.0"))
+
+    usages = tmp_context.resource_usage_store["test-pkg==1.0"]
+    assert list(usages) == ["run_python"]
+    assert usages["run_python"].cpu_time > 0
+    assert usages["run_python"].max_rss > 0
+    assert (
+        metrics.get_resource_usage(tmp_context, "test-pkg==1.0") == usages["run_python"]
+    )
+    assert metrics.get_resource_usage(tmp_context, "other==1.0") is None
@@ -0,0 +1,40 @@
+import threading
+
+from fromager import resources
+
+
+def test_resource_pool_capacity() -> None:
+    pool = resources.ResourcePool({"rust-link": 2})
+    assert pool.capacity("rust-link") == 2
+    assert pool.capacity("unknown") == resources.DEFAULT_CAPACITY
+
+    assert pool.try_acquire(frozenset())
+    assert pool.try_acquire({"rust-link"})
+    assert pool.try_acquire({"rust-link", "unknown"})
+    assert pool.in_use() == {"rust-link": 2, "unknown": 1}
+    # all or nothing
+    assert not pool.try_acquire({"rust-link"})
+    assert not pool.try_acquire({"other", "unknown"})
+    assert pool.in_use() == {"rust-link": 2, "unknown": 1}
+
+    pool.release({"rust-link", "unknown"})
+    assert pool.try_acquire({"other", "unknown"})
+    assert pool.in_use() == {"rust-link": 1, "other": 1, "unknown": 1}
+
+
+def test_resource_pool_hold_waits() -> None:
+    pool = resources.ResourcePool()
+    pool.acquire({"huge-memory"})
+    acquired = threading.Event()
+
+    def worker() -> None:
+        with pool.hold({"huge-memory"}):
+            acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(timeout=0.05)
+    pool.release({"huge-memory"})
+    assert acquired.wait(timeout=10)
+    thread.join()
+    assert pool.in_use() == {}
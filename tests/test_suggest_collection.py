@@ -2,6 +2,7 @@
 
 import json
 import pathlib
+import random
 
 import pytest
 from click.testing import CliRunner
@@ -488,3 +489,31 @@ class TestAnalyzeSuggestions:
         assert new_pkg_counts == sorted(new_pkg_counts), (
             f"all_collections not sorted by new_packages: {ranked}"
         )
+
+    def test_matches_set_intersections(self) -> None:
+        """Bitset scores equal the sizes of the set intersections."""
+        rng = random.Random(7)
+        names = [f"pkg{i}" for i in range(60)]
+        graph = _build_graph(
+            {name: "1.0" for name in names[:20]},
+            {
+                f"{name}==1.0": [
+                    (dep, "1.0", rng.choice(["install", "build-system"]))
+                    for dep in rng.sample(names[8:], 5)
+                ]
+                for name in names[:20]
+            },
+        )
+        toplevel = [graph.nodes[f"{name}==1.0"] for name in names[:8]]
+        collection_packages = {
+            f"c{i}": {canonicalize_name(n) for n in rng.sample(names, 25)}
+            for i in range(6)
+        }
+        results = _analyze_suggestions(toplevel, collection_packages, graph.closures())
+        for entry in results:
+            closure = get_dependency_closure(graph.nodes[f"{entry['package']}==1.0"])
+            assert entry["total_dependencies"] == len(closure)
+            for score in entry["all_collections"]:
+                existing = len(closure & collection_packages[score["collection"]])
+                assert score["existing_packages"] == existing
+                assert score["new_packages"] == len(closure) - existing